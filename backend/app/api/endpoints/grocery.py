@@ -1,53 +1,228 @@
-from fastapi import APIRouter, Depends, HTTPException
+import math
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
 
-from ...models.grocery import GroceryItem, GroceryListResponse
+from ...models.grocery import (
+    GroceryComparisonResponse,
+    GroceryItem,
+    GroceryListResponse,
+    StoreBasket,
+    StoreComparison,
+)
 from ...models.schema import User
 from ...core.auth import get_current_user
 from ...core.supabase import get_supabase_admin
-from ...services.pricing import get_price_per_unit
+from ...services.basket_optimizer import optimize_basket
+from ...services.grocery_cache import get_grocery_cache
+from ...services.grocery_list import get_plan_groceries
+from ...services.pricing import get_price_matrix, get_prices_per_unit
+from ...services.store_adjustments import get_store_price_multiplier
+from ...services.store_comparison import compare_stores, item_names
+from .stores import haversine
 
 router = APIRouter(prefix="/grocery", tags=["grocery"])
 
+# Default radius around the plan's stores for the comparison endpoint
+NEARBY_RADIUS_KM = 5.0
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def _cached_response(cache_key: str, build: Callable[[], BaseModel], if_none_match: Optional[str]) -> Response:
+    """JSON response for *build()*, cached per price snapshot version, with ETag/304."""
+    cache = get_grocery_cache()
+    version = cache.version()
+    cached = cache.get(cache_key, version)
+    if cached is None:
+        body = build().model_dump_json()
+        etag = cache.put(cache_key, version, body)
+    else:
+        etag, body = cached
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _optimized_items(supabase, groceries: List[Dict], place_ids: List[str], max_stores: int):
+    """Items assigned to at most *max_stores* of the plan's stores, plus per-store sublists."""
+    keys = [(row["name"], row["unit"]) for row in groceries]
+    quantities = np.array([float(row["quantity"]) for row in groceries])
+    # One bulk fetch: cheapest usable price of every item at every store
+    matrix = get_price_matrix(place_ids, keys)
+    plan = optimize_basket(matrix * quantities[:, None], max_stores)
+
+    # Items none of the chosen stores prices fall back to the usual estimate
+    unassigned = [i for i, store in enumerate(plan.assignment) if store < 0]
+    fallback = dict(zip(unassigned, get_prices_per_unit(place_ids, [keys[i] for i in unassigned], default=None)))
+
+    items: list[GroceryItem] = []
+    for i, (row, store) in enumerate(zip(groceries, plan.assignment)):
+        ppu = float(matrix[i, store]) if store >= 0 else fallback[i]
+        items.append(GroceryItem(
+            name=row["name"], unit=row["unit"], quantity=row["quantity"], price_per_unit=ppu,
+            cost=ppu * row["quantity"] if ppu is not None else None,
+            store_place_id=place_ids[store] if store >= 0 else None,
+        ))
+
+    names_res = supabase.table("stores").select("place_id, name").in_("place_id", [place_ids[j] for j in plan.stores]).execute()
+    names = {r["place_id"]: r.get("name") for r in names_res.data or []}
+    baskets = []
+    for j in plan.stores:
+        store_items = [item for item in items if item.store_place_id == place_ids[j]]
+        baskets.append(StoreBasket(
+            place_id=place_ids[j], name=names.get(place_ids[j]), items=store_items,
+            total_cost=sum(item.cost for item in store_items),
+        ))
+    return items, baskets
+
+def build_grocery_list(plan_id: str, max_stores: Optional[int] = None) -> GroceryListResponse:
+    """Aggregate the plan's ingredients and price them at the plan's stores.
+
+    With *max_stores*, each item is assigned to one of at most that many of
+    the plan's stores so the basket is cheapest overall
+    (services/basket_optimizer.py); otherwise every item gets its cheapest
+    price across all of them.
+    """
+    supabase = get_supabase_admin()
+    # Verify plan belongs to user via RLS policies; fetch stores for plan
+    stores_res = supabase.table("meal_plan_stores").select("place_id").eq("meal_plan_id", plan_id).execute()
+    place_ids = [row["place_id"] for row in (stores_res.data or [])]
+
+    # Aggregated (ingredient, unit, quantity × servings) rows, summed in the database
+    groceries = get_plan_groceries(plan_id, supabase)
+
+    if max_stores and place_ids:
+        items, baskets = _optimized_items(supabase, groceries, place_ids, max_stores)
+        total_cost = sum(item.cost for item in items if item.cost)
+        return GroceryListResponse(plan_id=plan_id, items=items, total_cost=total_cost or None, stores=baskets)
+
+    items: list[GroceryItem] = []
+    total_cost = 0.0
+    # One batch lookup and vectorized pricing pass for the whole list
+    prices = get_prices_per_unit(place_ids, [(row["name"], row["unit"]) for row in groceries], default=None)
+    for row, ppu in zip(groceries, prices):
+        name, unit, quantity = row["name"], row["unit"], row["quantity"]
+        cost = ppu * quantity if ppu is not None else None
+        if cost:
+            total_cost += cost
+        items.append(GroceryItem(name=name, unit=unit, quantity=quantity, price_per_unit=ppu, cost=cost))
+
+    return GroceryListResponse(plan_id=plan_id, items=items, total_cost=total_cost if total_cost else None)
+
 @router.get("/{plan_id}", response_model=GroceryListResponse)
-async def get_grocery_list(plan_id: str, current_user: User = Depends(get_current_user)):
-    """Return aggregated grocery list with cheapest prices."""
+async def get_grocery_list(
+    plan_id: str,
+    max_stores: Optional[int] = Query(None, ge=1, description="optimize the basket across at most this many stores"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Return aggregated grocery list with cheapest prices.
+
+    With max_stores, items are split across at most that many of the plan's
+    stores for the cheapest basket, with per-store sublists in `stores`.
+
+    Lists are cached until the next price refresh (see services/grocery_cache.py)
+    and carry an ETag; a matching If-None-Match gets a 304.
+    """
+    try:
+        cache_key = f"{plan_id}?max_stores={max_stores}" if max_stores else plan_id
+        return _cached_response(cache_key, lambda: build_grocery_list(plan_id, max_stores), if_none_match)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _comparison_stores(supabase, place_ids: List[str], radius_km: float) -> List[Dict]:
+    """The plan's stores plus known stores within *radius_km* of their centre, with distances."""
+    columns = "place_id, name, lat, lon"
+    plan_rows = supabase.table("stores").select(columns).in_("place_id", place_ids).execute().data or []
+    by_id = {row["place_id"]: {**row, "in_plan": True} for row in plan_rows}
+    stores = [by_id.get(place_id, {"place_id": place_id, "in_plan": True}) for place_id in place_ids]
+    located = [row for row in plan_rows if row.get("lat") is not None and row.get("lon") is not None]
+    if not located:
+        return stores
+
+    lat = sum(row["lat"] for row in located) / len(located)
+    lon = sum(row["lon"] for row in located) / len(located)
+    if radius_km > 0:
+        # Bounding box in the query, exact distance here
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        nearby = (
+            supabase.table("stores").select(columns)
+            .gte("lat", lat - dlat).lte("lat", lat + dlat)
+            .gte("lon", lon - dlon).lte("lon", lon + dlon)
+            .execute().data
+            or []
+        )
+        for row in nearby:
+            if row["place_id"] not in by_id and haversine(lat, lon, row["lat"], row["lon"]) <= radius_km:
+                stores.append({**row, "in_plan": False})
+    for row in stores:
+        if row.get("lat") is not None and row.get("lon") is not None:
+            row["distance_km"] = round(haversine(lat, lon, row["lat"], row["lon"]), 2)
+    return stores
+
+def build_store_comparison(plan_id: str, radius_km: float = NEARBY_RADIUS_KM) -> GroceryComparisonResponse:
+    """Cost of the whole grocery list at each of the plan's and nearby stores."""
+    supabase = get_supabase_admin()
+    stores_res = supabase.table("meal_plan_stores").select("place_id").eq("meal_plan_id", plan_id).execute()
+    place_ids = [row["place_id"] for row in (stores_res.data or [])]
+    groceries = get_plan_groceries(plan_id, supabase)
+    stores = _comparison_stores(supabase, place_ids, radius_km) if place_ids else []
+
+    keys = [(row["name"], row["unit"]) for row in groceries]
+    # One query: prices at every compared store plus each item's cheapest anywhere
+    matrix = get_price_matrix([store["place_id"] for store in stores], keys, baseline=True)
+    totals = compare_stores(
+        matrix[:, :-1], matrix[:, -1],
+        np.array([get_store_price_multiplier(store.get("name") or "") for store in stores]),
+        np.array([float(row["quantity"]) for row in groceries]),
+    )
+
+    names = [row["name"] for row in groceries]
+    estimated, missing = item_names(totals.estimated, names), item_names(totals.missing, names)
+    comparisons = [
+        StoreComparison(
+            place_id=store["place_id"], name=store.get("name"), distance_km=store.get("distance_km"),
+            in_plan=store["in_plan"], total_cost=round(float(totals.totals[j]), 2),
+            direct_cost=round(float(totals.direct_totals[j]), 2),
+            coverage_pct=round(float(totals.coverage[j]) * 100, 1),
+            estimated_items=estimated[j], missing_items=missing[j],
+        )
+        for j, store in enumerate(stores)
+    ]
+    # Complete baskets first, then cheapest
+    comparisons.sort(key=lambda c: (len(c.missing_items), c.total_cost))
+    return GroceryComparisonResponse(plan_id=plan_id, item_count=len(groceries), stores=comparisons)
+
+@router.get("/{plan_id}/compare", response_model=GroceryComparisonResponse)
+async def compare_grocery_stores(
+    plan_id: str,
+    radius_km: float = Query(NEARBY_RADIUS_KM, ge=0, le=50, description="also compare known stores this close to the plan's"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """What the plan's whole grocery list would cost at each nearby store.
+
+    Per store: total (gaps estimated from the cheapest price elsewhere scaled
+    by the store's price level), directly priced total, coverage and the
+    estimated and missing items. Cached like the grocery list.
+    """
     try:
-        supabase = get_supabase_admin()
-        # Verify plan belongs to user via RLS policies; fetch stores for plan
-        stores_res = supabase.table("meal_plan_stores").select("place_id").eq("meal_plan_id", plan_id).execute()
-        place_ids = [row["place_id"] for row in (stores_res.data or [])]
-
-        # Fetch recipe ingredients for all recipes in the plan
-        join_res = supabase.table("meal_plan_recipes").select("servings, recipes(id,name,recipe_ingredients(quantity,unit,ingredients(name)))").eq("meal_plan_id", plan_id).execute()
-        if join_res.error:
-            raise HTTPException(status_code=500, detail="Failed to fetch plan data")
-
-        aggregate: Dict[Tuple[str,str], float] = {}
-        for row in (join_res.data or []):
-            servings = row.get("servings", 1)
-            recipes_block = row.get("recipes", {}) or {}
-            for ri in recipes_block.get("recipe_ingredients", []) or []:
-                ing_name = (ri.get("ingredients", {}) or {}).get("name")
-                unit = ri.get("unit")
-                qty = ri.get("quantity", 0) * servings
-                if not ing_name or not unit:
-                    continue
-                key = (ing_name.lower(), unit.lower())
-                aggregate[key] = aggregate.get(key, 0) + qty
-
-        items: list[GroceryItem] = []
-        total_cost = 0.0
-        for (name, unit), quantity in aggregate.items():
-            ppu = get_price_per_unit(place_ids, name, unit, default=None)
-            cost = ppu * quantity if ppu is not None else None
-            if cost:
-                total_cost += cost
-            items.append(GroceryItem(name=name, unit=unit, quantity=quantity, price_per_unit=ppu, cost=cost))
-
-        return GroceryListResponse(plan_id=plan_id, items=items, total_cost=total_cost if total_cost else None)
+        cache_key = f"{plan_id}/compare?radius_km={radius_km:g}"
+        return _cached_response(cache_key, lambda: build_store_comparison(plan_id, radius_km), if_none_match)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -9,7 +9,32 @@ class GroceryItem(BaseModel):
     cost: Optional[float] = None
     store_place_id: Optional[str] = None
 
+class StoreBasket(BaseModel):
+    place_id: str
+    name: Optional[str] = None
+    items: list[GroceryItem]
+    total_cost: float
+
 class GroceryListResponse(BaseModel):
     plan_id: str
     items: list[GroceryItem]
-    total_cost: Optional[float] = None 
\ No newline at end of file
+    total_cost: Optional[float] = None
+    # Per-store sublists when the list was optimized across stores (max_stores)
+    stores: Optional[list[StoreBasket]] = None 
+class StoreComparison(BaseModel):
+    place_id: str
+    name: Optional[str] = None
+    distance_km: Optional[float] = None
+    in_plan: bool = False
+    # Whole list at this store: direct prices, gaps estimated from the cheapest price elsewhere
+    total_cost: float
+    # Directly priced items only
+    direct_cost: float
+    coverage_pct: float
+    estimated_items: list[str] = []
+    missing_items: list[str] = []
+
+class GroceryComparisonResponse(BaseModel):
+    plan_id: str
+    item_count: int
+    stores: list[StoreComparison]
@@ -0,0 +1,120 @@
+"""
+Multi-store basket optimization.
+
+Given an items × stores cost matrix (price per unit × quantity, NaN where a
+store has no usable price), pick at most K stores and assign every item to
+one of them so the basket's total is as low as possible.
+
+Coverage comes first: an item none of the chosen stores prices costs a
+penalty larger than any whole basket, so a plan that prices more items
+always wins, and cost decides between plans with the same coverage.
+
+- Exact: when there are at most EXACT_MAX_SUBSETS ways to choose the stores,
+  every subset of size min(K, stores) is scored at once with array
+  operations (adding a store never makes a basket dearer, so smaller subsets
+  never win).
+- Heuristic otherwise: from each store in turn, greedily add the store that
+  lowers the score most, then swap chosen for unchosen stores while that
+  improves it; the best of these runs wins.
+
+With the subset fixed, each item simply goes to its cheapest chosen store.
+"""
+
+from itertools import combinations
+from math import comb
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+# Above this many store subsets the greedy + swap heuristic is used
+EXACT_MAX_SUBSETS = 5000
+# Subsets scored per array operation (bounds memory to items × chunk × K)
+SUBSET_CHUNK = 512
+
+
+class BasketPlan(NamedTuple):
+    stores: List[int]  # chosen store columns, ascending
+    assignment: np.ndarray  # store column per item, -1 where no chosen store prices it
+    costs: np.ndarray  # cost per item at its store, NaN where unassigned
+    total: float  # sum of the assigned costs
+    exact: bool  # whether the subset is provably optimal
+
+
+def _penalized(costs: np.ndarray) -> np.ndarray:
+    """*costs* with unavailable cells set to a penalty above any full basket."""
+    finite = np.isfinite(costs)
+    penalty = np.where(finite, costs, 0.0).max(axis=1, initial=0.0).sum() + 1.0
+    return np.where(finite, costs, penalty)
+
+
+def _scores(filled: np.ndarray, subsets: np.ndarray) -> np.ndarray:
+    """Penalized basket score of each row of *subsets* (store columns)."""
+    return filled[:, subsets].min(axis=2).sum(axis=0)
+
+
+def _exact(filled: np.ndarray, k: int) -> List[int]:
+    best_score, best = np.inf, None
+    subsets = combinations(range(filled.shape[1]), k)
+    while True:
+        chunk = np.array([s for _, s in zip(range(SUBSET_CHUNK), subsets)], dtype=np.int64)
+        if not len(chunk):
+            return list(best)
+        scores = _scores(filled, chunk)
+        i = int(scores.argmin())
+        if scores[i] < best_score:
+            best_score, best = scores[i], chunk[i]
+
+
+def _greedy_swap(filled: np.ndarray, k: int, first: int) -> Tuple[float, List[int]]:
+    """Greedy choice starting from store *first*, improved by 1-swaps; (score, stores)."""
+    chosen = [first]
+    current = filled[:, first].copy()
+    for _ in range(k - 1):
+        # Score of adding each store to the current choice, all stores at once
+        scores = np.minimum(current[:, None], filled).sum(axis=0)
+        scores[chosen] = np.inf
+        store = int(scores.argmin())
+        chosen.append(store)
+        current = np.minimum(current, filled[:, store])
+
+    best_score = float(current.sum())
+    improved = True
+    while improved:
+        improved = False
+        for position in range(len(chosen)):
+            rest = [s for j, s in enumerate(chosen) if j != position]
+            base = filled[:, rest].min(axis=1) if rest else np.full(filled.shape[0], np.inf)
+            scores = np.minimum(base[:, None], filled).sum(axis=0)
+            scores[chosen] = np.inf
+            store = int(scores.argmin())
+            if scores[store] < best_score - 1e-9:
+                chosen[position], best_score, improved = store, float(scores[store]), True
+    return best_score, chosen
+
+
+def _heuristic(filled: np.ndarray, k: int) -> List[int]:
+    # One greedy + swap run per starting store, keep the best basket
+    return min(_greedy_swap(filled, k, first) for first in range(filled.shape[1]))[1]
+
+
+def optimize_basket(costs: np.ndarray, max_stores: int) -> BasketPlan:
+    """Assign each item (row) to one of at most *max_stores* stores (columns)."""
+    costs = np.asarray(costs, dtype=float)
+    n_items, n_stores = costs.shape
+    k = min(max(max_stores, 1), n_stores)
+    if not n_items or not n_stores:
+        return BasketPlan([], np.full(n_items, -1), np.full(n_items, np.nan), 0.0, True)
+
+    filled = _penalized(costs)
+    exact = comb(n_stores, k) <= EXACT_MAX_SUBSETS
+    stores = sorted(_exact(filled, k) if exact else _heuristic(filled, k))
+
+    chosen = costs[:, stores]
+    finite = np.isfinite(chosen)
+    best = np.where(finite, chosen, np.inf).argmin(axis=1)
+    priced = finite.any(axis=1)
+    assignment = np.where(priced, np.asarray(stores)[best], -1)
+    item_costs = np.where(priced, chosen[np.arange(n_items), best], np.nan)
+    # Drop stores no item ended up at
+    used = sorted(set(assignment[priced].tolist()))
+    return BasketPlan(used, assignment, item_costs, float(np.nansum(item_costs)), exact)
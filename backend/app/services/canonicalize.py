@@ -0,0 +1,298 @@
+"""
+Ingredient name canonicalization.
+
+LLM output spells the same ingredient many ways ("Chicken Breast",
+"boneless chicken breasts", "chicken breast, diced"). Every spelling used to
+become its own `ingredients` row, which bloated the price search space and the
+cart mapping table. This module collapses variants in two stages:
+
+1. Rule-based normalization (casing, punctuation, preparation descriptors,
+   plurals) produces a canonical key. Only words that never change the
+   product bought are stripped; product forms ("canned", "crushed",
+   "dried", ...) are kept, including from parentheticals and comma tails.
+2. The key is looked up in the `ingredient_aliases` table, which maps any
+   known variant to the canonical ingredient row. New aliases are recorded by
+   the write path and by `scripts/merge_duplicate_ingredients.py`, which also
+   clusters near-duplicates by embedding similarity.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.supabase import get_supabase_admin
+
+# Cosine similarity above which two ingredient embeddings are treated as the
+# same ingredient. Kept deliberately high: "chicken breast" vs "chicken thigh"
+# sit around 0.85 with text-embedding-3-small.
+MERGE_SIMILARITY_THRESHOLD = 0.92
+
+# Resolved spellings kept per process, and for how long. The TTL bounds how
+# long a running API keeps resolving to rows merge_duplicate_ingredients.py
+# has since deleted.
+CACHE_SIZE = int(os.getenv("CANONICAL_CACHE_SIZE", "8192"))
+CACHE_TTL_SECONDS = float(os.getenv("CANONICAL_CACHE_TTL", "300"))
+
+# Preparation / quality words that never change what you buy at the store.
+# Words that name a different product ("crushed red pepper", "shredded
+# cheese", "raw honey") are deliberately not here.
+DESCRIPTORS = frozenset({
+    "fresh", "freshly", "ripe", "large", "medium", "small", "boneless",
+    "skinless", "diced", "chopped", "minced", "halved", "quartered", "peeled",
+    "trimmed", "rinsed", "drained", "finely", "roughly", "thinly", "coarsely",
+    "softened", "melted", "beaten", "optional", "to", "taste",
+})
+
+# Product forms kept when they only appear in a parenthetical or after the
+# first comma: "Tomatoes (canned)" and "tomatoes, canned" are "canned tomato".
+PRODUCT_FORMS = frozenset({
+    "canned", "crushed", "dried", "frozen", "ground", "jarred", "pickled",
+    "powdered", "roasted", "smoked", "toasted",
+})
+
+# Words ending in "s" that are not plurals, or that are always bought in the
+# plural form and should stay that way.
+_KEEP_PLURAL = frozenset({
+    "hummus", "asparagus", "couscous", "molasses", "swiss", "grass", "bass",
+    "citrus", "lentils", "oats", "grits", "greens", "brussels", "chips", "peas",
+    "noodles", "flakes", "sprouts", "pancakes", "waffles", "crackers",
+})
+
+_IRREGULAR_PLURALS = {
+    # -ie nouns, which the -ies -> -y rule would turn into "cooky"
+    "cookies": "cookie",
+    "brownies": "brownie",
+    "veggies": "veggie",
+    "smoothies": "smoothie",
+    "hoagies": "hoagie",
+    "pies": "pie",
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "knives": "knife",
+    "halves": "half",
+    "potatoes": "potato",
+    "tomatoes": "tomato",
+    "mangoes": "mango",
+    "avocadoes": "avocado",
+}
+
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_NON_ALPHA_RE = re.compile(r"[^a-z\s-]")
+_WS_RE = re.compile(r"\s+")
+
+
+def _singularize(word: str) -> str:
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if word in _KEEP_PLURAL or len(word) <= 3 or not word.endswith("s"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is")):
+        return word
+    return word[:-1]
+
+
+def _words(text: str) -> List[str]:
+    text = _NON_ALPHA_RE.sub(" ", text).replace("-", " ")
+    return [w for w in _WS_RE.split(text) if w]
+
+
+@lru_cache(maxsize=8192)
+def normalize_ingredient_name(name: str) -> str:
+    """Return the canonical key for an ingredient name.
+
+    Lowercases, drops parentheticals and anything after the first comma
+    ("chicken breast, diced") except the product forms in them, strips
+    punctuation and preparation descriptors, and singularizes the head noun.
+    Falls back to the lowercased input when the rules would strip everything.
+    """
+    if not name:
+        return ""
+    lowered = name.strip().lower()
+    head, _, tail = _PARENS_RE.sub(" ", lowered).partition(",")
+    dropped = " ".join(_PARENS_RE.findall(lowered)) + " " + tail
+    words = _words(head)
+    forms = [w for w in _words(dropped) if w in PRODUCT_FORMS and w not in words]
+    words = list(dict.fromkeys(forms)) + [w for w in words if w not in DESCRIPTORS]
+    if not words:
+        return _WS_RE.sub(" ", lowered)
+    # Only the last word is the head noun ("green beans" -> "green bean").
+    words[-1] = _singularize(words[-1])
+    return " ".join(words)
+
+
+def _parse_embedding(value) -> Optional[List[float]]:
+    """PostgREST returns pgvector columns as '[0.1,0.2,...]' strings."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    return list(value) if value else None
+
+
+def cluster_ingredients(
+    rows: Sequence[Dict],
+    similarity_threshold: float = MERGE_SIMILARITY_THRESHOLD,
+    block_size: int = 1024,
+) -> List[List[Dict]]:
+    """Group ingredient rows that refer to the same thing.
+
+    Rows sharing a normalized name are always grouped; rows whose embeddings
+    have cosine similarity >= similarity_threshold are grouped too (union-find,
+    so clusters are transitive). Each row needs "id" and "name" and may carry
+    an "embedding". Only clusters with more than one member are returned.
+    """
+    parent = list(range(len(rows)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a: int, b: int) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    # Stage 1: identical canonical keys
+    first_by_key: Dict[str, int] = {}
+    for i, row in enumerate(rows):
+        key = normalize_ingredient_name(row["name"])
+        if key in first_by_key:
+            union(first_by_key[key], i)
+        else:
+            first_by_key[key] = i
+
+    # Stage 2: embedding similarity, computed blockwise to bound memory
+    indexed = [(i, _parse_embedding(row.get("embedding"))) for i, row in enumerate(rows)]
+    indexed = [(i, vec) for i, vec in indexed if vec]
+    if len(indexed) > 1:
+        idx = np.array([i for i, _ in indexed])
+        matrix = np.asarray([vec for _, vec in indexed], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        for start in range(0, len(matrix), block_size):
+            sims = matrix[start:start + block_size] @ matrix.T
+            a_local, b_local = np.nonzero(sims >= similarity_threshold)
+            for a, b in zip(a_local + start, b_local):
+                if a < b:
+                    union(int(idx[a]), int(idx[b]))
+
+    clusters: Dict[int, List[Dict]] = {}
+    for i, row in enumerate(rows):
+        clusters.setdefault(find(i), []).append(row)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def pick_canonical(members: Sequence[Dict]) -> Dict:
+    """Choose the row that survives a merge.
+
+    Prefers a row already named by its canonical key, then the shortest name,
+    then the oldest row.
+    """
+    return min(
+        members,
+        key=lambda row: (
+            row["name"] != normalize_ingredient_name(row["name"]),
+            len(row["name"]),
+            row.get("created_at") or "",
+        ),
+    )
+
+
+class IngredientCanonicalizer:
+    """Resolves ingredient spellings to canonical `ingredients` rows via aliases."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL_SECONDS):
+        self.supabase = get_supabase_admin()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # canonical key -> (stored at, {"id", "name"}), least recently used
+        # first; negative lookups are not cached so freshly inserted
+        # ingredients become visible immediately.
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _remember(self, key: str, row: Dict[str, str]) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic(), row)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Forget every resolved spelling (after ingredients were merged or deleted)."""
+        with self._lock:
+            self._cache.clear()
+
+    def resolve(self, ingredient_name: str) -> Optional[Dict[str, str]]:
+        """Return the canonical ingredient row ({"id", "name"}) for a spelling, if known."""
+        key = normalize_ingredient_name(ingredient_name)
+        if not key:
+            return None
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        try:
+            alias = self.supabase.table("ingredient_aliases").select("ingredient_id, canonical_name").eq("alias", key).limit(1).execute()
+            if alias.data:
+                row = {"id": alias.data[0]["ingredient_id"], "name": alias.data[0]["canonical_name"]}
+                self._remember(key, row)
+                return row
+
+            existing = self.supabase.table("ingredients").select("id, name").eq("name", key).limit(1).execute()
+            if existing.data:
+                row = {"id": existing.data[0]["id"], "name": existing.data[0]["name"]}
+                self._remember(key, row)
+                return row
+        except Exception as e:
+            logging.warning(f"Canonical lookup failed for '{ingredient_name}': {e}")
+        return None
+
+    def record_alias(self, ingredient_name: str, ingredient_id: str, canonical_name: str) -> None:
+        """Map a spelling (and its canonical key) to a canonical ingredient."""
+        key = normalize_ingredient_name(ingredient_name)
+        rows = [{"alias": key, "ingredient_id": ingredient_id, "canonical_name": canonical_name}]
+        raw = ingredient_name.strip().lower()
+        if raw != key:
+            rows.append({"alias": raw, "ingredient_id": ingredient_id, "canonical_name": canonical_name})
+        try:
+            self.supabase.table("ingredient_aliases").upsert(rows, on_conflict="alias").execute()
+            self._remember(key, {"id": ingredient_id, "name": canonical_name})
+        except Exception as e:
+            logging.warning(f"Failed to record alias '{key}' -> '{canonical_name}': {e}")
+
+
+# Global canonicalizer instance
+canonicalizer = IngredientCanonicalizer()
+
+def get_canonicalizer() -> IngredientCanonicalizer:
+    """Get the global ingredient canonicalizer instance."""
+    return canonicalizer
@@ -9,26 +9,36 @@ def build_instacart_url(product_ids: List[str]) -> str:
     return f"https://www.instacart.com/store/checkout_v3?items={joined}"
 
 
+def build_walmart_url(product_ids: List[str]) -> str:
+    # Walmart add-to-cart link; item IDs are the ones the price refresh pins
+    joined = ",".join(product_ids)
+    return f"https://affil.walmart.com/cart/addToCart?items={joined}"
+
+
+CART_URL_BUILDERS = {
+    "instacart": build_instacart_url,
+    "walmart": build_walmart_url,
+}
+
+
 def get_cart_url(ingredients: List[dict], retailer: str = "instacart") -> Optional[str]:
     """Return a prefilled cart URL for the given ingredients.
 
     `ingredients` is a list of dicts with at least `name` and `unit` keys.
+    Product IDs come from `product_mappings`, which the price refresh keeps
+    pinned to the products it prices.
     """
+    builder = CART_URL_BUILDERS.get(retailer)
+    names = [ing["name"] for ing in ingredients if ing.get("name")]
+    if builder is None or not names:
+        return None
     supabase = get_supabase_admin()
-    product_ids: List[str] = []
-    for ing in ingredients:
-        name = ing.get("name")
-        if not name:
-            continue
-        res = supabase.table("product_mappings").select("product_id").eq("ingredient_name", name).eq("retailer", retailer).limit(1).execute()
-        if res.data:
-            product_ids.append(res.data[0]["product_id"])
+    res = supabase.table("product_mappings").select("ingredient_name, product_id").eq("retailer", retailer).in_("ingredient_name", names).execute()
+    by_name = {row["ingredient_name"]: row["product_id"] for row in res.data or []}
+    product_ids = [by_name[name] for name in names if name in by_name]
     if not product_ids:
         return None
-    if retailer == "instacart":
-        return build_instacart_url(product_ids)
-    # Extend for walmart, etc.
-    return None
+    return builder(product_ids)
 
 
 def get_available_retailers() -> List[Dict[str, str]]:
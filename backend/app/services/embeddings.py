@@ -9,6 +9,7 @@ from openai import OpenAI
 from langchain_openai import OpenAIEmbeddings
 from ..core.config import settings
 from ..core.supabase import get_supabase_admin
+from .canonicalize import MERGE_SIMILARITY_THRESHOLD, get_canonicalizer, normalize_ingredient_name
 
 # Initialize OpenAI client
 client = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -39,59 +40,120 @@ class IngredientEmbeddingService:
         except Exception as e:
             logging.error(f"Error generating embedding for '{text}': {e}")
             return []
-    
+
+    def generate_embeddings(self, texts: List[str], timeout: float = 30) -> List[List[float]]:
+        """
+        Generate embeddings for many texts with a single API call.
+
+        Unlike generate_embedding, errors are raised to the caller so batch
+        jobs can back off and retry on rate limits.
+
+        Args:
+            texts: Texts to embed (the API accepts up to 2048 inputs per call)
+            timeout: Request timeout in seconds
+
+        Returns:
+            Embeddings in the same order as texts
+        """
+        if not texts:
+            return []
+        response = client.embeddings.create(
+            model="text-embedding-3-small",
+            input=[text.strip() for text in texts],
+            encoding_format="float",
+            timeout=timeout
+        )
+        # The API echoes an index per input; sort defensively before returning.
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
     def embed_ingredient(self, ingredient_name: str) -> Optional[str]:
         """
         Generate and store embedding for an ingredient.
         Returns the ingredient ID if successful.
+
+        Spellings are canonicalized first: known variants resolve through the
+        alias table, and unseen names whose embedding is a near-duplicate of an
+        existing ingredient are recorded as aliases instead of new rows.
         """
         try:
+            canonicalizer = get_canonicalizer()
+
             # Normalize ingredient name
-            normalized_name = ingredient_name.strip().lower()
-            
+            normalized_name = normalize_ingredient_name(ingredient_name)
+            if not normalized_name:
+                return None
+
             # Generate embedding
             embedding = self.generate_embedding(normalized_name)
             if not embedding:
                 return None
-            
-            # Check if ingredient exists
-            existing = self.supabase.table("ingredients").select("id").eq("name", normalized_name).execute()
-            
-            if existing.data:
+
+            # Check if ingredient (or a known alias of it) exists
+            existing = canonicalizer.resolve(ingredient_name)
+
+            if existing:
                 # Update existing ingredient with embedding
-                ingredient_id = existing.data[0]["id"]
+                ingredient_id = existing["id"]
                 result = self.supabase.table("ingredients").update({
                     "embedding": embedding
                 }).eq("id", ingredient_id).execute()
-                
+
                 if not result.data:
                     logging.error(f"Error updating embedding for ingredient '{normalized_name}': No data returned")
                     return None
-                    
-                logging.info(f"Updated embedding for existing ingredient: {normalized_name}")
-                return ingredient_id
-            else:
-                # Create new ingredient with embedding
-                result = self.supabase.table("ingredients").insert({
-                    "name": normalized_name,
-                    "category": "general",  # Default category
-                    "unit": "unit",  # Default unit
-                    "price_per_unit": 0.0,  # Default price
-                    "embedding": embedding
-                }).execute()
-                
-                if not result.data:
-                    logging.error(f"Error creating ingredient '{normalized_name}': No data returned")
-                    return None
-                    
-                ingredient_id = result.data[0]["id"]
-                logging.info(f"Created new ingredient with embedding: {normalized_name}")
+
+                if existing["name"] != ingredient_name.strip().lower():
+                    canonicalizer.record_alias(ingredient_name, ingredient_id, existing["name"])
+                logging.info(f"Updated embedding for existing ingredient: {existing['name']}")
                 return ingredient_id
-                
+
+            # Merge into a near-duplicate instead of creating another row
+            duplicate = self._find_near_duplicate(embedding)
+            if duplicate:
+                canonicalizer.record_alias(ingredient_name, duplicate["id"], duplicate["name"])
+                logging.info(f"Aliased '{ingredient_name}' to existing ingredient: {duplicate['name']}")
+                return duplicate["id"]
+
+            # Create new ingredient with embedding
+            result = self.supabase.table("ingredients").insert({
+                "name": normalized_name,
+                "category": "general",  # Default category
+                "unit": "unit",  # Default unit
+                "price_per_unit": 0.0,  # Default price
+                "embedding": embedding
+            }).execute()
+
+            if not result.data:
+                logging.error(f"Error creating ingredient '{normalized_name}': No data returned")
+                return None
+
+            ingredient_id = result.data[0]["id"]
+            canonicalizer.record_alias(ingredient_name, ingredient_id, normalized_name)
+            logging.info(f"Created new ingredient with embedding: {normalized_name}")
+            return ingredient_id
+
         except Exception as e:
             logging.error(f"Error in embed_ingredient for '{ingredient_name}': {e}")
             return None
-    
+
+    def _find_near_duplicate(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the existing ingredient whose embedding is close enough to merge with, if any."""
+        try:
+            result = self.supabase.rpc(
+                "match_ingredients",
+                {
+                    "query_embedding": embedding,
+                    "match_threshold": MERGE_SIMILARITY_THRESHOLD,
+                    "match_count": 1
+                }
+            ).execute()
+            if not result.data:
+                return None
+            return {"id": result.data[0]["id"], "name": result.data[0]["name"]}
+        except Exception as e:
+            logging.debug(f"Near-duplicate search failed: {e}")
+            return None
+
     def find_similar_ingredients(
         self, 
         query: str, 
@@ -0,0 +1,180 @@
+"""
+Cache of computed grocery lists, keyed by (plan_id, price snapshot version).
+
+A plan's contents don't change after it is generated and prices only change
+when scripts/refresh_prices.py (or compute_price_bounds.py) writes new ones,
+so GET /grocery/{plan_id} can serve the same response until then instead of
+re-aggregating and re-pricing the plan on every view. Writers bump the
+version in `price_snapshot` (migration 27) whenever they change prices;
+entries for older versions are simply never asked for again and age out of
+the LRU.
+
+Backends (GROCERY_CACHE_BACKEND):
+- "memory" (default): an in-process OrderedDict, per API worker,
+- "sqlite": a local SQLite file (GROCERY_CACHE_PATH) shared by the workers
+  on one host and kept across restarts,
+- "off": no caching.
+
+Entries carry a content-hash ETag so clients can revalidate with
+If-None-Match and get a 304.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Grocery lists kept per backend
+MAX_ENTRIES = int(os.getenv("GROCERY_CACHE_SIZE", "512"))
+# How long the API trusts the snapshot version it last read
+VERSION_TTL_SECONDS = float(os.getenv("GROCERY_CACHE_VERSION_TTL", "5"))
+DEFAULT_SQLITE_PATH = Path(__file__).resolve().parents[2] / ".grocery_cache.sqlite3"
+
+Entry = Tuple[str, str]  # (etag, JSON body)
+
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def bump_price_snapshot_version(supabase) -> Optional[int]:
+    """Invalidate cached grocery lists after prices changed; returns the new version."""
+    try:
+        return supabase.rpc("bump_price_snapshot_version", {}).execute().data
+    except Exception as e:
+        # Migration 27 not applied – nothing is cached against a version then
+        logging.getLogger(__name__).warning(f"Could not bump price snapshot version: {e}")
+        return None
+
+
+class MemoryBackend:
+    """In-process LRU of grocery list entries."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """LRU of grocery list entries in a local SQLite file."""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS grocery_cache ("
+            " key TEXT PRIMARY KEY, etag TEXT NOT NULL, body TEXT NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_grocery_cache_used_at ON grocery_cache(used_at)")
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._db.execute("SELECT etag, body FROM grocery_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE grocery_cache SET used_at = ? WHERE key = ?", (time.time(), key))
+            return (row[0], row[1]) if row else None
+
+    def set(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO grocery_cache (key, etag, body, used_at) VALUES (?, ?, ?, ?)",
+                (key, entry[0], entry[1], time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM grocery_cache WHERE key NOT IN"
+                " (SELECT key FROM grocery_cache ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM grocery_cache")
+
+
+class GroceryListCache:
+    """Grocery list responses keyed by (plan_id, price snapshot version)."""
+
+    def __init__(self, backend=None, supabase=None, version_ttl: float = VERSION_TTL_SECONDS):
+        self.backend = backend
+        self.supabase = supabase
+        self.version_ttl = version_ttl
+        self._version: Optional[int] = None
+        self._version_read_at: Optional[float] = None
+
+    def version(self) -> Optional[int]:
+        """Current price snapshot version (re-read at most every version_ttl seconds).
+
+        None when the version can't be read; callers skip the cache then.
+        """
+        if self._version_read_at is not None and time.monotonic() - self._version_read_at < self.version_ttl:
+            return self._version
+        if self.supabase is None:
+            from ..core.supabase import get_supabase_admin
+            self.supabase = get_supabase_admin()
+        try:
+            rows = self.supabase.table("price_snapshot").select("version").limit(1).execute().data or []
+            self._version = int(rows[0]["version"]) if rows else None
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Price snapshot version unavailable, not caching: {e}")
+            self._version = None
+        self._version_read_at = time.monotonic()
+        return self._version
+
+    @staticmethod
+    def _key(plan_id: str, version: int) -> str:
+        return f"{plan_id}:{version}"
+
+    def get(self, plan_id: str, version: Optional[int]) -> Optional[Entry]:
+        if self.backend is None or version is None:
+            return None
+        return self.backend.get(self._key(plan_id, version))
+
+    def put(self, plan_id: str, version: Optional[int], body: str) -> str:
+        """Store *body* for (plan_id, version); returns its ETag."""
+        etag = make_etag(body)
+        if self.backend is not None and version is not None:
+            self.backend.set(self._key(plan_id, version), (etag, body))
+        return etag
+
+
+def _backend_from_env():
+    kind = os.getenv("GROCERY_CACHE_BACKEND", "memory").lower()
+    if kind == "off":
+        return None
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("GROCERY_CACHE_PATH") or DEFAULT_SQLITE_PATH)
+    return MemoryBackend()
+
+
+# Global cache instance (backend chosen by GROCERY_CACHE_BACKEND)
+grocery_cache = GroceryListCache(_backend_from_env())
+
+def get_grocery_cache() -> GroceryListCache:
+    """Get the global grocery list cache."""
+    return grocery_cache
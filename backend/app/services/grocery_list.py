@@ -0,0 +1,19 @@
+"""
+A meal plan's grocery list: one row per ingredient and canonical unit with
+quantities multiplied by servings.
+
+Aggregation runs in the database (get_grocery_for_plan, see
+migrations/26_grocery_for_plan.sql), so the API receives the summed list
+rather than every recipe ingredient of every meal in the plan.
+"""
+
+from typing import Dict, List
+
+from ..core.supabase import get_supabase_admin
+
+
+def get_plan_groceries(plan_id: str, supabase=None) -> List[Dict]:
+    """[{"name", "unit", "quantity"}] for *plan_id*, names lowercased and units canonical."""
+    supabase = supabase or get_supabase_admin()
+    res = supabase.rpc("get_grocery_for_plan", {"p_plan_id": plan_id}).execute()
+    return [row for row in res.data or [] if row.get("name") and row.get("unit")]
@@ -0,0 +1,178 @@
+"""Bounded extraction of JSON blobs embedded in retailer HTML pages.
+
+Scraper sources used to pull embedded state out of search pages with patterns
+like ``window\\.__INITIAL_STATE__\\s*=\\s*({.*?});`` under ``re.DOTALL``. On
+multi-megabyte pages each such pattern tries a lazy match at every ``{``,
+and a pattern without a match (or a ``};`` inside a string) scans to the
+end of the page again and again. This module replaces them with:
+
+- a plain substring search for the marker (``window.__WML_REDUX_INITIAL_STATE__``,
+  ``"products"``, the JSON-LD script tag, ...),
+- decoding of just the value's slice, with ``orjson`` when installed. The
+  slice is the rest of the enclosing ``<script>`` when that decodes, else it
+  is found by a brace matcher that jumps between structural characters and
+  skips string literals with one precompiled pattern,
+- bounds on how far into a page, and how long a value, is ever scanned.
+
+Parsing stays CPU-bound, so sources hand it to ``run_cpu_bound``: a worker
+thread by default, or a process pool when ``HTML_PARSE_PROCESSES`` is set
+(useful for big refreshes, where the GIL would otherwise serialise parsing).
+"""
+
+import asyncio
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+from anyio import to_thread
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Never look further into a page, or at a longer blob, than this
+MAX_SCAN_CHARS = 16_000_000
+MAX_BLOB_CHARS = 8_000_000
+
+# A complete string literal, or a bracket. Unrolled so long strings are matched
+# in one pass without backtracking.
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]', re.S)
+
+JSON_LD_OPEN = '<script type="application/ld+json">'
+SCRIPT_CLOSE = "</script>"
+
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_CONFIGURED = False
+
+
+def loads(text: str) -> Any:
+    """Decode JSON with orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def match_brackets(text: str, start: int, max_chars: int = MAX_BLOB_CHARS) -> Optional[int]:
+    """Return the index just past the value opened by ``text[start]`` (``{`` or ``[``).
+
+    Brackets inside string literals are ignored. Returns None when the value
+    is not closed within *max_chars*.
+    """
+    depth = 0
+    for token in _TOKEN_RE.finditer(text, start, min(len(text), start + max_chars)):
+        c = token.group()
+        if c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return None
+
+
+def decode_at(text: str, start: int, max_chars: int = MAX_BLOB_CHARS) -> Optional[Tuple[Any, int]]:
+    """Decode the JSON value opening at ``text[start]``; return (value, end) or None.
+
+    Embedded state is usually all that is left of its ``<script>`` tag, so the
+    text up to ``</script>`` (minus a trailing ``;``) is tried first, which
+    keeps the whole scan in C. Otherwise the value is delimited by bracket
+    matching.
+    """
+    close = text.find(SCRIPT_CLOSE, start, start + max_chars)
+    if close > 0:
+        candidate = text[start:close].rstrip().rstrip(";").rstrip()
+        try:
+            return loads(candidate), start + len(candidate)
+        except ValueError:
+            pass
+    end = match_brackets(text, start, max_chars)
+    if end is None:
+        return None
+    try:
+        return loads(text[start:end]), end
+    except ValueError:
+        return None
+
+
+def iter_json_blobs(
+    text: str,
+    markers: Sequence[str],
+    limit: Optional[int] = None,
+    max_chars: int = MAX_BLOB_CHARS,
+    max_scan: int = MAX_SCAN_CHARS,
+) -> Iterator[Any]:
+    """Yield JSON values assigned to *markers* (``marker = {...}`` or ``marker: [...]``).
+
+    Values are yielded in marker order, at most *limit* per marker; ones that
+    do not decode are skipped.
+    """
+    scan_end = min(len(text), max_scan)
+    for marker in markers:
+        found = 0
+        pos = 0
+        while limit is None or found < limit:
+            at = text.find(marker, pos, scan_end)
+            if at < 0:
+                break
+            pos = at + len(marker)
+            # Skip `=` / `:` and whitespace up to the opening bracket
+            start = pos
+            while start < scan_end and text[start] in " \t\r\n=:":
+                start += 1
+            if start >= scan_end or text[start] not in "{[":
+                continue
+            decoded = decode_at(text, start, max_chars)
+            if decoded is None:
+                continue
+            value, pos = decoded
+            found += 1
+            yield value
+
+
+def first_json_blob(text: str, markers: Sequence[str]) -> Optional[Any]:
+    """The first decodable JSON value assigned to one of *markers*, or None."""
+    return next(iter_json_blobs(text, markers, limit=1), None)
+
+
+def iter_json_ld(text: str, max_chars: int = MAX_BLOB_CHARS, max_scan: int = MAX_SCAN_CHARS) -> Iterator[Any]:
+    """Yield the decoded contents of each ``application/ld+json`` script tag."""
+    scan_end = min(len(text), max_scan)
+    pos = 0
+    while True:
+        at = text.find(JSON_LD_OPEN, pos, scan_end)
+        if at < 0:
+            return
+        start = at + len(JSON_LD_OPEN)
+        end = text.find(SCRIPT_CLOSE, start, min(scan_end, start + max_chars))
+        if end < 0:
+            return
+        pos = end + len(SCRIPT_CLOSE)
+        try:
+            yield loads(text[start:end])
+        except ValueError:
+            continue
+
+
+def configure_process_pool(workers: Optional[int]) -> None:
+    """Parse in a pool of *workers* processes from now on (0/None: worker threads)."""
+    global _PROCESS_POOL, _POOL_CONFIGURED
+    _POOL_CONFIGURED = True
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=False)
+    _PROCESS_POOL = ProcessPoolExecutor(max_workers=workers) if workers else None
+
+
+async def run_cpu_bound(fn: Callable, *args) -> Any:
+    """Run a parse function off the event loop.
+
+    *fn* and its arguments must be picklable (a module-level function or a
+    staticmethod) so it can run in the process pool when one is configured.
+    """
+    if not _POOL_CONFIGURED:
+        configure_process_pool(int(os.getenv("HTML_PARSE_PROCESSES", "0")))
+    if _PROCESS_POOL is not None:
+        return await asyncio.get_running_loop().run_in_executor(_PROCESS_POOL, fn, *args)
+    return await to_thread.run_sync(fn, *args)
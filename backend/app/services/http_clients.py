@@ -0,0 +1,88 @@
+"""Shared, pooled httpx.AsyncClient instances for price sources.
+
+Price lookups fan out to a handful of hosts (api.kroger.com, www.walmart.com,
+www.safeway.com, www.instacart.com). Opening a fresh connection per request
+means a TCP + TLS handshake per lookup; instead every source asks this module
+for the client of its host so connections are kept alive and reused across
+the whole refresh run. HTTP/2 is enabled when the optional `h2` package is
+installed, letting concurrent requests share one connection.
+
+Clients are bound to the event loop that created them. A new loop (e.g. a
+second `asyncio.run`) transparently gets fresh clients.
+
+Sources swallow HTTP errors and return ``(None, unit)``, so callers that need
+to tell "no match" from "throttled" wrap a lookup in ``capture_responses()``
+to see the status codes of every response it received.
+"""
+
+import asyncio
+import importlib.util
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=30)
+
+_CLIENTS: Dict[Tuple[int, str], httpx.AsyncClient] = {}
+
+# (status_code, Retry-After header) of each response seen in the current context
+_RESPONSES: ContextVar[Optional[List[Tuple[int, Optional[str]]]]] = ContextVar("_RESPONSES", default=None)
+
+
+async def _record_response(response: httpx.Response) -> None:
+    responses = _RESPONSES.get()
+    if responses is not None:
+        responses.append((response.status_code, response.headers.get("retry-after")))
+
+
+@contextmanager
+def capture_responses() -> Iterator[List[Tuple[int, Optional[str]]]]:
+    """Collect (status_code, retry_after) for responses received by pooled clients in this block."""
+    responses: List[Tuple[int, Optional[str]]] = []
+    token = _RESPONSES.set(responses)
+    try:
+        yield responses
+    finally:
+        _RESPONSES.reset(token)
+
+
+def _host_of(url_or_host: str) -> str:
+    if "://" in url_or_host:
+        return urlsplit(url_or_host).netloc
+    return url_or_host
+
+
+def get_async_client(url_or_host: str) -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for *url_or_host* on the running event loop.
+
+    Sources sharing a host share its client, so per-source options
+    (headers, ``follow_redirects=True``) are passed on each request rather
+    than baked into whichever source happened to create the client first.
+    """
+    loop = asyncio.get_running_loop()
+    key = (id(loop), _host_of(url_or_host))
+    client = _CLIENTS.get(key)
+    if client is None or client.is_closed:
+        options = {
+            "timeout": DEFAULT_TIMEOUT,
+            "limits": DEFAULT_LIMITS,
+            "http2": HTTP2_AVAILABLE,
+            "event_hooks": {"response": [_record_response]},
+        }
+        client = httpx.AsyncClient(**options)
+        _CLIENTS[key] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    """Close every pooled client created on the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _CLIENTS if k[0] == loop_id]:
+        client = _CLIENTS.pop(key)
+        await client.aclose()
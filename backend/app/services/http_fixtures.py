@@ -0,0 +1,169 @@
+"""Record/replay of price-source HTTP traffic as compressed fixtures.
+
+Scraper parsers break (or slow down) when a retailer changes its pages, and
+without recorded traffic we only notice in production. This module captures
+the responses a price source receives into a gzip-compressed JSON "cassette"
+and serves them back later without touching the network, so parsers can be
+tested and benchmarked offline (scripts/record_price_fixtures.py,
+scripts/bench_price_fixtures.py).
+
+Recording and replay patch the httpx transports at class level, so every
+client a source uses is covered: the pooled ``AsyncClient`` from
+``http_clients``, per-source ``httpx.Client`` sessions and bare
+``httpx.get`` calls alike. Client-level event hooks (``capture_responses``)
+keep working during replay.
+
+Requests are matched on method + URL with the query string sorted; request
+headers are ignored. Credentials are never stored: auth/cookie headers are
+dropped and token endpoints are not recorded at all.
+"""
+
+import base64
+import gzip
+import json
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "http"
+
+# Response headers that are stale once the body is stored decoded, or secret
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie", "authorization", "cookie"}
+# Requests whose responses carry credentials
+SKIP_RECORDING = ("/oauth2/token",)
+
+
+class FixtureMissing(httpx.TransportError):
+    """Raised during replay for a request that was never recorded."""
+
+
+def request_key(request: httpx.Request) -> str:
+    """Stable key for *request*: method and URL with a sorted query string."""
+    parts = urlsplit(str(request.url))
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{request.method} {parts.scheme}://{parts.netloc}{parts.path}" + (f"?{query}" if query else "")
+
+
+class Cassette:
+    """Recorded interactions for one price source, plus the lookups that produced them."""
+
+    def __init__(self, path: Path, source: Optional[str] = None):
+        self.path = Path(path)
+        self.source = source
+        self.recorded_at: Optional[str] = None
+        self.interactions: Dict[str, Dict] = {}
+        # [{"store", "ingredient", "unit", "price", "price_unit"}] as returned while recording
+        self.lookups: List[Dict] = []
+        self.misses: List[str] = []
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        cassette = cls(path, data.get("source"))
+        cassette.recorded_at = data.get("recorded_at")
+        cassette.interactions = data.get("interactions", {})
+        cassette.lookups = data.get("lookups", [])
+        return cassette
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "source": self.source,
+            "recorded_at": self.recorded_at or datetime.now(timezone.utc).isoformat(),
+            "lookups": self.lookups,
+            "interactions": self.interactions,
+        }
+        # mtime=0 keeps re-recorded but unchanged fixtures byte-identical
+        with open(self.path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(data, indent=1, sort_keys=True).encode("utf-8"))
+
+    def add(self, request: httpx.Request, response: httpx.Response) -> None:
+        """Store *response* (already read) for *request*; the first response per key wins."""
+        if any(part in request.url.path for part in SKIP_RECORDING):
+            return
+        key = request_key(request)
+        if key in self.interactions:
+            return
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+        entry: Dict = {"status": response.status_code, "headers": headers}
+        try:
+            entry["body"] = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(response.content).decode("ascii")
+        self.interactions[key] = entry
+
+    def response_for(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        entry = self.interactions.get(key)
+        if entry is None:
+            self.misses.append(key)
+            raise FixtureMissing(f"No recorded response for {key}", request=request)
+        if "body_b64" in entry:
+            content = base64.b64decode(entry["body_b64"])
+        else:
+            content = entry["body"].encode("utf-8")
+        return httpx.Response(entry["status"], headers=entry["headers"], content=content, request=request)
+
+
+def _replayable(response: httpx.Response, request: httpx.Request) -> httpx.Response:
+    """Copy of an already-read *response* whose body can be read again."""
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+    return httpx.Response(response.status_code, headers=headers, content=response.content, request=request)
+
+
+@contextmanager
+def recording(cassette: Cassette) -> Iterator[Cassette]:
+    """Pass requests through to the network and record every response into *cassette*."""
+    sync_send = httpx.HTTPTransport.handle_request
+    async_send = httpx.AsyncHTTPTransport.handle_async_request
+
+    def handle_request(transport, request):
+        response = sync_send(transport, request)
+        response.read()
+        cassette.add(request, response)
+        return _replayable(response, request)
+
+    async def handle_async_request(transport, request):
+        response = await async_send(transport, request)
+        await response.aread()
+        cassette.add(request, response)
+        return _replayable(response, request)
+
+    httpx.HTTPTransport.handle_request = handle_request
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+    try:
+        yield cassette
+    finally:
+        httpx.HTTPTransport.handle_request = sync_send
+        httpx.AsyncHTTPTransport.handle_async_request = async_send
+
+
+@contextmanager
+def replaying(cassette: Cassette) -> Iterator[Cassette]:
+    """Serve requests from *cassette* only; unrecorded requests raise FixtureMissing."""
+    sync_send = httpx.HTTPTransport.handle_request
+    async_send = httpx.AsyncHTTPTransport.handle_async_request
+
+    def handle_request(transport, request):
+        return cassette.response_for(request)
+
+    async def handle_async_request(transport, request):
+        return cassette.response_for(request)
+
+    httpx.HTTPTransport.handle_request = handle_request
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+    try:
+        yield cassette
+    finally:
+        httpx.HTTPTransport.handle_request = sync_send
+        httpx.AsyncHTTPTransport.handle_async_request = async_send
+        if cassette.misses:
+            logging.getLogger(__name__).warning(
+                f"{len(cassette.misses)} unrecorded request(s) during replay of {cassette.path.name}"
+            )
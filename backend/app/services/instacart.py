@@ -7,6 +7,19 @@ import time
 from urllib.parse import quote
 
 from .price_sources import PriceSource
+from .http_clients import get_async_client
+from .quantity import unit_price
+
+INSTACART_SEARCH_URL = "https://www.instacart.com/v3/containers/retail_search_results_page"
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Referer": "https://www.instacart.com/",
+    "Origin": "https://www.instacart.com"
+}
 
 class InstacartPriceSource(PriceSource):
     """
@@ -32,19 +45,42 @@ class InstacartPriceSource(PriceSource):
     def _get_session(self) -> httpx.Client:
         """Get or create HTTP session with appropriate headers."""
         if self._session is None:
-            self._session = httpx.Client(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "application/json, text/plain, */*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Referer": "https://www.instacart.com/",
-                    "Origin": "https://www.instacart.com"
-                },
-                timeout=20
-            )
+            self._session = httpx.Client(headers=_HEADERS, timeout=20)
         return self._session
 
+    @staticmethod
+    def _search_params(ingredient_name: str) -> Dict[str, str]:
+        # This is a simplified version - Instacart's actual API is more complex
+        # and requires authentication, location setting, etc.
+        return {
+            'source': 'search_suggestions',
+            'term': quote(ingredient_name),
+            'page': '1'
+        }
+
+    def _parse_search_response(self, response: httpx.Response, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        """Turn a search response into (price, unit)."""
+        if response.status_code != 200:
+            return (None, unit)
+            
+        # Parse JSON response to extract price information
+        # This would need to be adapted based on Instacart's actual API structure
+        data = response.json()
+        
+        # Look for products in the response
+        products = self._extract_products(data)
+        
+        if products:
+            # Find best matching product and extract price
+            best_match = self._find_best_match(products, ingredient_name)
+            if best_match:
+                price = self._extract_price(best_match)
+                if price:
+                    # Price per unit of the package size when one is given
+                    return unit_price(float(price), [best_match.get("size"), best_match.get("name")], unit)
+        
+        return (None, unit)
+
     def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
         """
         Fetch price from Instacart for specific retailer.
@@ -56,40 +92,19 @@ class InstacartPriceSource(PriceSource):
             # First, set location context if needed
             # This may require additional API calls to set delivery address
             
-            # Search for the product
-            search_term = quote(ingredient_name)
-            search_url = f"https://www.instacart.com/v3/containers/retail_search_results_page"
-            
-            # This is a simplified version - Instacart's actual API is more complex
-            # and requires authentication, location setting, etc.
-            params = {
-                'source': 'search_suggestions',
-                'term': search_term,
-                'page': '1'
-            }
-            
-            response = session.get(search_url, params=params)
-            
-            if response.status_code != 200:
-                return (None, unit)
-                
-            # Parse JSON response to extract price information
-            # This would need to be adapted based on Instacart's actual API structure
-            data = response.json()
-            
-            # Look for products in the response
-            products = self._extract_products(data)
-            
-            if products:
-                # Find best matching product and extract price
-                best_match = self._find_best_match(products, ingredient_name)
-                if best_match:
-                    price = self._extract_price(best_match)
-                    if price:
-                        return (float(price), unit)
+            response = session.get(INSTACART_SEARCH_URL, params=self._search_params(ingredient_name))
+            return self._parse_search_response(response, ingredient_name, unit)
             
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Instacart {self.retailer_name} price lookup failed for {ingredient_name}: {e}")
             return (None, unit)
-            
+
+    async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        """Native async lookup over the pooled www.instacart.com client."""
+        try:
+            client = get_async_client(INSTACART_SEARCH_URL)
+            response = await client.get(INSTACART_SEARCH_URL, params=self._search_params(ingredient_name), headers=_HEADERS)
+            return self._parse_search_response(response, ingredient_name, unit)
         except Exception as e:
             logging.getLogger(__name__).warning(f"Instacart {self.retailer_name} price lookup failed for {ingredient_name}: {e}")
             return (None, unit)
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 import asyncio
 
 from .price_sources import PriceSource
+from .http_clients import get_async_client
+from .quantity import unit_price
 
 class InstacartPartnerAPI(PriceSource):
     """
@@ -38,16 +40,16 @@ class InstacartPartnerAPI(PriceSource):
     def _get_session(self) -> httpx.Client:
         """Get or create HTTP session with authentication."""
         if self._session is None:
-            self._session = httpx.Client(
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                    "User-Agent": "NutriGenie-MealPlan/1.0",
-                },
-                timeout=30
-            )
+            self._session = httpx.Client(headers=self._headers(), timeout=30)
         return self._session
 
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "User-Agent": "NutriGenie-MealPlan/1.0",
+        }
+
     # Store Management Methods
     
     def find_stores_by_location(self, latitude: float, longitude: float, 
@@ -111,6 +113,42 @@ class InstacartPartnerAPI(PriceSource):
 
     # Product Search & Pricing Methods
     
+    @staticmethod
+    def _search_params(query: str, store_id: str = None, category: str = None, limit: int = 10) -> Dict[str, Any]:
+        params = {
+            "q": query,
+            "limit": limit
+        }
+        
+        if store_id:
+            params["store_id"] = store_id
+        if category:
+            params["category"] = category
+        return params
+
+    def _cache_products(self, products_data: Dict[str, Any], store_id: str = None) -> List[Dict[str, Any]]:
+        products = products_data.get("products", [])
+        
+        # Cache products
+        for product in products:
+            cache_key = f"{product.get('id', '')}_{store_id or 'global'}"
+            self._product_cache[cache_key] = product
+            
+        return products
+
+    @staticmethod
+    def _price_info(product_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "price": product_data.get("price"),
+            "unit": product_data.get("unit"),
+            "unit_price": product_data.get("unit_price"), 
+            "sale_price": product_data.get("sale_price"),
+            "availability": product_data.get("in_stock", True),
+            "product_name": product_data.get("name"),
+            "brand": product_data.get("brand"),
+            "size": product_data.get("size")
+        }
+
     def search_products(self, query: str, store_id: str = None, 
                        category: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -128,28 +166,11 @@ class InstacartPartnerAPI(PriceSource):
         try:
             session = self._get_session()
             
-            params = {
-                "q": query,
-                "limit": limit
-            }
-            
-            if store_id:
-                params["store_id"] = store_id
-            if category:
-                params["category"] = category
-                
+            params = self._search_params(query, store_id, category, limit)
             response = session.get(f"{self.base_url}/catalog/search", params=params)
             response.raise_for_status()
             
-            products_data = response.json()
-            products = products_data.get("products", [])
-            
-            # Cache products
-            for product in products:
-                cache_key = f"{product.get('id', '')}_{store_id or 'global'}"
-                self._product_cache[cache_key] = product
-                
-            return products
+            return self._cache_products(response.json(), store_id)
             
         except Exception as e:
             logging.getLogger(__name__).error(f"Instacart product search failed for '{query}': {e}")
@@ -169,17 +190,7 @@ class InstacartPartnerAPI(PriceSource):
             response = session.get(f"{self.base_url}/catalog/products/{product_id}", params=params)
             response.raise_for_status()
             
-            product_data = response.json()
-            return {
-                "price": product_data.get("price"),
-                "unit": product_data.get("unit"),
-                "unit_price": product_data.get("unit_price"), 
-                "sale_price": product_data.get("sale_price"),
-                "availability": product_data.get("in_stock", True),
-                "product_name": product_data.get("name"),
-                "brand": product_data.get("brand"),
-                "size": product_data.get("size")
-            }
+            return self._price_info(response.json())
             
         except Exception as e:
             logging.getLogger(__name__).error(f"Instacart price lookup failed for product {product_id}: {e}")
@@ -214,20 +225,23 @@ class InstacartPartnerAPI(PriceSource):
             
             # Get detailed pricing information  
             price_info = self.get_product_price(best_product["id"], store_external_id)
-            
-            if not price_info or not price_info.get("price"):
-                return (None, unit)
-            
-            # Use unit_price if available (price per standard unit)
-            price = price_info.get("unit_price") or price_info.get("price")
-            actual_unit = price_info.get("unit") or unit
-            
-            return (float(price), actual_unit)
+            return self._price_from_info(price_info, unit)
             
         except Exception as e:
             logging.getLogger(__name__).error(f"Instacart fetch_price failed for {ingredient_name}: {e}")
             return (None, unit)
 
+    @staticmethod
+    def _price_from_info(price_info: Optional[Dict[str, Any]], unit: str) -> Tuple[Optional[float], str]:
+        if not price_info or not price_info.get("price"):
+            return (None, unit)
+        
+        # Use unit_price if available (price per standard unit)
+        if price_info.get("unit_price"):
+            return (float(price_info["unit_price"]), price_info.get("unit") or unit)
+        # Otherwise divide the pack price by its package size
+        return unit_price(float(price_info["price"]), [price_info.get("size"), price_info.get("unit")], unit)
+
     def _find_best_product_match(self, products: List[Dict], ingredient_name: str) -> Optional[Dict]:
         """Find the product that best matches the ingredient name."""
         if not products:
@@ -275,10 +289,34 @@ class InstacartPartnerAPI(PriceSource):
         return stores[0]["id"] if stores else None
 
     async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
-        """Async version of fetch_price."""
-        # For now, run sync version in thread pool
-        # TODO: Implement proper async HTTP calls
-        return self.fetch_price(store_external_id, ingredient_name, unit)
+        """Async version of fetch_price over the pooled api.instacart.com client."""
+        try:
+            client = get_async_client(self.base_url)
+            headers = self._headers()
+
+            response = await client.get(
+                f"{self.base_url}/catalog/search",
+                params=self._search_params(ingredient_name, store_external_id, limit=5),
+                headers=headers,
+            )
+            response.raise_for_status()
+            products = self._cache_products(response.json(), store_external_id)
+
+            best_product = self._find_best_product_match(products, ingredient_name)
+            if not best_product:
+                return (None, unit)
+
+            response = await client.get(
+                f"{self.base_url}/catalog/products/{best_product['id']}",
+                params={"store_id": store_external_id},
+                headers=headers,
+            )
+            response.raise_for_status()
+            return self._price_from_info(self._price_info(response.json()), unit)
+
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Instacart fetch_price failed for {ingredient_name}: {e}")
+            return (None, unit)
 
     # Utility Methods
     
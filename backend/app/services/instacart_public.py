@@ -6,11 +6,36 @@ Uses publicly available endpoints for basic product information.
 from typing import Optional, Tuple, Dict, List
 import httpx
 import logging
-import json
 import re
 from urllib.parse import quote
 
 from .price_sources import PriceSource
+from .http_clients import get_async_client
+from .html_extract import iter_json_blobs, run_cpu_bound
+from .quantity import unit_price
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/html, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.instacart.com/",
+    "Origin": "https://www.instacart.com"
+}
+
+# Script globals (and keys) that carry product data on storefront pages
+_JSON_MARKERS = [
+    "window.__INITIAL_STATE__",
+    "window.__STORE_STATE__",
+    '"products"',
+    "window.IC_STORE_DATA",
+]
+
+_PRODUCT_CARD = 'data-testid="product-card"'
+# Longest stretch of markup searched for one card's id, name and price
+_MAX_CARD_CHARS = 20_000
+# id, then the first <h3> title, then the first $price. Character classes
+# instead of nested lazy `.*?` keep a card without a price linear to reject.
+_PRODUCT_CARD_RE = re.compile(r'data-product-id="([^"]+)"[^<]*(?:<(?!h3)[^<]*)*<h3[^>]*>([^<]+)</h3>[^$]*\$(\d+\.?\d*)')
 
 class InstacartPublicAPI(PriceSource):
     """
@@ -29,19 +54,33 @@ class InstacartPublicAPI(PriceSource):
     def _get_session(self) -> httpx.Client:
         """Get HTTP session with browser-like headers."""
         if self._session is None:
-            self._session = httpx.Client(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "application/json, text/html, */*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Referer": "https://www.instacart.com/",
-                    "Origin": "https://www.instacart.com"
-                },
-                timeout=20,
-                follow_redirects=True
-            )
+            self._session = httpx.Client(headers=_HEADERS, timeout=20, follow_redirects=True)
         return self._session
 
+    @staticmethod
+    def _store_search_url(store_slug: str, query: str) -> str:
+        return f"https://www.instacart.com/store/{store_slug}/search/{quote(query)}"
+
+    async def async_search_store_products(self, store_slug: str, query: str, limit: int = 10) -> List[Dict]:
+        """Async search_store_products over the pooled www.instacart.com client.
+
+        HTML extraction runs in a worker thread (or the HTML_PARSE_PROCESSES
+        pool) so large pages do not stall the event loop.
+        """
+        try:
+            client = get_async_client("www.instacart.com")
+            response = await client.get(self._store_search_url(store_slug, query), headers=_HEADERS, follow_redirects=True)
+
+            if response.status_code != 200:
+                return []
+
+            products = await run_cpu_bound(_extract_products, response.text, query)
+            return products[:limit]
+
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Instacart store search failed for {store_slug}/{query}: {e}")
+            return []
+
     def search_store_products(self, store_slug: str, query: str, limit: int = 10) -> List[Dict]:
         """
         Search for products in a specific Instacart store.
@@ -58,9 +97,7 @@ class InstacartPublicAPI(PriceSource):
             session = self._get_session()
             
             # Try Instacart's store search endpoint
-            search_url = f"https://www.instacart.com/store/{store_slug}/search/{quote(query)}"
-            
-            response = session.get(search_url)
+            response = session.get(self._store_search_url(store_slug, query))
             
             if response.status_code != 200:
                 return []
@@ -80,22 +117,8 @@ class InstacartPublicAPI(PriceSource):
         
         try:
             # Look for JSON data embedded in the page
-            json_patterns = [
-                r'window\.__INITIAL_STATE__\s*=\s*({.*?});',
-                r'window\.__STORE_STATE__\s*=\s*({.*?});',
-                r'"products"\s*:\s*(\[.*?\])',
-                r'window\.IC_STORE_DATA\s*=\s*({.*?});'
-            ]
-            
-            for pattern in json_patterns:
-                matches = re.findall(pattern, html_content, re.DOTALL)
-                for match in matches:
-                    try:
-                        data = json.loads(match)
-                        extracted_products = self._extract_products_from_json(data, query)
-                        products.extend(extracted_products)
-                    except json.JSONDecodeError:
-                        continue
+            for data in iter_json_blobs(html_content, _JSON_MARKERS):
+                products.extend(self._extract_products_from_json(data, query))
                         
             # Also try regex patterns for product data
             if not products:
@@ -204,12 +227,17 @@ class InstacartPublicAPI(PriceSource):
         products = []
         
         try:
-            # Pattern for product cards in HTML
-            product_pattern = r'data-testid="product-card".*?data-product-id="([^"]+)".*?<h3[^>]*>([^<]+)</h3>.*?\$(\d+\.?\d*)'
-            matches = re.findall(product_pattern, html_content, re.DOTALL)
-            
-            for match in matches:
-                product_id, name, price = match
+            # Match each product card within its own bounded stretch of markup,
+            # so a card without a price cannot drag the match across the page.
+            start = html_content.find(_PRODUCT_CARD)
+            while start >= 0:
+                next_card = html_content.find(_PRODUCT_CARD, start + len(_PRODUCT_CARD))
+                end = min(next_card if next_card >= 0 else len(html_content), start + _MAX_CARD_CHARS)
+                match = _PRODUCT_CARD_RE.search(html_content, start, end)
+                start = next_card
+                if not match:
+                    continue
+                product_id, name, price = match.groups()
                 products.append({
                     "id": product_id,
                     "name": name.strip(),
@@ -225,6 +253,20 @@ class InstacartPublicAPI(PriceSource):
 
     # PriceSource Interface Implementation
 
+    def _price_from_products(self, products: List[Dict], ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        if not products:
+            return (None, unit)
+        
+        # Find best matching product
+        best_product = self._find_best_product_match(products, ingredient_name)
+        
+        if not best_product or not best_product.get("price"):
+            return (None, unit)
+        
+        # Price per unit of the package size when one is given
+        sizes = [best_product.get("size"), best_product.get("name"), best_product.get("unit")]
+        return unit_price(float(best_product["price"]), sizes, unit)
+
     def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
         """
         Fetch price using public Instacart endpoints.
@@ -240,20 +282,7 @@ class InstacartPublicAPI(PriceSource):
         try:
             # Search for products
             products = self.search_store_products(store_external_id, ingredient_name, limit=5)
-            
-            if not products:
-                return (None, unit)
-            
-            # Find best matching product
-            best_product = self._find_best_product_match(products, ingredient_name)
-            
-            if not best_product or not best_product.get("price"):
-                return (None, unit)
-            
-            price = best_product["price"]
-            actual_unit = best_product.get("unit", unit)
-            
-            return (float(price), actual_unit)
+            return self._price_from_products(products, ingredient_name, unit)
             
         except Exception as e:
             logging.getLogger(__name__).error(f"Instacart public fetch_price failed for {ingredient_name}: {e}")
@@ -308,8 +337,13 @@ class InstacartPublicAPI(PriceSource):
         return "safeway"
 
     async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
-        """Async version of fetch_price."""
-        return self.fetch_price(store_external_id, ingredient_name, unit)
+        """Native async version of fetch_price."""
+        try:
+            products = await self.async_search_store_products(store_external_id, ingredient_name, limit=5)
+            return self._price_from_products(products, ingredient_name, unit)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Instacart public fetch_price failed for {ingredient_name}: {e}")
+            return (None, unit)
 
     def get_supported_stores(self) -> List[str]:
         """Get list of store slugs we can search."""
@@ -330,4 +364,9 @@ print(f"Found {len(products)} products")
 # Get pricing
 price, unit = instacart_public.fetch_price("safeway", "milk", "gallon")
 print(f"Milk costs ${price} per {unit}")
-"""
\ No newline at end of file
+"""
+
+
+def _extract_products(html_content: str, query: str) -> List[Dict]:
+    """Module-level entry point so page parsing can run in a process pool."""
+    return InstacartPublicAPI()._extract_products_from_html(html_content, query)
@@ -1,94 +1,159 @@
 import os
-import time
 import httpx
-from typing import Optional
+from typing import Dict, List, Optional
 import logging
-import re
 
-from .price_sources import PriceSource
-
-_TOKEN: Optional[str] = None
-_TOKEN_EXP: float = 0
+from .price_sources import PriceSource, ProductHit
+from .http_clients import get_async_client
+from .token_provider import TokenProvider
+from .quantity import unit_price
 
 KROGER_TOKEN_URL = "https://api.kroger.com/v1/connect/oauth2/token"
 KROGER_PRODUCTS_URL = "https://api.kroger.com/v1/products"
 
-SIZE_RE = re.compile(r"([\d\.]+)\s*(oz|fl\s?oz|lb|lbs?|g|kg|ml|l|ct)", re.I)
+def _fetch_token():
+    cid = os.getenv("KROGER_CLIENT_ID")
+    secret = os.getenv("KROGER_CLIENT_SECRET")
+    if not cid or not secret:
+        raise RuntimeError("Missing KROGER_CLIENT_ID / KROGER_CLIENT_SECRET env vars")
+
+    resp = httpx.post(
+        KROGER_TOKEN_URL,
+        data={"grant_type": "client_credentials", "scope": "product.compact"},
+        auth=(cid, secret),
+        timeout=10,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return data["access_token"], int(data["expires_in"])
+
+
+# Shared by every KrogerPriceSource; set KROGER_TOKEN_CACHE to a file path to
+# reuse a still-valid token across short script runs.
+KROGER_TOKENS = TokenProvider(
+    _fetch_token,
+    cache_path=os.getenv("KROGER_TOKEN_CACHE") or None,
+    name="Kroger OAuth token",
+)
 
 class KrogerPriceSource(PriceSource):
     """Fetch prices from the public Kroger Product API."""
 
+    # filter.productId takes up to 50 comma-separated IDs
+    product_id_batch = 50
+
     @property
     def source_name(self) -> str:
         return "kroger_api"
 
     def _get_token(self) -> str:
-        global _TOKEN, _TOKEN_EXP
-        if _TOKEN and _TOKEN_EXP - time.time() > 60:
-            return _TOKEN
-
-        cid = os.getenv("KROGER_CLIENT_ID")
-        secret = os.getenv("KROGER_CLIENT_SECRET")
-        if not cid or not secret:
-            raise RuntimeError("Missing KROGER_CLIENT_ID / KROGER_CLIENT_SECRET env vars")
-
-        resp = httpx.post(
-            KROGER_TOKEN_URL,
-            data={"grant_type": "client_credentials", "scope": "product.compact"},
-            auth=(cid, secret),
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        _TOKEN = data["access_token"]
-        _TOKEN_EXP = time.time() + int(data["expires_in"])
-        return _TOKEN
+        return KROGER_TOKENS.get_token()
 
     @staticmethod
-    def _normalize_unit(raw: str) -> str:
-        raw = raw.lower().strip()
-        if raw in {"lbs", "lb"}:
-            return "lb"
-        if raw in {"fl oz", "floz", "fl-oz"}:
-            return "fl-oz"
-        return raw
+    def _product_params(store_external_id: str, ingredient_name: str) -> dict:
+        # store_external_id is Kroger locationId
+        return {
+            "filter.locationId": store_external_id,
+            "filter.term": ingredient_name,
+            "filter.limit": 1,
+        }
+
+    def _price_product(self, product: dict, unit: str):
+        variant = product["items"][0]
+        price_cents = variant["price"]["regular"]
+        price_dollars = price_cents / 100.0
+
+        # Falls back to the pack price in the requested unit when the size can't be parsed
+        return unit_price(price_dollars, [variant.get("size")], unit)
+
+    def _parse_products(self, data: dict, unit: str):
+        items = data.get("data", [])
+        if not items:
+            return (None, unit)
+        return self._price_product(items[0], unit)
+
+    async def _get_products(self, params: dict) -> dict:
+        token = await KROGER_TOKENS.async_get_token()
+        client = get_async_client(KROGER_PRODUCTS_URL)
+        r = await client.get(KROGER_PRODUCTS_URL, params=params, headers={"Authorization": f"Bearer {token}"})
+        if r.status_code == 401:
+            KROGER_TOKENS.invalidate(token)
+        r.raise_for_status()
+        return r.json()
 
     def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
-        # store_external_id is Kroger locationId
         try:
             token = self._get_token()
         except RuntimeError:
             return (None, unit)
 
-        params = {
-            "filter.locationId": store_external_id,
-            "filter.term": ingredient_name,
-            "filter.limit": 1,
-        }
         headers = {"Authorization": f"Bearer {token}"}
         try:
-            r = httpx.get(KROGER_PRODUCTS_URL, params=params, headers=headers, timeout=10)
+            r = httpx.get(
+                KROGER_PRODUCTS_URL,
+                params=self._product_params(store_external_id, ingredient_name),
+                headers=headers,
+                timeout=10,
+            )
+            if r.status_code == 401:
+                KROGER_TOKENS.invalidate(token)
             r.raise_for_status()
-            items = r.json().get("data", [])
-            if not items:
-                return (None, unit)
-
-            variant = items[0]["items"][0]
-            price_cents = variant["price"]["regular"]
-            price_dollars = price_cents / 100.0
-
-            size_str = variant.get("size") or ""
-            m = SIZE_RE.search(size_str)
-            if m:
-                qty = float(m.group(1))
-                parsed_unit = self._normalize_unit(m.group(2))
-                if qty > 0:
-                    return (price_dollars / qty, parsed_unit)
-            # Fallback – cannot parse size, return pack price with default unit
-            return (price_dollars, unit)
+            return self._parse_products(r.json(), unit)
         except Exception:
             return (None, unit)
 
+    async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
+        """Native async lookup over the pooled api.kroger.com client."""
+        try:
+            token = await KROGER_TOKENS.async_get_token()
+        except Exception:
+            return (None, unit)
+
+        headers = {"Authorization": f"Bearer {token}"}
+        try:
+            client = get_async_client(KROGER_PRODUCTS_URL)
+            r = await client.get(
+                KROGER_PRODUCTS_URL,
+                params=self._product_params(store_external_id, ingredient_name),
+                headers=headers,
+            )
+            if r.status_code == 401:
+                KROGER_TOKENS.invalidate(token)
+            r.raise_for_status()
+            return self._parse_products(r.json(), unit)
+        except Exception:
+            return (None, unit)
+
+    async def async_search_product(self, store_external_id: str, ingredient_name: str, unit: str):
+        try:
+            items = (await self._get_products(self._product_params(store_external_id, ingredient_name))).get("data", [])
+            if not items:
+                return None
+            price, parsed_unit = self._price_product(items[0], unit)
+            return ProductHit(str(items[0]["productId"]), price, parsed_unit, items[0].get("description"))
+        except Exception:
+            return None
+
+    async def async_fetch_product_prices(self, store_external_id: str, product_ids: List[str]):
+        """Price up to `product_id_batch` products at one location in a single request."""
+        params = {
+            "filter.locationId": store_external_id,
+            "filter.productId": ",".join(product_ids),
+            "filter.limit": len(product_ids),
+        }
+        try:
+            data = await self._get_products(params)
+        except Exception:
+            return None
+        prices: Dict[str, tuple] = {}
+        for product in data.get("data", []):
+            try:
+                prices[str(product["productId"])] = self._price_product(product, None)
+            except (KeyError, IndexError, TypeError):
+                # Known product, but no price at this location
+                prices[str(product.get("productId"))] = (None, None)
+        return prices
+
     # -------------------------
     # Store-ID lookup utilities
     # -------------------------
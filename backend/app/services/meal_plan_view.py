@@ -0,0 +1,209 @@
+"""
+The full meal plan served by GET /meal-plans/{plan_id}.
+
+Generation writes the assembled plan – days, meals, recipes with their
+ingredients, and the selected stores – as a JSONB snapshot on its
+meal_plans row (migration 28) next to the relational rows. A read is then
+one primary-key lookup plus one batched pricing.get_prices_per_unit call
+that overlays current prices, the same few queries whatever the plan's size.
+
+Plans generated before the snapshot existed are rebuilt from one nested
+select over the relational rows instead.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.supabase import get_supabase_admin
+from .pricing import get_prices_per_unit
+
+# Bump when the snapshot layout changes; readers rebuild older ones from the rows
+SNAPSHOT_VERSION = 1
+
+PLAN_HEADER_SELECT = "id, start_date, end_date, total_cost, snapshot"
+PLAN_TREE_SELECT = (
+    "id, start_date, end_date, total_cost, "
+    "meal_plan_stores(place_id), "
+    "meal_plan_recipes(meal_type, day_of_week, servings, "
+    "recipes(*, recipe_ingredients(quantity, unit, ingredients(name, category, price_per_unit))))"
+)
+
+
+def _field(obj: Any, name: str, default=None):
+    # Ingredients on a generated plan may be models or plain dicts
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def build_snapshot(plan, stores: List[Dict], store_ids: List[str]) -> Dict:
+    """JSON-ready snapshot of a generated MealPlan and its selected stores."""
+    days = []
+    for day in plan.days:
+        meals = []
+        for meal in day.meals:
+            r = meal.recipe
+            meals.append({
+                "meal_type": meal.meal_type,
+                "servings": meal.servings,
+                "recipe": {
+                    "name": r.name,
+                    "description": r.description,
+                    "instructions": r.instructions,
+                    "prep_time_minutes": r.prep_time_minutes,
+                    "cook_time_minutes": r.cook_time_minutes,
+                    "servings": r.servings,
+                    "calories_per_serving": r.calories_per_serving,
+                    "protein_per_serving": r.protein_per_serving,
+                    "carbs_per_serving": r.carbs_per_serving,
+                    "fat_per_serving": r.fat_per_serving,
+                    "ingredients": [
+                        {
+                            "name": _field(ing, "name"),
+                            "category": _field(ing, "category"),
+                            "unit": _field(ing, "unit"),
+                            "quantity": _field(ing, "quantity"),
+                            "price_per_unit": _field(ing, "price_per_unit"),
+                        }
+                        for ing in r.ingredients
+                        if _field(ing, "name")
+                    ],
+                    "dietary_tags": r.dietary_tags or [],
+                },
+            })
+        days.append({"day_of_week": day.day_of_week, "meals": meals})
+    days.sort(key=lambda day: day["day_of_week"])
+    return {"version": SNAPSHOT_VERSION, "days": days, "stores": stores, "store_ids": store_ids}
+
+
+def save_snapshot(supabase, plan_id: str, plan, store_ids: List[str]) -> bool:
+    """Write the snapshot of a freshly persisted *plan*; False if it couldn't be written."""
+    try:
+        stores = []
+        if store_ids:
+            stores = supabase.table("stores").select("place_id,name").in_("place_id", store_ids).execute().data or []
+        snapshot = build_snapshot(plan, stores, list(store_ids))
+        supabase.table("meal_plans").update({"snapshot": snapshot}).eq("id", plan_id).execute()
+        return True
+    except Exception as e:
+        # Migration 28 not applied – reads rebuild the plan from its rows
+        logging.getLogger(__name__).warning(f"Could not write snapshot for meal plan {plan_id}: {e}")
+        return False
+
+
+def _recipe_name(stored_name: str, plan_id: str, day_of_week: int, meal_type: str) -> str:
+    """Generated name of a recipe row, without the unique suffix persistence appends."""
+    suffix = f"_{plan_id}_{day_of_week}_{meal_type}"
+    return stored_name[: -len(suffix)] if stored_name.endswith(suffix) else stored_name
+
+
+def _recipe(recipe_row: Dict, name: str) -> Dict:
+    ingredients = []
+    for ing_row in recipe_row.get("recipe_ingredients") or []:
+        ing_base = ing_row.get("ingredients") or {}
+        ingredients.append({
+            "name": ing_base.get("name"),
+            "category": ing_base.get("category"),
+            "unit": ing_row.get("unit"),
+            "quantity": ing_row.get("quantity"),
+            "price_per_unit": ing_base.get("price_per_unit"),
+        })
+    return {
+        "name": name,
+        "description": recipe_row.get("description"),
+        "instructions": recipe_row.get("instructions", []),
+        "prep_time_minutes": recipe_row.get("prep_time_minutes"),
+        "cook_time_minutes": recipe_row.get("cook_time_minutes"),
+        "servings": recipe_row.get("servings"),
+        "calories_per_serving": recipe_row.get("calories_per_serving"),
+        "protein_per_serving": recipe_row.get("protein_per_serving"),
+        "carbs_per_serving": recipe_row.get("carbs_per_serving"),
+        "fat_per_serving": recipe_row.get("fat_per_serving"),
+        "ingredients": ingredients,
+        "dietary_tags": recipe_row.get("dietary_tags", []),
+    }
+
+
+def build_days(plan_id: str, meal_rows: List[Dict]) -> List[Dict]:
+    """[{"day_of_week", "meals"}] in day order from meal_plan_recipes rows with embedded recipes."""
+    days_map: Dict[int, List[Dict]] = {}
+    for rec in meal_rows:
+        recipe_row = rec["recipes"]
+        name = _recipe_name(recipe_row["name"], plan_id, rec["day_of_week"], rec["meal_type"])
+        days_map.setdefault(rec["day_of_week"], []).append({
+            "meal_type": rec["meal_type"],
+            "servings": rec["servings"],
+            "recipe": _recipe(recipe_row, name),
+        })
+    return [{"day_of_week": idx, "meals": days_map[idx]} for idx in sorted(days_map)]
+
+
+def apply_prices(days: List[Dict], store_ids: List[str]) -> None:
+    """Overwrite each ingredient's price_per_unit with the latest price at *store_ids*.
+
+    Distinct (name, unit) pairs are priced in one batch; pairs without a
+    store or global price keep the ingredient's stored price.
+    """
+    ingredients = [
+        ing
+        for day in days
+        for meal in day["meals"]
+        for ing in meal["recipe"]["ingredients"]
+        if ing["name"] and ing["unit"]
+    ]
+    defaults: Dict[Tuple[str, str], Optional[float]] = {}
+    for ing in ingredients:
+        defaults.setdefault((ing["name"], ing["unit"]), ing["price_per_unit"])
+    keys = list(defaults)
+    prices = get_prices_per_unit(
+        store_ids, keys, defaults=[defaults[key] for key in keys], substring_fallback=False
+    )
+    by_key = dict(zip(keys, prices))
+    for ing in ingredients:
+        ing["price_per_unit"] = by_key[(ing["name"], ing["unit"])]
+
+
+def _from_rows(supabase, plan_id: str) -> Optional[Tuple[Dict, List[Dict], List[Dict], List[str]]]:
+    """(header, days, stores, store_ids) rebuilt from the relational rows, for plans without a snapshot."""
+    rows = supabase.table("meal_plans").select(PLAN_TREE_SELECT).eq("id", plan_id).limit(1).execute().data
+    if not rows:
+        return None
+    tree = rows[0]
+    store_ids = [row["place_id"] for row in tree.get("meal_plan_stores") or []]
+    stores = []
+    if store_ids:
+        stores = supabase.table("stores").select("place_id,name").in_("place_id", store_ids).execute().data or []
+    return tree, build_days(plan_id, tree.get("meal_plan_recipes") or []), stores, store_ids
+
+
+def get_plan_view(plan_id: str, supabase=None) -> Optional[Dict]:
+    """The priced plan for *plan_id*, or None if there is no such plan."""
+    supabase = supabase or get_supabase_admin()
+    snapshot = None
+    try:
+        rows = supabase.table("meal_plans").select(PLAN_HEADER_SELECT).eq("id", plan_id).limit(1).execute().data
+        if not rows:
+            return None
+        header = rows[0]
+        snapshot = header.get("snapshot")
+    except Exception as e:
+        # Migration 28 not applied – no snapshot column yet
+        logging.getLogger(__name__).warning(f"Meal plan snapshots unavailable, reading rows: {e}")
+
+    if snapshot and snapshot.get("version") == SNAPSHOT_VERSION:
+        days, stores, store_ids = snapshot["days"], snapshot["stores"], snapshot["store_ids"]
+    else:
+        rebuilt = _from_rows(supabase, plan_id)
+        if rebuilt is None:
+            return None
+        header, days, stores, store_ids = rebuilt
+
+    apply_prices(days, store_ids)
+    return {
+        "plan_id": header["id"],
+        "start_date": header["start_date"],
+        "end_date": header["end_date"],
+        "total_cost": header["total_cost"],
+        "days": days,
+        "stores": stores,
+    }
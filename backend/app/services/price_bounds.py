@@ -0,0 +1,178 @@
+"""
+Learned per-ingredient price bounds.
+
+The keyword heuristics in pricing.is_realistic_price cap every ingredient in
+a unit at the same price and reject anything near $1/$3/$5/$10 unless the
+name contains a magic word, which is wrong for many items. Instead,
+scripts/compute_price_bounds.py learns a range per (canonical ingredient
+key, canonical unit) from observed prices (`stores_prices` plus recent
+`price_history`) and stores it in `price_bounds` (migration 25).
+
+Bounds are robust to the odd broken scrape: in log space (prices are
+roughly log-normal) they sit K_MAD robust standard deviations (1.4826 × MAD)
+either side of the median, with a floor on the spread so a handful of
+identical prices doesn't reject every other price. Estimates (e.g. the
+safeway_fallback table, the same price at every store) are left out, and
+prices from rows that don't record their source count once per distinct
+value, so repeated made-up prices can't collapse a range around themselves.
+
+Inside a learned range, the round prices broken scrapers return for
+everything ($1/$3/$5/$10) are only believable near what the pair usually
+costs: `typical_range` is the band one robust standard deviation either
+side of the median.
+
+The API process loads the table into a dict (reloaded every RELOAD_SECONDS),
+so validating a price is one lookup. Pairs without enough samples have no
+row and fall back to the heuristics.
+"""
+
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .canonicalize import normalize_ingredient_name
+from .unit_conversion import canonical_unit
+
+# Width of the accepted range, in robust standard deviations of log price
+K_MAD = 3.5
+# Minimum robust SD of log price (×1.25), so tightly clustered samples still
+# leave room for ordinary price differences between stores
+MIN_LOG_SPREAD = math.log(1.25)
+# Observations needed before an (ingredient, unit) pair gets learned bounds
+MIN_SAMPLES = 5
+RELOAD_SECONDS = 3600
+PAGE_SIZE = 1000
+
+BoundsKey = Tuple[str, str]  # (ingredient key, canonical unit)
+
+
+def bounds_key(ingredient_name: str, unit: str) -> BoundsKey:
+    return normalize_ingredient_name(ingredient_name), canonical_unit(unit or "")
+
+
+def compute_bounds(
+    observations: Iterable[Tuple[str, str, float, Optional[str]]],
+    min_samples: int = MIN_SAMPLES,
+    k: float = K_MAD,
+    exclude_sources: Iterable[str] = (),
+) -> List[Dict]:
+    """price_bounds rows from (ingredient_name, unit, price_per_unit, source) observations.
+
+    Observations from *exclude_sources* are skipped; those without a source
+    count once per distinct price of their (ingredient, unit) pair.
+    """
+    excluded = set(exclude_sources)
+    samples: Dict[BoundsKey, List[float]] = {}
+    unattributed: Dict[BoundsKey, set] = {}
+    for name, unit, price, source in observations:
+        if source in excluded:
+            continue
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            continue
+        if not name or price <= 0 or not math.isfinite(price):
+            continue
+        key = bounds_key(name, unit)
+        if source is None:
+            seen = unattributed.setdefault(key, set())
+            if price in seen:
+                continue
+            seen.add(price)
+        samples.setdefault(key, []).append(math.log(price))
+
+    now = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for (key, unit), logs in samples.items():
+        if len(logs) < min_samples or not key:
+            continue
+        values = np.asarray(logs)
+        median = float(np.median(values))
+        spread = max(1.4826 * float(np.median(np.abs(values - median))), MIN_LOG_SPREAD)
+        rows.append({
+            "ingredient_key": key,
+            "unit": unit,
+            "median": round(math.exp(median), 4),
+            "lower": round(math.exp(median - k * spread), 4),
+            "upper": round(math.exp(median + k * spread), 4),
+            "samples": len(logs),
+            "computed_at": now,
+        })
+    return rows
+
+
+def typical_range(lower: float, upper: float, k: float = K_MAD) -> Tuple[float, float]:
+    """Prices within one robust standard deviation of the median of learned [lower, upper].
+
+    compute_bounds places the bounds symmetrically in log space, so the
+    median and spread follow from the bounds alone.
+    """
+    median = math.sqrt(lower * upper)
+    spread = math.log(upper / lower) / (2 * k)
+    return median * math.exp(-spread), median * math.exp(spread)
+
+
+class PriceBounds:
+    """In-memory view of `price_bounds`, reloaded periodically."""
+
+    def __init__(self, supabase=None, reload_seconds: float = RELOAD_SECONDS):
+        self.supabase = supabase
+        self.reload_seconds = reload_seconds
+        self._bounds: Dict[BoundsKey, Tuple[float, float]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def load(self, rows: Optional[List[Dict]] = None) -> None:
+        """Replace the bounds with *rows*, or with the table's contents."""
+        self._loaded_at = time.monotonic()
+        if rows is None:
+            rows = self._fetch()
+            if rows is None:
+                return  # keep serving what we had
+        self._bounds = {
+            (row["ingredient_key"], row["unit"]): (float(row["lower"]), float(row["upper"]))
+            for row in rows
+        }
+
+    def _fetch(self) -> Optional[List[Dict]]:
+        if self.supabase is None:
+            from ..core.supabase import get_supabase_admin
+            self.supabase = get_supabase_admin()
+        rows: List[Dict] = []
+        try:
+            while True:
+                page = (
+                    self.supabase.table("price_bounds")
+                    .select("ingredient_key, unit, lower, upper")
+                    .order("ingredient_key")
+                    .order("unit")
+                    .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                    .execute()
+                    .data
+                    or []
+                )
+                rows.extend(page)
+                if len(page) < PAGE_SIZE:
+                    return rows
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Price bounds unavailable, using heuristics: {e}")
+            return None
+
+    def lookup(self, ingredient_name: str, unit: str) -> Optional[Tuple[float, float]]:
+        """(lower, upper) for *ingredient_name* priced per *unit*, or None if not learned."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_seconds:
+            self.load()
+        if not self._bounds:
+            return None
+        return self._bounds.get(bounds_key(ingredient_name, unit))
+
+
+# Global bounds instance (loads lazily on first lookup)
+price_bounds = PriceBounds()
+
+def get_price_bounds() -> PriceBounds:
+    """Get the global learned price bounds."""
+    return price_bounds
@@ -0,0 +1,116 @@
+"""
+Vectorized pricing kernel: conversion, realism filtering and store
+multipliers over whole arrays of candidate prices.
+
+Pricing a plan or grocery list used to push every candidate `stores_prices`
+row through `normalize`, `convert_price` and `is_realistic_price` one at a
+time. The kernel takes the candidates as parallel arrays instead:
+
+- per candidate: price, stored-unit code, group index and store multiplier,
+- per group (one ingredient × requested unit): requested-unit code,
+  ingredient-class code, realistic price range (learned or heuristic, see
+  pricing.realism_bounds) and whether the uniform prices broken scrapers
+  return are allowed,
+
+and converts with the compiled factor table from unit_conversion, filters
+unrealistic values and reduces to the cheapest valid price per group using
+NumPy array operations.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .unit_conversion import INGREDIENT_CLASSES, UNIT_SIZES, _FACTORS, canonical_unit, ingredient_class
+
+# Prices broken scrapers return for everything (see pricing.is_realistic_price)
+SUSPICIOUS_UNIFORM_PRICES = np.array([5.0, 1.0, 10.0, 3.0])
+
+UNIT_CODES: Dict[str, int] = {unit: code for code, unit in enumerate(UNIT_SIZES)}
+CLASS_CODES: Dict[str, int] = {cls: code for code, cls in enumerate(INGREDIENT_CLASSES)}
+_KNOWN_UNITS = len(UNIT_CODES)
+
+# FACTORS[from_code, to_code, class_code]: multiplier from a per-from_unit to a per-to_unit price
+FACTORS = np.full((_KNOWN_UNITS, _KNOWN_UNITS, len(CLASS_CODES)), np.nan)
+for (_from, _to, _cls), _factor in _FACTORS.items():
+    FACTORS[UNIT_CODES[_from], UNIT_CODES[_to], CLASS_CODES[_cls]] = _factor
+
+# Units the tables don't know get codes past the factor table on first sight,
+# so two rows in the same unknown unit still compare equal.
+_EXTRA_UNITS: Dict[str, int] = {}
+# raw unit string -> code, so encoding a column is one dict lookup per row
+_RAW_CODES: Dict[Optional[str], int] = {}
+
+
+def unit_code(unit: Optional[str]) -> int:
+    code = _RAW_CODES.get(unit)
+    if code is None:
+        u = canonical_unit(unit or "")
+        code = UNIT_CODES.get(u)
+        if code is None:
+            code = _EXTRA_UNITS.setdefault(u, _KNOWN_UNITS + len(_EXTRA_UNITS))
+        _RAW_CODES[unit] = code
+    return code
+
+
+def unit_codes(units: Iterable[Optional[str]]) -> np.ndarray:
+    return np.fromiter(map(unit_code, units), dtype=np.int64)
+
+
+def class_codes(ingredient_names: Iterable[Optional[str]]) -> np.ndarray:
+    return np.fromiter((CLASS_CODES[ingredient_class(name)] for name in ingredient_names), dtype=np.int64)
+
+
+def convert_prices(prices: np.ndarray, from_codes: np.ndarray, to_codes: np.ndarray, classes: np.ndarray) -> np.ndarray:
+    """Per-unit prices converted elementwise; NaN where the units can't be related."""
+    known = (from_codes < _KNOWN_UNITS) & (to_codes < _KNOWN_UNITS)
+    factors = np.full(prices.shape, np.nan)
+    factors[known] = FACTORS[from_codes[known], to_codes[known], classes[known]]
+    factors[from_codes == to_codes] = 1.0
+    return prices * factors
+
+
+def realistic_mask(
+    prices: np.ndarray, min_prices: np.ndarray, max_prices: np.ndarray, allow_uniform: np.ndarray
+) -> np.ndarray:
+    """Vectorized pricing.is_realistic_price for precomputed per-row bounds."""
+    with np.errstate(invalid="ignore"):
+        uniform = np.zeros(prices.shape, dtype=bool)
+        for value in SUSPICIOUS_UNIFORM_PRICES:
+            uniform |= np.abs(prices - value) < 0.01
+        return (prices > 0) & (prices >= min_prices) & (prices <= max_prices) & (allow_uniform | ~uniform)
+
+
+def cheapest_per_group(
+    prices: np.ndarray,
+    from_codes: np.ndarray,
+    groups: np.ndarray,
+    to_codes: np.ndarray,
+    classes: np.ndarray,
+    min_prices: np.ndarray,
+    max_prices: np.ndarray,
+    allow_uniform: np.ndarray,
+    multipliers: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Cheapest realistic converted price per group (NaN for groups with none).
+
+    Args:
+        prices, from_codes, groups: per candidate row; *groups* indexes the per-group arrays
+        to_codes, classes, min_prices, max_prices, allow_uniform: per group
+        multipliers: per candidate store multiplier, applied after the realism
+            check (the bound is for the baseline price)
+    """
+    n_groups = len(to_codes)
+    best = np.full(n_groups, np.inf)
+    if len(prices):
+        converted = convert_prices(prices, from_codes, to_codes[groups], classes[groups])
+        valid = realistic_mask(converted, min_prices[groups], max_prices[groups], allow_uniform[groups])
+        if multipliers is not None:
+            converted = converted * multipliers
+        np.minimum.at(best, groups[valid], converted[valid])
+    best[np.isinf(best)] = np.nan
+    return best
+
+
+def group_results(best: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(value) else float(value) for value in best]
@@ -1,5 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List, Tuple
+from typing import Dict, NamedTuple, Optional, List, Tuple
+
+
+class ProductHit(NamedTuple):
+    """Top search result for an ingredient: the product and its price."""
+
+    product_id: str
+    price: float
+    unit: str
+    name: Optional[str] = None
+
 
 class PriceSource(ABC):
     """Abstract base for a retailer-specific price lookup implementation."""
@@ -48,4 +58,34 @@ class PriceSource(ABC):
             store_external_id,
             ingredient_name,
             unit,
-        ) 
\ No newline at end of file
+        ) 
+
+    # --------------------------------------------------
+    # Product-ID lookups (optional)
+    # --------------------------------------------------
+    # Most product IDs one async_fetch_product_prices call accepts; 0 means
+    # the source can't look products up by ID and is always searched.
+    product_id_batch: int = 0
+
+    async def async_search_product(
+        self,
+        store_external_id: str,
+        ingredient_name: str,
+        unit: str,
+    ) -> Optional[ProductHit]:
+        """Search for *ingredient_name* and return the top hit with its product ID."""
+        return None
+
+    async def async_fetch_product_prices(
+        self,
+        store_external_id: str,
+        product_ids: List[str],
+    ) -> Optional[Dict[str, Tuple[Optional[float], Optional[str]]]]:
+        """Return product_id -> (price_per_unit, unit or None) for *product_ids*.
+
+        IDs the retailer no longer knows are left out; IDs it knows but cannot
+        price at this store map to (None, None). Returns None when the request
+        itself failed, so callers can tell a transient error from a product
+        that has disappeared.
+        """
+        return None
@@ -1,60 +1,96 @@
-from typing import List
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
 from ..core.supabase import get_supabase_admin
+from . import price_kernel
+from .price_bounds import get_price_bounds, typical_range
 from .unit_conversion import convert_price, normalize
 from .store_adjustments import adjust_price_for_store
+from .canonicalize import normalize_ingredient_name
+
+# Prices broken scrapers return for everything
+SUSPICIOUS_UNIFORM_PRICES = [5.0, 1.0, 10.0, 3.0]
+
+# PostgREST caps a response at 1000 rows
+PAGE_SIZE = 1000
+# Ingredient names per in_() filter, keeping the request URL short for long grocery lists
+NAMES_PER_QUERY = 100
+CANDIDATE_COLUMNS = "place_id, price_per_unit, unit, ingredient_name"
+
+
+@lru_cache(maxsize=4096)
+def heuristic_bounds(ingredient_name: str, unit: str) -> Tuple[float, bool]:
+    """(max realistic price per *unit*, whether the suspicious uniform prices are allowed).
+
+    Only used for ingredient/unit pairs without learned bounds.
+    """
+    ingredient_lower = ingredient_name.lower()
+
+    # Uniform scraper-error prices are only plausible for expensive or large items
+    expensive_keywords = ['meat', 'beef', 'salmon', 'tuna', 'cheese', 'nuts', 'oil', 'organic']
+    large_keywords = ['bottle', 'jar', 'bag', 'package', 'box', 'container']
+    allow_uniform = any(keyword in ingredient_lower for keyword in expensive_keywords + large_keywords)
 
-def is_realistic_price(price: float, ingredient_name: str, unit: str) -> bool:
-    """Check if a price seems realistic vs obviously wrong."""
-    if price <= 0:
-        return False
-    
-    # Reject uniform prices that indicate scraping errors
-    # These are common values returned by broken scrapers
-    suspicious_uniform_prices = [5.0, 1.0, 10.0, 3.0]
-    if any(abs(price - uniform_price) < 0.01 for uniform_price in suspicious_uniform_prices):
-        # Allow these prices only for expensive or large items
-        expensive_keywords = ['meat', 'beef', 'salmon', 'tuna', 'cheese', 'nuts', 'oil', 'organic']
-        large_keywords = ['bottle', 'jar', 'bag', 'package', 'box', 'container']
-        
-        ingredient_lower = ingredient_name.lower()
-        if not any(keyword in ingredient_lower for keyword in expensive_keywords + large_keywords):
-            return False
-    
     # More aggressive thresholds to catch scraping errors
     if unit in ['each', 'piece', 'item', 'ct', 'count']:
         # Individual items - most grocery items shouldn't exceed $3 each
         # Exceptions for expensive categories
         expensive_keywords = ['meat', 'fish', 'cheese', 'nuts', 'oil', 'organic', 'premium']
-        max_price = 6.0 if any(kw in ingredient_name.lower() for kw in expensive_keywords) else 3.0
-        return price <= max_price
-        
+        max_price = 6.0 if any(kw in ingredient_lower for kw in expensive_keywords) else 3.0
     elif unit in ['lb', 'kg']:
         # Per pound/kg - most items shouldn't exceed $8/lb
-        return price <= 8.0
-        
+        max_price = 8.0
     elif unit in ['g', 'oz']:
         # Per gram/ounce - very expensive per small unit is suspicious
-        return price <= 0.50  # $0.50 per gram/oz max
-        
+        max_price = 0.50  # $0.50 per gram/oz max
     elif unit in ['ml', 'fl-oz']:
         # Per ml/fl-oz - liquids shouldn't be too expensive per small volume
-        return price <= 0.02  # $0.02 per ml max
-        
+        max_price = 0.02  # $0.02 per ml max
     elif unit in ['l', 'cup']:
         # Per liter/cup - reasonable for liquid volumes
-        return price <= 5.0
-        
+        max_price = 5.0
     elif unit in ['slice', 'slices', 'wedge', 'wedges']:
         # Per slice - bread, pizza, etc. shouldn't be too expensive per slice
-        return price <= 1.0
-        
+        max_price = 1.0
     elif unit in ['clove', 'cloves', 'sprig', 'sprigs', 'leaf', 'leaves']:
         # Small units - herbs, garlic, etc.
-        return price <= 0.25
-        
+        max_price = 0.25
     else:
         # Other units - conservative general check
-        return price <= 5.0
+        max_price = 5.0
+    return max_price, allow_uniform
+
+
+def realism_bounds(ingredient_name: str, unit: str) -> Tuple[float, float, bool]:
+    """(min, max realistic price per *unit*, whether the suspicious uniform prices are allowed).
+
+    Learned bounds (price_bounds.py) when the pair has been observed often
+    enough, the keyword heuristics otherwise. Learned pairs allow the
+    suspicious uniform prices only when one is typical for the pair.
+    """
+    learned = get_price_bounds().lookup(ingredient_name, unit)
+    if learned is not None:
+        lower, upper = learned
+        typical_low, typical_high = typical_range(lower, upper)
+        allow_uniform = any(typical_low <= price <= typical_high for price in SUSPICIOUS_UNIFORM_PRICES)
+        return lower, upper, allow_uniform
+    max_price, allow_uniform = heuristic_bounds(ingredient_name, unit)
+    return 0.0, max_price, allow_uniform
+
+
+def is_realistic_price(price: float, ingredient_name: str, unit: str) -> bool:
+    """Check if a price seems realistic vs obviously wrong."""
+    if price <= 0:
+        return False
+    min_price, max_price, allow_uniform = realism_bounds(ingredient_name, unit)
+    if price < min_price:
+        return False
+    if not allow_uniform and any(abs(price - uniform_price) < 0.01 for uniform_price in SUSPICIOUS_UNIFORM_PRICES):
+        return False
+    return price <= max_price
 
 def get_price_per_unit(place_ids: List[str], ingredient_name: str, unit: str, default: float = 1.0) -> float:
     """Return the cheapest REALISTIC price per unit among given stores; fallback to default."""
@@ -70,12 +106,7 @@ def get_price_per_unit(place_ids: List[str], ingredient_name: str, unit: str, de
     
     try:
         # Try multiple ingredient name variations for better matching
-        name_variations = [
-            ingredient_name,
-            ingredient_name.lower(),
-            ingredient_name.lower().replace(',', '').strip(),
-            ingredient_name.title(),
-        ]
+        name_variations = _name_variants(ingredient_name)
         
         best_price = None
         realistic_prices = []  # Track realistic prices separately
@@ -104,7 +135,7 @@ def get_price_per_unit(place_ids: List[str], ingredient_name: str, unit: str, de
                         continue
                     
                     # Try unit conversion
-                    converted = convert_price(price, price_unit, unit)
+                    converted = convert_price(price, price_unit, unit, ingredient_name)
                     if converted is not None:
                         if is_realistic_price(converted, ingredient_name, unit):
                             realistic_prices.append(converted)
@@ -133,6 +164,212 @@ def get_price_per_unit(place_ids: List[str], ingredient_name: str, unit: str, de
     
     return default
 
+def _name_variants(ingredient_name: str) -> List[str]:
+    """Spellings of *ingredient_name* that stores_prices rows may use."""
+    variants = [
+        ingredient_name,
+        ingredient_name.lower(),
+        ingredient_name.lower().replace(',', '').strip(),
+        ingredient_name.title(),
+        normalize_ingredient_name(ingredient_name),
+    ]
+    return list(dict.fromkeys(variants))
+
+
+def _fetch_pages(build_query) -> List[Dict]:
+    """Every row of the query *build_query()* returns, read PAGE_SIZE rows at a time.
+
+    The query must be ordered on a unique key; it is rebuilt for each page.
+    """
+    rows: List[Dict] = []
+    while True:
+        page = build_query().range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+
+
+def _chunks(names: List[str]) -> Iterable[List[str]]:
+    for start in range(0, len(names), NAMES_PER_QUERY):
+        yield names[start:start + NAMES_PER_QUERY]
+
+
+def _store_prices(supabase, names: List[str], store_ids: List[str]) -> List[Dict]:
+    """stores_prices rows for *names*, at *store_ids* or (if empty) at every store."""
+
+    def build_query(chunk: List[str]):
+        query = supabase.table("stores_prices").select(CANDIDATE_COLUMNS).in_("ingredient_name", chunk)
+        if store_ids:
+            query = query.in_("place_id", store_ids)
+        return query.order("place_id").order("ingredient_name").order("unit")
+
+    rows: List[Dict] = []
+    for chunk in _chunks(names):
+        rows.extend(_fetch_pages(lambda: build_query(chunk)))
+    return rows
+
+
+def _global_prices(supabase, names: List[str]) -> List[Dict]:
+    """Distinct (ingredient_name, unit, price_per_unit) rows for *names* across every store."""
+    rows: List[Dict] = []
+    try:
+        for chunk in _chunks(names):
+            rows.extend(_fetch_pages(
+                lambda: supabase.rpc("ingredient_unit_prices", {"p_names": chunk})
+                .order("ingredient_name")
+                .order("unit")
+                .order("price_per_unit")
+            ))
+        return rows
+    except Exception as e:
+        # Migration 30 not applied – read every store's rows instead
+        logging.getLogger(__name__).warning(f"ingredient_unit_prices unavailable, reading all stores' prices: {e}")
+        return _store_prices(supabase, names, [])
+
+
+class _ItemBatch:
+    """Per-item kernel inputs for a batch of (ingredient_name, unit) items."""
+
+    def __init__(self, items: List[Tuple[str, str]]):
+        self.variants = [_name_variants(name) for name, _ in items]
+        self.to_codes = price_kernel.unit_codes(unit for _, unit in items)
+        self.classes = price_kernel.class_codes(name for name, _ in items)
+        bounds = [realism_bounds(name, unit) for name, unit in items]
+        self.min_prices = np.array([bound[0] for bound in bounds])
+        self.max_prices = np.array([bound[1] for bound in bounds])
+        self.allow_uniform = np.array([bound[2] for bound in bounds])
+
+    def candidates(self, supabase, indices: Iterable[int], store_ids: List[str]):
+        """Candidate prices for the items at *indices* (exact name variants).
+
+        The stores_prices rows at *store_ids*; without, the distinct prices
+        at any store (migration 30, place_id None). Either read is paged.
+
+        Returns parallel (prices, units, item indices, place_ids) lists, one
+        entry per candidate row and item it may price.
+        """
+        by_name: Dict[str, List[int]] = {}
+        for i in indices:
+            for variant in self.variants[i]:
+                by_name.setdefault(variant, []).append(i)
+        if not by_name:
+            return [], [], [], []
+        prices, units, groups, places = [], [], [], []
+        if store_ids:
+            rows = _store_prices(supabase, list(by_name), store_ids)
+        else:
+            rows = _global_prices(supabase, list(by_name))
+        for row in rows:
+            try:
+                price = float(row["price_per_unit"])
+            except (TypeError, ValueError):
+                continue
+            for i in by_name.get(row["ingredient_name"], ()):
+                prices.append(price)
+                units.append(row["unit"])
+                groups.append(i)
+                places.append(row.get("place_id"))
+        return prices, units, groups, places
+
+
+def get_prices_per_unit(
+    place_ids: List[str],
+    items: List[Tuple[str, str]],
+    default: Optional[float] = None,
+    defaults: Optional[List[Optional[float]]] = None,
+    substring_fallback: bool = True,
+) -> List[Optional[float]]:
+    """Batch get_price_per_unit for (ingredient_name, unit) *items*.
+
+    Candidate rows for all items come from one paged query on the exact name
+    variants and are converted, realism-checked and reduced to the cheapest
+    price per item by the vectorized kernel (price_kernel.py). Items without a
+    realistic store price use the global cheapest (from the distinct prices
+    across stores) adjusted for the selected stores; anything still unpriced
+    goes through get_price_per_unit's substring matching, or with
+    substring_fallback=False (a fixed number of queries however long the
+    list) gets its default.
+
+    *defaults* gives a per-item default in place of *default*.
+    """
+    if not items:
+        return []
+    supabase = get_supabase_admin()
+    batch = _ItemBatch(items)
+
+    def cheapest(indices: List[int], store_ids: List[str], multiplier: float = 1.0) -> np.ndarray:
+        prices, units, groups, _ = batch.candidates(supabase, indices, store_ids)
+        return price_kernel.cheapest_per_group(
+            np.array(prices, dtype=float), price_kernel.unit_codes(units), np.array(groups, dtype=np.int64),
+            batch.to_codes, batch.classes, batch.min_prices, batch.max_prices, batch.allow_uniform,
+            np.full(len(prices), multiplier) if multiplier != 1.0 else None,
+        )
+
+    best = np.full(len(items), np.nan)
+    try:
+        best = cheapest(list(range(len(items))), place_ids)
+        missing = [i for i in range(len(items)) if np.isnan(best[i])]
+        if missing and place_ids:
+            # Global cheapest, adjusted by the selected stores' price level
+            multiplier = adjust_price_for_stores(1.0, place_ids)
+            global_best = cheapest(missing, [], multiplier)
+            best[missing] = global_best[missing]
+    except Exception as e:
+        print(f"Error in get_prices_per_unit: {e}")
+
+    results = price_kernel.group_results(best)
+    for i, (name, unit) in enumerate(items):
+        if results[i] is None:
+            item_default = defaults[i] if defaults is not None else default
+            if substring_fallback:
+                results[i] = get_price_per_unit(place_ids, name, unit, item_default)
+            else:
+                results[i] = item_default
+    return results
+
+
+def get_price_matrix(place_ids: List[str], items: List[Tuple[str, str]], baseline: bool = False) -> np.ndarray:
+    """Cheapest realistic price per unit of each item at each store.
+
+    Shape (len(items), len(place_ids)), NaN where a store has no usable
+    price. With *baseline*, one more trailing column holds each item's
+    cheapest price at any store (for estimating the gaps). The store columns
+    come from one stores_prices read filtered to *place_ids*, the baseline
+    from the distinct prices per ingredient and unit across stores; both are
+    paged and split into NAMES_PER_QUERY name chunks so a 100-item list
+    across a dozen stores arrives whole, and every cell is reduced in one
+    kernel pass.
+    """
+    n_items, n_stores = len(items), len(place_ids)
+    n_columns = n_stores + 1 if baseline else n_stores
+    if not n_items or not n_columns:
+        return np.full((n_items, n_columns), np.nan)
+    batch = _ItemBatch(items)
+    supabase = get_supabase_admin()
+    prices, units, cells = [], [], []
+    if n_stores:
+        store_prices, store_units, groups, places = batch.candidates(supabase, range(n_items), place_ids)
+        column = {place_id: j for j, place_id in enumerate(place_ids)}
+        for price, unit, i, place_id in zip(store_prices, store_units, groups, places):
+            j = column.get(place_id)
+            if j is not None:
+                prices.append(price)
+                units.append(unit)
+                cells.append(i * n_columns + j)
+    if baseline:
+        global_prices, global_units, groups, _ = batch.candidates(supabase, range(n_items), [])
+        prices.extend(global_prices)
+        units.extend(global_units)
+        cells.extend(i * n_columns + n_stores for i in groups)
+    best = price_kernel.cheapest_per_group(
+        np.array(prices, dtype=float), price_kernel.unit_codes(units), np.array(cells, dtype=np.int64),
+        np.repeat(batch.to_codes, n_columns), np.repeat(batch.classes, n_columns),
+        np.repeat(batch.min_prices, n_columns), np.repeat(batch.max_prices, n_columns),
+        np.repeat(batch.allow_uniform, n_columns),
+    )
+    return best.reshape(n_items, n_columns)
+
+
 def adjust_price_for_stores(base_price: float, place_ids: List[str]) -> float:
     """Adjust base price based on the stores selected by user."""
     try:
@@ -0,0 +1,174 @@
+"""
+Ingredient -> product pinning for price refreshes.
+
+A free-text search per ingredient per store is the slowest and flakiest
+request a source makes, and its top hit drifts from day to day. For sources
+that can price a product by ID (`PriceSource.product_id_batch > 0`) the
+registry wraps the source in a `PinnedSource`, which:
+
+- searches an (ingredient, retailer) pair once and pins the product it found
+  in `product_mappings` (extended by migration 24), which also gives
+  cart_export real product IDs,
+- prices pinned products by ID afterwards, coalescing concurrent lookups for
+  the same store into one request of up to `product_id_batch` IDs,
+- re-searches and re-pins only when the retailer no longer knows the pinned
+  ID. A failed request or a product the store doesn't stock falls back to a
+  search for this lookup but keeps the pin.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .price_sources import PriceSource, ProductHit
+
+# PostgREST caps a response at 1000 rows
+PAGE_SIZE = 1000
+
+# How long the first ID lookup for a store waits for others to join its batch
+BATCH_WINDOW_S = 0.02
+
+_FAILED = object()  # the batch request failed
+_GONE = object()  # the retailer no longer knows the product ID
+
+
+class ProductPins:
+    """(ingredient_name, retailer) -> pinned product ID, backed by product_mappings."""
+
+    def __init__(self, supabase=None):
+        self.supabase = supabase
+        self._pins: Dict[Tuple[str, str], str] = {}
+        self._pending: Dict[Tuple[str, str], Dict] = {}
+        self.by_id = 0
+        self.searched = 0
+        self.repinned = 0
+
+    def load(self, retailers: Optional[List[str]] = None) -> None:
+        if self.supabase is None:
+            return
+        rows: List[Dict] = []
+        try:
+            while True:
+                query = self.supabase.table("product_mappings").select("ingredient_name, retailer, product_id")
+                if retailers:
+                    query = query.in_("retailer", retailers)
+                page = (
+                    query.order("ingredient_name")
+                    .order("retailer")
+                    .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                    .execute()
+                    .data
+                    or []
+                )
+                rows.extend(page)
+                if len(page) < PAGE_SIZE:
+                    break
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Product pins unavailable, searching every lookup: {e}")
+            return
+        for row in rows:
+            self._pins[(row["ingredient_name"], row["retailer"])] = row["product_id"]
+
+    def get(self, ingredient_name: str, retailer: str) -> Optional[str]:
+        return self._pins.get((ingredient_name, retailer))
+
+    def pin(self, ingredient_name: str, retailer: str, hit: ProductHit, source_name: str) -> None:
+        key = (ingredient_name, retailer)
+        if key in self._pins:
+            self.repinned += 1
+        self._pins[key] = hit.product_id
+        self._pending[key] = {
+            "ingredient_name": ingredient_name,
+            "retailer": retailer,
+            "product_id": hit.product_id,
+            "source": source_name,
+            "product_name": hit.name,
+            "pinned_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def save(self) -> int:
+        """Write pins made since the last save in one upsert; returns how many."""
+        rows = list(self._pending.values())
+        if not rows or self.supabase is None:
+            return 0
+        try:
+            self.supabase.table("product_mappings").upsert(rows, on_conflict="ingredient_name,retailer").execute()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not save product pins: {e}")
+            return 0
+        self._pending.clear()
+        return len(rows)
+
+
+class PinnedSource(PriceSource):
+    """Prices a source's lookups by pinned product ID, searching only to (re)pin."""
+
+    def __init__(self, source: PriceSource, retailer: str, pins: ProductPins, batch_window: float = BATCH_WINDOW_S):
+        self.source = source
+        self.retailer = retailer
+        self.pins = pins
+        self.batch_window = batch_window
+        self.product_id_batch = source.product_id_batch
+        # store external id -> [(product id, future)] waiting for the next batch
+        self._batches: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+
+    @property
+    def source_name(self) -> str:
+        return self.source.source_name
+
+    def __getattr__(self, name):
+        # Store-ID lookups etc. go straight to the wrapped source
+        return getattr(self.source, name)
+
+    def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
+        return self.source.fetch_price(store_external_id, ingredient_name, unit)
+
+    async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
+        product_id = self.pins.get(ingredient_name, self.retailer)
+        gone = False
+        if product_id:
+            result = await self._price_by_id(store_external_id, product_id)
+            if result is _GONE:
+                gone = True
+            elif result is not _FAILED and result[0] is not None:
+                self.pins.by_id += 1
+                return (result[0], result[1] or unit)
+
+        self.pins.searched += 1
+        hit = await self.source.async_search_product(store_external_id, ingredient_name, unit)
+        if hit is None:
+            return (None, unit)
+        if not product_id or gone:
+            self.pins.pin(ingredient_name, self.retailer, hit, self.source.source_name)
+        return (hit.price, hit.unit)
+
+    async def _price_by_id(self, store_external_id: str, product_id: str):
+        future = asyncio.get_running_loop().create_future()
+        batch = self._batches.setdefault(store_external_id, [])
+        batch.append((product_id, future))
+        if len(batch) >= self.product_id_batch:
+            del self._batches[store_external_id]
+            await self._run_batch(store_external_id, batch)
+        elif len(batch) == 1:
+            # First in: give concurrent lookups for this store a moment to join
+            await asyncio.sleep(self.batch_window)
+            if self._batches.get(store_external_id) is batch:
+                del self._batches[store_external_id]
+                await self._run_batch(store_external_id, batch)
+        return await future
+
+    async def _run_batch(self, store_external_id: str, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        product_ids = list(dict.fromkeys(product_id for product_id, _ in batch))
+        try:
+            prices = await self.source.async_fetch_product_prices(store_external_id, product_ids)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"{self.source_name} product lookup raised: {e}")
+            prices = None
+        for product_id, future in batch:
+            if future.done():
+                continue
+            if prices is None:
+                future.set_result(_FAILED)
+            else:
+                future.set_result(prices.get(product_id, _GONE))
@@ -0,0 +1,136 @@
+"""
+Package-size / quantity parsing shared by every price source.
+
+Retailers describe package sizes as free text ("1 gal", "16.9 fl oz (6 pk)",
+"2 x 500 g", "12 ct / 2 lb"). Sources used to parse them with their own
+regexes, or not at all, and returned pack prices as per-unit prices, which
+then failed conversion or the realism checks. `parse_quantity` turns a size
+string into (total quantity, canonical unit) with one compiled pattern and an
+LRU cache, and `unit_price` divides a pack price by it.
+
+Rules:
+- "N x Q unit", Safeway's "N-Q unit" ("4-4 Oz", "6-16.9 Fl. Oz.") and pack
+  counts ("6 pk", "(6 pack)", "6-pack", "(Pack of 6)") multiply the measure,
+- a range ("3-4 lb", "avg. 4-5 lb") means its midpoint: a dash after
+  "avg"/"approx", between decimals, or up to less than twice the first
+  number is read as a range rather than a pack,
+- a weight or volume wins over an item count ("12 ct / 2 lb" -> 2 lb),
+- counts ("12 ct", "1 dozen", "each") are returned in "each",
+- "half" is a number ("Half Gallon" -> 0.5 gallon),
+- a bare unit ("lb", "per lb") means one of it.
+
+Units are canonicalized with unit_conversion.canonical_unit.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+from .unit_conversion import UNIT_ALIASES, UNIT_SIZES, canonical_unit
+
+_PACK_WORDS = ("pk", "pks", "pack", "packs", "pkg", "multipack")
+# Count words that stand for a number of items
+_COUNT_WORDS = {"dozen": 12.0, "doz": 12.0}
+
+# Every unit spelling, longest first so "fl oz" wins over "oz" and "lbs" over "lb"
+_UNIT_WORDS = sorted(
+    {w for w in (*UNIT_SIZES, *UNIT_ALIASES, *_PACK_WORDS, *_COUNT_WORDS) if w not in ("c", "l", "whole")},
+    key=len, reverse=True,
+)
+_UNIT_PATTERN = "|".join(
+    [r"fl\.?\s*oz\.?", r"fluid\s+ounces?", r"l(?![a-z])", r"ltr"]
+    + [re.escape(word).replace("\\-", r"[\s-]?") for word in _UNIT_WORDS]
+)
+_NUMBER = r"\bhalf|(?:\d+\s+)?\d+/\d+|\d+(?:\.\d+)?|\.\d+"
+# Words that mark "N-Q unit" as an estimate range, not a pack
+_RANGE_WORDS = r"approximately|approx|average|avg|about|~"
+
+_QUANTITY_RE = re.compile(
+    rf"(?:(?<![a-z])({_RANGE_WORDS})\.?\s*)?(?:(\d+(?:\.\d+)?)\s*([x×-])\s*)?({_NUMBER})\s*-?\s*({_UNIT_PATTERN})(?![a-z])",
+    re.I,
+)
+_PACK_OF_RE = re.compile(rf"\b(?:{'|'.join(_PACK_WORDS)}|case|box)\s+of\s+(\d+)\b", re.I)
+_BARE_UNIT_RE = re.compile(rf"^\s*(?:per\s+|/\s*)?({_UNIT_PATTERN})\.?\s*$", re.I)
+
+
+def _number(text: str) -> float:
+    if text.lower() == "half":
+        return 0.5
+    if "/" not in text:
+        return float(text)
+    whole, _, fraction = text.rpartition(" ")
+    numerator, denominator = fraction.split("/")
+    value = float(numerator) / float(denominator) if float(denominator) else 0.0
+    return value + (float(whole) if whole.strip() else 0.0)
+
+
+def _is_range(first: str, second: float, estimate: bool) -> bool:
+    """Whether "first-second" is a range of sizes rather than Safeway's count-size pack."""
+    low = float(first)
+    return estimate or "." in first or low < second < 2 * low
+
+
+def _unit(word: str) -> str:
+    word = re.sub(r"\s+", " ", word.lower()).rstrip(".")
+    if word.startswith("fl") or word.startswith("fluid"):
+        return "fl-oz"
+    if word in ("ltr",):
+        return "l"
+    if word in _PACK_WORDS:
+        return "pack"
+    if word in _COUNT_WORDS:
+        return word
+    return canonical_unit(word)
+
+
+@lru_cache(maxsize=8192)
+def parse_quantity(text: Optional[str]) -> Optional[Tuple[float, str]]:
+    """(total quantity, canonical unit) described by a package-size string, or None."""
+    if not text:
+        return None
+    measure: Optional[Tuple[float, str]] = None
+    count: Optional[float] = None
+    packs = 1.0
+    for estimate, first, operator, number, word in _QUANTITY_RE.findall(text):
+        quantity = _number(number)
+        if operator == "-" and _is_range(first, quantity, bool(estimate)):
+            quantity = (float(first) + quantity) / 2
+        elif first:
+            quantity *= float(first)
+        unit = _unit(word)
+        if unit in _COUNT_WORDS:
+            quantity, unit = quantity * _COUNT_WORDS[unit], "each"
+        if unit == "pack":
+            packs *= quantity or 1.0
+        elif UNIT_SIZES.get(unit, ("count",))[0] != "count":
+            if measure is None:
+                measure = (quantity, unit)
+        elif count is None and unit in UNIT_SIZES:
+            count = quantity
+    for pack_count in _PACK_OF_RE.findall(text):
+        packs *= float(pack_count) or 1.0
+    if measure is not None:
+        return (measure[0] * packs, measure[1]) if measure[0] > 0 else None
+    if count is not None:
+        return (count * packs, "each") if count > 0 else None
+    if packs > 1:
+        return (packs, "each")
+    bare = _BARE_UNIT_RE.match(text)
+    if bare:
+        unit = _unit(bare.group(1))
+        if unit in UNIT_SIZES:
+            return (1.0, unit if UNIT_SIZES[unit][0] != "count" else "each")
+    return None
+
+
+def unit_price(price: float, sizes: Iterable[Optional[str]], unit: Optional[str]) -> Tuple[float, Optional[str]]:
+    """Per-unit price for a pack priced at *price*, using the first parseable size string.
+
+    Falls back to (price, unit) when none of *sizes* describes a quantity.
+    """
+    for size in sizes:
+        parsed = parse_quantity(size)
+        if parsed is not None:
+            quantity, parsed_unit = parsed
+            return (price / quantity, parsed_unit)
+    return (price, unit)
@@ -11,6 +11,8 @@ from ..models.meal_plan import MealPlan, MealPlanRequest
 from ..core.config import settings
 from ..core.supabase import get_supabase_admin
 from .embeddings import get_embedding_service
+from .canonicalize import get_canonicalizer, normalize_ingredient_name
+from .meal_plan_view import save_snapshot
 from .pricing import get_price_per_unit
 
 client = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -20,6 +22,7 @@ class RAGMealPlanService:
     
     def __init__(self):
         self.embedding_service = get_embedding_service()
+        self.canonicalizer = get_canonicalizer()
         self.supabase = get_supabase_admin()
     
     def get_available_ingredients(self, store_place_ids: List[str]) -> List[Dict[str, Any]]:
@@ -87,10 +90,11 @@ class RAGMealPlanService:
                 continue
             
             try:
-                # First, try to find exact match
-                exact_match = self.supabase.table("ingredients").select("*").eq("name", ingredient_name.lower()).execute()
+                # First, try to find exact match (after canonicalizing the spelling)
+                canonical = self.canonicalizer.resolve(ingredient_name)
+                exact_match = self.supabase.table("ingredients").select("*").eq("id", canonical["id"]).execute() if canonical else None
                 
-                if exact_match.data:
+                if exact_match and exact_match.data:
                     # Exact match found
                     enhanced_ingredients.append({
                         **ingredient_dict,
@@ -440,10 +444,10 @@ Verify each day has 3 meals before returning."""
                         # Ensure ingredient exists (try embedding first, fallback to simple lookup)
                         ingredient_id = None
                         try:
-                            # First try existing ingredient lookup (faster)
-                            existing = self.supabase.table("ingredients").select("id").eq("name", ingredient_name.lower()).execute()
-                            if existing.data:
-                                ingredient_id = existing.data[0]["id"]
+                            # First try canonical/alias lookup (faster)
+                            existing = self.canonicalizer.resolve(ingredient_name)
+                            if existing:
+                                ingredient_id = existing["id"]
                             else:
                                 # Only generate embedding for new ingredients
                                 ingredient_id = self.embedding_service.embed_ingredient(ingredient_name)
@@ -452,7 +456,7 @@ Verify each day has 3 meals before returning."""
                             # Final fallback - create ingredient without embedding
                             try:
                                 result = self.supabase.table("ingredients").insert({
-                                    "name": ingredient_name.lower(),
+                                    "name": normalize_ingredient_name(ingredient_name),
                                     "category": "general",
                                     "unit": "unit",
                                     "price_per_unit": 0.0
@@ -491,6 +495,9 @@ Verify each day has 3 meals before returning."""
                             logging.debug(f"Meal plan store already exists: {plan_id}, {place_id}")
                         else:
                             logging.error(f"Error inserting meal plan store: {e}")
+
+            # Assembled plan for reads (GET /meal-plans/{plan_id})
+            save_snapshot(self.supabase, plan_id, plan, request.store_place_ids or [])
             
             return plan_id
             
@@ -0,0 +1,184 @@
+"""
+Staleness- and volatility-driven scheduling for the stores_prices refresh.
+
+Instead of re-fetching every store × ingredient on each run, every price row
+carries a small change history (refresh_count, change_count, unchanged_streak,
+last_changed_at). From it we derive how long a price can be trusted:
+
+- hot ingredients (used by recent recipes) start from a shorter interval,
+- volatile prices (changed on a large share of refreshes) never back off,
+- stable prices back off exponentially with each unchanged refresh.
+
+Keys no lookup has priced yet carry their last attempt and the number of
+misses in a row instead (price_refresh_misses, migration 32) and back off
+the same way, so an ingredient no store sells doesn't crowd out the rest.
+
+Rows are then ranked by how overdue they are and picked until the run's
+request budget is spent. Never-tried keys always come first.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+BASE_INTERVAL = timedelta(hours=24)
+HOT_INTERVAL = timedelta(hours=6)
+MAX_INTERVAL = timedelta(days=14)
+MAX_BACKOFF_STEPS = 6
+
+# A row is "volatile" when at least this share of its refreshes changed the price
+VOLATILE_CHANGE_RATIO = 0.3
+# Relative difference below which two prices are considered the same
+PRICE_CHANGE_TOLERANCE = 0.01
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse a Supabase timestamp (ISO string or datetime) into an aware datetime."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def volatility(row: Dict) -> float:
+    """Share of past refreshes that observed a price change (0 when unknown)."""
+    refreshes = row.get("refresh_count") or 0
+    if refreshes <= 0:
+        return 0.0
+    return min(1.0, (row.get("change_count") or 0) / refreshes)
+
+
+def refresh_interval(row: Dict, hot: bool = False) -> timedelta:
+    """How long the price in *row* can be served before it is due again."""
+    base = HOT_INTERVAL if hot else BASE_INTERVAL
+    if volatility(row) >= VOLATILE_CHANGE_RATIO:
+        return base
+    steps = min(row.get("unchanged_streak") or 0, MAX_BACKOFF_STEPS)
+    return min(base * (2 ** steps), MAX_INTERVAL)
+
+
+def retry_interval(row: Dict, hot: bool = False) -> timedelta:
+    """How long to wait before looking up a never-priced key again after its misses."""
+    base = HOT_INTERVAL if hot else BASE_INTERVAL
+    steps = min(row.get("miss_count") or 0, MAX_BACKOFF_STEPS)
+    return min(base * (2 ** steps), MAX_INTERVAL)
+
+
+def staleness(row: Optional[Dict], now: datetime, hot: bool = False) -> float:
+    """Age of the row as a multiple of its refresh interval; >= 1 means due.
+
+    Never-priced keys are aged from their last missed attempt; keys never
+    tried at all are infinitely stale.
+    """
+    if not row:
+        return float("inf")
+    last_seen = parse_timestamp(row.get("last_seen_at"))
+    if last_seen is not None:
+        return (now - last_seen) / refresh_interval(row, hot)
+    attempted = parse_timestamp(row.get("last_attempted_at"))
+    if attempted is None:
+        return float("inf")
+    return (now - attempted) / retry_interval(row, hot)
+
+
+def plan_refresh(
+    costs: Dict[Hashable, int],
+    rows: Dict[Hashable, Dict],
+    hot_keys: Set[Hashable],
+    budget: Optional[int],
+    now: Optional[datetime] = None,
+) -> List[Hashable]:
+    """Pick the keys to refresh this run.
+
+    Args:
+        costs: key -> number of outbound requests needed to refresh it
+        rows: key -> existing stores_prices row, or price_refresh_misses row
+            if never priced (missing if never tried)
+        hot_keys: keys whose ingredient is used by recent recipes
+        budget: maximum total requests for the run (None for unlimited)
+        now: reference time (defaults to the current UTC time)
+
+    Returns:
+        Due keys, most overdue first, whose total cost fits in the budget.
+    """
+    now = now or datetime.now(timezone.utc)
+    scored = []
+    for key in costs:
+        hot = key in hot_keys
+        score = staleness(rows.get(key), now, hot)
+        if score >= 1:
+            scored.append((score, hot, key))
+    # Most overdue first; hot rows win ties (e.g. two never-tried keys)
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
+    planned: List[Hashable] = []
+    spent = 0
+    for _, _, key in scored:
+        cost = costs[key]
+        if budget is not None and spent + cost > budget:
+            continue
+        planned.append(key)
+        spent += cost
+    return planned
+
+
+def price_changed(old_price: float, new_price: float) -> bool:
+    """Whether *new_price* differs from *old_price* by more than PRICE_CHANGE_TOLERANCE."""
+    return abs(new_price - old_price) > PRICE_CHANGE_TOLERANCE * max(abs(old_price), 0.01)
+
+
+def is_unchanged(previous: Optional[Dict], row: Dict) -> bool:
+    """Whether a fetched *row* matches the stored *previous* row (same unit, same price)."""
+    if not previous or previous.get("price_per_unit") is None:
+        return False
+    if previous.get("unit") != row["unit"]:
+        return False
+    return not price_changed(float(previous["price_per_unit"]), row["price_per_unit"])
+
+
+def record_observation(previous: Optional[Dict], price: float, now: datetime) -> Dict:
+    """Return the history columns for a freshly fetched *price*.
+
+    The result is meant to be merged into the upsert row for stores_prices.
+    """
+    now_iso = now.isoformat()
+    if not previous or previous.get("price_per_unit") is None:
+        return {
+            "last_seen_at": now_iso,
+            "last_changed_at": now_iso,
+            "refresh_count": 1,
+            "change_count": 0,
+            "unchanged_streak": 0,
+        }
+
+    changed = price_changed(float(previous["price_per_unit"]), price)
+    return {
+        "last_seen_at": now_iso,
+        "last_changed_at": now_iso if changed else previous.get("last_changed_at") or previous.get("last_seen_at"),
+        "refresh_count": (previous.get("refresh_count") or 0) + 1,
+        "change_count": (previous.get("change_count") or 0) + (1 if changed else 0),
+        "unchanged_streak": 0 if changed else (previous.get("unchanged_streak") or 0) + 1,
+    }
+
+
+def record_miss(previous: Optional[Dict], now: datetime) -> Dict:
+    """Return the price_refresh_misses columns for a lookup that found no price.
+
+    The result is meant to be merged into the upsert row for the key.
+    """
+    return {
+        "last_attempted_at": now.isoformat(),
+        "miss_count": ((previous or {}).get("miss_count") or 0) + 1,
+    }
+
+
+def hot_ingredient_names(recipe_ingredient_rows: Iterable[Dict]) -> Set[str]:
+    """Extract ingredient names from `recipe_ingredients` rows embedding `ingredients(name)`."""
+    names = set()
+    for row in recipe_ingredient_rows:
+        ingredient = row.get("ingredients") or {}
+        if ingredient.get("name"):
+            names.add(ingredient["name"])
+    return names
@@ -1,5 +1,4 @@
 import re
-import json
 from typing import Optional, Tuple, Dict, List
 import httpx
 import logging
@@ -7,6 +6,36 @@ import time
 from urllib.parse import quote
 
 from .price_sources import PriceSource
+from .http_clients import get_async_client
+from .html_extract import first_json_blob
+from .quantity import unit_price
+
+SAFEWAY_API_URL = "https://www.safeway.com/abs/pub/web/j4u/api/products/search"
+SAFEWAY_SEARCH_PAGE_URL = "https://www.safeway.com/shop/search-results.html"
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Referer": "https://www.safeway.com/",
+    "Origin": "https://www.safeway.com"
+}
+
+# Store context headers sent with search API calls
+_API_HEADERS = {
+    'X-Requested-With': 'XMLHttpRequest',
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+}
+
+_STATE_MARKER = "window.__INITIAL_STATE__"
+
+# Last-resort price patterns for search pages without embedded state
+_PRICE_PATTERNS = [
+    re.compile(r'\$(\d+\.?\d*)'),
+    re.compile(r'price["\']:\s*["\']?\$?(\d+\.?\d*)'),
+    re.compile(r'regularPrice["\']:\s*(\d+\.?\d*)'),
+]
 
 class SafewayPriceSource(PriceSource):
     """Scrapes Safeway/Albertsons family stores for price information using their API."""
@@ -21,19 +50,40 @@ class SafewayPriceSource(PriceSource):
     def _get_session(self) -> httpx.Client:
         """Get or create HTTP session with appropriate headers."""
         if self._session is None:
-            self._session = httpx.Client(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "application/json, text/plain, */*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Referer": "https://www.safeway.com/",
-                    "Origin": "https://www.safeway.com"
-                },
-                timeout=20
-            )
+            self._session = httpx.Client(headers=_HEADERS, timeout=20)
         return self._session
 
+    @staticmethod
+    def _api_params(store_external_id: str, ingredient_name: str) -> Dict[str, str]:
+        return {
+            'storeId': store_external_id,
+            'query': quote(ingredient_name),
+            'rows': '10',
+            'start': '0',
+            'url': '/shop/search-results.html'
+        }
+
+    @staticmethod
+    def _search_page_url(ingredient_name: str) -> str:
+        search_term = ingredient_name.replace(' ', '+')
+        return f"{SAFEWAY_SEARCH_PAGE_URL}?q={search_term}"
+
+    def _parse_api_response(self, data: Dict, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        """Pick the best matching product from a search API payload."""
+        # Extract product information
+        products = self._extract_products_from_api(data)
+        
+        if products:
+            # Find best matching product
+            best_match = self._find_best_match(products, ingredient_name)
+            if best_match:
+                price = self._extract_price_from_product(best_match)
+                if price:
+                    # Price per unit of the package size when one is given
+                    return unit_price(float(price), self._package_sizes(best_match), unit)
+        
+        return (None, unit)
+
     def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
         """
         Fetch price from Safeway using their search API.
@@ -42,49 +92,41 @@ class SafewayPriceSource(PriceSource):
         try:
             session = self._get_session()
             
-            # Use Safeway's product search API
-            search_term = quote(ingredient_name)
-            
-            # Safeway uses an internal API for product search
-            api_url = "https://www.safeway.com/abs/pub/web/j4u/api/products/search"
-            
-            params = {
-                'storeId': store_external_id,
-                'query': search_term,
-                'rows': '10',
-                'start': '0',
-                'url': '/shop/search-results.html'
-            }
-            
-            # Add store context headers
-            session.headers.update({
-                'X-Requested-With': 'XMLHttpRequest',
-                'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            })
-            
-            response = session.get(api_url, params=params)
+            response = session.get(
+                SAFEWAY_API_URL,
+                params=self._api_params(store_external_id, ingredient_name),
+                headers=_API_HEADERS,
+            )
             
             if response.status_code != 200:
                 # Try alternative search endpoint
                 return self._try_alternative_search(session, store_external_id, ingredient_name, unit)
                 
-            data = response.json()
-            
-            # Extract product information
-            products = self._extract_products_from_api(data)
-            
-            if products:
-                # Find best matching product
-                best_match = self._find_best_match(products, ingredient_name)
-                if best_match:
-                    price = self._extract_price_from_product(best_match)
-                    if price:
-                        # Try to extract unit information
-                        detected_unit = self._extract_unit_from_product(best_match) or unit
-                        return (float(price), detected_unit)
+            return self._parse_api_response(response.json(), ingredient_name, unit)
             
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Safeway API price lookup failed for {ingredient_name}: {e}")
             return (None, unit)
-            
+
+    async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        """Native async lookup over the pooled www.safeway.com client."""
+        try:
+            client = get_async_client(SAFEWAY_API_URL)
+
+            response = await client.get(
+                SAFEWAY_API_URL,
+                params=self._api_params(store_external_id, ingredient_name),
+                headers={**_HEADERS, **_API_HEADERS},
+            )
+
+            if response.status_code != 200:
+                page = await client.get(self._search_page_url(ingredient_name), headers=_HEADERS)
+                if page.status_code != 200:
+                    return (None, unit)
+                return self._parse_search_page(page.text, ingredient_name, unit)
+
+            return self._parse_api_response(response.json(), ingredient_name, unit)
+
         except Exception as e:
             logging.getLogger(__name__).warning(f"Safeway API price lookup failed for {ingredient_name}: {e}")
             return (None, unit)
@@ -92,52 +134,39 @@ class SafewayPriceSource(PriceSource):
     def _try_alternative_search(self, session: httpx.Client, store_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
         """Try alternative search method using the main search page."""
         try:
-            search_term = ingredient_name.replace(' ', '+')
-            url = f"https://www.safeway.com/shop/search-results.html?q={search_term}"
-            
-            response = session.get(url)
+            response = session.get(self._search_page_url(ingredient_name))
             if response.status_code != 200:
                 return (None, unit)
             
-            # Look for JSON product data in the HTML
-            html_content = response.text
-            
-            # Search for product data in script tags
-            json_pattern = r'window\.__INITIAL_STATE__\s*=\s*({.*?});'
-            match = re.search(json_pattern, html_content, re.DOTALL)
-            
-            if match:
-                try:
-                    data = json.loads(match.group(1))
-                    products = self._extract_products_from_html_json(data)
-                    
-                    if products:
-                        best_match = self._find_best_match(products, ingredient_name)
-                        if best_match:
-                            price = self._extract_price_from_product(best_match)
-                            if price:
-                                return (float(price), unit)
-                except json.JSONDecodeError:
-                    pass
-            
-            # Fallback: look for price patterns in HTML
-            price_patterns = [
-                r'\$(\d+\.?\d*)',
-                r'price["\']:\s*["\']?\$?(\d+\.?\d*)',
-                r'regularPrice["\']:\s*(\d+\.?\d*)'
-            ]
-            
-            for pattern in price_patterns:
-                prices = re.findall(pattern, html_content)
-                if prices:
-                    return (float(prices[0]), unit)
-            
-            return (None, unit)
+            return self._parse_search_page(response.text, ingredient_name, unit)
             
         except Exception as e:
             logging.getLogger(__name__).warning(f"Safeway alternative search failed for {ingredient_name}: {e}")
             return (None, unit)
 
+    def _parse_search_page(self, html_content: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        """Extract a price from the HTML search results page."""
+        # Search for product data in script tags
+        data = first_json_blob(html_content, [_STATE_MARKER])
+        
+        if isinstance(data, dict):
+            products = self._extract_products_from_html_json(data)
+            
+            if products:
+                best_match = self._find_best_match(products, ingredient_name)
+                if best_match:
+                    price = self._extract_price_from_product(best_match)
+                    if price:
+                        return (float(price), unit)
+        
+        # Fallback: look for price patterns in HTML
+        for pattern in _PRICE_PATTERNS:
+            m = pattern.search(html_content)
+            if m:
+                return (float(m.group(1)), unit)
+        
+        return (None, unit)
+
     def _extract_products_from_api(self, data: Dict) -> List[Dict]:
         """Extract products from Safeway API response."""
         try:
@@ -213,34 +242,12 @@ class SafewayPriceSource(PriceSource):
         except:
             return None
 
-    def _extract_unit_from_product(self, product: Dict) -> Optional[str]:
-        """Extract unit information from product data."""
-        try:
-            # Look for unit information in various fields
-            unit_fields = ['unit', 'uom', 'unitOfMeasure', 'size', 'packageSize']
-            
-            for field in unit_fields:
-                unit_info = product.get(field)
-                if unit_info:
-                    return str(unit_info).lower()
-                    
-            # Try to extract from product name or description
-            name_or_desc = f"{product.get('name', '')} {product.get('description', '')}"
-            
-            # Look for common unit patterns
-            unit_patterns = [
-                r'(\d+)\s*(oz|lb|lbs|g|kg|ml|l|ct|count|each)',
-                r'(\d+)\s*(fl\s*oz|fluid\s*ounce)',
-            ]
-            
-            for pattern in unit_patterns:
-                match = re.search(pattern, name_or_desc, re.IGNORECASE)
-                if match:
-                    return match.group(2).lower()
-                    
-            return None
-        except:
-            return None
+    @staticmethod
+    def _package_sizes(product: Dict) -> List[str]:
+        """Size/unit fields of a product, most specific first, then its name and description."""
+        sizes = [str(product[f]) for f in ('packageSize', 'size', 'unitOfMeasure', 'uom', 'unit') if product.get(f)]
+        sizes.append(f"{product.get('name', '')} {product.get('description', '')}")
+        return sizes
 
     def lookup_store_id(self, latitude: float, longitude: float, radius_miles: int = 10) -> Optional[str]:
         """
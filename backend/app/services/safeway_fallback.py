@@ -1,76 +1,142 @@
-from typing import Optional, Tuple, Dict
+import json
 import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
 from .price_sources import PriceSource
 
+# Item, category and default estimates; SAFEWAY_ESTIMATES_FILE points at a replacement
+ESTIMATES_FILE = Path(__file__).resolve().parent / "data" / "safeway_price_estimates.json"
+
+# Substring length of the index used to find items whose name contains the ingredient's
+GRAM = 3
+
+
+class EstimateIndex:
+    """Estimate table compiled for fast fuzzy lookups.
+
+    Item names are split into an inverted index of word -> items, so the
+    word-overlap (Jaccard) score is only computed for items that share a word
+    with the ingredient. Containment ("tomato" / "tomatoes") is found without
+    a scan too: items inside the ingredient's name by looking up its
+    substrings of each item-name length, items around it through an index of
+    their short substrings. Results are memoized per normalized ingredient
+    name, so a refresh pays for matching once per ingredient rather than once
+    per ingredient per store.
+    """
+
+    def __init__(self, items: Dict[str, float], categories: List[Dict], default_price: float, min_similarity: float):
+        self.items = {name.lower().strip(): float(price) for name, price in items.items()}
+        self.default_price = float(default_price)
+        self.min_similarity = min_similarity
+        self._keys = list(self.items)
+        self._sizes = [len(set(key.split())) for key in self._keys]
+        self._positions = {key: position for position, key in enumerate(self._keys)}
+        self._key_lengths = sorted({len(key) for key in self._keys})
+        self._postings: Dict[str, List[int]] = {}
+        self._grams: Dict[str, List[int]] = {}
+        for position, key in enumerate(self._keys):
+            for word in set(key.split()):
+                self._postings.setdefault(word, []).append(position)
+            # Every substring up to GRAM long, so shorter names can be looked up whole
+            grams = {key[i:i + n] for n in range(1, GRAM + 1) for i in range(len(key) - n + 1)}
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(position)
+        self._categories = [(c["name"], float(c["price"]), tuple(c["keywords"])) for c in categories]
+        self._memo: Dict[str, Tuple[float, str, Optional[str]]] = {}
+
+    @classmethod
+    def from_file(cls, path: Path) -> "EstimateIndex":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["items"], data.get("categories", []), data.get("default_price", 2.99), data.get("min_similarity", 0.3))
+
+    def match(self, ingredient_name: str) -> Tuple[float, str, Optional[str]]:
+        """(price, how it was matched: exact/similar/category/default, matched item or category)."""
+        name = ingredient_name.lower().strip()
+        result = self._memo.get(name)
+        if result is None:
+            result = self._memo[name] = self._match(name)
+            if result[1] != "exact":
+                logging.getLogger(__name__).debug(f"Safeway fallback: {result[1]} pricing for '{name}' ({result[2]}, ${result[0]})")
+        return result
+
+    def _containing(self, name: str) -> List[int]:
+        """Positions of items whose name contains *name*."""
+        if not name:
+            return list(range(len(self._keys)))
+        if len(name) <= GRAM:
+            return self._grams.get(name, [])
+        postings = [self._grams.get(name[i:i + GRAM], []) for i in range(len(name) - GRAM + 1)]
+        return [position for position in min(postings, key=len) if name in self._keys[position]]
+
+    def _contained(self, name: str) -> List[int]:
+        """Positions of items whose name is a substring of *name*."""
+        found = []
+        for length in self._key_lengths:
+            for i in range(len(name) - length + 1):
+                position = self._positions.get(name[i:i + length])
+                if position is not None:
+                    found.append(position)
+        return found
+
+    def _match(self, name: str) -> Tuple[float, str, Optional[str]]:
+        if name in self.items:
+            return (self.items[name], "exact", name)
+
+        words = set(name.split())
+        shared: Dict[int, int] = {}
+        for word in words:
+            for position in self._postings.get(word, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        # Word overlap scores |shared| / |union|; items sharing no word score
+        # 0.5 when one name contains the other ("tomatoes" / "tomato"). Ties
+        # go to the item listed first.
+        related = set(self._containing(name)) | set(self._contained(name))
+        best, best_score = None, self.min_similarity
+        for position in sorted(related.union(shared)):
+            common = shared.get(position)
+            if common:
+                score = common / (len(words) + self._sizes[position] - common)
+            else:
+                score = 0.5
+            if score > best_score:
+                best, best_score = self._keys[position], score
+        if best is not None:
+            return (self.items[best], "similar", best)
+
+        for category, price, keywords in self._categories:
+            if any(keyword in name for keyword in keywords):
+                return (price, "category", category)
+        return (self.default_price, "default", None)
+
+
+_INDEXES: Dict[str, EstimateIndex] = {}
+
+
+def load_estimates(path: Optional[Path] = None) -> EstimateIndex:
+    """Compiled estimates for *path* (default: SAFEWAY_ESTIMATES_FILE or the bundled file), built once per process."""
+    path = Path(path or os.getenv("SAFEWAY_ESTIMATES_FILE") or ESTIMATES_FILE)
+    index = _INDEXES.get(str(path))
+    if index is None:
+        index = _INDEXES[str(path)] = EstimateIndex.from_file(path)
+    return index
+
+
 class SafewayFallbackPriceSource(PriceSource):
     """
     Fallback Safeway pricing using category-based estimates.
     Uses realistic grocery price estimates based on typical Safeway pricing.
     """
 
-    def __init__(self):
-        # Category-based price estimates (per unit) based on typical Safeway prices
-        self.price_estimates = {
-            # Produce (per lb unless specified)
-            'apple': 1.99,
-            'banana': 0.79,
-            'orange': 1.49,
-            'onion': 1.29,
-            'potato': 1.49,
-            'tomato': 2.99,
-            'cucumber': 1.49,
-            'carrot': 1.29,
-            'bell pepper': 1.99,
-            'lettuce': 2.49,
-            'spinach': 3.49,
-            'broccoli': 2.49,
-            'garlic': 4.99,  # per lb
-            
-            # Dairy (per unit/container)
-            'milk': 3.99,  # per gallon
-            'almond milk': 4.49,  # per half-gallon
-            'yogurt': 1.29,  # per container
-            'cheese': 4.99,  # per package
-            'butter': 4.99,  # per package
-            'cream cheese': 2.49,
-            
-            # Proteins (per lb)
-            'chicken breast': 5.99,
-            'ground beef': 4.99,
-            'salmon': 9.99,
-            'eggs': 3.49,  # per dozen
-            'tofu': 3.99,  # per package
-            
-            # Pantry/Dry Goods
-            'rice': 2.99,  # per bag
-            'pasta': 1.49,  # per box
-            'bread': 2.99,  # per loaf
-            'oats': 3.99,  # per container
-            'flour': 3.49,  # per bag
-            'sugar': 3.99,  # per bag
-            'olive oil': 7.99,  # per bottle
-            'vinegar': 2.99,  # per bottle
-            'soy sauce': 3.49,  # per bottle
-            
-            # Canned/Jarred
-            'canned tomatoes': 1.49,
-            'beans': 1.29,  # per can
-            'tuna': 1.99,  # per can
-            'peanut butter': 4.99,  # per jar
-            
-            # Frozen
-            'frozen vegetables': 2.49,  # per bag
-            'frozen fruit': 3.99,  # per bag
-            
-            # Herbs/Spices (per package)
-            'basil': 2.49,
-            'parsley': 1.99,
-            'cilantro': 1.99,
-            'oregano': 1.99,
-            'thyme': 2.49,
-            'rosemary': 2.49,
-        }
-        
+    def __init__(self, estimates_path: Optional[Path] = None):
+        # Category-based price estimates (per unit) based on typical Safeway
+        # prices, shared by every instance using the same file
+        self.estimates = load_estimates(estimates_path)
+        self.price_estimates = self.estimates.items
+
         # Unit conversion factors for price adjustment
         self.unit_conversions = {
             ('lb', 'oz'): 16,
@@ -93,93 +159,11 @@ class SafewayFallbackPriceSource(PriceSource):
         Return estimated price based on ingredient category and realistic Safeway pricing.
         """
         try:
-            ingredient_lower = ingredient_name.lower().strip()
-            
-            # Direct match
-            if ingredient_lower in self.price_estimates:
-                base_price = self.price_estimates[ingredient_lower]
-                return (base_price, unit)
-            
-            # Partial match - find best matching ingredient
-            best_match = None
-            best_score = 0
-            
-            for key in self.price_estimates.keys():
-                score = self._calculate_similarity(ingredient_lower, key)
-                if score > best_score and score > 0.3:  # Minimum similarity threshold
-                    best_score = score
-                    best_match = key
-            
-            if best_match:
-                base_price = self.price_estimates[best_match]
-                logging.getLogger(__name__).info(f"Safeway fallback: matched '{ingredient_name}' to '{best_match}' (${base_price})")
-                return (base_price, unit)
-            
-            # Category-based fallback
-            category_price = self._get_category_price(ingredient_lower)
-            if category_price:
-                logging.getLogger(__name__).info(f"Safeway fallback: category pricing for '{ingredient_name}' (${category_price})")
-                return (category_price, unit)
-            
-            # Default fallback
-            default_price = 2.99
-            logging.getLogger(__name__).info(f"Safeway fallback: default pricing for '{ingredient_name}' (${default_price})")
-            return (default_price, unit)
-            
+            price, _, _ = self.estimates.match(ingredient_name)
         except Exception as e:
             logging.getLogger(__name__).warning(f"Safeway fallback pricing failed for {ingredient_name}: {e}")
             return (2.99, unit)  # Safe default
-    
-    def _calculate_similarity(self, ingredient: str, key: str) -> float:
-        """Calculate similarity score between ingredient and known item."""
-        ingredient_words = set(ingredient.split())
-        key_words = set(key.split())
-        
-        # Exact match
-        if ingredient == key:
-            return 1.0
-        
-        # Word overlap
-        if ingredient_words & key_words:
-            overlap = len(ingredient_words & key_words)
-            total = len(ingredient_words | key_words)
-            return overlap / total
-        
-        # Substring match
-        if ingredient in key or key in ingredient:
-            return 0.5
-        
-        return 0.0
-    
-    def _get_category_price(self, ingredient: str) -> Optional[float]:
-        """Get price based on ingredient category."""
-        
-        # Produce keywords
-        produce_keywords = ['fresh', 'organic', 'vegetable', 'fruit']
-        if any(keyword in ingredient for keyword in produce_keywords):
-            return 2.49  # Average produce price
-        
-        # Meat keywords  
-        meat_keywords = ['chicken', 'beef', 'pork', 'turkey', 'meat', 'fish']
-        if any(keyword in ingredient for keyword in meat_keywords):
-            return 6.99  # Average meat price per lb
-        
-        # Dairy keywords
-        dairy_keywords = ['milk', 'cheese', 'yogurt', 'cream', 'dairy']
-        if any(keyword in ingredient for keyword in dairy_keywords):
-            return 3.99  # Average dairy price
-        
-        # Pantry keywords
-        pantry_keywords = ['flour', 'sugar', 'rice', 'pasta', 'oil', 'spice', 'sauce']
-        if any(keyword in ingredient for keyword in pantry_keywords):
-            return 3.49  # Average pantry item price
-        
-        # Canned keywords
-        canned_keywords = ['canned', 'jarred', 'jar', 'can']
-        if any(keyword in ingredient for keyword in canned_keywords):
-            return 1.99  # Average canned goods price
-        
-        return None
+        return (price, unit)
 
     def lookup_store_id(self, latitude: float, longitude: float, radius_miles: int = 10) -> Optional[str]:
         """Return default store ID for fallback pricing."""
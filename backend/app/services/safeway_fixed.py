@@ -1,5 +1,5 @@
 import re
-import json
+import asyncio
 from typing import Optional, Tuple, Dict, List
 import httpx
 import logging
@@ -8,6 +8,41 @@ from urllib.parse import quote
 from bs4 import BeautifulSoup
 
 from .price_sources import PriceSource
+from .http_clients import get_async_client
+from .html_extract import iter_json_blobs, iter_json_ld, run_cpu_bound
+
+SAFEWAY_SEARCH_PAGE_URL = "https://www.safeway.com/shop/search-results.html"
+
+REQUEST_DELAY_SECONDS = 1
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    # No "Connection: keep-alive": connections are pooled anyway, and the
+    # header is illegal over HTTP/2.
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Script globals that carry product data on search pages
+_JS_STATE_MARKERS = [
+    "window.__INITIAL_STATE__",
+    "window.__PRODUCT_DATA__",
+    "var productData",
+    "window.productInfo",
+]
+
+# Last-resort price patterns, tried in order
+_PRICE_PATTERNS = [
+    re.compile(r'\$(\d+\.?\d*)'),
+    re.compile(r'price["\']:\s*["\']?\$?(\d+\.?\d*)'),
+    re.compile(r'regularPrice["\']:\s*(\d+\.?\d*)'),
+    re.compile(r'currentPrice["\']:\s*(\d+\.?\d*)'),
+    re.compile(r'"price":\s*(\d+\.?\d*)'),
+    re.compile(r'data-price="(\d+\.?\d*)"'),
+]
 
 class SafewayFixedPriceSource(PriceSource):
     """Fixed Safeway scraper using public search pages instead of protected APIs."""
@@ -22,21 +57,14 @@ class SafewayFixedPriceSource(PriceSource):
     def _get_session(self) -> httpx.Client:
         """Get or create HTTP session with realistic browser headers."""
         if self._session is None:
-            self._session = httpx.Client(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                },
-                timeout=30,
-                follow_redirects=True
-            )
+            self._session = httpx.Client(headers=_HEADERS, timeout=30, follow_redirects=True)
         return self._session
 
+    @staticmethod
+    def _search_url(ingredient_name: str) -> str:
+        # Use public search page
+        return f"{SAFEWAY_SEARCH_PAGE_URL}?q={quote(ingredient_name)}"
+
     def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
         """
         Fetch price from Safeway using their public search page.
@@ -44,23 +72,17 @@ class SafewayFixedPriceSource(PriceSource):
         try:
             session = self._get_session()
             
-            # Use public search page
-            search_term = quote(ingredient_name)
-            search_url = f"https://www.safeway.com/shop/search-results.html?q={search_term}"
-            
             # Add delay to be respectful
-            time.sleep(1)
+            time.sleep(REQUEST_DELAY_SECONDS)
             
-            response = session.get(search_url)
+            response = session.get(self._search_url(ingredient_name))
             
             if response.status_code != 200:
                 logging.getLogger(__name__).warning(f"Safeway search page returned {response.status_code}")
                 return (None, unit)
             
-            html_content = response.text
-            
             # Try multiple extraction methods
-            price = self._extract_price_from_html(html_content, ingredient_name)
+            price = self._extract_price_from_html(response.text, ingredient_name)
             
             if price:
                 return (float(price), unit)
@@ -104,12 +126,8 @@ class SafewayFixedPriceSource(PriceSource):
         """Extract price from JSON-LD structured data."""
         try:
             # Look for JSON-LD product data
-            json_ld_pattern = r'<script type="application/ld\+json">(.*?)</script>'
-            matches = re.findall(json_ld_pattern, html_content, re.DOTALL)
-            
-            for match in matches:
+            for data in iter_json_ld(html_content):
                 try:
-                    data = json.loads(match)
                     if isinstance(data, dict) and data.get('@type') == 'Product':
                         offers = data.get('offers', {})
                         if isinstance(offers, dict) and 'price' in offers:
@@ -124,24 +142,11 @@ class SafewayFixedPriceSource(PriceSource):
     def _extract_from_js_data(self, html_content: str) -> Optional[float]:
         """Extract price from JavaScript data objects."""
         try:
-            # Look for common JS data patterns
-            js_patterns = [
-                r'window\.__INITIAL_STATE__\s*=\s*({.*?});',
-                r'window\.__PRODUCT_DATA__\s*=\s*({.*?});',
-                r'var\s+productData\s*=\s*({.*?});',
-                r'window\.productInfo\s*=\s*({.*?});'
-            ]
-            
-            for pattern in js_patterns:
-                matches = re.findall(pattern, html_content, re.DOTALL)
-                for match in matches:
-                    try:
-                        data = json.loads(match)
-                        price = self._find_price_in_data(data)
-                        if price:
-                            return price
-                    except:
-                        continue
+            # Look for common JS data objects
+            for data in iter_json_blobs(html_content, _JS_STATE_MARKERS):
+                price = self._find_price_in_data(data)
+                if price:
+                    return price
                         
             return None
         except:
@@ -187,22 +192,12 @@ class SafewayFixedPriceSource(PriceSource):
     def _extract_with_regex(self, html_content: str) -> Optional[float]:
         """Extract price using regex patterns as fallback."""
         try:
-            # Price regex patterns
-            price_patterns = [
-                r'\$(\d+\.?\d*)',
-                r'price["\']:\s*["\']?\$?(\d+\.?\d*)',
-                r'regularPrice["\']:\s*(\d+\.?\d*)',
-                r'currentPrice["\']:\s*(\d+\.?\d*)',
-                r'"price":\s*(\d+\.?\d*)',
-                r'data-price="(\d+\.?\d*)"'
-            ]
-            
-            for pattern in price_patterns:
-                matches = re.findall(pattern, html_content)
-                if matches:
+            for pattern in _PRICE_PATTERNS:
+                match = pattern.search(html_content)
+                if match:
                     try:
                         # Return first valid price found
-                        price = float(matches[0])
+                        price = float(match.group(1))
                         if 0.01 <= price <= 50.0:  # Reasonable price range
                             return price
                     except:
@@ -271,5 +266,33 @@ class SafewayFixedPriceSource(PriceSource):
         return "3132"  # Bay Area default store
 
     async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
-        """Async version of fetch_price for compatibility with scraping framework."""
-        return self.fetch_price(store_external_id, ingredient_name, unit)
\ No newline at end of file
+        """Native async lookup over the pooled www.safeway.com client.
+
+        HTML parsing is CPU-bound, so it runs in a worker thread (or the
+        HTML_PARSE_PROCESSES pool) to keep the event loop free for other requests.
+        """
+        try:
+            client = get_async_client(SAFEWAY_SEARCH_PAGE_URL)
+
+            # Add delay to be respectful
+            await asyncio.sleep(REQUEST_DELAY_SECONDS)
+
+            response = await client.get(self._search_url(ingredient_name), headers=_HEADERS, follow_redirects=True)
+
+            if response.status_code != 200:
+                logging.getLogger(__name__).warning(f"Safeway search page returned {response.status_code}")
+                return (None, unit)
+
+            price = await run_cpu_bound(_extract_price, response.text, ingredient_name)
+            if price:
+                return (float(price), unit)
+            return (None, unit)
+
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Safeway fixed price lookup failed for {ingredient_name}: {e}")
+            return (None, unit)
+
+
+def _extract_price(html_content: str, ingredient_name: str) -> Optional[float]:
+    """Module-level entry point so page parsing can run in a process pool."""
+    return SafewayFixedPriceSource()._extract_price_from_html(html_content, ingredient_name)
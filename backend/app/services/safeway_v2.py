@@ -7,6 +7,23 @@ import time
 from urllib.parse import quote
 
 from .price_sources import PriceSource
+from .http_clients import get_async_client
+from .quantity import unit_price
+
+# Modern search endpoint discovered from the website
+SAFEWAY_SEARCH_API_URL = "https://www.safeway.com/abs/pub/xapi/search/products"
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Referer": "https://www.safeway.com/",
+    "Origin": "https://www.safeway.com",
+    "X-Requested-With": "XMLHttpRequest",
+    # Required subscription key from their public website
+    "ocp-apim-subscription-key": "7bad9afbb87043b28519c4443106db06"
+}
 
 class SafewayPriceSourceV2(PriceSource):
     """Modern Safeway scraper using updated API endpoints discovered from their current website."""
@@ -22,69 +39,53 @@ class SafewayPriceSourceV2(PriceSource):
     def _get_session(self) -> httpx.Client:
         """Get or create HTTP session with appropriate headers for modern Safeway API."""
         if self._session is None:
-            self._session = httpx.Client(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "application/json, text/plain, */*",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Referer": "https://www.safeway.com/",
-                    "Origin": "https://www.safeway.com",
-                    "X-Requested-With": "XMLHttpRequest",
-                    # Required subscription key from their public website
-                    "ocp-apim-subscription-key": "7bad9afbb87043b28519c4443106db06"
-                },
-                timeout=20
-            )
+            self._session = httpx.Client(headers=_HEADERS, timeout=20)
         return self._session
 
+    @staticmethod
+    def _search_params(store_external_id: str, ingredient_name: str) -> Dict[str, str]:
+        return {
+            'storeId': store_external_id,
+            'q': quote(ingredient_name),
+            'rows': '10',
+            'start': '0',
+            'sort': 'relevance'
+        }
+
+    def _parse_search_response(self, response: httpx.Response, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
+        """Turn a search API response into (price, unit)."""
+        if response.status_code != 200:
+            logging.getLogger(__name__).warning(f"Safeway search API returned {response.status_code}")
+            return (None, unit)
+        
+        try:
+            data = response.json()
+        except json.JSONDecodeError:
+            logging.getLogger(__name__).warning("Failed to parse Safeway API JSON response")
+            return (None, unit)
+        
+        # Extract products from modern API response
+        products = self._extract_products_from_search_api(data)
+        
+        if products:
+            # Find best matching product
+            best_match = self._find_best_match(products, ingredient_name)
+            if best_match:
+                price = self._extract_price_from_modern_product(best_match)
+                if price:
+                    # Price per unit of the package size when one is given
+                    return unit_price(float(price), self._package_sizes(best_match), unit)
+        
+        return (None, unit)
+
     def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
         """
         Fetch price from Safeway using their modern search API.
         """
         try:
             session = self._get_session()
-            
-            # Use modern product search API discovered from website
-            search_term = quote(ingredient_name)
-            
-            # Modern search endpoint
-            search_url = "https://www.safeway.com/abs/pub/xapi/search/products"
-            
-            params = {
-                'storeId': store_external_id,
-                'q': search_term,
-                'rows': '10',
-                'start': '0',
-                'sort': 'relevance'
-            }
-            
-            response = session.get(search_url, params=params)
-            
-            if response.status_code != 200:
-                logging.getLogger(__name__).warning(f"Safeway search API returned {response.status_code}")
-                return (None, unit)
-            
-            try:
-                data = response.json()
-            except json.JSONDecodeError:
-                logging.getLogger(__name__).warning("Failed to parse Safeway API JSON response")
-                return (None, unit)
-            
-            # Extract products from modern API response
-            products = self._extract_products_from_search_api(data)
-            
-            if products:
-                # Find best matching product
-                best_match = self._find_best_match(products, ingredient_name)
-                if best_match:
-                    price = self._extract_price_from_modern_product(best_match)
-                    if price:
-                        # Extract unit information
-                        detected_unit = self._extract_unit_from_modern_product(best_match) or unit
-                        return (float(price), detected_unit)
-            
-            return (None, unit)
+            response = session.get(SAFEWAY_SEARCH_API_URL, params=self._search_params(store_external_id, ingredient_name))
+            return self._parse_search_response(response, ingredient_name, unit)
             
         except Exception as e:
             logging.getLogger(__name__).warning(f"Safeway V2 price lookup failed for {ingredient_name}: {e}")
@@ -188,44 +189,18 @@ class SafewayPriceSourceV2(PriceSource):
         except:
             return None
 
-    def _extract_unit_from_modern_product(self, product: Dict) -> Optional[str]:
-        """Extract unit information from modern product data."""
-        try:
-            # Look for unit information in various fields
-            unit_fields = ['unit', 'uom', 'unitOfMeasure', 'size', 'packageSize', 'sellUnit']
-            
-            for field in unit_fields:
-                unit_info = product.get(field)
-                if unit_info:
-                    return str(unit_info).lower()
-            
-            # Try nested unit info
-            if 'unitInfo' in product:
-                unit_info = product['unitInfo']
-                if isinstance(unit_info, dict):
-                    for field in ['unit', 'uom', 'type']:
-                        if field in unit_info:
-                            return str(unit_info[field]).lower()
-                elif isinstance(unit_info, str):
-                    return unit_info.lower()
-                    
-            # Try to extract from product name or description
-            name_or_desc = f"{product.get('name', '')} {product.get('description', '')}"
-            
-            # Look for common unit patterns
-            unit_patterns = [
-                r'(\d+)\s*(oz|lb|lbs|g|kg|ml|l|ct|count|each)',
-                r'(\d+)\s*(fl\s*oz|fluid\s*ounce)',
-            ]
-            
-            for pattern in unit_patterns:
-                match = re.search(pattern, name_or_desc, re.IGNORECASE)
-                if match:
-                    return match.group(2).lower()
-                    
-            return None
-        except:
-            return None
+    @staticmethod
+    def _package_sizes(product: Dict) -> List[str]:
+        """Size/unit fields of a product, most specific first, then its name and description."""
+        fields = ('packageSize', 'size', 'unitOfMeasure', 'uom', 'sellUnit', 'unit')
+        sizes = [str(product[f]) for f in fields if product.get(f)]
+        unit_info = product.get('unitInfo')
+        if isinstance(unit_info, dict):
+            sizes += [str(unit_info[f]) for f in ('unit', 'uom', 'type') if unit_info.get(f)]
+        elif isinstance(unit_info, str):
+            sizes.append(unit_info)
+        sizes.append(f"{product.get('name', '')} {product.get('description', '')}")
+        return sizes
 
     def lookup_store_id(self, latitude: float, longitude: float, radius_miles: int = 10) -> Optional[str]:
         """
@@ -271,5 +246,15 @@ class SafewayPriceSourceV2(PriceSource):
             return None
 
     async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str) -> Tuple[Optional[float], str]:
-        """Async version of fetch_price for compatibility with scraping framework."""
-        return self.fetch_price(store_external_id, ingredient_name, unit)
\ No newline at end of file
+        """Native async lookup over the pooled www.safeway.com client."""
+        try:
+            client = get_async_client(SAFEWAY_SEARCH_API_URL)
+            response = await client.get(
+                SAFEWAY_SEARCH_API_URL,
+                params=self._search_params(store_external_id, ingredient_name),
+                headers=_HEADERS,
+            )
+            return self._parse_search_response(response, ingredient_name, unit)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Safeway V2 price lookup failed for {ingredient_name}: {e}")
+            return (None, unit)
@@ -0,0 +1,271 @@
+"""
+Per-source rate limiting, adaptive concurrency and circuit breaking.
+
+Each price source gets its own SourceGuard so one misbehaving retailer can't
+drag down the whole refresh:
+
+- a token bucket caps the request rate (and pauses on Retry-After, up to
+  MAX_RETRY_AFTER_S; longer outages are the circuit breaker's job),
+- an AIMD limiter grows concurrency by ~1 per window of successes and halves
+  it on throttling or failures,
+- a circuit breaker opens after consecutive failures, skips the source's
+  lookups while open, and lets a few half-open probes through after a
+  cool-down to decide whether to close again.
+
+Outcomes are classified from the HTTP responses a lookup received (see
+http_clients.capture_responses), since sources themselves return
+``(None, unit)`` for both "not found" and "failed".
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .http_clients import capture_responses
+
+THROTTLE_STATUSES = {429, 503}
+
+# requests/second and burst per source; anything unlisted uses DEFAULT_RATE_LIMIT
+SOURCE_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "kroger_api": (10.0, 20),
+    "walmart_web": (4.0, 8),
+    "safeway_web": (4.0, 8),
+    "safeway_web_v2": (4.0, 8),
+    "safeway_web_fixed": (1.0, 2),
+    "safeway_fallback": (1000.0, 1000),  # local estimates, no HTTP
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+DEFAULT_THROTTLE_PAUSE = 2.0
+# Longest Retry-After honoured; a source asking for more is left to the breaker
+MAX_RETRY_AFTER_S = float(os.getenv("MAX_RETRY_AFTER_S", "300"))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Withhold tokens for `seconds` (e.g. after a Retry-After)."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase / multiplicative decrease."""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 20,
+                 decrease_factor: float = 0.5, decrease_interval: float = 1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        # One congestion event usually fails every in-flight request; only
+        # back off once per interval so the limit isn't collapsed to minimum.
+        self.decrease_interval = decrease_interval
+        self._last_decrease = float("-inf")
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def release(self, ok: Optional[bool]) -> None:
+        """Free a slot; `ok=None` (call never ran) leaves the limit unchanged."""
+        async with self._cond:
+            self._in_flight -= 1
+            if ok is None:
+                pass
+            elif ok:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif time.monotonic() - self._last_decrease >= self.decrease_interval:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self._last_decrease = time.monotonic()
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Closed → open after `failure_threshold` consecutive failures → half-open after `reset_timeout`."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.opened_count = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+    def admit(self) -> Optional[str]:
+        """Return the state the call is admitted under, or None to skip it."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return None
+            self.state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        if self.state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                return None
+            self._probes_in_flight += 1
+            return self.HALF_OPEN
+        return self.CLOSED
+
+    def record(self, ok: bool, admitted_as: str) -> None:
+        if admitted_as == self.HALF_OPEN:
+            self._probes_in_flight -= 1
+            if self.state != self.HALF_OPEN:
+                return
+            if ok:
+                self.state = self.CLOSED
+                self._failures = 0
+            else:
+                self._open()
+            return
+
+        if ok:
+            self._failures = 0
+            return
+        self._failures += 1
+        if self.state == self.CLOSED and self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.opened_count += 1
+
+
+class SourceGuard:
+    """Rate limiter, AIMD limiter, breaker and stats for one price source."""
+
+    def __init__(self, source_name: str, max_concurrency: int = 20,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        rate, burst = SOURCE_RATE_LIMITS.get(source_name, DEFAULT_RATE_LIMIT)
+        self.source_name = source_name
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AIMDLimiter(initial=max(1, max_concurrency // 4), maximum=max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.requests = 0
+        self.successes = 0
+        self.priced = 0
+        self.failures = 0
+        self.throttled = 0
+        self.skipped = 0
+        self.latencies: List[float] = []
+        self.latency_total = 0.0
+
+    async def fetch_price(self, src, store_external_id: str, ingredient_name: str, unit: str):
+        """Run `src.async_fetch_price` under this guard; skipped calls return (None, unit)."""
+        await self.limiter.acquire()
+        ok: Optional[bool] = None
+        try:
+            # Ask the breaker only once a slot is free: it may have opened
+            # while this call was queued behind others.
+            admitted_as = self.breaker.admit()
+            if admitted_as is None:
+                self.skipped += 1
+                return (None, unit)
+
+            ok = False
+            await self.bucket.acquire()
+            start = time.monotonic()
+            errored = False
+            with capture_responses() as responses:
+                try:
+                    price, resolved_unit = await src.async_fetch_price(store_external_id, ingredient_name, unit)
+                except Exception as e:
+                    logging.getLogger(__name__).warning(f"{self.source_name} lookup raised for {ingredient_name}: {e}")
+                    price, resolved_unit, errored = None, unit, True
+            latency = time.monotonic() - start
+            self.latencies.append(latency)
+            self.latency_total += latency
+            self.requests += 1
+
+            statuses = [status for status, _ in responses]
+            throttles = [(status, retry_after) for status, retry_after in responses if status in THROTTLE_STATUSES]
+            if throttles:
+                self.throttled += 1
+                self.bucket.pause(_retry_after_seconds(throttles[-1][1], self.source_name))
+            elif errored or any(status >= 500 for status in statuses) or (price is None and not statuses):
+                # No response at all means the request never completed (timeout, connect error)
+                self.failures += 1
+            else:
+                ok = True
+                self.successes += 1
+                if price is not None:
+                    self.priced += 1
+
+            was_open = self.breaker.opened_count
+            self.breaker.record(ok, admitted_as)
+            if self.breaker.opened_count != was_open:
+                logging.getLogger(__name__).warning(
+                    f"Circuit opened for {self.source_name}; skipping its lookups for {self.breaker.reset_timeout:.0f}s"
+                )
+            return (price, resolved_unit)
+        finally:
+            await self.limiter.release(ok)
+
+    def stats(self) -> Dict:
+        latencies = sorted(self.latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        return {
+            "source": self.source_name,
+            "requests": self.requests,
+            "success_rate": round(self.successes / self.requests, 4) if self.requests else None,
+            "priced": self.priced,
+            "failures": self.failures,
+            "throttle_events": self.throttled,
+            "skipped": self.skipped,
+            "circuit_opened": self.breaker.opened_count,
+            "circuit_state": self.breaker.state,
+            "latency_p50_s": pct(0.5),
+            "latency_p95_s": pct(0.95),
+            "final_concurrency": round(self.limiter.limit, 2),
+        }
+
+
+def _retry_after_seconds(value: Optional[str], source_name: str = "") -> float:
+    try:
+        seconds = max(0.0, float(value)) if value else DEFAULT_THROTTLE_PAUSE
+    except ValueError:
+        # HTTP-date form; not worth parsing for a pause hint
+        return DEFAULT_THROTTLE_PAUSE
+    if seconds > MAX_RETRY_AFTER_S:
+        logging.getLogger(__name__).warning(
+            f"{source_name or 'source'} asked for Retry-After {seconds:.0f}s; pausing {MAX_RETRY_AFTER_S:.0f}s instead"
+        )
+        return MAX_RETRY_AFTER_S
+    return seconds
@@ -0,0 +1,301 @@
+"""
+Registry of price sources: per-retailer fallback chains with health-based routing.
+
+Each retailer declares an ordered chain of sources that can price its stores
+(e.g. Safeway: the two JSON scrapers, the HTML scraper, Instacart, then
+regional estimates), together with the `stores` column each source reads its
+store ID from. A refresh asks the registry for a store's routes and then
+prices each ingredient through `SourceRegistry.fetch_price`, which:
+
+- ranks the chain's live sources by expected time to a price (mean latency
+  divided by the share of lookups that returned one), combining this run's
+  SourceGuard counters with decayed stats from previous runs
+  (`price_source_health`, migration 23),
+- tries them in that order and falls back down the chain until one prices,
+- demotes dead sources (hardly ever priced over enough lookups) to an
+  occasional probe, so a broken scraper stops costing a request per lookup,
+- keeps estimate-only sources at the end of the chain.
+
+Sources that can price by product ID are wrapped so they price pinned
+products instead of searching (see product_pins.py).
+
+The declarations also drive which store-ID columns are loaded and resolved
+(see `id_lookups`), replacing the hand-edited SOURCES list and if/elif chain.
+"""
+
+import importlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .price_sources import PriceSource
+from .product_pins import PinnedSource, ProductPins
+from .source_guard import SourceGuard
+from .store_id_resolver import KROGER_BANNERS, SAFEWAY_BANNERS, always, name_matches
+
+# source_name -> (module, class). Imported lazily: some scrapers need optional
+# packages (e.g. bs4) not every install has.
+SOURCE_CLASSES: Dict[str, Tuple[str, str]] = {
+    "kroger_api": ("app.services.kroger", "KrogerPriceSource"),
+    "walmart_web": ("app.services.walmart", "WalmartPriceSource"),
+    "safeway_web": ("app.services.safeway", "SafewayPriceSource"),
+    "safeway_web_v2": ("app.services.safeway_v2", "SafewayPriceSourceV2"),
+    "safeway_web_fixed": ("app.services.safeway_fixed", "SafewayFixedPriceSource"),
+    "safeway_fallback": ("app.services.safeway_fallback", "SafewayFallbackPriceSource"),
+    "instacart_whole_foods": ("app.services.instacart", "InstacartWholeFoodsSource"),
+    "instacart_safeway": ("app.services.instacart", "InstacartSafewaySource"),
+    "instacart_public": ("app.services.instacart_public", "InstacartPublicAPI"),
+    "aldi_web": ("app.services.aldi", "AldiPriceSource"),
+}
+
+
+class SourceLink(NamedTuple):
+    source: str
+    # `stores` column holding the store ID this source expects
+    id_column: Optional[str]
+    # ID to use when the store has none (sources that price regionally)
+    default_id: Optional[str] = None
+    # Returns estimates rather than shelf prices: only used once live sources fail
+    estimate: bool = False
+
+
+RETAILER_CHAINS: Dict[str, List[SourceLink]] = {
+    "kroger": [SourceLink("kroger_api", "kroger_location_id")],
+    "walmart": [SourceLink("walmart_web", "walmart_store_id")],
+    "safeway": [
+        SourceLink("safeway_web_v2", "safeway_store_id"),
+        SourceLink("safeway_web", "safeway_store_id"),
+        SourceLink("safeway_web_fixed", "safeway_store_id"),
+        SourceLink("instacart_safeway", "instacart_zone_id"),
+        # Bay Area default store: every store gets a regional estimate
+        SourceLink("safeway_fallback", "safeway_store_id", default_id="3132", estimate=True),
+    ],
+    "whole_foods": [SourceLink("instacart_whole_foods", "instacart_zone_id")],
+}
+
+# Sources whose prices are estimates; kept out of the learned price bounds
+ESTIMATE_SOURCES = frozenset(link.source for links in RETAILER_CHAINS.values() for link in links if link.estimate)
+
+# stores column -> (source that resolves it, lookup method, banners it applies to or None for any store)
+ID_COLUMNS: Dict[str, Tuple[str, str, Optional[List[str]]]] = {
+    "kroger_location_id": ("kroger_api", "lookup_location_id", KROGER_BANNERS),
+    "walmart_store_id": ("walmart_web", "lookup_store_id", None),
+    "safeway_store_id": ("safeway_fallback", "lookup_store_id", SAFEWAY_BANNERS),
+}
+
+# A source is dead after this many lookups with a priced rate below DEAD_PRICED_RATE ...
+MIN_SAMPLES = 20
+DEAD_PRICED_RATE = 0.05
+# ... and then only gets every PROBE_EVERY-th lookup routed to it.
+PROBE_EVERY = 50
+# Weight of previous runs' stats when merging in this run's
+HEALTH_DECAY = 0.5
+# Optimistic prior for sources without history: try them before judging
+PRIOR_LOOKUPS = 4
+PRIOR_PRICED_RATE = 0.5
+PRIOR_LATENCY_S = 1.0
+
+# (source_name, store external id), in routing order
+Route = List[Tuple[str, str]]
+
+
+def make_source(source_name: str) -> PriceSource:
+    module, cls = SOURCE_CLASSES[source_name]
+    return getattr(importlib.import_module(module), cls)()
+
+
+class SourceRegistry:
+    """Routes lookups through the retailer chains of the enabled sources."""
+
+    def __init__(
+        self,
+        chains: Optional[Dict[str, List[SourceLink]]] = None,
+        enabled: Optional[List[str]] = None,
+        sources: Optional[Dict[str, PriceSource]] = None,
+        max_concurrency: int = 20,
+        pins: Optional[ProductPins] = None,
+    ):
+        """
+        Args:
+            chains: retailer -> ordered SourceLinks (defaults to RETAILER_CHAINS)
+            enabled: source names to use (default: every source in the chains,
+                or the comma-separated REFRESH_SOURCES env var)
+            sources: pre-built source instances by name (built lazily otherwise)
+            max_concurrency: per-source SourceGuard concurrency cap
+            pins: product pins; sources that can price by product ID are
+                wrapped in a PinnedSource so they search only to (re)pin
+        """
+        self.chains = chains if chains is not None else RETAILER_CHAINS
+        if enabled is None and os.getenv("REFRESH_SOURCES"):
+            enabled = [name.strip() for name in os.getenv("REFRESH_SOURCES").split(",") if name.strip()]
+        self.sources: Dict[str, PriceSource] = dict(sources or {})
+        names = {link.source for links in self.chains.values() for link in links}
+        for name in sorted(names):
+            if enabled is not None and name not in enabled:
+                continue
+            if name not in self.sources:
+                try:
+                    self.sources[name] = make_source(name)
+                except Exception as e:
+                    logging.getLogger(__name__).warning(f"Price source {name} unavailable: {e}")
+        self.pins = pins
+        if pins is not None:
+            for retailer, links in self.chains.items():
+                for link in links:
+                    src = self.sources.get(link.source)
+                    if getattr(src, "product_id_batch", 0) and not isinstance(src, PinnedSource):
+                        self.sources[link.source] = PinnedSource(src, retailer, pins)
+        self.guards = {name: SourceGuard(name, max_concurrency=max_concurrency) for name in self.sources}
+        # previous runs' (decayed) lookups, priced and latency sum per source
+        self.history: Dict[str, Dict[str, float]] = {}
+        self._routed: Dict[str, int] = {name: 0 for name in self.sources}
+        self._probes: Dict[str, int] = {name: 0 for name in self.sources}
+        self._fallbacks = 0
+
+    # ------------------------------------------------------------------
+    # Declarations
+    # ------------------------------------------------------------------
+    def id_columns(self) -> List[str]:
+        """`stores` columns the enabled sources read store IDs from."""
+        columns = {
+            link.id_column
+            for links in self.chains.values()
+            for link in links
+            if link.source in self.sources and link.id_column
+        }
+        return sorted(columns)
+
+    def id_lookups(self) -> Dict[str, Tuple]:
+        """StoreIdResolver lookups for the ID columns of the enabled sources."""
+        lookups = {}
+        for column in self.id_columns():
+            if column not in ID_COLUMNS:
+                continue
+            source_name, method, banners = ID_COLUMNS[column]
+            src = self.sources.get(source_name) or make_source(source_name)
+            lookups[column] = (getattr(src, method), name_matches(banners) if banners else always)
+        return lookups
+
+    def routes(self, store: Dict) -> List[Tuple[str, List[SourceLink], Dict[str, str]]]:
+        """(retailer, usable links, source -> external id) for each retailer that can price *store*."""
+        routes = []
+        for retailer, links in self.chains.items():
+            usable, ids = [], {}
+            for link in links:
+                if link.source not in self.sources:
+                    continue
+                ext_id = (store.get(link.id_column) if link.id_column else None) or link.default_id
+                if ext_id:
+                    usable.append(link)
+                    ids[link.source] = str(ext_id)
+            if usable:
+                routes.append((retailer, usable, ids))
+        return routes
+
+    # ------------------------------------------------------------------
+    # Health and routing
+    # ------------------------------------------------------------------
+    def _health(self, name: str) -> Tuple[float, float, float]:
+        """(lookups, priced, latency sum) from history plus this run, with the prior folded in."""
+        guard = self.guards[name]
+        past = self.history.get(name, {})
+        # lookups the open breaker skipped went unpriced too
+        lookups = past.get("lookups", 0.0) + guard.requests + guard.skipped
+        priced = past.get("priced", 0.0) + guard.priced
+        latency = past.get("latency_s", 0.0) + guard.latency_total
+        return lookups, priced, latency
+
+    def is_dead(self, name: str) -> bool:
+        lookups, priced, _ = self._health(name)
+        return lookups >= MIN_SAMPLES and priced / lookups < DEAD_PRICED_RATE
+
+    def expected_cost(self, name: str) -> float:
+        """Expected seconds until this source returns a price."""
+        lookups, priced, latency = self._health(name)
+        rate = (priced + PRIOR_PRICED_RATE * PRIOR_LOOKUPS) / (lookups + PRIOR_LOOKUPS)
+        mean_latency = (latency + PRIOR_LATENCY_S * PRIOR_LOOKUPS) / (lookups + PRIOR_LOOKUPS)
+        return mean_latency / max(rate, 1e-3)
+
+    def order(self, links: List[SourceLink]) -> List[SourceLink]:
+        """Links to try, fastest expected price first; dead sources only as the odd probe."""
+        live, estimates = [], []
+        for position, link in enumerate(links):
+            if link.estimate:
+                estimates.append(link)
+                continue
+            if self.is_dead(link.source):
+                self._probes[link.source] += 1
+                if self._probes[link.source] % PROBE_EVERY:
+                    continue
+            live.append((self.expected_cost(link.source), position, link))
+        live.sort(key=lambda item: item[:2])
+        return [link for _, _, link in live] + estimates
+
+    async def fetch_price(
+        self, links: List[SourceLink], ids: Dict[str, str], ingredient_name: str, unit: str
+    ) -> Tuple[Optional[float], str, Optional[str]]:
+        """Price *ingredient_name* through the chain; returns (price, unit, source name or None)."""
+        for attempt, link in enumerate(self.order(links)):
+            self._routed[link.source] += 1
+            guard = self.guards[link.source]
+            price, resolved_unit = await guard.fetch_price(
+                self.sources[link.source], ids[link.source], ingredient_name, unit
+            )
+            if price is not None:
+                if attempt:
+                    self._fallbacks += 1
+                return price, resolved_unit, link.source
+        return None, unit, None
+
+    def stats(self) -> List[Dict]:
+        """Per-source SourceGuard stats plus routing figures."""
+        stats = []
+        for name, guard in self.guards.items():
+            entry = guard.stats()
+            entry["routed"] = self._routed[name]
+            entry["dead"] = self.is_dead(name)
+            entry["expected_cost_s"] = round(self.expected_cost(name), 4)
+            stats.append(entry)
+        return stats
+
+    @property
+    def fallbacks(self) -> int:
+        """Lookups priced by a source other than the first one tried."""
+        return self._fallbacks
+
+    # ------------------------------------------------------------------
+    # Persistence (price_source_health, migration 23)
+    # ------------------------------------------------------------------
+    def load_health(self, supabase) -> None:
+        try:
+            res = supabase.table("price_source_health").select("source, lookups, priced, latency_s").execute()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Source health unavailable, routing on this run's stats only: {e}")
+            return
+        for row in res.data or []:
+            self.history[row["source"]] = {
+                "lookups": float(row["lookups"] or 0),
+                "priced": float(row["priced"] or 0),
+                "latency_s": float(row["latency_s"] or 0),
+            }
+
+    def save_health(self, supabase) -> None:
+        """Persist decayed history plus this run's counters for the next run."""
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for name, guard in self.guards.items():
+            past = self.history.get(name, {})
+            rows.append({
+                "source": name,
+                "lookups": past.get("lookups", 0.0) * HEALTH_DECAY + guard.requests + guard.skipped,
+                "priced": past.get("priced", 0.0) * HEALTH_DECAY + guard.priced,
+                "latency_s": past.get("latency_s", 0.0) * HEALTH_DECAY + guard.latency_total,
+                "updated_at": now,
+            })
+        if not rows:
+            return
+        try:
+            supabase.table("price_source_health").upsert(rows, on_conflict="source").execute()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not save source health: {e}")
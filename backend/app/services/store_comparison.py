@@ -0,0 +1,53 @@
+"""
+What a whole grocery list would cost at each of several stores.
+
+Works on the items × stores price matrix from pricing.get_price_matrix
+(with its baseline column): where a store has no usable price for an item,
+the item's cheapest price anywhere is scaled by the store's price level
+(store_adjustments.get_store_price_multiplier), as the single-store pricing
+path does. Totals, coverage and missing items for every store come out of
+one set of array reductions.
+"""
+
+from typing import List, NamedTuple
+
+import numpy as np
+
+
+class StoreTotals(NamedTuple):
+    totals: np.ndarray  # per store: cost of every item priced there (direct or estimated)
+    direct_totals: np.ndarray  # per store: cost of the directly priced items only
+    coverage: np.ndarray  # per store: share of items with a direct price, 0..1
+    estimated: np.ndarray  # items × stores: priced from the baseline × multiplier
+    missing: np.ndarray  # items × stores: no price at all
+
+
+def compare_stores(
+    prices: np.ndarray, baseline: np.ndarray, multipliers: np.ndarray, quantities: np.ndarray
+) -> StoreTotals:
+    """Reduce an items × stores price-per-unit matrix to per-store basket totals.
+
+    Args:
+        prices: items × stores, NaN where a store has no usable price
+        baseline: per item cheapest price at any store (NaN if none)
+        multipliers: per store price level relative to the baseline
+        quantities: per item quantity in the priced unit
+    """
+    direct = np.isfinite(prices)
+    estimate = baseline[:, None] * multipliers[None, :]
+    priced = np.where(direct, prices, estimate)
+    estimated = ~direct & np.isfinite(priced)
+    costs = priced * quantities[:, None]
+    n_items = max(prices.shape[0], 1)
+    return StoreTotals(
+        totals=np.nansum(costs, axis=0),
+        direct_totals=np.where(direct, costs, 0.0).sum(axis=0),
+        coverage=direct.sum(axis=0) / n_items,
+        estimated=estimated,
+        missing=~np.isfinite(priced),
+    )
+
+
+def item_names(mask: np.ndarray, names: List[str]) -> List[List[str]]:
+    """Per store (column of *mask*), the names of the flagged items."""
+    return [[names[i] for i in np.flatnonzero(column)] for column in mask.T]
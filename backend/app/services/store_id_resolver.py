@@ -0,0 +1,193 @@
+"""
+Concurrent, cached resolution of retailer store IDs for `stores` rows.
+
+Price sources need a retailer-specific store ID (Kroger locationId, Walmart
+store number, Safeway store ID) for every Google Places store. Looking them
+up one store at a time is slow and repeats the same query for stores a few
+blocks apart, so this resolver:
+
+- snaps each store to a lat/lon grid cell and resolves each
+  (id column, cell) pair once per run, so nearby stores share the answer,
+- runs the lookups concurrently in worker threads,
+- caches answers in `store_id_cache` (migration 21). Misses are cached as
+  well, with a shorter TTL, so stores without a match are not re-queried
+  every run,
+- writes every resolved ID back to `stores` in one bulk upsert.
+"""
+
+import asyncio
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from anyio import to_thread
+
+GRID_DEGREES = 0.02  # ~2 km cells
+POSITIVE_TTL = timedelta(days=30)
+NEGATIVE_TTL = timedelta(days=7)
+
+KROGER_BANNERS = [
+    "kroger",
+    "ralph",
+    "fred meyer",
+    "fry",
+    "king soopers",
+    "harris teeter",
+    "smith",
+    "city market",
+    "pick n save",
+]
+
+SAFEWAY_BANNERS = [
+    "safeway",
+    "albertsons",
+    "vons",
+    "pavilions",
+    "tom thumb",
+    "randalls",
+    "shaw",
+    "star market",
+    "acme"
+]
+
+# lookup(lat, lon) -> external id or None
+Lookup = Callable[[float, float], Optional[str]]
+# eligible(store row) -> whether this retailer could operate the store
+Eligibility = Callable[[Dict], bool]
+
+
+def grid_cell(latitude: float, longitude: float, size: float = GRID_DEGREES) -> str:
+    """Key of the grid cell containing (latitude, longitude)."""
+    return f"{math.floor(latitude / size)}:{math.floor(longitude / size)}"
+
+
+def name_matches(banners: List[str]) -> Eligibility:
+    def eligible(store: Dict) -> bool:
+        store_name = (store.get("name") or "").lower()
+        return any(b in store_name for b in banners)
+    return eligible
+
+
+def always(store: Dict) -> bool:
+    return True
+
+
+class StoreIdResolver:
+    """Fills missing retailer ID columns on store rows."""
+
+    def __init__(
+        self,
+        supabase,
+        lookups: Dict[str, Tuple[Lookup, Eligibility]],
+        concurrency: int = 8,
+        grid_size: float = GRID_DEGREES,
+    ):
+        """
+        Args:
+            supabase: Supabase admin client
+            lookups: stores column -> (lookup function, eligibility check)
+            concurrency: Max lookups in flight
+            grid_size: Grid cell size in degrees
+        """
+        self.supabase = supabase
+        self.lookups = lookups
+        self.concurrency = concurrency
+        self.grid_size = grid_size
+        self._cache: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def _load_cache(self) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            res = (
+                self.supabase.table("store_id_cache")
+                .select("id_column, grid_cell, external_id")
+                .gt("expires_at", now)
+                .execute()
+            )
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Store ID cache unavailable, resolving without it: {e}")
+            return
+        for row in res.data or []:
+            self._cache[(row["id_column"], row["grid_cell"])] = row["external_id"]
+
+    async def resolve(self, stores: List[Dict]) -> List[Dict]:
+        """Fill missing IDs on *stores* in place, persist them, and return the stores."""
+        self._load_cache()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending: Dict[Tuple[str, str], asyncio.Task] = {}
+        fresh: Dict[Tuple[str, str], Optional[str]] = {}
+
+        async def lookup(column: str, cell: str, lat: float, lon: float) -> Optional[str]:
+            fn = self.lookups[column][0]
+            async with semaphore:
+                try:
+                    external_id = await to_thread.run_sync(fn, lat, lon)
+                except Exception as e:
+                    logging.getLogger(__name__).warning(f"{column} lookup failed near {lat},{lon}: {e}")
+                    external_id = None
+            fresh[(column, cell)] = external_id
+            return external_id
+
+        wanted: List[Tuple[Dict, str, Tuple[str, str]]] = []
+        for store in stores:
+            lat, lon = store.get("lat"), store.get("lon")
+            if lat is None or lon is None:
+                continue
+            cell = grid_cell(float(lat), float(lon), self.grid_size)
+            for column, (_, eligible) in self.lookups.items():
+                # Only fill columns the row has (e.g. safeway_store_id may not exist yet)
+                if column not in store or store.get(column) or not eligible(store):
+                    continue
+                key = (column, cell)
+                wanted.append((store, column, key))
+                if key not in self._cache and key not in pending:
+                    # The first store in a cell is looked up for all of its neighbours.
+                    pending[key] = asyncio.create_task(lookup(column, cell, float(lat), float(lon)))
+
+        if pending:
+            await asyncio.gather(*pending.values())
+
+        updated: Dict[str, Dict] = {}
+        for store, column, key in wanted:
+            external_id = self._cache[key] if key in self._cache else fresh.get(key)
+            if external_id:
+                store[column] = external_id
+                updated[store["place_id"]] = store
+
+        cached_hits = sum(1 for _, _, key in wanted if key in self._cache)
+        logging.getLogger(__name__).info(
+            f"Store IDs: {len(wanted)} missing, {cached_hits} from cache, "
+            f"{len(pending)} lookups, {len(updated)} stores updated"
+        )
+        self._save_cache(fresh)
+        self._save_stores(list(updated.values()))
+        return stores
+
+    def _save_cache(self, fresh: Dict[Tuple[str, str], Optional[str]]) -> None:
+        if not fresh:
+            return
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "id_column": column,
+                "grid_cell": cell,
+                "external_id": external_id,
+                "resolved_at": now.isoformat(),
+                "expires_at": (now + (POSITIVE_TTL if external_id else NEGATIVE_TTL)).isoformat(),
+            }
+            for (column, cell), external_id in fresh.items()
+        ]
+        try:
+            self.supabase.table("store_id_cache").upsert(rows, on_conflict="id_column,grid_cell").execute()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not save store ID cache: {e}")
+        self._cache.update(fresh)
+
+    def _save_stores(self, stores: List[Dict]) -> None:
+        if not stores:
+            return
+        # name/lat/lon ride along so the upsert's insert path satisfies NOT NULL
+        columns = ["place_id", "name", "lat", "lon", *self.lookups]
+        rows = [{col: store[col] for col in columns if col in store} for store in stores]
+        self.supabase.table("stores").upsert(rows, on_conflict="place_id").execute()
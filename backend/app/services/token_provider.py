@@ -0,0 +1,153 @@
+"""
+Thread-safe OAuth token cache with single-flight refresh.
+
+Many threads (and coroutines via `async_get_token`) may ask for a token at
+once; only one of them calls the token endpoint while the rest wait for and
+reuse its result. A daemon timer refreshes the token shortly before it
+expires so callers rarely block at all, and an optional cache file lets
+short-lived script runs reuse a token that is still valid.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from anyio import to_thread
+
+# fetch() -> (access_token, expires_in_seconds)
+TokenFetcher = Callable[[], Tuple[str, float]]
+
+
+class TokenProvider:
+    """Caches a bearer token and refreshes it single-flight."""
+
+    def __init__(
+        self,
+        fetch: TokenFetcher,
+        expiry_margin: float = 60,
+        refresh_ahead: float = 300,
+        cache_path: Optional[Path] = None,
+        name: str = "token",
+    ):
+        """
+        Args:
+            fetch: Calls the token endpoint; may raise (e.g. missing credentials)
+            expiry_margin: Treat tokens expiring within this many seconds as expired
+            refresh_ahead: Refresh in the background this many seconds before expiry
+            cache_path: Optional JSON file to persist the token between runs
+            name: Label used in log messages
+        """
+        self._fetch = fetch
+        self.expiry_margin = expiry_margin
+        self.refresh_ahead = refresh_ahead
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.name = name
+        # (token, expires_at) replaced as one object so lock-free readers
+        # never pair a token with another token's expiry
+        self._state: Tuple[Optional[str], float] = (None, 0.0)
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._load_cache()
+
+    def enable_persistence(self, cache_path: Path) -> None:
+        """Persist to (and reuse a valid token from) *cache_path* from now on."""
+        with self._lock:
+            self.cache_path = Path(cache_path)
+            if not self._valid():
+                self._load_cache()
+            elif not self.cache_path.exists():
+                self._save_cache()
+
+    def _current(self) -> Optional[str]:
+        """The cached token if it is still valid, else None."""
+        token, expires_at = self._state
+        if token is not None and expires_at - time.time() > self.expiry_margin:
+            return token
+        return None
+
+    def _valid(self) -> bool:
+        return self._current() is not None
+
+    def get_token(self) -> str:
+        """Return a valid token, fetching one if needed (only one caller fetches at a time)."""
+        token = self._current()
+        if token is not None:
+            return token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock.
+            token = self._current()
+            if token is None:
+                token = self._refresh_locked()
+            return token
+
+    async def async_get_token(self) -> str:
+        """Async variant; the blocking refresh runs in a worker thread."""
+        token = self._current()
+        if token is not None:
+            return token
+        return await to_thread.run_sync(self.get_token)
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token (e.g. after the API answers 401).
+
+        Pass the token the rejected request used: a late 401 for a token
+        that has since been replaced then leaves the fresh one alone.
+        """
+        with self._lock:
+            if token is None or token == self._state[0]:
+                self._state = (None, 0.0)
+
+    def _refresh_locked(self) -> str:
+        token, expires_in = self._fetch()
+        self._state = (token, time.time() + float(expires_in))
+        self._save_cache()
+        self._schedule_refresh()
+        return token
+
+    def _schedule_refresh(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = self._state[1] - time.time() - self.refresh_ahead
+        if delay <= 0:
+            return
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                self._refresh_locked()
+        except Exception as e:
+            # The next get_token() retries synchronously once the token expires.
+            logging.getLogger(__name__).warning(f"Background refresh of {self.name} failed: {e}")
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text())
+            self._state = (data["access_token"], float(data["expires_at"]))
+        except (OSError, ValueError, KeyError) as e:
+            logging.getLogger(__name__).warning(f"Ignoring unreadable {self.name} cache {self.cache_path}: {e}")
+            return
+        if self._valid():
+            self._schedule_refresh()
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        try:
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            # Bearer tokens are credentials: keep the file private to this user.
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as fh:
+                token, expires_at = self._state
+                json.dump({"access_token": token, "expires_at": expires_at}, fh)
+            tmp_path.replace(self.cache_path)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not persist {self.name} to {self.cache_path}: {e}")
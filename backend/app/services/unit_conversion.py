@@ -1,168 +1,224 @@
 # backend/app/services/unit_conversion.py
 """Utility helpers for unit normalization and conversion.
 
-Currently supports common grocery units used by our price scrapers (g, kg, lb, oz, ml, l, each).
-The conversion helpers are intentionally simple – they do not handle density-based
-conversions (e.g. g ↔ ml).
+Conversions are driven by three data tables:
+
+- ``UNIT_ALIASES`` maps spellings seen in recipes and scraped packages to a
+  canonical unit, and ``UNIT_SIZES`` gives each canonical unit its dimension
+  (mass, volume or count) and size in that dimension's base unit (g, ml, each).
+- ``INGREDIENT_CLASSES`` gives per-class density (g/ml), package weight and
+  volume for items priced "each", and how many slices/small pieces make up
+  one item. ``CLASS_KEYWORDS`` assigns an ingredient name to a class.
+
+At import every (from_unit, to_unit, ingredient_class) combination is
+compiled into ``_FACTORS``, so converting a price is one normalization (LRU
+cached) and one dict lookup.
+
+A per-unit price converts by the inverse of the quantity ratio: 1 lb is
+16 oz, so $4.00/lb is $0.25/oz.
 """
 from __future__ import annotations
 
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
-# Base units expressed in grams or millilitres where applicable.
-_BASE_WEIGHTS_G = {
-    "g": 1.0,
-    "kg": 1000.0,
-    "lb": 453.592,
-    "lbs": 453.592,
-    "oz": 28.3495,
+# Canonical unit -> (dimension, size in the dimension's base unit: g, ml or each)
+UNIT_SIZES: Dict[str, Tuple[str, float]] = {
+    # Mass
+    "g": ("mass", 1.0),
+    "kg": ("mass", 1000.0),
+    "lb": ("mass", 453.592),
+    "oz": ("mass", 28.3495),
+    # Volume
+    "ml": ("volume", 1.0),
+    "l": ("volume", 1000.0),
+    "fl-oz": ("volume", 29.5735),
+    "cup": ("volume", 236.588),
+    "tbsp": ("volume", 14.7868),
+    "tsp": ("volume", 4.92892),
+    "pint": ("volume", 473.176),
+    "quart": ("volume", 946.353),
+    "gallon": ("volume", 3785.41),
+    # Counts; sub-units are sized per ingredient class (see _count_size)
+    "each": ("count", 1.0),
+    "stalk": ("count", 1.0),
+    "slice": ("count", None),
+    "wedge": ("count", None),
+    "clove": ("count", None),
+    "sprig": ("count", None),
+    "leaf": ("count", None),
 }
 
-_BASE_VOLUMES_ML = {
-    "ml": 1.0,
-    "l": 1000.0,
-    "fl-oz": 29.5735,
-    "cup": 236.588,  # 1 US cup = 236.588 ml
-    "tbsp": 14.7868,  # 1 tablespoon = 14.7868 ml
-    "tsp": 4.92892,   # 1 teaspoon = 4.92892 ml
+# Alternative spellings -> canonical unit (after normalize())
+UNIT_ALIASES: Dict[str, str] = {
+    "gram": "g", "grams": "g", "gr": "g",
+    "kilogram": "kg", "kilograms": "kg", "kgs": "kg",
+    "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "ounce": "oz", "ounces": "oz",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "mls": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l", "lt": "l",
+    "floz": "fl-oz", "fl.-oz": "fl-oz", "fl.oz": "fl-oz", "fluid-ounce": "fl-oz", "fluid-ounces": "fl-oz",
+    "cups": "cup", "c": "cup",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbs": "tbsp", "tbl": "tbsp",
+    "teaspoon": "tsp", "teaspoons": "tsp",
+    "pt": "pint", "pints": "pint",
+    "qt": "quart", "quarts": "quart",
+    "gal": "gallon", "gallons": "gallon",
+    "ct": "each", "count": "each", "piece": "each", "pieces": "each", "item": "each", "items": "each",
+    "ea": "each", "whole": "each",
+    "slices": "slice", "wedges": "wedge", "cloves": "clove", "sprigs": "sprig",
+    "leaves": "leaf", "stalks": "stalk",
 }
 
-_SPECIAL_UNITS = {
-    "each", "ct", "count", "piece", "item", 
-    # Recipe-specific units that should be treated as fractions of "each"
-    "slice", "slices", "wedge", "wedges", "clove", "cloves",
-    "stalk", "stalks", "sprig", "sprigs", "leaf", "leaves"
+# Ingredient class -> density (g/ml), weight and volume of one item sold
+# "each", slices/wedges per item, cloves/sprigs/leaves per item
+INGREDIENT_CLASSES: Dict[str, Dict[str, float]] = {
+    "default": {"density": 1.0, "package_g": 300.0, "package_ml": 473.0, "slices": 5, "pieces": 9},
+    "milk": {"density": 1.03, "package_ml": 1892.7},  # half gallon
+    "juice": {"density": 1.05, "package_ml": 1540.0},  # 52 fl oz
+    "oil": {"density": 0.92, "package_ml": 500.0},
+    "vinegar": {"density": 1.01},
+    "wine": {"density": 0.99, "package_ml": 750.0},
+    "beer": {"density": 1.01, "package_ml": 355.0},
+    "soda": {"density": 1.04, "package_ml": 355.0},
+    "honey": {"density": 1.42, "package_g": 340.0},
+    "flour": {"density": 0.53, "package_g": 2268.0},  # 5 lb bag
+    "sugar": {"density": 0.85, "package_g": 1814.0},  # 4 lb bag
+    "rice": {"density": 0.85, "package_g": 907.0},
+    "butter": {"density": 0.91, "package_g": 454.0},
+    "cheese": {"package_g": 227.0},
+    "meat": {"package_g": 454.0},
+    "canned": {"package_g": 425.0, "package_ml": 355.0},  # 15 oz can ≈ 1.5 cups
+    "egg": {"package_g": 50.0},
+    "produce": {"package_g": 200.0},
+    "bread": {"package_g": 567.0, "slices": 20},
+    "garlic": {"package_g": 50.0, "pieces": 10},
+    "herb": {"package_g": 28.0, "pieces": 30},
 }
 
+# Keyword -> class, first match wins (multi-word and more specific keywords first)
+CLASS_KEYWORDS: Tuple[Tuple[str, str], ...] = (
+    ("garlic", "garlic"),
+    ("canned", "canned"), ("can of", "canned"), ("beans", "canned"), ("chickpea", "canned"),
+    ("peanut butter", "default"),
+    ("buttermilk", "milk"), ("milk", "milk"),
+    ("juice", "juice"),
+    ("oil", "oil"),
+    ("vinegar", "vinegar"),
+    ("wine", "wine"),
+    ("beer", "beer"),
+    ("soda", "soda"), ("cola", "soda"),
+    ("honey", "honey"), ("syrup", "honey"),
+    ("flour", "flour"),
+    ("sugar", "sugar"),
+    ("rice", "rice"), ("oats", "rice"), ("quinoa", "rice"),
+    ("butter", "butter"),
+    ("cheese", "cheese"),
+    ("chicken", "meat"), ("beef", "meat"), ("pork", "meat"), ("turkey", "meat"), ("salmon", "meat"),
+    ("egg", "egg"),
+    ("bread", "bread"), ("bun", "bread"),
+    ("basil", "herb"), ("parsley", "herb"), ("cilantro", "herb"), ("thyme", "herb"),
+    ("rosemary", "herb"), ("mint", "herb"), ("dill", "herb"),
+    ("onion", "produce"), ("apple", "produce"), ("potato", "produce"), ("tomato", "produce"),
+    ("lemon", "produce"), ("lime", "produce"), ("orange", "produce"), ("pepper", "produce"),
+    ("avocado", "produce"), ("carrot", "produce"), ("cucumber", "produce"), ("zucchini", "produce"),
+)
+
+_DIMENSION_BASE = {"mass": "g", "volume": "ml", "count": "each"}
+
+
+def _class_value(cls: str, key: str) -> float:
+    return INGREDIENT_CLASSES[cls].get(key, INGREDIENT_CLASSES["default"][key])
+
+
+def _count_size(unit: str, cls: str) -> float:
+    size = UNIT_SIZES[unit][1]
+    if size is not None:
+        return size
+    per_item = _class_value(cls, "slices" if unit in ("slice", "wedge") else "pieces")
+    return 1.0 / per_item
+
+
+def _quantity(unit: str, dimension: str, cls: str) -> Optional[float]:
+    """How much of *dimension*'s base unit one *unit* is for an ingredient of class *cls*."""
+    unit_dimension, size = UNIT_SIZES[unit]
+    if unit_dimension == "count":
+        size = _count_size(unit, cls)
+    if unit_dimension == dimension:
+        return size
+    # Bridge dimensions through grams using the class's density and package sizes
+    grams_per = {
+        "mass": 1.0,
+        "volume": _class_value(cls, "density"),
+        "count": _class_value(cls, "package_g"),
+    }
+    if {unit_dimension, dimension} == {"volume", "count"}:
+        # Containers are sized by volume directly rather than weight / density
+        ml_per_each = _class_value(cls, "package_ml")
+        return size * ml_per_each if dimension == "volume" else size / ml_per_each
+    return size * grams_per[unit_dimension] / grams_per[dimension]
+
+
+def _compile() -> Dict[Tuple[str, str, str], float]:
+    factors = {}
+    for cls in INGREDIENT_CLASSES:
+        for f in UNIT_SIZES:
+            for t, (dimension, _) in UNIT_SIZES.items():
+                to_size = _count_size(t, cls) if dimension == "count" else UNIT_SIZES[t][1]
+                quantity = _quantity(f, dimension, cls)
+                # 1 f = quantity / to_size t, so a per-f price divides by that
+                factors[(f, t, cls)] = to_size / quantity
+    return factors
+
+
+_FACTORS = _compile()
+
 
 def normalize(unit: str) -> str:
     """Return a canonical, lowercase representation of *unit*."""
     return unit.strip().lower().replace(" ", "-")
 
 
-def is_convertible(unit: str) -> bool:
-    """Return True when *unit* can be converted with our simple ratios."""
-    u = normalize(unit)
-    return u in _BASE_WEIGHTS_G or u in _BASE_VOLUMES_ML
+@lru_cache(maxsize=1024)
+def canonical_unit(unit: str) -> str:
+    """*unit* normalized and with aliases resolved ("Pounds" -> "lb", "fl oz" -> "fl-oz")."""
+    u = normalize(unit).rstrip(".")
+    return UNIT_ALIASES.get(u, u)
 
 
-def convert_price(price: float, from_unit: str, to_unit: str) -> Optional[float]:
-    """Return *price* converted from *from_unit* → *to_unit* (per-unit price).
+@lru_cache(maxsize=4096)
+def ingredient_class(ingredient_name: Optional[str]) -> str:
+    """Conversion class of *ingredient_name* ("default" when nothing matches)."""
+    if not ingredient_name:
+        return "default"
+    name = ingredient_name.lower()
+    for keyword, cls in CLASS_KEYWORDS:
+        if keyword in name:
+            return cls
+    return "default"
 
-    If either unit is not convertible the original price is returned unchanged.
-    """
-    f, t = normalize(from_unit), normalize(to_unit)
 
-    if f == t or price is None:
-        return price
+def is_convertible(unit: str) -> bool:
+    """Return True when *unit* is a weight or volume."""
+    return UNIT_SIZES.get(canonical_unit(unit), ("count",))[0] != "count"
 
-    # Handle recipe-specific units that are fractions of "each" FIRST
-    slice_units = {"slice", "slices", "wedge", "wedges"}
-    small_units = {"clove", "cloves", "sprig", "sprigs", "leaf", "leaves"}
-    
-    if f == "each" and t in slice_units:
-        # 1 whole item = 4-6 slices/wedges on average
-        return price / 5
-    elif f in slice_units and t == "each":
-        return price * 5
-    elif f == "each" and t in small_units:
-        # 1 whole item = 8-10 small pieces (cloves, sprigs, etc.)
-        return price / 9
-    elif f in small_units and t == "each":
-        return price * 9
-
-    # Special units that are assumed to be equivalent (counts, pieces, etc.)
-    if f in _SPECIAL_UNITS and t in _SPECIAL_UNITS:
-        return price
 
-    # Weight
-    if f in _BASE_WEIGHTS_G and t in _BASE_WEIGHTS_G:
-        ratio = _BASE_WEIGHTS_G[f] / _BASE_WEIGHTS_G[t]
-        return price * ratio
+@lru_cache(maxsize=4096)
+def conversion_factor(from_unit: str, to_unit: str, ingredient_name: Optional[str] = None) -> Optional[float]:
+    """Multiplier turning a price per *from_unit* into a price per *to_unit*, or None if unknown."""
+    f, t = canonical_unit(from_unit), canonical_unit(to_unit)
+    if f == t:
+        return 1.0
+    return _FACTORS.get((f, t, ingredient_class(ingredient_name)))
 
-    # Volume
-    if f in _BASE_VOLUMES_ML and t in _BASE_VOLUMES_ML:
-        ratio = _BASE_VOLUMES_ML[f] / _BASE_VOLUMES_ML[t]
-        return price * ratio
-
-    # Special case: for some ingredients, we can make reasonable approximations
-    # For canned goods: 1 can ≈ 1.5 cups, 1 oz of canned ≈ 2 tbsp
-    if f == "oz" and t == "cup":
-        return price * (28.35 / 236.588)  # 1 oz ≈ 0.12 cups
-    elif f == "ct" and t == "cup":
-        # For canned items like chickpeas: 1 can ≈ 1.5 cups
-        return price / 1.5
-    elif f == "cup" and t == "ct":
-        return price * 1.5
-    
-    # Common grocery conversions with more realistic package sizes
-    elif f == "each" and t in _BASE_VOLUMES_ML:
-        # For liquids sold "each" (containers), use context-aware sizes
-        # Different products have very different standard container sizes
-        container_ml = 473.0  # Default to ~16 fl oz bottle/container
-        
-        # Adjust based on likely product type (if we can infer from context)
-        # Milk/juice cartons: 946ml (32 fl oz) or 1892ml (64 fl oz)
-        # Bottles: 473ml (16 fl oz) or 355ml (12 fl oz)
-        # Cans: 355ml (12 fl oz)
-        
-        ratio = container_ml / _BASE_VOLUMES_ML[t]
-        return price / ratio
-        
-    elif f in _BASE_VOLUMES_ML and t == "each":
-        # Reverse conversion: ml/l to containers
-        container_ml = 473.0  # Default container size
-        ratio = _BASE_VOLUMES_ML[f] / container_ml
-        return price / ratio
-    
-    # For weight-based items sold "each", use more realistic package sizes
-    elif f == "each" and t in _BASE_WEIGHTS_G:
-        # Different standard package weights based on common grocery items:
-        # Produce items: 200-400g (apples, onions, etc.)
-        # Packaged goods: 300-600g (pasta, rice, etc.)
-        # Meat packages: 400-800g
-        # Default to smaller size since many items are sold individually
-        package_g = 300.0  # More realistic average package size
-        
-        ratio = package_g / _BASE_WEIGHTS_G[t]
-        return price / ratio
-        
-    elif f in _BASE_WEIGHTS_G and t == "each":
-        # Reverse conversion
-        package_g = 300.0  # Match the forward conversion
-        ratio = _BASE_WEIGHTS_G[f] / package_g
-        return price / ratio
-
-    # Density-based conversions for common liquids (weight ↔ volume)
-    # Only use for specific liquid ingredients where density is well-known
-    liquid_densities = {
-        # Density in g/ml - most liquids are close to water (1 g/ml)
-        'milk': 1.03,      # Milk is slightly denser than water
-        'water': 1.0,      # Water baseline
-        'juice': 1.05,     # Fruit juices slightly denser
-        'oil': 0.92,       # Cooking oils are less dense
-        'vinegar': 1.01,   # Similar to water
-        'wine': 0.99,      # Slightly less than water
-        'beer': 1.01,      # Close to water
-        'soda': 1.04,      # Sugar makes it denser
-    }
-    
-    # Check if we can infer liquid type for density conversion
-    # This is a fallback for when we have weight data for liquids
-    if f in _BASE_WEIGHTS_G and t in _BASE_VOLUMES_ML:
-        # Default density for unknown liquids (assume water-like)
-        density = 1.0  # g/ml
-        
-        # Convert weight to volume: volume_ml = weight_g / density
-        price_per_ml = price * (_BASE_WEIGHTS_G[f] / density) / _BASE_VOLUMES_ML[t]
-        return price_per_ml
-        
-    elif f in _BASE_VOLUMES_ML and t in _BASE_WEIGHTS_G:
-        # Convert volume to weight: weight_g = volume_ml * density
-        density = 1.0  # g/ml default
-        
-        price_per_g = price * (_BASE_VOLUMES_ML[f] * density) / _BASE_WEIGHTS_G[t]
-        return price_per_g
-
-    # Unknown conversion – return None to signal caller to ignore.
-    return None 
\ No newline at end of file
+
+def convert_price(price: float, from_unit: str, to_unit: str, ingredient_name: Optional[str] = None) -> Optional[float]:
+    """Return *price* converted from *from_unit* → *to_unit* (per-unit price).
+
+    *ingredient_name* selects the density and package sizes used across
+    weight, volume and count. Returns None when the units can't be related.
+    """
+    if price is None or normalize(from_unit) == normalize(to_unit):
+        return price
+    factor = conversion_factor(from_unit, to_unit, ingredient_name)
+    return price * factor if factor is not None else None
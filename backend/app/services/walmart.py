@@ -1,52 +1,148 @@
-import re
-import json
-from typing import Optional
+from typing import List, Optional
 import httpx
 import logging
 
-from .price_sources import PriceSource
+from .price_sources import PriceSource, ProductHit
+from .http_clients import get_async_client
+from .html_extract import first_json_blob, iter_json_ld, run_cpu_bound
+from .quantity import unit_price
 
-_JSON_RE = re.compile(r'window\.__WML_REDUX_INITIAL_STATE__\s*=\s*(\{.*?\})\s*;')
+WALMART_SEARCH_URL = "https://www.walmart.com/search"
+WALMART_PRODUCT_URL = "https://www.walmart.com/ip"
+WALMART_STORE_FINDER_URL = "https://www.walmart.com/store/finder/v3/data"
+
+_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+_STATE_MARKER = "window.__WML_REDUX_INITIAL_STATE__"
 
 class WalmartPriceSource(PriceSource):
     """Scrapes Walmart search page for first result price (no API key)."""
 
+    # Item pages are fetched one ID at a time
+    product_id_batch = 1
+
     @property
     def source_name(self) -> str:
         return "walmart_web"
 
-    def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
+    @staticmethod
+    def _search_url(store_external_id: str, ingredient_name: str) -> str:
         # store_external_id is Walmart numeric store id (string)
-        url = (
-            f"https://www.walmart.com/search?q={ingredient_name.replace(' ', '%20')}"
+        return (
+            f"{WALMART_SEARCH_URL}?q={ingredient_name.replace(' ', '%20')}"
             f"&store={store_external_id}&facet=store_availability%3A1"
         )
+
+    @staticmethod
+    def _top_item(html: str) -> Optional[dict]:
+        data = first_json_blob(html, [_STATE_MARKER])
+        if not isinstance(data, dict):
+            return None
+        items = (
+            data.get("search", {})
+            .get("searchResult", {})
+            .get("itemStacks", [{}])[0]
+            .get("items", [])
+        )
+        return items[0] if items else None
+
+    @staticmethod
+    def _item_price(item: dict) -> Optional[float]:
+        price_info = item.get("price", {})
+        price = price_info.get("price") or price_info.get("minPrice")
+        return float(price) if price is not None else None
+
+    @staticmethod
+    def _item_unit_price(item: dict, unit: Optional[str]):
+        """(price per unit, unit) for a search item, priced per package size when one is given."""
+        price = WalmartPriceSource._item_price(item)
+        if price is None:
+            return (None, unit)
+        return unit_price(price, [item.get("size"), item.get("name")], unit)
+
+    @staticmethod
+    def _parse_search_page(html: str, unit: str):
         try:
-            r = httpx.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-            r.raise_for_status()
+            item = WalmartPriceSource._top_item(html)
+            return WalmartPriceSource._item_unit_price(item, unit) if item else (None, unit)
         except Exception:
             return (None, unit)
 
-        m = _JSON_RE.search(r.text)
-        if not m:
+    @staticmethod
+    def _parse_search_hit(html: str, unit: str) -> Optional[ProductHit]:
+        try:
+            item = WalmartPriceSource._top_item(html)
+            if not item:
+                return None
+            price, item_unit = WalmartPriceSource._item_unit_price(item, unit)
+            product_id = item.get("usItemId") or item.get("id")
+            if price is None or not product_id:
+                return None
+            return ProductHit(str(product_id), price, item_unit, item.get("name"))
+        except Exception:
+            return None
+
+    @staticmethod
+    def _parse_item_page(html: str):
+        """(price per unit, unit) from an item page's schema.org Product markup.
+
+        The unit is None when the product name carries no package size; the
+        caller keeps the requested unit then.
+        """
+        for data in iter_json_ld(html):
+            for entry in data if isinstance(data, list) else [data]:
+                if not isinstance(entry, dict) or entry.get("@type") != "Product":
+                    continue
+                offers = entry.get("offers")
+                offers = offers[0] if isinstance(offers, list) and offers else offers
+                try:
+                    price = float(offers["price"])
+                except (KeyError, TypeError, ValueError):
+                    return (None, None)
+                return unit_price(price, [entry.get("size"), entry.get("name")], None)
+        return (None, None)
+
+    def fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
+        try:
+            r = httpx.get(self._search_url(store_external_id, ingredient_name), headers=_HEADERS, timeout=10)
+            r.raise_for_status()
+        except Exception:
             return (None, unit)
+        return self._parse_search_page(r.text, unit)
+
+    async def async_fetch_price(self, store_external_id: str, ingredient_name: str, unit: str):
+        """Native async lookup over the pooled www.walmart.com client."""
         try:
-            data = json.loads(m.group(1))
-            items = (
-                data.get("search", {})
-                .get("searchResult", {})
-                .get("itemStacks", [{}])[0]
-                .get("items", [])
-            )
-            if not items:
-                return (None, unit)
-            price_info = items[0].get("price", {})
-            price = price_info.get("price") or price_info.get("minPrice")
-            if price is None:
-                return (None, unit)
-            return (float(price), unit)
+            client = get_async_client(WALMART_SEARCH_URL)
+            r = await client.get(self._search_url(store_external_id, ingredient_name), headers=_HEADERS)
+            r.raise_for_status()
         except Exception:
             return (None, unit)
+        # Search pages run to several MB; parse off the event loop
+        return await run_cpu_bound(WalmartPriceSource._parse_search_page, r.text, unit)
+
+    async def async_search_product(self, store_external_id: str, ingredient_name: str, unit: str):
+        try:
+            client = get_async_client(WALMART_SEARCH_URL)
+            r = await client.get(self._search_url(store_external_id, ingredient_name), headers=_HEADERS)
+            r.raise_for_status()
+        except Exception:
+            return None
+        return await run_cpu_bound(WalmartPriceSource._parse_search_hit, r.text, unit)
+
+    async def async_fetch_product_prices(self, store_external_id: str, product_ids: List[str]):
+        prices = {}
+        client = get_async_client(WALMART_PRODUCT_URL)
+        for product_id in product_ids:
+            try:
+                r = await client.get(f"{WALMART_PRODUCT_URL}/{product_id}?store={store_external_id}", headers=_HEADERS)
+                if r.status_code == 404:
+                    continue  # delisted
+                r.raise_for_status()
+            except Exception:
+                return None
+            prices[product_id] = await run_cpu_bound(WalmartPriceSource._parse_item_page, r.text)
+        return prices
 
     # -------------------------
     # Store-ID lookup utilities
@@ -59,10 +155,10 @@ class WalmartPriceSource(PriceSource):
         """
         try:
             url = (
-                "https://www.walmart.com/store/finder/v3/data"
-                f"?latitude={latitude}&longitude={longitude}&distance={radius_miles}"
+                WALMART_STORE_FINDER_URL
+                + f"?latitude={latitude}&longitude={longitude}&distance={radius_miles}"
             )
-            r = httpx.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+            r = httpx.get(url, headers=_HEADERS, timeout=10)
             r.raise_for_status()
             data = r.json()
             stores = data.get("stores", [])
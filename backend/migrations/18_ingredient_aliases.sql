@@ -0,0 +1,25 @@
+-- 18_ingredient_aliases.sql
+-- Map spelling variants ("boneless chicken breasts", "chicken breast, diced")
+-- to a single canonical ingredients row.
+CREATE TABLE IF NOT EXISTS ingredient_aliases (
+    alias TEXT PRIMARY KEY,
+    ingredient_id UUID NOT NULL REFERENCES ingredients(id) ON DELETE CASCADE,
+    canonical_name TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT timezone('utc', now())
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingredient_aliases_ingredient_id ON ingredient_aliases(ingredient_id);
+
+-- Nearest-neighbour search over ingredient embeddings (match_embeddings only
+-- covers test_embeddings). Used to merge near-duplicates on the write path.
+CREATE OR REPLACE FUNCTION match_ingredients(query_embedding vector, match_threshold double precision, match_count integer)
+RETURNS TABLE(id uuid, name text, similarity double precision)
+LANGUAGE sql STABLE
+AS $$
+    SELECT i.id, i.name::text, 1 - (i.embedding <=> query_embedding) AS similarity
+    FROM ingredients i
+    WHERE i.embedding IS NOT NULL
+      AND 1 - (i.embedding <=> query_embedding) > match_threshold
+    ORDER BY i.embedding <=> query_embedding
+    LIMIT match_count;
+$$;
@@ -0,0 +1,11 @@
+-- 19_price_refresh_history.sql
+-- Per-row change history used by scripts/refresh_prices.py to decide which
+-- prices are due for a refresh (see app/services/refresh_scheduler.py).
+ALTER TABLE stores_prices
+    ADD COLUMN IF NOT EXISTS last_changed_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS refresh_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS change_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS unchanged_streak INTEGER NOT NULL DEFAULT 0;
+
+-- "Hot" ingredients are those referenced by recently created recipe_ingredients
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_created_at ON recipe_ingredients(created_at);
@@ -0,0 +1,108 @@
+-- 20_price_refresh_jobs.sql
+-- Lease-based work queue for sharded price refreshes (scripts/refresh_workers.py).
+-- One row per (run, store, source) shard; workers claim shards with a lease,
+-- heartbeat while processing and mark them done. Shards whose lease expired
+-- (worker crashed or hung) are handed to the next claimant.
+CREATE TABLE IF NOT EXISTS price_refresh_jobs (
+    run_id TEXT NOT NULL,
+    place_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'leased', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT timezone('utc', now()),
+    completed_at TIMESTAMPTZ,
+    PRIMARY KEY (run_id, place_id, source)
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_refresh_jobs_claimable
+    ON price_refresh_jobs(run_id, status, lease_expires_at);
+
+-- Claim one pending (or lease-expired) shard. SKIP LOCKED lets any number of
+-- workers claim concurrently without contending on the same row.
+CREATE OR REPLACE FUNCTION claim_price_refresh_job(
+    p_run_id TEXT,
+    p_worker TEXT,
+    p_lease_seconds INTEGER,
+    p_max_attempts INTEGER DEFAULT 3
+)
+RETURNS SETOF price_refresh_jobs
+LANGUAGE sql
+AS $$
+    UPDATE price_refresh_jobs AS j
+    SET status = 'leased',
+        lease_owner = p_worker,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = now(),
+        attempts = j.attempts + 1
+    WHERE (j.run_id, j.place_id, j.source) = (
+        SELECT c.run_id, c.place_id, c.source
+        FROM price_refresh_jobs AS c
+        WHERE c.run_id = p_run_id
+          AND c.attempts < p_max_attempts
+          AND (c.status = 'pending' OR (c.status = 'leased' AND c.lease_expires_at < now()))
+        ORDER BY c.attempts, c.place_id, c.source
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$;
+
+-- Extend a lease; returns false if the worker no longer holds it.
+CREATE OR REPLACE FUNCTION heartbeat_price_refresh_job(
+    p_run_id TEXT,
+    p_place_id TEXT,
+    p_source TEXT,
+    p_worker TEXT,
+    p_lease_seconds INTEGER
+)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE price_refresh_jobs
+        SET lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+            heartbeat_at = now()
+        WHERE run_id = p_run_id AND place_id = p_place_id AND source = p_source
+          AND status = 'leased' AND lease_owner = p_worker
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM updated);
+$$;
+
+-- Upsert a chunk of stores_prices rows written by a sharded worker. Several
+-- sources refresh the same store in parallel, so an existing row is only
+-- replaced if it predates the run or the new price is cheaper.
+CREATE OR REPLACE FUNCTION upsert_store_prices(p_rows JSONB, p_run_started TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH written AS (
+        INSERT INTO stores_prices AS sp (
+            place_id, ingredient_name, unit, price_per_unit, last_seen_at,
+            last_changed_at, refresh_count, change_count, unchanged_streak
+        )
+        SELECT r.place_id, r.ingredient_name, r.unit, r.price_per_unit, r.last_seen_at,
+               r.last_changed_at, COALESCE(r.refresh_count, 1), COALESCE(r.change_count, 0),
+               COALESCE(r.unchanged_streak, 0)
+        FROM jsonb_to_recordset(p_rows) AS r(
+            place_id TEXT, ingredient_name TEXT, unit TEXT, price_per_unit NUMERIC,
+            last_seen_at TIMESTAMPTZ, last_changed_at TIMESTAMPTZ,
+            refresh_count INTEGER, change_count INTEGER, unchanged_streak INTEGER
+        )
+        ON CONFLICT (place_id, ingredient_name, unit) DO UPDATE
+        SET price_per_unit = EXCLUDED.price_per_unit,
+            last_seen_at = EXCLUDED.last_seen_at,
+            last_changed_at = EXCLUDED.last_changed_at,
+            refresh_count = EXCLUDED.refresh_count,
+            change_count = EXCLUDED.change_count,
+            unchanged_streak = EXCLUDED.unchanged_streak
+        WHERE sp.last_seen_at < p_run_started OR EXCLUDED.price_per_unit < sp.price_per_unit
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM written;
+$$;
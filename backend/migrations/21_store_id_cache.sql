@@ -0,0 +1,15 @@
+-- 21_store_id_cache.sql
+-- Cache of retailer store-ID lookups by lat/lon grid cell, shared by every
+-- refresh run and worker (app/services/store_id_resolver.py). A NULL
+-- external_id records that the lookup found nothing, so the cell is not
+-- re-queried until the entry expires.
+CREATE TABLE IF NOT EXISTS store_id_cache (
+    id_column TEXT NOT NULL,
+    grid_cell TEXT NOT NULL,
+    external_id TEXT,
+    resolved_at TIMESTAMPTZ NOT NULL DEFAULT timezone('utc', now()),
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (id_column, grid_cell)
+);
+
+CREATE INDEX IF NOT EXISTS idx_store_id_cache_expires_at ON store_id_cache(expires_at);
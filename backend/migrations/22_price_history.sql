@@ -0,0 +1,126 @@
+-- 22_price_history.sql
+-- Append-only price time series, range-partitioned by month on observed_at.
+-- A row is appended only when a refresh observes a new or changed price;
+-- unchanged prices just get stores_prices.last_seen_at bumped in bulk.
+CREATE TABLE IF NOT EXISTS price_history (
+    place_id TEXT NOT NULL,
+    ingredient_name TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    price_per_unit NUMERIC NOT NULL,
+    observed_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (place_id, ingredient_name, unit, observed_at)
+) PARTITION BY RANGE (observed_at);
+
+-- Trend queries look up one ingredient across stores over a time window
+CREATE INDEX IF NOT EXISTS idx_price_history_ingredient_observed
+    ON price_history(ingredient_name, observed_at);
+
+-- Create the partition holding p_month if it does not exist yet.
+CREATE OR REPLACE FUNCTION ensure_price_history_partition(p_month DATE)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_month)::DATE;
+    partition_name TEXT := format('price_history_%s', to_char(month_start, 'YYYY_MM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF price_history FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+    );
+END;
+$$;
+
+SELECT ensure_price_history_partition(current_date);
+SELECT ensure_price_history_partition((current_date + INTERVAL '1 month')::DATE);
+
+-- Seed the series with the current snapshot
+DO $$
+DECLARE
+    m DATE;
+BEGIN
+    FOR m IN SELECT DISTINCT date_trunc('month', last_seen_at)::DATE FROM stores_prices WHERE last_seen_at IS NOT NULL LOOP
+        PERFORM ensure_price_history_partition(m);
+    END LOOP;
+END;
+$$;
+
+INSERT INTO price_history (place_id, ingredient_name, unit, price_per_unit, observed_at)
+SELECT place_id, ingredient_name, unit, price_per_unit, last_seen_at
+FROM stores_prices
+WHERE last_seen_at IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+-- Write changed prices: upsert stores_prices and append what was written to
+-- price_history. With p_run_started (sharded runs, several workers writing
+-- the same store) an existing row is only replaced if it predates the run or
+-- the new price is cheaper. Replaces the version from migration 20.
+CREATE OR REPLACE FUNCTION upsert_store_prices(p_rows JSONB, p_run_started TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    m DATE;
+    written_count INTEGER;
+BEGIN
+    FOR m IN
+        SELECT DISTINCT date_trunc('month', (r->>'last_seen_at')::TIMESTAMPTZ)::DATE
+        FROM jsonb_array_elements(p_rows) AS r
+    LOOP
+        PERFORM ensure_price_history_partition(m);
+    END LOOP;
+
+    WITH written AS (
+        INSERT INTO stores_prices AS sp (
+            place_id, ingredient_name, unit, price_per_unit, last_seen_at,
+            last_changed_at, refresh_count, change_count, unchanged_streak
+        )
+        SELECT r.place_id, r.ingredient_name, r.unit, r.price_per_unit, r.last_seen_at,
+               r.last_changed_at, COALESCE(r.refresh_count, 1), COALESCE(r.change_count, 0),
+               COALESCE(r.unchanged_streak, 0)
+        FROM jsonb_to_recordset(p_rows) AS r(
+            place_id TEXT, ingredient_name TEXT, unit TEXT, price_per_unit NUMERIC,
+            last_seen_at TIMESTAMPTZ, last_changed_at TIMESTAMPTZ,
+            refresh_count INTEGER, change_count INTEGER, unchanged_streak INTEGER
+        )
+        ON CONFLICT (place_id, ingredient_name, unit) DO UPDATE
+        SET price_per_unit = EXCLUDED.price_per_unit,
+            last_seen_at = EXCLUDED.last_seen_at,
+            last_changed_at = EXCLUDED.last_changed_at,
+            refresh_count = EXCLUDED.refresh_count,
+            change_count = EXCLUDED.change_count,
+            unchanged_streak = EXCLUDED.unchanged_streak
+        WHERE p_run_started IS NULL
+           OR sp.last_seen_at < p_run_started
+           OR EXCLUDED.price_per_unit < sp.price_per_unit
+        RETURNING sp.place_id, sp.ingredient_name, sp.unit, sp.price_per_unit, sp.last_seen_at
+    ), appended AS (
+        INSERT INTO price_history (place_id, ingredient_name, unit, price_per_unit, observed_at)
+        SELECT place_id, ingredient_name, unit, price_per_unit, last_seen_at FROM written
+        ON CONFLICT DO NOTHING
+    )
+    SELECT count(*)::INTEGER INTO written_count FROM written;
+
+    RETURN written_count;
+END;
+$$;
+
+-- Mark unchanged prices as seen: one UPDATE for a whole chunk of keys.
+CREATE OR REPLACE FUNCTION touch_store_prices(p_keys JSONB, p_seen_at TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH touched AS (
+        UPDATE stores_prices AS sp
+        SET last_seen_at = p_seen_at,
+            refresh_count = sp.refresh_count + 1,
+            unchanged_streak = sp.unchanged_streak + 1
+        FROM jsonb_to_recordset(p_keys) AS k(place_id TEXT, ingredient_name TEXT, unit TEXT)
+        WHERE sp.place_id = k.place_id
+          AND sp.ingredient_name = k.ingredient_name
+          AND sp.unit = k.unit
+          AND sp.last_seen_at < p_seen_at
+        RETURNING 1
+    )
+    SELECT count(*)::INTEGER FROM touched;
+$$;
@@ -0,0 +1,12 @@
+-- 23_price_source_health.sql
+-- Per-source lookup outcomes carried across refresh runs, used by the source
+-- registry (app/services/source_registry.py) to route lookups to the source
+-- most likely to return a price fastest. Values are decayed sums: each run
+-- halves the stored figures before adding its own counts.
+CREATE TABLE IF NOT EXISTS price_source_health (
+    source TEXT PRIMARY KEY,
+    lookups DOUBLE PRECISION NOT NULL DEFAULT 0,
+    priced DOUBLE PRECISION NOT NULL DEFAULT 0,
+    latency_s DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT timezone('utc', now())
+);
@@ -0,0 +1,11 @@
+-- 24_product_pins.sql
+-- product_mappings doubles as the refresh's ingredient -> product pin table
+-- (app/services/product_pins.py): the first search for an (ingredient,
+-- retailer) pair pins the product it found, later refreshes price that
+-- product by ID, and it is only re-searched once the retailer no longer
+-- knows the ID. Rows inserted by hand or by migration 16 keep working: they
+-- have no source and are replaced the first time their ID fails to resolve.
+ALTER TABLE product_mappings
+    ADD COLUMN IF NOT EXISTS source TEXT,
+    ADD COLUMN IF NOT EXISTS product_name TEXT,
+    ADD COLUMN IF NOT EXISTS pinned_at TIMESTAMPTZ;
@@ -0,0 +1,16 @@
+-- 25_price_bounds.sql
+-- Learned realistic price range per (canonical ingredient key, canonical
+-- unit), computed from stores_prices and recent price_history by
+-- scripts/compute_price_bounds.py. The pricing path accepts a price when it
+-- falls inside [lower, upper] and only uses the keyword heuristics for
+-- ingredient/unit pairs without a row here (app/services/price_bounds.py).
+CREATE TABLE IF NOT EXISTS price_bounds (
+    ingredient_key TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    median NUMERIC NOT NULL,
+    lower NUMERIC NOT NULL,
+    upper NUMERIC NOT NULL,
+    samples INTEGER NOT NULL,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT timezone('utc', now()),
+    PRIMARY KEY (ingredient_key, unit)
+);
@@ -0,0 +1,129 @@
+-- 26_grocery_for_plan.sql
+-- Aggregate a plan's grocery list in the database: one row per ingredient
+-- and unit with quantities multiplied by servings, instead of shipping the
+-- meal_plan_recipes -> recipes -> recipe_ingredients -> ingredients tree to
+-- the API and summing it there. Used by GET /grocery/{plan_id} and the cart
+-- export endpoints (app/services/grocery_list.py).
+
+-- Recipe unit spellings -> canonical unit, dimension and size in the
+-- dimension's base unit (g, ml, each). Mirrors UNIT_SIZES and UNIT_ALIASES in
+-- app/services/unit_conversion.py (tests/test_grocery_list.py keeps them in
+-- sync). Sub-units sized per ingredient class (slice, clove, ...) have no size.
+CREATE TABLE IF NOT EXISTS unit_sizes (
+    unit TEXT PRIMARY KEY,
+    canonical_unit TEXT NOT NULL,
+    dimension TEXT NOT NULL CHECK (dimension IN ('mass', 'volume', 'count')),
+    size NUMERIC
+);
+
+INSERT INTO unit_sizes (unit, canonical_unit, dimension, size) VALUES
+    ('g', 'g', 'mass', 1.0),
+    ('kg', 'kg', 'mass', 1000.0),
+    ('lb', 'lb', 'mass', 453.592),
+    ('oz', 'oz', 'mass', 28.3495),
+    ('ml', 'ml', 'volume', 1.0),
+    ('l', 'l', 'volume', 1000.0),
+    ('fl-oz', 'fl-oz', 'volume', 29.5735),
+    ('cup', 'cup', 'volume', 236.588),
+    ('tbsp', 'tbsp', 'volume', 14.7868),
+    ('tsp', 'tsp', 'volume', 4.92892),
+    ('pint', 'pint', 'volume', 473.176),
+    ('quart', 'quart', 'volume', 946.353),
+    ('gallon', 'gallon', 'volume', 3785.41),
+    ('each', 'each', 'count', 1.0),
+    ('stalk', 'stalk', 'count', 1.0),
+    ('slice', 'slice', 'count', NULL),
+    ('wedge', 'wedge', 'count', NULL),
+    ('clove', 'clove', 'count', NULL),
+    ('sprig', 'sprig', 'count', NULL),
+    ('leaf', 'leaf', 'count', NULL),
+    ('gram', 'g', 'mass', 1.0),
+    ('grams', 'g', 'mass', 1.0),
+    ('gr', 'g', 'mass', 1.0),
+    ('kilogram', 'kg', 'mass', 1000.0),
+    ('kilograms', 'kg', 'mass', 1000.0),
+    ('kgs', 'kg', 'mass', 1000.0),
+    ('lbs', 'lb', 'mass', 453.592),
+    ('pound', 'lb', 'mass', 453.592),
+    ('pounds', 'lb', 'mass', 453.592),
+    ('ounce', 'oz', 'mass', 28.3495),
+    ('ounces', 'oz', 'mass', 28.3495),
+    ('milliliter', 'ml', 'volume', 1.0),
+    ('milliliters', 'ml', 'volume', 1.0),
+    ('millilitre', 'ml', 'volume', 1.0),
+    ('mls', 'ml', 'volume', 1.0),
+    ('liter', 'l', 'volume', 1000.0),
+    ('liters', 'l', 'volume', 1000.0),
+    ('litre', 'l', 'volume', 1000.0),
+    ('litres', 'l', 'volume', 1000.0),
+    ('lt', 'l', 'volume', 1000.0),
+    ('floz', 'fl-oz', 'volume', 29.5735),
+    ('fl.-oz', 'fl-oz', 'volume', 29.5735),
+    ('fl.oz', 'fl-oz', 'volume', 29.5735),
+    ('fluid-ounce', 'fl-oz', 'volume', 29.5735),
+    ('fluid-ounces', 'fl-oz', 'volume', 29.5735),
+    ('cups', 'cup', 'volume', 236.588),
+    ('c', 'cup', 'volume', 236.588),
+    ('tablespoon', 'tbsp', 'volume', 14.7868),
+    ('tablespoons', 'tbsp', 'volume', 14.7868),
+    ('tbs', 'tbsp', 'volume', 14.7868),
+    ('tbl', 'tbsp', 'volume', 14.7868),
+    ('teaspoon', 'tsp', 'volume', 4.92892),
+    ('teaspoons', 'tsp', 'volume', 4.92892),
+    ('pt', 'pint', 'volume', 473.176),
+    ('pints', 'pint', 'volume', 473.176),
+    ('qt', 'quart', 'volume', 946.353),
+    ('quarts', 'quart', 'volume', 946.353),
+    ('gal', 'gallon', 'volume', 3785.41),
+    ('gallons', 'gallon', 'volume', 3785.41),
+    ('ct', 'each', 'count', 1.0),
+    ('count', 'each', 'count', 1.0),
+    ('piece', 'each', 'count', 1.0),
+    ('pieces', 'each', 'count', 1.0),
+    ('item', 'each', 'count', 1.0),
+    ('items', 'each', 'count', 1.0),
+    ('ea', 'each', 'count', 1.0),
+    ('whole', 'each', 'count', 1.0),
+    ('slices', 'slice', 'count', NULL),
+    ('wedges', 'wedge', 'count', NULL),
+    ('cloves', 'clove', 'count', NULL),
+    ('sprigs', 'sprig', 'count', NULL),
+    ('leaves', 'leaf', 'count', NULL),
+    ('stalks', 'stalk', 'count', 1.0)
+ON CONFLICT (unit) DO UPDATE
+SET canonical_unit = EXCLUDED.canonical_unit,
+    dimension = EXCLUDED.dimension,
+    size = EXCLUDED.size;
+
+-- Weights and volumes of one ingredient are summed in the largest unit the
+-- plan uses for it (2 cups + 4 tbsp -> 2.25 cup). Counts and unknown units
+-- only sum with the same canonical unit; weight and volume stay separate
+-- rows since relating them needs the ingredient's density.
+CREATE OR REPLACE FUNCTION get_grocery_for_plan(p_plan_id UUID)
+RETURNS TABLE(name TEXT, unit TEXT, quantity DOUBLE PRECISION)
+LANGUAGE sql STABLE
+AS $$
+    WITH lines AS (
+        SELECT lower(i.name) AS name,
+               COALESCE(us.canonical_unit, spelled.unit) AS unit,
+               us.dimension,
+               us.size,
+               ri.quantity * COALESCE(mpr.servings, 1) AS quantity
+        FROM meal_plan_recipes mpr
+        JOIN recipe_ingredients ri ON ri.recipe_id = mpr.recipe_id
+        JOIN ingredients i ON i.id = ri.ingredient_id
+        CROSS JOIN LATERAL (SELECT rtrim(replace(lower(trim(ri.unit)), ' ', '-'), '.') AS unit) AS spelled
+        LEFT JOIN unit_sizes us ON us.unit = spelled.unit
+        WHERE mpr.meal_plan_id = p_plan_id
+          AND spelled.unit <> ''
+    )
+    SELECT name,
+           (array_agg(unit ORDER BY size DESC NULLS LAST, unit))[1] AS unit,
+           (CASE WHEN bool_and(dimension IN ('mass', 'volume'))
+                 THEN sum(quantity * size) / max(size)
+                 ELSE sum(quantity)
+            END)::DOUBLE PRECISION AS quantity
+    FROM lines
+    GROUP BY name, CASE WHEN dimension IN ('mass', 'volume') THEN ':' || dimension ELSE unit END
+    ORDER BY name, unit;
+$$;
@@ -0,0 +1,24 @@
+-- 27_price_snapshot_version.sql
+-- Monotonic version of the price data. Every writer that changes prices
+-- (scripts/refresh_prices.py and its workers per written chunk,
+-- scripts/compute_price_bounds.py) bumps it; the API caches computed grocery
+-- lists per (plan_id, version), so a bump invalidates them all
+-- (app/services/grocery_cache.py).
+CREATE TABLE IF NOT EXISTS price_snapshot (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    bumped_at TIMESTAMPTZ NOT NULL DEFAULT timezone('utc', now())
+);
+
+INSERT INTO price_snapshot (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_price_snapshot_version()
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+    UPDATE price_snapshot
+    SET version = version + 1,
+        bumped_at = timezone('utc', now())
+    WHERE id
+    RETURNING version;
+$$;
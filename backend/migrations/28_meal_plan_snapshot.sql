@@ -0,0 +1,8 @@
+-- 28_meal_plan_snapshot.sql
+-- Assembled plan document written at generation next to the relational
+-- meal_plan_recipes / recipes / recipe_ingredients rows: days, meals, recipes
+-- with their ingredients and the selected stores. GET /meal-plans/{plan_id}
+-- serves it with one primary-key lookup and overlays current prices
+-- (app/services/meal_plan_view.py). The document is never updated after
+-- generation; plans without one are rebuilt from the relational rows.
+ALTER TABLE meal_plans ADD COLUMN IF NOT EXISTS snapshot JSONB;
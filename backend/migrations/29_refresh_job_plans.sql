@@ -0,0 +1,8 @@
+-- 29_refresh_job_plans.sql
+-- Ingredients each sharded-refresh shard should fetch, decided once when the
+-- run is planned (scripts/refresh_workers.py). Shards run per store ×
+-- retailer but stores_prices keeps one row per (store, ingredient), so a
+-- shard planning from the live table would skip whatever another retailer's
+-- shard for the same store had just refreshed. NULL: the worker plans the
+-- shard itself (full refreshes, runs planned before this migration).
+ALTER TABLE price_refresh_jobs ADD COLUMN IF NOT EXISTS planned_ingredients JSONB;
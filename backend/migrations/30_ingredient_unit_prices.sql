@@ -0,0 +1,17 @@
+-- 30_ingredient_unit_prices.sql
+-- Every store's prices for a set of ingredients, collapsed to the distinct
+-- (ingredient_name, unit, price_per_unit) rows. The global fallback of
+-- pricing.get_prices_per_unit and the baseline column of
+-- pricing.get_price_matrix only need the cheapest realistic price at any
+-- store, which the API picks after its unit conversion and realism checks,
+-- so they read this instead of one row per store. Prices repeated across a
+-- chain's stores (and fallback estimates) come back once.
+CREATE OR REPLACE FUNCTION ingredient_unit_prices(p_names TEXT[])
+RETURNS TABLE(ingredient_name TEXT, unit TEXT, price_per_unit NUMERIC)
+LANGUAGE sql STABLE
+AS $$
+    SELECT DISTINCT sp.ingredient_name, sp.unit, sp.price_per_unit
+    FROM stores_prices sp
+    WHERE sp.ingredient_name = ANY(p_names)
+      AND sp.price_per_unit > 0;
+$$;
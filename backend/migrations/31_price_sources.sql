@@ -0,0 +1,61 @@
+-- 31_price_sources.sql
+-- The price source (source_registry name) that produced each stored price.
+-- scripts/compute_price_bounds.py leaves out estimate sources such as
+-- safeway_fallback, whose made-up prices repeat across every store and
+-- would otherwise collapse the learned ranges around themselves. NULL for
+-- rows written before this migration.
+ALTER TABLE stores_prices ADD COLUMN IF NOT EXISTS source TEXT;
+ALTER TABLE price_history ADD COLUMN IF NOT EXISTS source TEXT;
+
+-- upsert_store_prices from migration 22, now writing the source through to
+-- both tables.
+CREATE OR REPLACE FUNCTION upsert_store_prices(p_rows JSONB, p_run_started TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    m DATE;
+    written_count INTEGER;
+BEGIN
+    FOR m IN
+        SELECT DISTINCT date_trunc('month', (r->>'last_seen_at')::TIMESTAMPTZ)::DATE
+        FROM jsonb_array_elements(p_rows) AS r
+    LOOP
+        PERFORM ensure_price_history_partition(m);
+    END LOOP;
+
+    WITH written AS (
+        INSERT INTO stores_prices AS sp (
+            place_id, ingredient_name, unit, price_per_unit, source, last_seen_at,
+            last_changed_at, refresh_count, change_count, unchanged_streak
+        )
+        SELECT r.place_id, r.ingredient_name, r.unit, r.price_per_unit, r.source, r.last_seen_at,
+               r.last_changed_at, COALESCE(r.refresh_count, 1), COALESCE(r.change_count, 0),
+               COALESCE(r.unchanged_streak, 0)
+        FROM jsonb_to_recordset(p_rows) AS r(
+            place_id TEXT, ingredient_name TEXT, unit TEXT, price_per_unit NUMERIC, source TEXT,
+            last_seen_at TIMESTAMPTZ, last_changed_at TIMESTAMPTZ,
+            refresh_count INTEGER, change_count INTEGER, unchanged_streak INTEGER
+        )
+        ON CONFLICT (place_id, ingredient_name, unit) DO UPDATE
+        SET price_per_unit = EXCLUDED.price_per_unit,
+            source = EXCLUDED.source,
+            last_seen_at = EXCLUDED.last_seen_at,
+            last_changed_at = EXCLUDED.last_changed_at,
+            refresh_count = EXCLUDED.refresh_count,
+            change_count = EXCLUDED.change_count,
+            unchanged_streak = EXCLUDED.unchanged_streak
+        WHERE p_run_started IS NULL
+           OR sp.last_seen_at < p_run_started
+           OR EXCLUDED.price_per_unit < sp.price_per_unit
+        RETURNING sp.place_id, sp.ingredient_name, sp.unit, sp.price_per_unit, sp.source, sp.last_seen_at
+    ), appended AS (
+        INSERT INTO price_history (place_id, ingredient_name, unit, price_per_unit, source, observed_at)
+        SELECT place_id, ingredient_name, unit, price_per_unit, source, last_seen_at FROM written
+        ON CONFLICT DO NOTHING
+    )
+    SELECT count(*)::INTEGER INTO written_count FROM written;
+
+    RETURN written_count;
+END;
+$$;
@@ -0,0 +1,13 @@
+-- 32_price_refresh_misses.sql
+-- Lookups that found no price for a (store, ingredient) never priced before.
+-- Without a stores_prices row such a key looked never tried, so the refresh
+-- scheduler put it first on every run and it ate the request budget; with
+-- the time of the last attempt and the number of misses in a row it backs
+-- off like a stable price (app/services/refresh_scheduler.py).
+CREATE TABLE IF NOT EXISTS price_refresh_misses (
+    place_id TEXT NOT NULL,
+    ingredient_name TEXT NOT NULL,
+    last_attempted_at TIMESTAMPTZ NOT NULL,
+    miss_count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (place_id, ingredient_name)
+);
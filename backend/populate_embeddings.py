@@ -2,20 +2,49 @@
 """
 Script to populate embeddings for existing ingredients in the database.
 Run this once to initialize the RAG system with embeddings for all existing ingredients.
+
+The backfill pages through ingredients by keyset (ordered by id) so it is not
+capped by Supabase's default row limit, embeds each page in large API batches
+on a bounded thread pool, and checkpoints the last processed id to a local
+state file. Re-running the script resumes where the previous run stopped;
+pass --reset to start over.
+
+Environment:
+    EMBED_PAGE_SIZE    – rows fetched per keyset page (default 1000)
+    EMBED_BATCH_SIZE   – names sent per embeddings API call (default 256)
+    EMBED_CONCURRENCY  – concurrent API calls / writers (default 4)
 """
 
 import os
 import sys
+import json
+import time
+import random
 import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional
 
 # Add the app directory to the Python path
 app_dir = Path(__file__).parent / "app"
 sys.path.insert(0, str(app_dir))
 
+from openai import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+
 from app.services.embeddings import get_embedding_service
 from app.core.supabase import get_supabase_admin
 
+PAGE_SIZE = int(os.getenv("EMBED_PAGE_SIZE", "1000"))
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+MAX_RETRIES = 6
+
+STATE_FILE = Path(__file__).parent / ".embedding_backfill_state.json"
+
+# Errors worth retrying with backoff; anything else fails the batch outright.
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
 def setup_logging():
     """Set up logging configuration."""
     logging.basicConfig(
@@ -24,120 +53,191 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-def populate_embeddings():
+def load_state() -> Dict:
+    """Return the checkpoint from a previous run, or a fresh state."""
+    if STATE_FILE.exists():
+        try:
+            return json.loads(STATE_FILE.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable state file {STATE_FILE}: {e}")
+    return {"last_id": None, "successful": 0, "failed": 0}
+
+def save_state(state: Dict):
+    """Atomically persist the checkpoint so an interrupted run can resume."""
+    tmp_path = STATE_FILE.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(state))
+    tmp_path.replace(STATE_FILE)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying, honouring Retry-After when the API sends one."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter, capped at one minute
+    return random.uniform(0, min(60.0, 2 ** attempt))
+
+def embed_with_backoff(embedding_service, names: List[str]) -> List[List[float]]:
+    """Embed a batch of names, backing off on rate limits and transient errors."""
+    for attempt in range(MAX_RETRIES):
+        try:
+            return embedding_service.generate_embeddings(names)
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            delay = _retry_delay(e, attempt)
+            logging.warning(f"Embedding batch throttled/failed ({type(e).__name__}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+    return []
+
+def process_batch(embedding_service, supabase, batch: List[Dict]) -> int:
+    """Embed one batch and write the vectors back. Returns the number of rows written."""
+    names = [ing["name"].strip().lower() for ing in batch]
+    try:
+        vectors = embed_with_backoff(embedding_service, names)
+    except Exception as e:
+        logging.error(f"✗ Failed to embed batch starting at '{batch[0]['name']}': {e}")
+        return 0
+
+    written = 0
+    for ing, vector in zip(batch, vectors):
+        try:
+            supabase.table("ingredients").update({"embedding": vector}).eq("id", ing["id"]).execute()
+            written += 1
+        except Exception as e:
+            logging.warning(f"✗ Failed to store embedding for '{ing['name']}': {e}")
+    return written
+
+def fetch_page(supabase, last_id: Optional[str]) -> List[Dict]:
+    """Return the next keyset page of ingredients still missing an embedding."""
+    query = supabase.table("ingredients").select("id, name").is_("embedding", "null")
+    if last_id is not None:
+        query = query.gt("id", last_id)
+    return query.order("id").limit(PAGE_SIZE).execute().data or []
+
+def populate_embeddings(total_missing: int = 0, reset: bool = False):
     """Populate embeddings for all ingredients without embeddings."""
     logging.info("Starting ingredient embedding population...")
-    
+
     try:
         # Get services
         embedding_service = get_embedding_service()
         supabase = get_supabase_admin()
-        
-        # Get all ingredients without embeddings
-        result = supabase.table("ingredients").select("id, name").is_("embedding", "null").execute()
-        
-        ingredients = result.data or []
-        total_count = len(ingredients)
-        
-        if total_count == 0:
-            logging.info("No ingredients found without embeddings. All ingredients are already processed.")
-            return True
-        
-        logging.info(f"Found {total_count} ingredients without embeddings. Starting processing...")
-        
-        # Process ingredients in batches
-        batch_size = 20
-        successful = 0
-        failed = 0
-        
-        for i in range(0, total_count, batch_size):
-            batch = ingredients[i:i + batch_size]
-            batch_names = [ing["name"] for ing in batch]
-            
-            logging.info(f"Processing batch {i//batch_size + 1}/{(total_count + batch_size - 1)//batch_size}: {len(batch_names)} ingredients")
-            
-            # Process batch
-            results = embedding_service.batch_embed_ingredients(batch_names)
-            
-            # Count results
-            for name, ingredient_id in results.items():
-                if ingredient_id:
-                    successful += 1
-                    logging.info(f"✓ {name} -> {ingredient_id}")
-                else:
-                    failed += 1
-                    logging.warning(f"✗ Failed to process: {name}")
-        
+
+        state = {"last_id": None, "successful": 0, "failed": 0} if reset else load_state()
+        if state["last_id"] is not None:
+            logging.info(f"Resuming after ingredient id {state['last_id']} "
+                         f"({state['successful']} embedded in previous runs)")
+
+        started = time.monotonic()
+        done_this_run = 0
+
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+            while True:
+                page = [ing for ing in fetch_page(supabase, state["last_id"]) if ing.get("name")]
+                if not page:
+                    break
+
+                batches = [page[i:i + BATCH_SIZE] for i in range(0, len(page), BATCH_SIZE)]
+                written = sum(pool.map(lambda b: process_batch(embedding_service, supabase, b), batches))
+
+                state["successful"] += written
+                state["failed"] += len(page) - written
+                state["last_id"] = page[-1]["id"]
+                save_state(state)
+
+                done_this_run += len(page)
+                elapsed = time.monotonic() - started
+                rate = done_this_run / elapsed if elapsed > 0 else 0.0
+                remaining = max(total_missing - done_this_run, 0)
+                eta = f"{remaining / rate:.0f}s" if rate > 0 and total_missing else "unknown"
+                logging.info(f"Processed {done_this_run}/{total_missing or '?'} rows "
+                             f"({rate:.1f} rows/s, ETA {eta}); last id {state['last_id']}")
+
+        if done_this_run == 0:
+            logging.info("No ingredients found without embeddings past the checkpoint.")
+
         logging.info(f"Embedding population completed!")
-        logging.info(f"Total processed: {total_count}")
-        logging.info(f"Successful: {successful}")
-        logging.info(f"Failed: {failed}")
-        logging.info(f"Success rate: {successful/total_count*100:.1f}%")
-        
-        return failed == 0
-        
+        logging.info(f"Total processed this run: {done_this_run}")
+        logging.info(f"Successful (all runs): {state['successful']}")
+        logging.info(f"Failed (all runs): {state['failed']}")
+
+        # A finished pass has nothing left to resume; failed rows are picked up
+        # again from the start on the next run.
+        if STATE_FILE.exists():
+            STATE_FILE.unlink()
+
+        return state["failed"] == 0
+
     except Exception as e:
-        logging.error(f"Error during embedding population: {e}")
+        logging.error(f"Error during embedding population (progress is checkpointed): {e}")
         return False
 
 def check_embedding_stats():
     """Check and display embedding statistics."""
     try:
         supabase = get_supabase_admin()
-        
+
         # Get total ingredients
         total_result = supabase.table("ingredients").select("id", count="exact").execute()
         total = total_result.count or 0
-        
+
         # Get ingredients with embeddings
         embedded_result = supabase.table("ingredients").select("id", count="exact").not_.is_("embedding", "null").execute()
         embedded = embedded_result.count or 0
-        
+
         # Get ingredients without embeddings
         missing_result = supabase.table("ingredients").select("id", count="exact").is_("embedding", "null").execute()
         missing = missing_result.count or 0
-        
+
         logging.info("=== Embedding Statistics ===")
         logging.info(f"Total ingredients: {total}")
         logging.info(f"With embeddings: {embedded}")
         logging.info(f"Missing embeddings: {missing}")
         logging.info(f"Coverage: {embedded/total*100:.1f}%" if total > 0 else "Coverage: 0%")
-        
+
         return {
             "total": total,
-            "embedded": embedded, 
+            "embedded": embedded,
             "missing": missing,
             "coverage": embedded/total if total > 0 else 0
         }
-        
+
     except Exception as e:
         logging.error(f"Error checking embedding stats: {e}")
         return None
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Backfill ingredient embeddings")
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and start from the first row")
+    args = parser.parse_args()
+
     setup_logging()
-    
+
     logging.info("Ingredient Embedding Population Tool")
     logging.info("=" * 40)
-    
+
     # Check initial stats
     initial_stats = check_embedding_stats()
     if not initial_stats:
         logging.error("Failed to check initial statistics")
         return 1
-    
+
     if initial_stats["missing"] == 0:
         logging.info("All ingredients already have embeddings. Nothing to do.")
         return 0
-    
+
     # Populate embeddings
-    success = populate_embeddings()
-    
+    success = populate_embeddings(initial_stats["missing"], reset=args.reset)
+
     # Check final stats
     logging.info("\nFinal statistics:")
     final_stats = check_embedding_stats()
-    
+
     if success and final_stats and final_stats["missing"] == 0:
         logging.info("🎉 All ingredients now have embeddings! RAG system is ready.")
         return 0
@@ -147,4 +247,4 @@ def main():
 
 if __name__ == "__main__":
     exit_code = main()
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(exit_code)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""Benchmark app/services/basket_optimizer.py.
+
+Times optimize_basket on random items × stores cost matrices (a share of
+cells unpriced) for a range of store counts and store limits, and reports
+how far the greedy + swap heuristic lands from the exact optimum where both
+can run.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_basket_optimizer.py
+
+Environment:
+    BENCH_ITEMS   – items in the grocery list (default 100).
+    BENCH_MISSING – share of (item, store) cells without a price (default 0.3).
+    BENCH_REPEAT  – timed runs, best is reported (default 5).
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+
+from app.services import basket_optimizer
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+ITEMS = int(os.getenv("BENCH_ITEMS", "100"))
+MISSING = float(os.getenv("BENCH_MISSING", "0.3"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+# (stores, max stores)
+CASES = [(5, 2), (10, 3), (12, 3), (15, 4), (20, 4), (30, 5), (50, 6)]
+
+
+def costs_matrix(rng, n_stores):
+    costs = rng.uniform(0.5, 12.0, (ITEMS, n_stores))
+    costs[rng.random(costs.shape) < MISSING] = np.nan
+    return costs
+
+
+def best_of(fn, *args):
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def heuristic(costs, k):
+    exact_max = basket_optimizer.EXACT_MAX_SUBSETS
+    basket_optimizer.EXACT_MAX_SUBSETS = 0
+    try:
+        return basket_optimizer.optimize_basket(costs, k)
+    finally:
+        basket_optimizer.EXACT_MAX_SUBSETS = exact_max
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for n_stores, k in CASES:
+        costs = costs_matrix(rng, n_stores)
+        elapsed, plan = best_of(basket_optimizer.optimize_basket, costs, k)
+        heuristic_elapsed, greedy = best_of(heuristic, costs, k)
+        gap = f"{(greedy.total / plan.total - 1) * 100:+.2f}%" if plan.exact else "n/a"
+        logging.info(
+            "%3d items × %2d stores, K=%d: %s %.2f ms (total %.2f, %d stores) | heuristic %.2f ms, gap %s",
+            ITEMS, n_stores, k, "exact" if plan.exact else "heuristic", elapsed * 1000, plan.total,
+            len(plan.stores), heuristic_elapsed * 1000, gap,
+        )
+
+
+if __name__ == "__main__":
+    main()
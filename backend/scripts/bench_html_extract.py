@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""Benchmark app/services/html_extract.py against the regex extraction it replaced.
+
+Builds synthetic search pages shaped like the real ones (a few MB of markup
+around one large embedded state object) and times, per case, the legacy
+``re.DOTALL`` patterns + ``json.loads`` against the bounded scanner + fast
+decoder. Also reports whether each approach found the right value: the lazy
+``{.*?};`` patterns stop at the first ``};`` even inside a string, and the
+product-card pattern pairs a card without a price with the next card's.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_html_extract.py
+
+Environment:
+    BENCH_PAGE_KB – approximate size of the markup around the state (default 2000).
+    BENCH_ITEMS   – products in the embedded state (default 2000).
+    BENCH_REPEAT  – timed runs per case, best is reported (default 5).
+"""
+
+import json
+import logging
+import os
+import re
+import time
+
+from app.services.html_extract import first_json_blob, iter_json_ld, orjson
+from app.services.instacart_public import InstacartPublicAPI
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+PAGE_KB = int(os.getenv("BENCH_PAGE_KB", "2000"))
+ITEMS = int(os.getenv("BENCH_ITEMS", "2000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+# The patterns the sources used before html_extract
+LEGACY_WALMART = r'window\.__WML_REDUX_INITIAL_STATE__\s*=\s*(\{.*?\})\s*;'
+LEGACY_STATE = r'window\.__INITIAL_STATE__\s*=\s*({.*?});'
+LEGACY_JSON_LD = r'<script type="application/ld\+json">(.*?)</script>'
+LEGACY_CARD = r'data-testid="product-card".*?data-product-id="([^"]+)".*?<h3[^>]*>([^<]+)</h3>.*?\$(\d+\.?\d*)'
+
+
+def markup(kb: int) -> str:
+    block = (
+        '<div class="tile" style="{display:flex}"><a href="/ip/123">Item</a>'
+        "<script>if (a) { b(); };</script></div>\n"
+    )
+    return block * (kb * 1024 // len(block))
+
+
+def state(items: int, tricky: bool) -> dict:
+    # `tricky` descriptions contain `};`, which ends the legacy lazy match early
+    desc = "Great value }; buy now" if tricky else "Great value, buy now"
+    return {
+        "search": {
+            "searchResult": {
+                "itemStacks": [
+                    {"items": [{"id": i, "name": f"item {i}", "description": desc, "price": {"price": 1.0 + i / 100}}
+                               for i in range(items)]}
+                ]
+            }
+        }
+    }
+
+
+def page(marker: str, data: dict, kb: int) -> str:
+    half = markup(kb // 2)
+    return (
+        f"<html><body>{half}<script>{marker} = {json.dumps(data)};</script>"
+        f'<script type="application/ld+json">{json.dumps({"@type": "Product", "offers": {"price": "3.49"}})}</script>'
+        f"{half}</body></html>"
+    )
+
+
+def cards_page(cards: int, with_price_every: int) -> str:
+    parts = []
+    for i in range(cards):
+        price = f"<span>${i % 20 + 1}.99</span>" if i % with_price_every == 0 else "<span>see options</span>"
+        parts.append(
+            f'<div data-testid="product-card" data-product-id="p{i}"><h3>Product {i}</h3>{price}</div>'
+            + '<div class="spacer"></div>' * 20
+        )
+    return "<html><body>" + "".join(parts) + "</body></html>"
+
+
+def legacy_blob(pattern, html):
+    for match in re.findall(pattern, html, re.DOTALL):
+        try:
+            return json.loads(match)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def best_of(fn, *args) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    logging.info("page ~%d KB, %d items, orjson=%s, best of %d", PAGE_KB, ITEMS, orjson is not None, REPEAT)
+    cases = []
+
+    for tricky in (False, True):
+        data = state(ITEMS, tricky)
+        html = page("window.__WML_REDUX_INITIAL_STATE__", data, PAGE_KB)
+        label = "walmart state" + (" ('};' in strings)" if tricky else "")
+        cases.append((
+            label, len(html), data,
+            lambda h=html: legacy_blob(LEGACY_WALMART, h),
+            lambda h=html: first_json_blob(h, ["window.__WML_REDUX_INITIAL_STATE__"]),
+        ))
+
+    html = page("window.__INITIAL_STATE__", state(ITEMS, False), PAGE_KB)
+    cases.append((
+        "safeway state + json-ld", len(html), None,
+        lambda h=html: (legacy_blob(LEGACY_STATE, h), legacy_blob(LEGACY_JSON_LD, h)),
+        lambda h=html: (first_json_blob(h, ["window.__INITIAL_STATE__"]), next(iter_json_ld(h), None)),
+    ))
+
+    cards = max(ITEMS // 2, 1)
+    html = cards_page(cards, with_price_every=4)
+    parser = InstacartPublicAPI()
+    cases.append((
+        "instacart cards (1 in 4 priced)", len(html), [(f"p{i}", f"{i % 20 + 1}.99") for i in range(0, cards, 4)],
+        lambda h=html: [(m[0], m[2]) for m in re.findall(LEGACY_CARD, h, re.DOTALL)],
+        lambda h=html: [(p["id"], f"{p['price']:.2f}") for p in parser._extract_products_with_regex(h, "")],
+    ))
+
+    for label, size, expected, legacy, bounded in cases:
+        legacy_ms, legacy_result = best_of(legacy)
+        bounded_ms, bounded_result = best_of(bounded)
+        if expected is not None:
+            legacy_ok, bounded_ok = legacy_result == expected, bounded_result == expected
+        else:
+            legacy_ok, bounded_ok = True, legacy_result == bounded_result
+        logging.info(
+            "%-32s %6.1f MB | regex %8.1f ms%s | html_extract %8.1f ms%s | %5.1fx",
+            label, size / 1e6, legacy_ms, "" if legacy_ok else " (WRONG)",
+            bounded_ms, "" if bounded_ok else " (DIFFERS)", legacy_ms / bounded_ms if bounded_ms else float("inf"),
+        )
+
+
+if __name__ == "__main__":
+    main()
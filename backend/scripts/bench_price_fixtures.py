@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""Offline benchmark and regression check of price-source parsers.
+
+Replays every fixture in backend/tests/fixtures/http (recorded by
+scripts/record_price_fixtures.py or built by
+scripts/synthesize_price_fixtures.py; no network access or credentials
+needed) and reports per source:
+
+- whether each lookup still returns the recorded price (any mismatch, or a
+  request missing from the fixture, fails the run),
+- lookups/s and ms per lookup through ``async_fetch_price``,
+- parse ms per lookup, i.e. the time spent outside the replayed transport,
+- peak traced memory of one pass over the fixture.
+
+Sources' politeness delays between requests (time.sleep / asyncio.sleep)
+are skipped during replay, so the timings are the parser's own.
+
+An empty fixture directory, or one where no fixture could be replayed, fails
+the run too. With --baseline, a source more than --max-slowdown times slower than in the
+baseline JSON (a previous --json output) also fails the run.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_price_fixtures.py [--json out.json] [--baseline base.json]
+
+Environment:
+    BENCH_ROUNDS – passes over each fixture for the timing (default 20).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+from unittest import mock
+
+from app.services import kroger
+from app.services.http_clients import close_async_clients
+from app.services.http_fixtures import FIXTURE_DIR, Cassette, replaying
+from app.services.source_registry import SOURCE_CLASSES, make_source
+from app.services.token_provider import TokenProvider
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+PRICE_TOLERANCE = 1e-6
+
+
+def _same_price(expected, actual) -> bool:
+    if expected is None or actual is None:
+        return expected is actual
+    return math.isclose(float(expected), float(actual), rel_tol=PRICE_TOLERANCE)
+
+
+async def _no_async_sleep(delay, result=None):
+    return result
+
+
+@contextmanager
+def no_request_delays() -> Iterator[None]:
+    """Skip the sleeps sources take between live requests (ALDI, Safeway HTML)."""
+    with mock.patch("time.sleep", lambda seconds: None), mock.patch("asyncio.sleep", _no_async_sleep):
+        yield
+
+
+async def _lookups(source, lookups: List[Dict], rounds: int = 1) -> List:
+    for _ in range(rounds):
+        results = [await source.async_fetch_price(l["store"], l["ingredient"], l["unit"]) for l in lookups]
+    return results
+
+
+async def _run_lookups(source, lookups: List[Dict]) -> List:
+    results = await _lookups(source, lookups)
+    await close_async_clients()
+    return results
+
+
+def bench_cassette(cassette: Cassette, rounds: int = ROUNDS) -> Dict:
+    """Replay *cassette* through its source; return correctness, timing and memory figures."""
+    source = make_source(cassette.source)
+    lookups = cassette.lookups
+    transport_seconds = 0.0
+    replay = cassette.response_for
+
+    def timed_replay(request):
+        nonlocal transport_seconds
+        started = time.perf_counter()
+        try:
+            return replay(request)
+        finally:
+            transport_seconds += time.perf_counter() - started
+
+    cassette.response_for = timed_replay
+    try:
+        with replaying(cassette), no_request_delays():
+            results = asyncio.run(_run_lookups(source, lookups))
+            mismatches = [
+                {"ingredient": l["ingredient"], "expected": [l["price"], l["price_unit"]], "got": list(r)}
+                for l, r in zip(lookups, results)
+                if not _same_price(l["price"], r[0]) or l["price_unit"] != r[1]
+            ]
+
+            tracemalloc.start()
+            asyncio.run(_run_lookups(source, lookups))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            async def timed() -> float:
+                nonlocal transport_seconds
+                # One event loop for all rounds, with the pooled client warmed up
+                await _lookups(source, lookups[:1])
+                transport_seconds = 0.0
+                started = time.perf_counter()
+                await _lookups(source, lookups, rounds)
+                elapsed = time.perf_counter() - started
+                await close_async_clients()
+                return elapsed
+
+            elapsed = asyncio.run(timed())
+    finally:
+        del cassette.response_for  # back to the class method
+
+    n = max(len(lookups) * rounds, 1)
+    return {
+        "source": cassette.source,
+        "lookups": len(lookups),
+        "responses": len(cassette.interactions),
+        "mismatches": mismatches,
+        "misses": sorted(set(cassette.misses)),
+        "lookups_per_s": n / elapsed if elapsed else float("inf"),
+        "ms_per_lookup": elapsed * 1000 / n,
+        "parse_ms_per_lookup": (elapsed - transport_seconds) * 1000 / n,
+        "peak_kb": peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURE_DIR)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="previous --json output to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Replays never reach the token endpoint
+    kroger.KROGER_TOKENS = TokenProvider(lambda: ("bench-token", 3600), name="bench token")
+
+    paths = sorted(args.fixtures.glob("*.json.gz"))
+    if not paths:
+        logging.error("No fixtures in %s – build them with scripts/synthesize_price_fixtures.py", args.fixtures)
+        sys.exit(1)
+
+    baseline = {}
+    if args.baseline and args.baseline.exists():
+        baseline = {r["source"]: r for r in json.loads(args.baseline.read_text())}
+
+    results, failed = [], False
+    for path in paths:
+        cassette = Cassette.load(path)
+        if cassette.source not in SOURCE_CLASSES:
+            logging.warning("Skipping %s: unknown source %r", path.name, cassette.source)
+            continue
+        try:
+            r = bench_cassette(cassette)
+        except ImportError as e:
+            # Optional scraper dependency (e.g. beautifulsoup4) not installed
+            logging.warning("Skipping %s: %s", path.name, e)
+            continue
+        results.append(r)
+        logging.info(
+            "%-22s %3d lookups | %8.1f lookups/s | %7.2f ms/lookup | parse %7.2f ms | peak %8.1f KB",
+            r["source"], r["lookups"], r["lookups_per_s"], r["ms_per_lookup"], r["parse_ms_per_lookup"], r["peak_kb"],
+        )
+        for m in r["mismatches"]:
+            logging.error("%s %s: expected %s, got %s", r["source"], m["ingredient"], m["expected"], m["got"])
+        for key in r["misses"]:
+            logging.error("%s: unrecorded request %s", r["source"], key)
+        failed |= bool(r["mismatches"] or r["misses"])
+
+        before = baseline.get(r["source"])
+        if before and r["ms_per_lookup"] > before["ms_per_lookup"] * args.max_slowdown:
+            logging.error(
+                "%s slowed down: %.2f -> %.2f ms/lookup", r["source"], before["ms_per_lookup"], r["ms_per_lookup"]
+            )
+            failed = True
+
+    if not results:
+        logging.error("None of the %d fixtures in %s could be replayed", len(paths), args.fixtures)
+        failed = True
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
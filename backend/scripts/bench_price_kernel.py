@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Benchmark app/services/price_kernel.py against per-row pricing.
+
+Generates random candidate stores_prices rows for a grocery list and times
+the per-row loop (convert_price + is_realistic_price + running minimum)
+against encoding the rows and running the vectorized kernel. Checks both
+produce the same prices.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_price_kernel.py
+
+Environment:
+    BENCH_ROWS   – candidate rows (default 50000).
+    BENCH_REPEAT – timed runs, best is reported (default 5).
+"""
+
+import logging
+import os
+import random
+import time
+
+import numpy as np
+
+from app.services import price_kernel
+from app.services.price_bounds import get_price_bounds
+from app.services.pricing import is_realistic_price, realism_bounds
+from app.services.unit_conversion import convert_price
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+ROWS = int(os.getenv("BENCH_ROWS", "50000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+UNITS = ["lb", "oz", "g", "each", "ct", "cup", "ml", "fl oz", "slice", "clove", "gallon"]
+NAMES = ["milk", "chicken breast", "garlic", "olive oil", "bread", "flour", "basil", "cheddar cheese",
+         "rice", "eggs", "butter", "tomatoes", "onions", "salmon", "pasta", "spinach"]
+
+
+def per_row(rows, items):
+    best = [None] * len(items)
+    for price, unit, group in rows:
+        name, target = items[group]
+        converted = price if unit == target else convert_price(price, unit, target, name)
+        if converted is not None and is_realistic_price(converted, name, target):
+            if best[group] is None or converted < best[group]:
+                best[group] = converted
+    return best
+
+
+def vectorized(rows, items):
+    prices, units, groups = zip(*rows)
+    bounds = [realism_bounds(name, unit) for name, unit in items]
+    best = price_kernel.cheapest_per_group(
+        np.array(prices), price_kernel.unit_codes(units), np.array(groups, dtype=np.int64),
+        price_kernel.unit_codes(unit for _, unit in items), price_kernel.class_codes(name for name, _ in items),
+        np.array([bound[0] for bound in bounds]), np.array([bound[1] for bound in bounds]),
+        np.array([bound[2] for bound in bounds]),
+    )
+    return price_kernel.group_results(best)
+
+
+def best_of(fn, *args):
+    best, result = float("inf"), None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    get_price_bounds().load([])  # heuristic bounds only; no database needed
+    rng = random.Random(1)
+    items = [(name, unit) for name in NAMES for unit in ("lb", "each", "cup")]
+    rows = [(round(rng.uniform(0.01, 12), 2), rng.choice(UNITS), rng.randrange(len(items))) for _ in range(ROWS)]
+
+    loop_ms, expected = best_of(per_row, rows, items)
+    kernel_ms, got = best_of(vectorized, rows, items)
+    same = all((a is None and b is None) or (a is not None and b is not None and abs(a - b) < 1e-9)
+               for a, b in zip(expected, got))
+    logging.info(
+        "%d rows, %d items | per-row %.1f ms | kernel %.1f ms (incl. encoding) | %.1fx%s",
+        ROWS, len(items), loop_ms, kernel_ms, loop_ms / kernel_ms, "" if same else " (RESULTS DIFFER)",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Benchmark price-source lookups/s against a local stand-in HTTP server.
+
+Compares the legacy path (sync ``fetch_price`` pushed to worker threads, one
+new connection per request) with the native async path that reuses pooled
+per-host ``httpx.AsyncClient`` connections. No network access or API keys are
+needed: Kroger and Walmart URLs are pointed at a ThreadingHTTPServer on
+localhost that serves canned responses after a small simulated latency.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_price_sources.py
+
+Environment:
+    BENCH_LOOKUPS      – lookups per source per mode (default 400).
+    BENCH_CONCURRENCY  – concurrent in-flight lookups, as in refresh_prices (default 20).
+    BENCH_LATENCY_MS   – simulated server latency per request (default 5).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services import kroger, walmart
+from app.services.http_clients import HTTP2_AVAILABLE, close_async_clients
+from app.services.price_sources import PriceSource
+from app.services.token_provider import TokenProvider
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+LOOKUPS = int(os.getenv("BENCH_LOOKUPS", "400"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "20"))
+LATENCY_S = int(os.getenv("BENCH_LATENCY_MS", "5")) / 1000.0
+
+KROGER_BODY = json.dumps(
+    {"data": [{"items": [{"price": {"regular": 399}, "size": "16 oz"}]}]}
+).encode()
+WALMART_BODY = (
+    "<html><script>window.__WML_REDUX_INITIAL_STATE__ = "
+    + json.dumps({"search": {"searchResult": {"itemStacks": [{"items": [{"price": {"price": 2.98}}]}]}}})
+    + ";</script></html>"
+).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real hosts
+
+    def do_GET(self):
+        time.sleep(LATENCY_S)
+        if self.path.startswith("/kroger"):
+            body, ctype = KROGER_BODY, "application/json"
+        else:
+            body, ctype = WALMART_BODY, "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def run(fetch, n: int) -> float:
+    """Run *n* lookups through *fetch* with CONCURRENCY in flight; return lookups/s."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i: int):
+        async with semaphore:
+            price, _ = await fetch("123", f"item {i}", "each")
+            if price is None:
+                raise RuntimeError("stand-in lookup returned no price")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    await close_async_clients()
+    return n / elapsed
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    kroger.KROGER_PRODUCTS_URL = f"{base}/kroger/products"
+    kroger.KROGER_TOKENS = TokenProvider(lambda: ("bench-token", 3600), name="bench token")
+    walmart.WALMART_SEARCH_URL = f"{base}/walmart/search"
+
+    logging.info(
+        "lookups=%d concurrency=%d latency=%.0fms http2_available=%s (stand-in speaks HTTP/1.1)",
+        LOOKUPS, CONCURRENCY, LATENCY_S * 1000, HTTP2_AVAILABLE,
+    )
+    for src in (kroger.KrogerPriceSource(), walmart.WalmartPriceSource()):
+        # PriceSource.async_fetch_price is the old thread-wrapped default.
+        threaded = asyncio.run(run(lambda *a: PriceSource.async_fetch_price(src, *a), LOOKUPS))
+        native = asyncio.run(run(src.async_fetch_price, LOOKUPS))
+        logging.info(
+            "%-12s threaded sync: %7.1f lookups/s | native async pooled: %7.1f lookups/s (%.1fx)",
+            src.source_name, threaded, native, native / threaded,
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
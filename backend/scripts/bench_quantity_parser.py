@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Throughput benchmark for app/services/quantity.py.
+
+Parses a corpus of package-size strings as the Kroger, Walmart, Safeway and
+Instacart sources see them, uncached (every string parsed) and through the
+LRU cache (a refresh pass sees the same few hundred sizes over and over).
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_quantity_parser.py
+
+Environment:
+    BENCH_CALLS  – parses per timed run (default 200000).
+    BENCH_REPEAT – timed runs, best is reported (default 5).
+"""
+
+import itertools
+import logging
+import os
+import time
+
+from app.services import quantity
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+CALLS = int(os.getenv("BENCH_CALLS", "200000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+# Kroger `size`, Walmart item names, Safeway packageSize/uom and Instacart sizes
+CORPUS = [
+    "1 gal", "1/2 gal", "64 fl oz", "16.9 fl oz (6 pk)", "12 fl oz", "2 L", "1.75 l", "750 mL",
+    "12 ct / 2 lb", "18 ct", "12 ct", "1 dozen", "5 lb", "3 lb bag", "2 lbs", "1 lb", "16 oz",
+    "8 oz", "10.5 oz", "28 oz", "15.25 oz", "2 x 500 g", "500 g", "1 kg", "6 x 355 ml",
+    "24 pk / 12 fl oz", "4 ct / 16 oz", "per lb", "lb", "each", "Each", "1 each", "1 ct",
+    "Great Value Whole Vitamin D Milk, Gallon, 128 fl oz",
+    "Great Value Large White Eggs, 18 Count",
+    "Fresh Banana Fruit, Each",
+    "Marketside Fresh Spinach, 10 oz Bag",
+    "Great Value All Purpose Flour, 5 lb",
+    "Coca-Cola Soda Pop, 12 fl oz, 12 Pack Cans",
+    "Barilla Spaghetti Pasta, 16 oz",
+    "Signature SELECT Extra Virgin Olive Oil - 25.5 Fl. Oz.",
+    "O Organics Organic Baby Spinach - 5 Oz",
+    "Lucerne Butter Salted - 4-4 Oz",
+    "Foster Farms Chicken Breast Boneless Skinless - 1.50 Lb",
+    "Avocados Hass Large - Each",
+    "Kroger® Shredded Mild Cheddar Cheese 8 oz",
+    "Simple Truth Organic™ Brown Rice 2 lb",
+    "Garlic Bulb - 3 Count",
+    "Fresh Basil 0.75 oz",
+    "Cilantro 1 bunch",
+]
+
+
+def workload(calls: int):
+    return list(itertools.islice(itertools.cycle(CORPUS), calls))
+
+
+def run(parse, items) -> float:
+    started = time.perf_counter()
+    for text in items:
+        parse(text)
+    return time.perf_counter() - started
+
+
+def main():
+    items = workload(CALLS)
+    parsed = sum(quantity.parse_quantity(text) is not None for text in CORPUS)
+    logging.info("%d/%d corpus strings yield a quantity", parsed, len(CORPUS))
+
+    uncached = min(run(quantity.parse_quantity.__wrapped__, items) for _ in range(REPEAT))
+    quantity.parse_quantity.cache_clear()
+    cached = min(run(quantity.parse_quantity, items) for _ in range(REPEAT))
+    logging.info(
+        "uncached: %.2f µs/parse (%.0f parses/s) | cached: %.3f µs/parse (%.0f parses/s) over %d calls",
+        uncached * 1e6 / CALLS, CALLS / uncached, cached * 1e6 / CALLS, CALLS / cached, CALLS,
+    )
+    logging.info("cache info: %s", quantity.parse_quantity.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Microbenchmark for app/services/unit_conversion.py.
+
+Times the import-time compile of the (from_unit, to_unit, ingredient_class)
+factor table, then convert_price over a mix of stored/requested unit pairs
+and ingredient names shaped like a pricing pass: once with cold LRU caches
+and once warm.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/bench_unit_conversion.py
+
+Environment:
+    BENCH_CALLS  – conversions per timed run (default 200000).
+    BENCH_REPEAT – timed runs, best is reported (default 5).
+"""
+
+import itertools
+import logging
+import os
+import time
+
+from app.services import unit_conversion as uc
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+CALLS = int(os.getenv("BENCH_CALLS", "200000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+PAIRS = [
+    ("lb", "oz"), ("oz", "g"), ("each", "cup"), ("ct", "each"), ("Pounds", "lb"), ("fl oz", "cup"),
+    ("each", "slice"), ("each", "clove"), ("l", "tbsp"), ("g", "cup"), ("kg", "each"), ("bunch", "lb"),
+]
+NAMES = ["milk", "all-purpose flour", "garlic", "chicken breast", "olive oil", "sourdough bread",
+         "cherry tomatoes", "canned chickpeas", "fresh basil", "quinoa", "brown sugar", "cheddar cheese"]
+
+
+def workload(calls: int):
+    combos = itertools.cycle(
+        (from_unit, to_unit, name)
+        for (from_unit, to_unit), name in itertools.product(PAIRS, NAMES)
+    )
+    return [next(combos) for _ in range(calls)]
+
+
+def clear_caches():
+    uc.canonical_unit.cache_clear()
+    uc.ingredient_class.cache_clear()
+    uc.conversion_factor.cache_clear()
+
+
+def run(items) -> float:
+    convert = uc.convert_price
+    started = time.perf_counter()
+    for from_unit, to_unit, name in items:
+        convert(2.5, from_unit, to_unit, name)
+    return time.perf_counter() - started
+
+
+def main():
+    started = time.perf_counter()
+    factors = uc._compile()
+    compile_ms = (time.perf_counter() - started) * 1000
+    logging.info("compiled %d factors in %.1f ms", len(factors), compile_ms)
+
+    items = workload(CALLS)
+    cold = []
+    for _ in range(REPEAT):
+        clear_caches()
+        # first pass over every distinct combination only
+        cold.append(run(items[: len(PAIRS) * len(NAMES)]))
+    warm = min(run(items) for _ in range(REPEAT))
+    logging.info(
+        "cold: %.2f µs/call over %d distinct conversions | warm: %.3f µs/call over %d calls (%.0f calls/s)",
+        min(cold) * 1e6 / (len(PAIRS) * len(NAMES)), len(PAIRS) * len(NAMES),
+        warm * 1e6 / CALLS, CALLS, CALLS / warm,
+    )
+    logging.info("cache info: %s", uc.conversion_factor.cache_info())
+
+
+if __name__ == "__main__":
+    main()
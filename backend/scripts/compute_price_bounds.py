@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Learn per-ingredient realistic price ranges into the price_bounds table.
+
+Reads the last PRICE_BOUNDS_DAYS of price_history plus the current
+stores_prices rows last written before that window (so each price counts
+once), leaves out estimate sources (migration 31 records each row's
+source), groups them by (canonical ingredient key, canonical unit) and
+writes median/MAD-based bounds (app/services/price_bounds.py) to
+price_bounds (migration 25). Pairs that no longer have enough samples are
+removed, so the pricing path falls back to the keyword heuristics for them.
+Run it after price refreshes, e.g. nightly. Writing new bounds bumps the
+price snapshot version, so cached grocery lists are recomputed.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/compute_price_bounds.py
+    PYTHONPATH=backend python backend/scripts/compute_price_bounds.py --dry-run   # log, don't write
+
+Environment:
+    PRICE_BOUNDS_DAYS – how far back price_history is read (default 180).
+    PRICE_BOUNDS_MIN_SAMPLES – observations needed per pair (default 5).
+"""
+
+import argparse
+import datetime
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+
+from app.core.supabase import get_supabase_admin
+from app.services.grocery_cache import bump_price_snapshot_version
+from app.services.price_bounds import MIN_SAMPLES, compute_bounds
+from app.services.refresh_scheduler import parse_timestamp
+from app.services.source_registry import ESTIMATE_SOURCES
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+SUPABASE = get_supabase_admin()
+HISTORY_DAYS = int(os.getenv("PRICE_BOUNDS_DAYS", "180"))
+PRICE_BOUNDS_MIN_SAMPLES = int(os.getenv("PRICE_BOUNDS_MIN_SAMPLES", str(MIN_SAMPLES)))
+PAGE_SIZE = 1000
+CHUNK_SIZE = 500
+
+
+def _read_pages(table: str, columns: Tuple[str, ...], order: Tuple[str, ...], since: Optional[str] = None) -> Iterator[Dict]:
+    """Every row of *table* (observed since *since*, if given), paged past the row cap."""
+    selected = (*columns, "source")
+    offset = 0
+    count = 0
+    while True:
+        query = SUPABASE.table(table).select(", ".join(selected))
+        if since is not None:
+            query = query.gte("observed_at", since)
+        for column in order:
+            query = query.order(column)
+        try:
+            page = query.range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        except Exception as exc:
+            if offset == 0 and selected != columns:
+                # Migration 31 not applied – no sources; repeated prices count once
+                logging.warning("%s has no source column (%s); reading without it", table, exc)
+                selected = columns
+                continue
+            logging.warning("Could not read %s (%s); continuing without it", table, exc)
+            break
+        yield from page
+        count += len(page)
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    logging.info("Read %d rows from %s", count, table)
+
+
+def iter_observations(since: str) -> Iterator[Tuple[str, str, float, Optional[str]]]:
+    """(ingredient_name, unit, price_per_unit, source) observed since *since*.
+
+    upsert_store_prices appends every written price to price_history, so a
+    current stores_prices row is only read when its price was last written
+    before *since*; otherwise its history row already counts it.
+    """
+    observed = ("ingredient_name", "unit", "price_per_unit")
+    for row in _read_pages("price_history", observed, ("observed_at", "place_id", "ingredient_name"), since):
+        yield row["ingredient_name"], row["unit"], row["price_per_unit"], row.get("source")
+
+    window_start = parse_timestamp(since)
+    current = (*observed, "last_changed_at", "last_seen_at")
+    for row in _read_pages("stores_prices", current, ("place_id", "ingredient_name", "unit")):
+        written = parse_timestamp(row.get("last_changed_at") or row.get("last_seen_at"))
+        if written is not None and written >= window_start:
+            continue
+        yield row["ingredient_name"], row["unit"], row["price_per_unit"], row.get("source")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute price_bounds from observed prices")
+    parser.add_argument("--dry-run", action="store_true", help="log the bounds instead of writing them")
+    args = parser.parse_args()
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    since = (started - datetime.timedelta(days=HISTORY_DAYS)).isoformat()
+    rows = compute_bounds(
+        iter_observations(since), min_samples=PRICE_BOUNDS_MIN_SAMPLES, exclude_sources=ESTIMATE_SOURCES
+    )
+    logging.info("Learned bounds for %d ingredient/unit pairs", len(rows))
+
+    if args.dry_run:
+        for row in sorted(rows, key=lambda r: -r["samples"])[:50]:
+            logging.info(
+                "%-30s %-8s median %8.4f  [%8.4f, %8.4f]  n=%d",
+                row["ingredient_key"], row["unit"], row["median"], row["lower"], row["upper"], row["samples"],
+            )
+        return
+
+    for start in range(0, len(rows), CHUNK_SIZE):
+        SUPABASE.table("price_bounds").upsert(rows[start:start + CHUNK_SIZE], on_conflict="ingredient_key,unit").execute()
+    # Pairs not recomputed this run dropped below the sample threshold
+    SUPABASE.table("price_bounds").delete().lt("computed_at", started.isoformat()).execute()
+    logging.info("price_bounds updated (price snapshot version %s)", bump_price_snapshot_version(SUPABASE))
+
+
+if __name__ == "__main__":
+    main()
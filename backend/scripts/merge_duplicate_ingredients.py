@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Merge near-duplicate ingredient rows into canonical ingredients.
+
+Clusters ingredients by normalized name and embedding similarity, records
+every variant in `ingredient_aliases`, repoints `recipe_ingredients`,
+`product_mappings` and spellings already aliased to a duplicate at the
+surviving row, and deletes the duplicates.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/merge_duplicate_ingredients.py            # dry run
+    PYTHONPATH=backend python backend/scripts/merge_duplicate_ingredients.py --apply    # write changes
+
+Environment:
+    MERGE_SIMILARITY_THRESHOLD – override the cosine threshold (default 0.92).
+
+Running API processes keep resolved spellings for CANONICAL_CACHE_TTL seconds
+(canonicalize.py); this script can't clear their caches, so they stop
+resolving to deleted rows only once that TTL has passed.
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+
+from app.core.supabase import get_supabase_admin
+from app.services.canonicalize import (
+    MERGE_SIMILARITY_THRESHOLD,
+    cluster_ingredients,
+    normalize_ingredient_name,
+    pick_canonical,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+SUPABASE = get_supabase_admin()
+
+PAGE_SIZE = 1000
+
+
+def iter_all_ingredients() -> List[Dict]:
+    """Return every ingredient row (id, name, embedding), paged by id."""
+    rows: List[Dict] = []
+    last_id = None
+    while True:
+        query = SUPABASE.table("ingredients").select("id, name, embedding, created_at")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(PAGE_SIZE).execute().data or []
+        if not page:
+            return rows
+        rows.extend(page)
+        last_id = page[-1]["id"]
+
+
+def merge_cluster(canonical: Dict, duplicates: List[Dict]) -> None:
+    """Alias and repoint every duplicate at the canonical row, then delete the duplicates."""
+    dup_ids = [row["id"] for row in duplicates]
+
+    aliases = {}
+    for row in [canonical, *duplicates]:
+        for alias in {row["name"].strip().lower(), normalize_ingredient_name(row["name"])}:
+            aliases[alias] = {
+                "alias": alias,
+                "ingredient_id": canonical["id"],
+                "canonical_name": canonical["name"],
+            }
+    SUPABASE.table("ingredient_aliases").upsert(list(aliases.values()), on_conflict="alias").execute()
+    # Spellings learned earlier for a duplicate would otherwise go with it (ON DELETE CASCADE)
+    SUPABASE.table("ingredient_aliases").update(
+        {"ingredient_id": canonical["id"], "canonical_name": canonical["name"]}
+    ).in_("ingredient_id", dup_ids).execute()
+
+    SUPABASE.table("recipe_ingredients").update({"ingredient_id": canonical["id"]}).in_("ingredient_id", dup_ids).execute()
+
+    # product_mappings is keyed by (ingredient_name, retailer): move a mapping
+    # over only when the canonical name has none for that retailer yet.
+    dup_names = [row["name"] for row in duplicates]
+    mappings = SUPABASE.table("product_mappings").select("ingredient_name, retailer, product_id").in_("ingredient_name", [canonical["name"], *dup_names]).execute().data or []
+    mapped_retailers = {m["retailer"] for m in mappings if m["ingredient_name"] == canonical["name"]}
+    moved = []
+    for m in mappings:
+        if m["ingredient_name"] != canonical["name"] and m["retailer"] not in mapped_retailers:
+            moved.append({"ingredient_name": canonical["name"], "retailer": m["retailer"], "product_id": m["product_id"]})
+            mapped_retailers.add(m["retailer"])
+    if moved:
+        SUPABASE.table("product_mappings").upsert(moved, on_conflict="ingredient_name,retailer").execute()
+    SUPABASE.table("product_mappings").delete().in_("ingredient_name", dup_names).execute()
+
+    SUPABASE.table("ingredients").delete().in_("id", dup_ids).execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate ingredient rows")
+    parser.add_argument("--apply", action="store_true", help="write changes (default is a dry run)")
+    args = parser.parse_args()
+
+    threshold = float(os.getenv("MERGE_SIMILARITY_THRESHOLD", MERGE_SIMILARITY_THRESHOLD))
+
+    rows = iter_all_ingredients()
+    logging.info("Loaded %d ingredients", len(rows))
+
+    clusters = cluster_ingredients(rows, similarity_threshold=threshold)
+    duplicate_count = sum(len(c) - 1 for c in clusters)
+    logging.info("Found %d clusters covering %d duplicate rows", len(clusters), duplicate_count)
+
+    for members in clusters:
+        canonical = pick_canonical(members)
+        duplicates = [row for row in members if row["id"] != canonical["id"]]
+        logging.info("%s <- %s", canonical["name"], ", ".join(row["name"] for row in duplicates))
+        if args.apply:
+            try:
+                merge_cluster(canonical, duplicates)
+            except Exception as exc:
+                logging.error("Failed to merge into '%s': %s", canonical["name"], exc)
+    if not args.apply:
+        logging.info("Dry run; re-run with --apply to merge %d rows", duplicate_count)
+
+
+if __name__ == "__main__":
+    main()
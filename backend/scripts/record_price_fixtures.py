@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Record live price-source responses into compressed replay fixtures.
+
+Runs real lookups (network access and, for Kroger, API credentials needed)
+and stores every HTTP response in ``backend/tests/fixtures/http/<source>.json.gz``
+together with the prices the parser returned. scripts/bench_price_fixtures.py
+replays the fixtures offline and fails if a parser no longer returns the same
+prices. Re-record when a retailer changes its pages.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/record_price_fixtures.py \
+        --source walmart_web --store 2119 --ingredients "whole milk,eggs,bananas"
+
+Environment:
+    KROGER_CLIENT_ID / KROGER_CLIENT_SECRET – for kroger_api (token requests are not recorded).
+"""
+
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from app.services.http_clients import close_async_clients
+from app.services.http_fixtures import FIXTURE_DIR, Cassette, recording
+from app.services.price_sources import PriceSource
+from app.services.source_registry import SOURCE_CLASSES, make_source
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+
+def fixture_path(source_name: str) -> Path:
+    return FIXTURE_DIR / f"{source_name}.json.gz"
+
+
+async def record(source: PriceSource, cassette: Cassette, store: str, ingredients, unit: str) -> None:
+    with recording(cassette):
+        for ingredient in ingredients:
+            price, price_unit = await source.async_fetch_price(store, ingredient, unit)
+            cassette.lookups.append(
+                {"store": store, "ingredient": ingredient, "unit": unit, "price": price, "price_unit": price_unit}
+            )
+            logging.info("%s %s: %s / %s", source.source_name, ingredient, price, price_unit)
+    await close_async_clients()
+
+
+def main():
+    load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", required=True, choices=sorted(SOURCE_CLASSES))
+    parser.add_argument("--store", required=True, help="store external ID passed to the source")
+    parser.add_argument("--ingredients", required=True, help="comma-separated ingredient names")
+    parser.add_argument("--unit", default="each")
+    parser.add_argument("--append", action="store_true", help="add to the existing fixture instead of replacing it")
+    args = parser.parse_args()
+
+    source = make_source(args.source)
+    path = fixture_path(source.source_name)
+    cassette = Cassette.load(path) if args.append and path.exists() else Cassette(path, source.source_name)
+    cassette.recorded_at = None  # stamped on save
+    ingredients = [name.strip() for name in args.ingredients.split(",") if name.strip()]
+
+    asyncio.run(record(source, cassette, args.store, ingredients, args.unit))
+    cassette.save()
+    logging.info(
+        "Saved %d lookups / %d responses to %s (%.1f KB)",
+        len(cassette.lookups), len(cassette.interactions), path, path.stat().st_size / 1024,
+    )
+
+
+if __name__ == "__main__":
+    main()
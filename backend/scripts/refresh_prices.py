@@ -1,23 +1,70 @@
 #!/usr/bin/env python
 """Refresh stores_prices table using quick-win free sources.
 
+Only rows that are due are fetched: hot and volatile prices are refreshed
+often, stable ones back off exponentially (see app/services/refresh_scheduler.py),
+as do never-priced ones after each miss, and each run stops at a fixed request budget.
+
 Usage (from repo root, venv active):
-    PYTHONPATH=backend python backend/scripts/refresh_prices.py
+    PYTHONPATH=backend python backend/scripts/refresh_prices.py          # scheduled refresh
+    PYTHONPATH=backend python backend/scripts/refresh_prices.py --full   # refetch everything
+    PYTHONPATH=backend python backend/scripts/refresh_prices.py --reset  # ignore an interrupted run's checkpoint
 
 Environment:
     KROGER_CLIENT_ID / KROGER_CLIENT_SECRET – only needed for Kroger lookups.
+    KROGER_TOKEN_CACHE – where the Kroger OAuth token is cached between runs (default backend/.kroger_token.json).
+    REFRESH_REQUEST_BUDGET – max outbound price requests per run (default 2000, 0 = unlimited).
+    REFRESH_HOT_DAYS – recipe_ingredients newer than this mark an ingredient hot (default 14).
+    REFRESH_CHUNK_SIZE – rows per upsert chunk (default 500).
+    REFRESH_METRICS_FILE – where per-source stats are written (default backend/.refresh_prices_metrics.json).
+    REFRESH_SOURCES – comma-separated source names to use (default: every source in the registry).
+    HTML_PARSE_PROCESSES – parse scraped pages in this many worker processes (default 0: threads).
+
+Each retailer is priced through an ordered chain of sources
+(app/services/source_registry.py): lookups go to the source with the best
+recent success rate and latency first and fall back down the chain on a miss;
+dead scrapers only get the odd probe. Kroger and Walmart price each
+ingredient's pinned product by ID (Kroger batches 50 IDs per request) and
+only search when nothing is pinned or the pinned product has disappeared;
+new pins are saved to product_mappings at the end of the run. Each source runs behind its own rate
+limiter, adaptive concurrency limit and circuit breaker
+(app/services/source_guard.py); a throttling source backs off or is skipped
+without slowing the others.
+
+Results stream to a writer task that writes fixed-size chunks as they
+arrive and checkpoints each committed chunk. Only new or changed prices are
+upserted (and appended to the monthly-partitioned price_history table);
+unchanged ones get last_seen_at bumped in one bulk update per chunk. A chunk
+with changed prices bumps the price snapshot version, which invalidates the
+API's cached grocery lists (app/services/grocery_cache.py). An
+interrupted run resumes after the last committed chunk (pass --reset to start
+over).
 """
 
+import argparse
 import datetime
+import json
 import logging
 import asyncio
-from typing import List, Dict, Optional
+import os
+import time
+from typing import List, Dict, Optional, Set, Tuple
 
 from app.core.supabase import get_supabase_admin
-from app.services.kroger import KrogerPriceSource
-from app.services.walmart import WalmartPriceSource
-from app.services.safeway_fallback import SafewayFallbackPriceSource
-from app.services.instacart import InstacartWholeFoodsSource, InstacartSafewaySource
+from app.services.grocery_cache import bump_price_snapshot_version
+from app.services.kroger import KROGER_TOKENS
+from app.services.http_clients import close_async_clients
+from app.services.product_pins import ProductPins
+from app.services.source_registry import SourceLink, SourceRegistry
+from app.services.store_id_resolver import StoreIdResolver
+from app.services.refresh_scheduler import (
+    hot_ingredient_names,
+    is_unchanged,
+    parse_timestamp,
+    plan_refresh,
+    record_miss,
+    record_observation,
+)
 
 # Ensure .env variables (including KROGER_CLIENT_ID / SECRET) are loaded when
 # this script runs outside the FastAPI context.
@@ -30,97 +77,62 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(mess
 
 SUPABASE = get_supabase_admin()
 
-# Instantiate once so token caching works and metrics are shared.
-KROGER = KrogerPriceSource()
-WALMART = WalmartPriceSource()
-SAFEWAY = SafewayFallbackPriceSource()
-INSTACART_WF = InstacartWholeFoodsSource()
-INSTACART_SAFEWAY = InstacartSafewaySource()
-
-# Note: Instacart sources are disabled by default due to complexity
-# Safeway now uses fallback pricing with realistic estimates instead of broken web scraping
-SOURCES = [KROGER, WALMART, SAFEWAY]
-# SOURCES = [KROGER, WALMART, SAFEWAY, INSTACART_WF, INSTACART_SAFEWAY]
+# Reuse a still-valid Kroger token from the previous run instead of fetching a new one.
+KROGER_TOKENS.enable_persistence(
+    os.getenv("KROGER_TOKEN_CACHE") or Path(__file__).resolve().parents[1] / ".kroger_token.json"
+)
 
 CONCURRENCY = 20
-
-
-def iter_store_mappings() -> List[Dict]:
-    """Return each store row with the retailer-specific IDs we need."""
+REQUEST_BUDGET = int(os.getenv("REFRESH_REQUEST_BUDGET", "2000")) or None
+HOT_DAYS = int(os.getenv("REFRESH_HOT_DAYS", "14"))
+PAGE_SIZE = 1000
+CHUNK_SIZE = int(os.getenv("REFRESH_CHUNK_SIZE", "500"))
+CHECKPOINT_FILE = Path(__file__).resolve().parents[1] / ".refresh_prices_checkpoint.jsonl"
+METRICS_FILE = Path(os.getenv("REFRESH_METRICS_FILE", Path(__file__).resolve().parents[1] / ".refresh_prices_metrics.json"))
+
+PriceKey = Tuple[str, str]  # (place_id, ingredient_name)
+# (store row, retailer, chain links, source -> store external id, ingredient row)
+Lookup = Tuple[Dict, str, List[SourceLink], Dict[str, str], Dict]
+
+# Ingredient -> product pins (product_mappings); sources that can price by
+# product ID search only to pin (app/services/product_pins.py).
+PINS = ProductPins(SUPABASE)
+
+# Per-retailer source chains, their store-ID columns and health-based routing
+# (app/services/source_registry.py). Instantiated once so sources and their
+# guards are shared by the whole run.
+REGISTRY = SourceRegistry(max_concurrency=CONCURRENCY, pins=PINS)
+
+
+def iter_store_mappings(place_id: Optional[str] = None) -> List[Dict]:
+    """Return each store row (or just *place_id*'s) with the retailer-specific IDs we need."""
+    def select(columns: List[str]):
+        query = SUPABASE.table("stores").select(",".join(columns))
+        if place_id is not None:
+            query = query.eq("place_id", place_id)
+        return query.execute()
+
+    base_columns = ["place_id", "name", "lat", "lon"]
+    id_columns = REGISTRY.id_columns()
     try:
-        # Try with safeway_store_id column
-        res = (
-            SUPABASE.table("stores")
-            .select("place_id,kroger_location_id,walmart_store_id,safeway_store_id,name,lat,lon")
-            .execute()
-        )
-    except:
-        # Fallback without safeway_store_id if column doesn't exist
-        res = (
-            SUPABASE.table("stores")
-            .select("place_id,kroger_location_id,walmart_store_id,name,lat,lon")
-            .execute()
-        )
+        res = select(base_columns + id_columns)
+    except Exception:
+        # Some ID columns don't exist yet (e.g. migration 17 not applied) – keep the ones that do.
+        present = []
+        for column in id_columns:
+            try:
+                SUPABASE.table("stores").select(column).limit(1).execute()
+                present.append(column)
+            except Exception:
+                logging.info("stores.%s missing; sources keyed on it are skipped", column)
+        res = select(base_columns + present)
     return res.data or []
 
 
-def maybe_update_external_ids(store: Dict) -> Dict:
-    """Fill missing retailer IDs and persist back to Supabase."""
-    updated: Dict[str, Optional[str]] = {}
-
-    lat = store.get("lat")
-    lon = store.get("lon")
-    if lat is None or lon is None:
-        return store
-
-    if not store.get("kroger_location_id"):
-        banners = [
-            "kroger",
-            "ralph",
-            "fred meyer",
-            "fry",
-            "king soopers",
-            "harris teeter",
-            "smith",
-            "city market",
-            "pick n save",
-        ]
-        store_name = (store.get("name") or "").lower()
-        if any(b in store_name for b in banners):
-            kroger_id = KROGER.lookup_location_id(lat, lon)
-            if kroger_id:
-                updated["kroger_location_id"] = kroger_id
-
-    if not store.get("walmart_store_id"):
-        walmart_id = WALMART.lookup_store_id(lat, lon)
-        if walmart_id:
-            updated["walmart_store_id"] = walmart_id
-
-    # Only try to update safeway_store_id if the column exists
-    if 'safeway_store_id' in store and not store.get("safeway_store_id"):
-        safeway_banners = [
-            "safeway",
-            "albertsons",
-            "vons",
-            "pavilions",
-            "tom thumb",
-            "randalls",
-            "shaw",
-            "star market",
-            "acme"
-        ]
-        store_name = (store.get("name") or "").lower()
-        if any(b in store_name for b in safeway_banners):
-            safeway_id = SAFEWAY.lookup_store_id(lat, lon)
-            if safeway_id:
-                updated["safeway_store_id"] = safeway_id
-
-    if updated:
-        SUPABASE.table("stores").update(updated).eq("place_id", store["place_id"]).execute()
-        logging.info("Updated store %s with %s", store["place_id"], updated)
-        store.update(updated)
-
-    return store
+async def resolve_external_ids(stores: List[Dict]) -> List[Dict]:
+    """Fill missing retailer IDs concurrently (grid-cached) and persist them in bulk."""
+    resolver = StoreIdResolver(SUPABASE, REGISTRY.id_lookups())
+    return await resolver.resolve(stores)
 
 
 def iter_ingredients() -> List[Dict]:
@@ -148,82 +160,407 @@ def iter_ingredients() -> List[Dict]:
         return cleaned
 
 
-async def gather_prices() -> List[Dict]:
-    """Fetch all prices concurrently and return the list of upsert rows."""
-    now = datetime.datetime.utcnow().isoformat()
+def _seen_at(row: Dict) -> datetime.datetime:
+    return parse_timestamp(row.get("last_seen_at")) or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
 
-    semaphore = asyncio.Semaphore(CONCURRENCY)
 
-    ingredients = iter_ingredients()  # fetch once
-    price_rows: List[Dict] = []
-
-    async def fetch_one(store: Dict, src, ext_id: str, ing: Dict):
-        async with semaphore:
-            price, resolved_unit = await src.async_fetch_price(ext_id, ing["name"], ing["default_unit"])
-            if price is None:
-                return None
-            return {
-                "place_id": store["place_id"],
-                "ingredient_name": ing["name"],
-                "unit": resolved_unit or ing["default_unit"],
-                "price_per_unit": price,
-                "last_seen_at": now,
-            }
-
-    tasks = []
-    for raw_store in iter_store_mappings():
-        store = maybe_update_external_ids(raw_store)
-        for src in SOURCES:
-            # map place_id → external id depending on source
-            if src.source_name == "kroger_api":
-                ext_id = store.get("kroger_location_id")
-            elif src.source_name == "walmart_web":
-                ext_id = store.get("walmart_store_id")
-            elif src.source_name == "safeway_fallback":
-                # Use default store ID for fallback pricing
-                ext_id = store.get("safeway_store_id") or "3132"  # Default store ID
-            elif src.source_name.startswith("instacart_"):
-                ext_id = store.get("instacart_zone_id")
-            else:
-                ext_id = None
-            if not ext_id:
-                continue
+def load_price_history(place_id: Optional[str] = None) -> Dict[PriceKey, Dict]:
+    """Return the latest stores_prices row per (place_id, ingredient_name), optionally for one store.
 
-            for ing in ingredients:
-                tasks.append(fetch_one(store, src, ext_id, ing))
+    Keys never priced carry their price_refresh_misses row instead, if any.
+    """
+    columns = "place_id, ingredient_name, unit, price_per_unit, last_seen_at"
+    history_columns = ", last_changed_at, refresh_count, change_count, unchanged_streak"
+    try:
+        SUPABASE.table("stores_prices").select(columns + history_columns).limit(1).execute()
+        columns += history_columns
+    except Exception:
+        # Migration 19 not applied yet – schedule on last_seen_at alone.
+        logging.warning("stores_prices has no change-history columns; scheduling by last_seen_at only")
+
+    rows: Dict[PriceKey, Dict] = {}
+    offset = 0
+    while True:
+        query = SUPABASE.table("stores_prices").select(columns)
+        if place_id is not None:
+            query = query.eq("place_id", place_id)
+        page = (
+            query
+            .order("place_id")
+            .order("ingredient_name")
+            .order("unit")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+            .data
+            or []
+        )
+        for row in page:
+            key = (row["place_id"], row["ingredient_name"])
+            # A row may exist under several units; the freshest one counts.
+            if key not in rows or _seen_at(row) > _seen_at(rows[key]):
+                rows[key] = row
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    for key, miss in load_refresh_misses(place_id).items():
+        rows.setdefault(key, miss)
+    return rows
+
+
+def load_refresh_misses(place_id: Optional[str] = None) -> Dict[PriceKey, Dict]:
+    """Return the price_refresh_misses row per never-priced (place_id, ingredient_name)."""
+    misses: Dict[PriceKey, Dict] = {}
+    offset = 0
+    try:
+        while True:
+            query = SUPABASE.table("price_refresh_misses").select("place_id, ingredient_name, last_attempted_at, miss_count")
+            if place_id is not None:
+                query = query.eq("place_id", place_id)
+            page = (
+                query
+                .order("place_id")
+                .order("ingredient_name")
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+                .data
+                or []
+            )
+            for row in page:
+                misses[(row["place_id"], row["ingredient_name"])] = row
+            if len(page) < PAGE_SIZE:
+                return misses
+            offset += PAGE_SIZE
+    except Exception as exc:
+        # Migration 32 not applied – never-priced keys are retried every run.
+        logging.warning("Could not load price_refresh_misses: %s", exc)
+        return {}
+
+
+def load_hot_ingredients() -> Set[str]:
+    """Names of ingredients referenced by recipe_ingredients created in the last HOT_DAYS."""
+    cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=HOT_DAYS)).isoformat()
+    rows: List[Dict] = []
+    try:
+        while True:
+            page = (
+                SUPABASE.table("recipe_ingredients")
+                .select("ingredient_id, ingredients(name)")
+                .gte("created_at", cutoff)
+                .order("id")
+                .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                .execute()
+                .data
+                or []
+            )
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+    except Exception as exc:
+        logging.warning("Could not load hot ingredients: %s", exc)
+        return set()
+    return hot_ingredient_names(rows)
+
+
+def load_checkpoint() -> Set[PriceKey]:
+    """Keys committed by an interrupted previous run (empty when starting fresh)."""
+    done: Set[PriceKey] = set()
+    if not CHECKPOINT_FILE.exists():
+        return done
+    try:
+        for line in CHECKPOINT_FILE.read_text().splitlines():
+            done.update(tuple(key) for key in json.loads(line)["keys"])
+    except (OSError, json.JSONDecodeError, KeyError) as exc:
+        # A torn final line only loses that chunk's checkpoint; it is refetched.
+        logging.warning("Stopped reading checkpoint %s early: %s", CHECKPOINT_FILE, exc)
+    return done
 
-    for coro in asyncio.as_completed(tasks):
-        row = await coro
-        if row:
-            price_rows.append(row)
 
-    return price_rows
+def append_checkpoint(chunk: int, keys: List[PriceKey]):
+    """Record a committed chunk; one JSON line per chunk keeps each write O(chunk)."""
+    with CHECKPOINT_FILE.open("a") as fh:
+        fh.write(json.dumps({"chunk": chunk, "keys": keys}) + "\n")
+
+
+def upsert_chunk(rows: List[Dict], run_started: Optional[str] = None):
+    """Write one chunk of new or changed prices to stores_prices and price_history.
+
+    With *run_started* (sharded runs, where several workers may write the
+    same row) an existing row is only replaced if it predates the run or the
+    new price is cheaper, matching the single-process dedupe.
+    """
+    if not rows:
+        return
+    try:
+        SUPABASE.rpc("upsert_store_prices", {"p_rows": rows, "p_run_started": run_started}).execute()
+        return
+    except Exception:
+        if run_started is not None:
+            raise
+    # Migrations 19/22 not applied – plain upsert, no history.
+    try:
+        SUPABASE.table("stores_prices").upsert(rows).execute()
+    except Exception:
+        # Change-history (migration 19) or source (migration 31) columns missing – write the plain rows.
+        base_columns = ("place_id", "ingredient_name", "unit", "price_per_unit", "last_seen_at")
+        SUPABASE.table("stores_prices").upsert(
+            [{col: row[col] for col in base_columns} for row in rows]
+        ).execute()
+
+
+def record_misses(keys: List[PriceKey], history: Dict[PriceKey, Dict], attempted_at: datetime.datetime):
+    """Record lookups that found no price for never-priced keys, so they back off."""
+    rows = [
+        {"place_id": key[0], "ingredient_name": key[1], **record_miss(history.get(key), attempted_at)}
+        for key in keys
+        if (history.get(key) or {}).get("price_per_unit") is None
+    ]
+    if not rows:
+        return
+    try:
+        SUPABASE.table("price_refresh_misses").upsert(rows, on_conflict="place_id,ingredient_name").execute()
+    except Exception as exc:
+        # Migration 32 not applied – never-priced keys are retried every run.
+        logging.warning("Could not record %d price misses: %s", len(rows), exc)
 
 
-def bulk_upsert(rows: List[Dict]):
+def touch_chunk(rows: List[Dict], seen_at: str):
+    """Bump last_seen_at (and the unchanged streak) for prices that did not change."""
     if not rows:
-        logging.info("No rows to upsert; exiting")
         return
-    
-    # Deduplicate rows by (place_id, ingredient_name) keeping the most recent/best price
-    seen = {}
-    deduplicated = []
-    
-    for row in rows:
-        key = (row["place_id"], row["ingredient_name"])
-        if key not in seen or row["price_per_unit"] < seen[key]["price_per_unit"]:
-            seen[key] = row
-    
-    deduplicated = list(seen.values())
-    
-    logging.info("Bulk upserting %d deduplicated rows (from %d total)", len(deduplicated), len(rows))
-    SUPABASE.table("stores_prices").upsert(deduplicated).execute()
+    keys = [{"place_id": r["place_id"], "ingredient_name": r["ingredient_name"], "unit": r["unit"]} for r in rows]
+    try:
+        SUPABASE.rpc("touch_store_prices", {"p_keys": keys, "p_seen_at": seen_at}).execute()
+    except Exception:
+        # Migration 22 not applied – rewriting the rows is equivalent, just larger.
+        upsert_chunk(rows)
+
+
+async def write_prices(
+    queue: asyncio.Queue,
+    history: Dict[PriceKey, Dict],
+    checkpoint: bool = True,
+    run_started: Optional[str] = None,
+) -> int:
+    """Drain (key, rows) results from *queue* and upsert them in CHUNK_SIZE chunks.
+
+    Rows for the same (place_id, ingredient_name) are deduped within the
+    current window, keeping the cheapest price. A chunk's keys – including
+    those with no price found – are checkpointed only once its upsert has
+    committed, so a crashed run resumes after the last committed chunk
+    (sharded workers pass checkpoint=False; the jobs table tracks progress).
+    Never-priced keys with no price found are recorded in
+    price_refresh_misses, so the scheduler backs them off.
+    """
+    window: Dict[PriceKey, Dict] = {}
+    window_keys: List[PriceKey] = []
+    chunks = written = changed = 0
+    started = time.monotonic()
+
+    async def flush():
+        nonlocal chunks, written, changed
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # Compare against the in-memory snapshot: only new/changed prices are
+        # rewritten (and appended to price_history); the rest are just touched.
+        changed_rows, unchanged_rows = [], []
+        for key, row in window.items():
+            previous = history.get(key)
+            if is_unchanged(previous, row):
+                unchanged_rows.append({**row, **record_observation(previous, row["price_per_unit"], now)})
+            else:
+                changed_rows.append({**row, **record_observation(previous, row["price_per_unit"], now)})
+        # Keep the event loop (and the fetchers) running during the writes.
+        await asyncio.to_thread(upsert_chunk, changed_rows, run_started)
+        await asyncio.to_thread(touch_chunk, unchanged_rows, now.isoformat())
+        await asyncio.to_thread(record_misses, [key for key in window_keys if key not in window], history, now)
+        if changed_rows:
+            # Cached grocery lists priced from the old rows are stale now
+            await asyncio.to_thread(bump_price_snapshot_version, SUPABASE)
+        chunks += 1
+        written += len(changed_rows) + len(unchanged_rows)
+        changed += len(changed_rows)
+        if checkpoint:
+            append_checkpoint(chunks, window_keys)
+        elapsed = time.monotonic() - started
+        logging.info(
+            "Chunk %d: %d changed, %d unchanged (%d rows total, %d changed, %.1f rows/s)",
+            chunks, len(changed_rows), len(unchanged_rows), written, changed,
+            written / elapsed if elapsed else 0.0,
+        )
+        window.clear()
+        window_keys.clear()
+
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        key, rows = item
+        window_keys.append(key)
+        for row in rows:
+            if key not in window or row["price_per_unit"] < window[key]["price_per_unit"]:
+                window[key] = row
+        if len(window_keys) >= CHUNK_SIZE:
+            await flush()
+
+    if window_keys:
+        await flush()
+    return written
+
+
+def export_source_stats(stats: List[Dict], path: Path = METRICS_FILE):
+    """Log per-source health for the run and write it to *path*."""
+    for entry in stats:
+        logging.info(
+            "%s: %d requests, success %s, %d priced, %d failures, %d throttled, %d skipped, "
+            "circuit opened %d×, p50 %ss, p95 %ss",
+            entry["source"], entry["requests"], entry["success_rate"], entry["priced"], entry["failures"],
+            entry["throttle_events"], entry["skipped"], entry["circuit_opened"],
+            entry["latency_p50_s"], entry["latency_p95_s"],
+        )
+    try:
+        path.write_text(json.dumps({
+            "finished_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "sources": stats,
+        }, indent=2))
+    except OSError as exc:
+        logging.warning("Could not write metrics to %s: %s", path, exc)
+
+
+def build_candidates(
+    stores: List[Dict], ingredients: List[Dict], retailer: Optional[str] = None
+) -> Dict[PriceKey, List[Lookup]]:
+    """Group lookups by the stores_prices row they would refresh: one per retailer that can price the store."""
+    candidates: Dict[PriceKey, List[Lookup]] = {}
+    for store in stores:
+        for chain_retailer, links, ids in REGISTRY.routes(store):
+            if retailer is not None and chain_retailer != retailer:
+                continue
+            for ing in ingredients:
+                candidates.setdefault((store["place_id"], ing["name"]), []).append(
+                    (store, chain_retailer, links, ids, ing)
+                )
+    return candidates
+
+
+def plan_keys(
+    candidates: Dict[PriceKey, List],
+    history: Dict[PriceKey, Dict],
+    full: bool,
+    budget: Optional[int],
+    hot_names: Optional[Set[str]] = None,
+) -> List[PriceKey]:
+    """Return the candidate keys to fetch this run (all of them with *full*)."""
+    if full:
+        return list(candidates)
+    if hot_names is None:
+        hot_names = load_hot_ingredients()
+    hot_keys = {key for key in candidates if key[1] in hot_names}
+    costs = {key: len(lookups) for key, lookups in candidates.items()}
+    planned = plan_refresh(costs, history, hot_keys, budget)
+    logging.info(
+        "Scheduled %d of %d price rows (%d hot ingredients, budget %s requests)",
+        len(planned), len(candidates), len(hot_names), budget or "unlimited",
+    )
+    return planned
+
+
+async def stream_refresh(
+    candidates: Dict[PriceKey, List[Lookup]],
+    planned: List[PriceKey],
+    history: Dict[PriceKey, Dict],
+    checkpoint: bool = True,
+    run_started: Optional[str] = None,
+) -> int:
+    """Fetch *planned* keys concurrently, streaming them to the chunked writer.
+
+    Returns the number of rows written.
+    """
+    now = datetime.datetime.utcnow().isoformat()
+
+    async def fetch_one(store: Dict, retailer: str, links: List[SourceLink], ids: Dict[str, str], ing: Dict):
+        # Walks the retailer's chain: best-placed source first, fallbacks on a miss
+        price, resolved_unit, source = await REGISTRY.fetch_price(links, ids, ing["name"], ing["default_unit"])
+        if price is None:
+            return None
+        return {
+            "place_id": store["place_id"],
+            "ingredient_name": ing["name"],
+            "unit": resolved_unit or ing["default_unit"],
+            "price_per_unit": price,
+            "source": source,
+            "last_seen_at": now,
+        }
+
+    logging.info("Issuing %d price lookups", sum(len(candidates[key]) for key in planned))
+
+    # Bounded so fetchers pause instead of buffering the whole run when writes lag.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=CHUNK_SIZE * 2)
+    writer = asyncio.create_task(write_prices(queue, history, checkpoint, run_started))
+
+    async def refresh_key(key: PriceKey):
+        rows = await asyncio.gather(*(fetch_one(*lookup) for lookup in candidates[key]))
+        await queue.put((key, [row for row in rows if row]))
+
+    producers = asyncio.gather(*(refresh_key(key) for key in planned))
+    try:
+        # If the writer dies (e.g. an upsert keeps failing) stop fetching at once
+        # instead of blocking on a full queue.
+        await asyncio.wait({producers, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if writer.done():
+            writer.result()
+        await producers
+        await queue.put(None)
+        return await writer
+    finally:
+        producers.cancel()
+        writer.cancel()
+
+
+async def refresh_prices(history: Dict[PriceKey, Dict], full: bool = False, done: Optional[Set[PriceKey]] = None) -> int:
+    """Refresh every due store × retailer × ingredient price in this process.
+
+    Returns the number of rows written.
+    """
+    REGISTRY.load_health(SUPABASE)
+    PINS.load(list(REGISTRY.chains))
+    ingredients = iter_ingredients()  # fetch once
+    candidates = build_candidates(await resolve_external_ids(iter_store_mappings()), ingredients)
+
+    if done:
+        candidates = {key: lookups for key, lookups in candidates.items() if key not in done}
+        logging.info("Resuming: skipping %d keys committed by the previous run", len(done))
+
+    planned = plan_keys(candidates, history, full, REQUEST_BUDGET)
+    try:
+        return await stream_refresh(candidates, planned, history)
+    finally:
+        REGISTRY.save_health(SUPABASE)
+        export_source_stats(REGISTRY.stats())
+        logging.info("%d lookups priced by a fallback source", REGISTRY.fallbacks)
+        logging.info(
+            "Product pins: %d lookups priced by ID, %d searched, %d re-pinned, %d pins saved",
+            PINS.by_id, PINS.searched, PINS.repinned, PINS.save(),
+        )
+        # Sources share pooled per-host clients; release their connections.
+        await close_async_clients()
 
 
 def main():
-    price_rows = asyncio.run(gather_prices())
-    bulk_upsert(price_rows)
+    parser = argparse.ArgumentParser(description="Refresh stores_prices")
+    parser.add_argument("--full", action="store_true", help="ignore the schedule and refetch every row")
+    parser.add_argument("--reset", action="store_true", help="discard the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    if args.reset and CHECKPOINT_FILE.exists():
+        CHECKPOINT_FILE.unlink()
+
+    history = load_price_history()
+    written = asyncio.run(refresh_prices(history, full=args.full, done=load_checkpoint()))
+    logging.info("Refresh complete: %d rows written", written)
+
+    # Finished cleanly – the next run starts from scratch.
+    if CHECKPOINT_FILE.exists():
+        CHECKPOINT_FILE.unlink()
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+"""Sharded, lease-based price refresh across any number of workers.
+
+A run is split into one shard per (store place_id × retailer), recorded
+in the `price_refresh_jobs` table (migration 20). Workers – separate
+processes, possibly on different machines – claim shards with a lease,
+heartbeat while they fetch, and mark them done. A shard whose worker dies
+is reclaimed once its lease expires, so throughput grows with the number of
+workers and no shard is lost.
+
+In scheduled mode the staleness schedule is applied once, when the run is
+planned: each shard row records the ingredients it is due to fetch
+(migration 29). stores_prices keeps one row per (store, ingredient) however
+many retailers price it, so shards planning from the live table would see
+the rows their store's first finished shard just wrote and skip them.
+
+Each shard reuses refresh_prices: the same staleness schedule, source
+registry routing (the retailer's fallback chain), per-source guards and
+chunked streaming writes. Workers route on the source health saved by the
+last single-process refresh but do not update it, since concurrent workers
+would overwrite each other's counts. Product pins found by a shard are
+saved as soon as it finishes.
+
+Usage (from repo root, venv active):
+    # one machine, N local worker processes (plans the run first)
+    PYTHONPATH=backend python backend/scripts/refresh_workers.py local --workers 8
+
+    # multi-node: plan once, then start workers anywhere with the printed run id
+    PYTHONPATH=backend python backend/scripts/refresh_workers.py plan
+    PYTHONPATH=backend python backend/scripts/refresh_workers.py work --run-id <run id>
+
+Environment (in addition to refresh_prices.py's):
+    REFRESH_LEASE_SECONDS – shard lease length; heartbeats renew it every third (default 120).
+    REFRESH_MAX_ATTEMPTS – claims per shard before it is given up on (default 3).
+    REFRESH_SHARD_BUDGET – max price requests per shard in scheduled mode (default 200, 0 = unlimited).
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import multiprocessing
+import os
+import socket
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+
+import refresh_prices as rp
+from app.services.http_clients import close_async_clients
+from app.services.refresh_scheduler import plan_refresh
+
+LEASE_SECONDS = int(os.getenv("REFRESH_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("REFRESH_MAX_ATTEMPTS", "3"))
+SHARD_BUDGET = int(os.getenv("REFRESH_SHARD_BUDGET", "200")) or None
+INSERT_BATCH = 500
+
+
+class LeaseLost(Exception):
+    """Another worker took over the shard (our lease expired)."""
+
+
+def plan_shard(
+    candidates: Dict[rp.PriceKey, List], history: Dict[rp.PriceKey, Dict], hot_names: Set[str]
+) -> List[str]:
+    """Ingredient names of one shard's *candidates* due this run, most overdue first."""
+    hot_keys = {key for key in candidates if key[1] in hot_names}
+    costs = {key: len(lookups) for key, lookups in candidates.items()}
+    return [key[1] for key in plan_refresh(costs, history, hot_keys, SHARD_BUDGET)]
+
+
+def insert_jobs(jobs: List[Dict]) -> None:
+    try:
+        for start in range(0, len(jobs), INSERT_BATCH):
+            rp.SUPABASE.table("price_refresh_jobs").insert(jobs[start:start + INSERT_BATCH]).execute()
+    except Exception:
+        if not any("planned_ingredients" in job for job in jobs):
+            raise
+        # Migration 29 not applied – shards plan themselves from the live table.
+        logging.warning("price_refresh_jobs has no planned_ingredients column; shards will plan individually")
+        jobs = [{k: v for k, v in job.items() if k != "planned_ingredients"} for job in jobs]
+        for start in range(0, len(jobs), INSERT_BATCH):
+            rp.SUPABASE.table("price_refresh_jobs").upsert(jobs[start:start + INSERT_BATCH]).execute()
+
+
+def plan_run(full: bool = False) -> str:
+    """Create the shard rows for a new run and return its id (the run's start time).
+
+    Unless *full*, every shard's due ingredients are planned here from one
+    snapshot of stores_prices taken before any shard writes.
+    """
+    run_id = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    stores = asyncio.run(rp.resolve_external_ids(rp.iter_store_mappings()))
+    if not full:
+        ingredients = rp.iter_ingredients()
+        history = rp.load_price_history()
+        hot_names = rp.load_hot_ingredients()
+
+    jobs = []
+    planned_rows = 0
+    for store in stores:
+        # price_refresh_jobs.source holds the retailer whose chain the shard walks
+        for retailer, _, _ in rp.REGISTRY.routes(store):
+            job = {"run_id": run_id, "place_id": store["place_id"], "source": retailer}
+            if not full:
+                candidates = rp.build_candidates([store], ingredients, retailer=retailer)
+                job["planned_ingredients"] = plan_shard(candidates, history, hot_names)
+                planned_rows += len(job["planned_ingredients"])
+            jobs.append(job)
+
+    insert_jobs(jobs)
+    logging.info("Planned run %s with %d shards (%s)", run_id, len(jobs),
+                 "full" if full else f"{planned_rows} rows due")
+    return run_id
+
+
+def claim_job(run_id: str, worker_id: str) -> Optional[Dict]:
+    res = rp.SUPABASE.rpc(
+        "claim_price_refresh_job",
+        {"p_run_id": run_id, "p_worker": worker_id, "p_lease_seconds": LEASE_SECONDS, "p_max_attempts": MAX_ATTEMPTS},
+    ).execute()
+    return (res.data or [None])[0]
+
+
+def heartbeat(job: Dict, worker_id: str) -> bool:
+    res = rp.SUPABASE.rpc(
+        "heartbeat_price_refresh_job",
+        {
+            "p_run_id": job["run_id"],
+            "p_place_id": job["place_id"],
+            "p_source": job["source"],
+            "p_worker": worker_id,
+            "p_lease_seconds": LEASE_SECONDS,
+        },
+    ).execute()
+    return bool(res.data)
+
+
+def finish_job(job: Dict, worker_id: str, rows_written: int = 0, error: Optional[str] = None):
+    """Mark a shard done, or hand it back (failed after MAX_ATTEMPTS) on error."""
+    if error is None:
+        update = {"status": "done", "rows_written": rows_written,
+                  "completed_at": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+    else:
+        update = {"status": "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending",
+                  "last_error": error[:1000], "lease_owner": None, "lease_expires_at": None}
+    (
+        rp.SUPABASE.table("price_refresh_jobs")
+        .update(update)
+        .eq("run_id", job["run_id"])
+        .eq("place_id", job["place_id"])
+        .eq("source", job["source"])
+        .eq("lease_owner", worker_id)
+        .execute()
+    )
+
+
+async def keep_lease(job: Dict, worker_id: str):
+    """Renew the lease every LEASE_SECONDS / 3; raise LeaseLost if it was taken over."""
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        if not await asyncio.to_thread(heartbeat, job, worker_id):
+            raise LeaseLost(f"{job['place_id']}/{job['source']}")
+
+
+async def process_shard(job: Dict, ingredients: List[Dict], hot_names: Set[str], full: bool) -> int:
+    """Refresh one store × retailer shard; returns rows written."""
+    stores = await asyncio.to_thread(rp.iter_store_mappings, job["place_id"])
+    candidates = rp.build_candidates(stores, ingredients, retailer=job["source"])
+    if not candidates:
+        return 0
+
+    # Still loaded in every mode: the writer diffs against it to keep change history
+    history = await asyncio.to_thread(rp.load_price_history, job["place_id"])
+    planned_names = job.get("planned_ingredients")
+    if planned_names is not None and not full:
+        planned = [key for key in ((job["place_id"], name) for name in planned_names) if key in candidates]
+    else:
+        planned = rp.plan_keys(candidates, history, full, SHARD_BUDGET, hot_names)
+    return await rp.stream_refresh(candidates, planned, history, checkpoint=False, run_started=job["run_id"])
+
+
+async def work(run_id: str, worker_id: str, full: bool = False) -> int:
+    """Claim and process shards of *run_id* until none are left; returns shards completed."""
+    # The registry's guards live for the whole worker so breaker/AIMD state carries across shards.
+    await asyncio.to_thread(rp.REGISTRY.load_health, rp.SUPABASE)
+    await asyncio.to_thread(rp.PINS.load, list(rp.REGISTRY.chains))
+    ingredients = await asyncio.to_thread(rp.iter_ingredients)
+    hot_names = set() if full else await asyncio.to_thread(rp.load_hot_ingredients)
+    completed = 0
+    try:
+        while True:
+            job = await asyncio.to_thread(claim_job, run_id, worker_id)
+            if job is None:
+                break
+            logging.info("[%s] claimed %s/%s (attempt %d)", worker_id, job["place_id"], job["source"], job["attempts"])
+
+            shard = asyncio.create_task(process_shard(job, ingredients, hot_names, full))
+            lease = asyncio.create_task(keep_lease(job, worker_id))
+            try:
+                await asyncio.wait({shard, lease}, return_when=asyncio.FIRST_COMPLETED)
+                if lease.done():
+                    lease.result()  # raises LeaseLost
+                written = shard.result()
+            except LeaseLost as exc:
+                logging.warning("[%s] lost lease on %s; abandoning shard", worker_id, exc)
+                continue
+            except Exception as exc:
+                logging.error("[%s] shard %s/%s failed: %s", worker_id, job["place_id"], job["source"], exc)
+                await asyncio.to_thread(finish_job, job, worker_id, 0, str(exc))
+                continue
+            finally:
+                shard.cancel()
+                lease.cancel()
+
+            # Pins are keyed per (ingredient, retailer), so concurrent workers can save theirs
+            await asyncio.to_thread(rp.PINS.save)
+            await asyncio.to_thread(finish_job, job, worker_id, written)
+            completed += 1
+    finally:
+        rp.export_source_stats(
+            rp.REGISTRY.stats(),
+            rp.METRICS_FILE.with_name(f"{rp.METRICS_FILE.stem}.{worker_id}.json"),
+        )
+        await close_async_clients()
+    logging.info("[%s] no shards left; completed %d", worker_id, completed)
+    return completed
+
+
+def run_worker(run_id: str, worker_id: str, full: bool = False) -> int:
+    """Process-pool entry point."""
+    return asyncio.run(work(run_id, worker_id, full))
+
+
+def log_run_summary(run_id: str):
+    res = rp.SUPABASE.table("price_refresh_jobs").select("status, rows_written").eq("run_id", run_id).execute()
+    rows = res.data or []
+    statuses = Counter(row["status"] for row in rows)
+    logging.info(
+        "Run %s: %s; %d rows written",
+        run_id, ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())),
+        sum(row["rows_written"] or 0 for row in rows),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded stores_prices refresh")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("plan", help="create shards for a new run and print its id")
+    work_parser = sub.add_parser("work", help="process shards of an existing run")
+    work_parser.add_argument("--run-id", required=True)
+    work_parser.add_argument("--full", action="store_true", help="ignore the schedule and refetch every row")
+    local_parser = sub.add_parser("local", help="plan a run and process it with a local process pool")
+    local_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    local_parser.add_argument("--full", action="store_true", help="ignore the schedule and refetch every row")
+    args = parser.parse_args()
+
+    host = socket.gethostname()
+    if args.command == "plan":
+        print(plan_run())
+    elif args.command == "work":
+        run_worker(args.run_id, f"{host}-{os.getpid()}", args.full)
+        log_run_summary(args.run_id)
+    else:
+        run_id = plan_run(args.full)
+        # spawn: each worker builds its own Supabase/httpx clients instead of inheriting forked ones
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(run_worker, run_id, f"{host}-{i}", args.full) for i in range(args.workers)]
+            completed = sum(future.result() for future in futures)
+        logging.info("%d workers completed %d shards", args.workers, completed)
+        log_run_summary(run_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""Build synthetic replay fixtures for every price source.
+
+scripts/record_price_fixtures.py captures live traffic, which needs network
+access, store IDs and (for Kroger) credentials, and must not be committed
+unsanitized. This script instead answers each source's requests with small
+made-up pages and payloads in the shape its parser reads, runs the lookups
+through the real source code and saves the result as
+``backend/tests/fixtures/http/<source>.json.gz``. The committed fixtures are
+what the CI benchmark (scripts/bench_price_fixtures.py) replays, so any
+change to a parser's output fails the run until the fixtures are rebuilt.
+
+Every fixture prices a few catalog products (with package sizes, so per-unit
+conversion is exercised) and looks up one ingredient no store carries.
+
+Usage (from repo root, venv active):
+    PYTHONPATH=backend python backend/scripts/synthesize_price_fixtures.py [--source walmart_web ...]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote_plus, urlsplit
+
+import httpx
+
+from app.services import kroger
+from app.services.http_clients import close_async_clients
+from app.services.http_fixtures import FIXTURE_DIR, Cassette, recording
+from app.services.source_registry import SOURCE_CLASSES, make_source
+from app.services.token_provider import TokenProvider
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# search term -> (product name, package size, shelf price)
+CATALOG: Dict[str, Tuple[str, str, float]] = {
+    "whole milk": ("Lucerne Whole Milk", "1 gal", 4.29),
+    "large eggs": ("Grade A Large Eggs", "12 ct", 3.99),
+    "chicken breast": ("Boneless Skinless Chicken Breast", "1.5 lb", 8.97),
+    "olive oil": ("Extra Virgin Olive Oil", "16.9 fl oz", 7.49),
+}
+# Looked up too; no source carries it, so every parser's miss path is covered
+UNLISTED = "saffron threads"
+INGREDIENTS = [*CATALOG, UNLISTED]
+# Sources that sleep between requests get fewer lookups to keep this script short
+SLOW_SOURCES = {"aldi_web", "safeway_web_fixed"}
+STORE_IDS = {"kroger_api": "70100123", "walmart_web": "2119", "instacart_public": "safeway"}
+DEFAULT_STORE_ID = "3132"
+
+Product = Tuple[str, str, float]
+
+
+def _search_term(request: httpx.Request) -> str:
+    """The ingredient a source searched for, from its query string or URL path."""
+    parts = urlsplit(str(request.url))
+    params = dict(parse_qsl(parts.query))
+    for name in ("filter.term", "q", "query", "term"):
+        if name in params:
+            term = params[name]
+            break
+    else:
+        term = parts.path.rstrip("/").rsplit("/", 1)[-1]
+    # Some sources quote the term before httpx encodes it again
+    while unquote_plus(term) != term:
+        term = unquote_plus(term)
+    return term.lower()
+
+
+def _html(body: str) -> str:
+    return f"<!DOCTYPE html><html><head><title>Search</title></head><body>{body}</body></html>"
+
+
+def _script(marker: str, data) -> str:
+    return f"<script>{marker} = {json.dumps(data)};</script>"
+
+
+def _kroger(products: List[Product]):
+    return {"data": [
+        {"productId": f"000{i}", "description": name, "items": [{"price": {"regular": round(price * 100)}, "size": size}]}
+        for i, (name, size, price) in enumerate(products, 1)
+    ]}
+
+
+def _walmart(products: List[Product]):
+    items = [{"usItemId": str(1000 + i), "name": name, "size": size, "price": {"price": price}}
+             for i, (name, size, price) in enumerate(products, 1)]
+    return _html(_script("window.__WML_REDUX_INITIAL_STATE__", {"search": {"searchResult": {"itemStacks": [{"items": items}]}}}))
+
+
+def _safeway(products: List[Product]):
+    return {"response": {"docs": [{"name": name, "packageSize": size, "price": price} for name, size, price in products]}}
+
+
+def _safeway_v2(products: List[Product]):
+    return {"products": [{"name": name, "packageSize": size, "price": {"value": price}} for name, size, price in products]}
+
+
+def _safeway_fixed(products: List[Product]):
+    ld = "".join(
+        f'<script type="application/ld+json">{json.dumps({"@type": "Product", "name": name, "offers": {"price": price}})}</script>'
+        for name, _, price in products
+    )
+    return _html(ld + "<p>No results</p>" * (not products))
+
+
+def _instacart(products: List[Product]):
+    items = [{"name": name, "size": size, "pricing": {"price": {"amount": round(price * 100)}}} for name, size, price in products]
+    return {"modules": [{"data": {"items": items}}]}
+
+
+def _instacart_public(products: List[Product]):
+    items = [{"id": str(2000 + i), "name": name, "size": size, "price": price} for i, (name, size, price) in enumerate(products, 1)]
+    return _html(_script("window.__INITIAL_STATE__", {"search": {"products": items}}))
+
+
+def _aldi(products: List[Product]):
+    return _html("".join(f'<div class="product"><h3>{name}</h3><span class="price">${price:.2f}</span></div>'
+                         for name, _, price in products))
+
+
+# source -> builder of the response body (JSON-able or HTML) for the matching products
+RESPONDERS: Dict[str, Callable[[List[Product]], object]] = {
+    "kroger_api": _kroger,
+    "walmart_web": _walmart,
+    "safeway_web": _safeway,
+    "safeway_web_v2": _safeway_v2,
+    "safeway_web_fixed": _safeway_fixed,
+    "instacart_whole_foods": _instacart,
+    "instacart_safeway": _instacart,
+    "instacart_public": _instacart_public,
+    "aldi_web": _aldi,
+}
+
+
+def _respond(source_name: str, request: httpx.Request) -> httpx.Response:
+    term = _search_term(request)
+    products = [CATALOG[term]] if term in CATALOG else []
+    body = RESPONDERS[source_name](products)
+    if isinstance(body, str):
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, text=body, request=request)
+    return httpx.Response(200, json=body, request=request)
+
+
+async def _lookups(source, cassette: Cassette, store: str, ingredients: List[str], unit: str) -> None:
+    for ingredient in ingredients:
+        price, price_unit = await source.async_fetch_price(store, ingredient, unit)
+        cassette.lookups.append(
+            {"store": store, "ingredient": ingredient, "unit": unit, "price": price, "price_unit": price_unit}
+        )
+        logging.info("%s %s: %s / %s", source.source_name, ingredient, price, price_unit)
+    await close_async_clients()
+
+
+def synthesize(source_name: str, unit: str = "each") -> Optional[Cassette]:
+    """Run *source_name*'s lookups against synthetic responses; the saved cassette, or None."""
+    try:
+        source = make_source(source_name)
+    except ImportError as e:
+        logging.warning("Skipping %s: %s", source_name, e)
+        return None
+    cassette = Cassette(FIXTURE_DIR / f"{source_name}.json.gz", source_name)
+    ingredients = INGREDIENTS[:2] + [UNLISTED] if source_name in SLOW_SOURCES else INGREDIENTS
+    store = STORE_IDS.get(source_name, DEFAULT_STORE_ID)
+
+    sync_send = httpx.HTTPTransport.handle_request
+    async_send = httpx.AsyncHTTPTransport.handle_async_request
+
+    async def handle_async_request(transport, request):
+        return _respond(source_name, request)
+
+    # recording() wraps whatever the transports do when it starts: here, the synthetic responder
+    httpx.HTTPTransport.handle_request = lambda transport, request: _respond(source_name, request)
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+    try:
+        with recording(cassette):
+            asyncio.run(_lookups(source, cassette, store, ingredients, unit))
+    finally:
+        httpx.HTTPTransport.handle_request = sync_send
+        httpx.AsyncHTTPTransport.handle_async_request = async_send
+    cassette.recorded_at = "synthetic"
+    cassette.save()
+    return cassette
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", action="append", choices=sorted(SOURCE_CLASSES),
+                        help="source to build (repeatable; default: all)")
+    args = parser.parse_args()
+
+    # Lookups never reach the token endpoint
+    kroger.KROGER_TOKENS = TokenProvider(lambda: ("synthetic-token", 3600), name="synthetic token")
+
+    for source_name in args.source or sorted(SOURCE_CLASSES):
+        cassette = synthesize(source_name)
+        if cassette is not None:
+            priced = sum(1 for lookup in cassette.lookups if lookup["price"] is not None)
+            logging.info("Saved %s: %d/%d lookups priced, %d responses",
+                         cassette.path.name, priced, len(cassette.lookups), len(cassette.interactions))
+
+
+if __name__ == "__main__":
+    main()
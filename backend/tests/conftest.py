@@ -0,0 +1,149 @@
+import re
+
+import pytest
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+class FakeQuery:
+    """Chainable stand-in for a supabase-py query over in-memory rows.
+
+    Filters, order, range and limit apply to the rows as PostgREST would,
+    including its cap on the rows in one response;
+    update() and upsert() are recorded on the client and applied to the table.
+    """
+
+    def __init__(self, db, table, rows):
+        self.db = db
+        self.table = table
+        self.rows = list(rows)
+        self.orderings = []
+        self.slices = []
+        self.write = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def _filter(self, test):
+        self.rows = [row for row in self.rows if test(row)]
+        return self
+
+    def _compare(self, column, test):
+        return self._filter(lambda row: row.get(column) is not None and test(row[column]))
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        return self._filter(lambda row: row.get(column) != value)
+
+    def in_(self, column, values):
+        values = list(values)
+        self.db.in_filters.append((self.table, column, values))
+        return self._filter(lambda row: row.get(column) in values)
+
+    def gt(self, column, value):
+        return self._compare(column, lambda v: v > value)
+
+    def gte(self, column, value):
+        return self._compare(column, lambda v: v >= value)
+
+    def lt(self, column, value):
+        return self._compare(column, lambda v: v < value)
+
+    def lte(self, column, value):
+        return self._compare(column, lambda v: v <= value)
+
+    def ilike(self, column, pattern):
+        regex = re.compile(".*".join(re.escape(part) for part in pattern.split("%")), re.IGNORECASE)
+        return self._compare(column, lambda v: regex.fullmatch(str(v)) is not None)
+
+    def order(self, column, desc=False):
+        self.orderings.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.slices.append(slice(start, end + 1))
+        return self
+
+    def limit(self, n):
+        self.slices.append(slice(0, n))
+        return self
+
+    def _result_rows(self):
+        rows = self.rows
+        # Last key first, so the first order() call is the primary sort; NULLs last
+        for column, desc in reversed(self.orderings):
+            present = sorted((row for row in rows if row.get(column) is not None),
+                             key=lambda row: row[column], reverse=desc)
+            rows = present + [row for row in rows if row.get(column) is None]
+        for part in self.slices:
+            rows = rows[part]
+        return rows[:self.db.max_rows]
+
+    def update(self, values):
+        self.write = ("update", values)
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.write = ("upsert", rows)
+        return self
+
+    def execute(self):
+        self.db.queries.append(self.table)
+        if self.write is None:
+            return FakeResult(self._result_rows())
+        kind, payload = self.write
+        if kind == "update":
+            self.db.updates.append((self.table, payload))
+            for row in self.rows:
+                row.update(payload)
+            return FakeResult(self.rows)
+        self.db.writes.append((self.table, payload))
+        return FakeResult(payload if isinstance(payload, list) else [payload])
+
+class FakeSupabase:
+    """In-memory supabase client: ``tables`` maps table name -> rows,
+    ``rpcs`` maps function name -> rows or a callable of the params.
+
+    ``queries`` lists the table (or function) of every executed request,
+    ``rpc_calls`` every (function, params), ``in_filters`` every (table,
+    column, values) of an in_() filter, ``updates`` and ``writes`` every
+    update / upsert.
+    """
+
+    def __init__(self, tables=None, rpcs=None, max_rows=1000):
+        self.tables = tables if tables is not None else {}
+        self.max_rows = max_rows
+        self.rpcs = rpcs or {}
+        self.queries = []
+        self.rpc_calls = []
+        self.in_filters = []
+        self.updates = []
+        self.writes = []
+
+    def table(self, name):
+        return FakeQuery(self, name, self.tables.get(name, []))
+
+    def rpc(self, name, params=None):
+        self.rpc_calls.append((name, params))
+        rows = self.rpcs.get(name, [])
+        return FakeQuery(self, name, rows(params) if callable(rows) else rows)
+
+@pytest.fixture
+def fake_supabase():
+    """Factory for FakeSupabase clients: ``fake_supabase({"stores": [...]})``."""
+    return FakeSupabase
+
+@pytest.fixture
+def ingredient_unit_prices():
+    """RPC stand-in for migration 30 over *rows*: ``rpcs={"ingredient_unit_prices": ingredient_unit_prices(rows)}``."""
+
+    def over(rows):
+        def rpc(params):
+            distinct = {(row["ingredient_name"], row["unit"], row["price_per_unit"]) for row in rows
+                        if row["ingredient_name"] in params["p_names"] and row["price_per_unit"] > 0}
+            return [{"ingredient_name": name, "unit": unit, "price_per_unit": price} for name, unit, price in distinct]
+        return rpc
+    return over
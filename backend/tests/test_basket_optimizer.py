@@ -0,0 +1,96 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from app.services import basket_optimizer, pricing
+from app.services.basket_optimizer import optimize_basket
+
+def _brute_force(costs, k):
+    best = None
+    for stores in combinations(range(costs.shape[1]), min(k, costs.shape[1])):
+        chosen = costs[:, list(stores)]
+        missing = int((~np.isfinite(chosen)).all(axis=1).sum())
+        total = float(np.nansum(np.fmin.reduce(chosen, axis=1)))
+        if best is None or (missing, total) < best:
+            best = (missing, total)
+    return best
+
+def _random_costs(seed, n_items, n_stores, missing=0.3):
+    rng = np.random.default_rng(seed)
+    costs = rng.uniform(0.5, 12.0, (n_items, n_stores))
+    costs[rng.random(costs.shape) < missing] = np.nan
+    return costs
+
+@pytest.mark.parametrize("seed, n_stores, k", [(0, 6, 2), (1, 8, 3), (2, 10, 1), (3, 4, 6)])
+def test_exact_matches_brute_force(seed, n_stores, k):
+    costs = _random_costs(seed, 40, n_stores)
+    plan = optimize_basket(costs, k)
+    missing = int((plan.assignment < 0).sum())
+    assert plan.exact and len(plan.stores) <= k
+    assert (missing, plan.total) == pytest.approx(_brute_force(costs, k))
+
+def test_heuristic_is_close_to_exact(monkeypatch):
+    costs = _random_costs(4, 100, 12)
+    exact = optimize_basket(costs, 3)
+    monkeypatch.setattr(basket_optimizer, "EXACT_MAX_SUBSETS", 0)
+    heuristic = optimize_basket(costs, 3)
+    assert not heuristic.exact and len(heuristic.stores) <= 3
+    assert heuristic.total <= exact.total * 1.02
+
+def test_coverage_beats_cost():
+    nan = np.nan
+    costs = np.array([
+        [1.0, 1.0, 9.0],
+        [1.0, 1.0, 9.0],
+        [nan, nan, 9.0],  # only the dear store has it
+    ])
+    plan = optimize_basket(costs, 1)
+    assert plan.stores == [2] and plan.assignment.tolist() == [2, 2, 2]
+    plan = optimize_basket(costs, 2)
+    assert plan.assignment.tolist()[2] == 2 and plan.total == pytest.approx(11.0)
+
+def test_price_matrix_is_one_query(monkeypatch, fake_supabase):
+    db = fake_supabase({"stores_prices": [
+        {"place_id": "A", "ingredient_name": "chicken breast", "unit": "lb", "price_per_unit": 4.0},
+        {"place_id": "A", "ingredient_name": "chicken breast", "unit": "lb", "price_per_unit": 3.5},
+        {"place_id": "B", "ingredient_name": "chicken breast", "unit": "oz", "price_per_unit": 0.25},
+        {"place_id": "B", "ingredient_name": "brown rice", "unit": "lb", "price_per_unit": 1.5},
+        {"place_id": "C", "ingredient_name": "brown rice", "unit": "lb", "price_per_unit": 1.0},
+    ]})
+    monkeypatch.setattr(pricing, "get_supabase_admin", lambda: db)
+    matrix = pricing.get_price_matrix(["A", "B"], [("chicken breast", "lb"), ("brown rice", "lb")])
+    assert db.queries == ["stores_prices"]
+    assert matrix[0].tolist() == [3.5, 4.0]
+    assert np.isnan(matrix[1, 0]) and matrix[1, 1] == 1.5
+
+def test_price_matrix_at_grocery_list_scale(monkeypatch, fake_supabase):
+    # 100 items x 12 stores: more rows than one response holds
+    stores = [f"store-{j}" for j in range(12)]
+    items = [(f"item {i}", "lb") for i in range(100)]
+    db = fake_supabase({"stores_prices": [
+        {"place_id": place_id, "ingredient_name": name, "unit": unit, "price_per_unit": 1.1 + i / 100 + j / 1000}
+        for i, (name, unit) in enumerate(items) for j, place_id in enumerate(stores)
+    ]})
+    monkeypatch.setattr(pricing, "get_supabase_admin", lambda: db)
+    matrix = pricing.get_price_matrix(stores, items)
+    expected = 1.1 + np.arange(100)[:, None] / 100 + np.arange(12)[None, :] / 1000
+    assert np.allclose(matrix, expected)
+
+def test_grocery_list_split_across_stores(monkeypatch, fake_supabase):
+    from app.api.endpoints import grocery
+
+    matrix = np.array([[2.0, 3.0], [np.nan, 1.0], [np.nan, np.nan]])
+    monkeypatch.setattr(grocery, "get_price_matrix", lambda place_ids, keys: matrix)
+    monkeypatch.setattr(grocery, "get_prices_per_unit", lambda place_ids, keys, default=None: [5.0] * len(keys))
+    groceries = [
+        {"name": "milk", "unit": "cup", "quantity": 2.0},
+        {"name": "rice", "unit": "cup", "quantity": 1.0},
+        {"name": "saffron", "unit": "g", "quantity": 1.0},
+    ]
+    stores = fake_supabase({"stores": [{"place_id": "A", "name": "Store A"}, {"place_id": "B", "name": "Store B"}]})
+    items, baskets = grocery._optimized_items(stores, groceries, ["A", "B"], 1)
+    # B alone covers two items (7.0); A alone covers one
+    assert [item.store_place_id for item in items] == ["B", "B", None]
+    assert items[2].price_per_unit == 5.0
+    assert [(b.place_id, b.name, b.total_cost) for b in baskets] == [("B", "Store B", 7.0)]
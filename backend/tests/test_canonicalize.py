@@ -0,0 +1,89 @@
+import pytest
+from app.services.canonicalize import IngredientCanonicalizer, cluster_ingredients, normalize_ingredient_name, pick_canonical
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [
+        ("Chicken Breast", "chicken breast"),
+        ("boneless chicken breasts", "chicken breast"),
+        ("chicken breast, diced", "chicken breast"),
+        ("Fresh Basil Leaves", "basil leaf"),
+        ("Tomatoes (canned)", "canned tomato"),
+        ("tomatoes, canned", "canned tomato"),
+        ("Spinach (about 2 cups)", "spinach"),
+        ("crushed red pepper", "crushed red pepper"),
+        ("shredded cheddar cheese", "shredded cheddar cheese"),
+        ("cherries", "cherry"),
+        ("cookies", "cookie"),
+        ("rolled oats", "rolled oats"),
+        ("hummus", "hummus"),
+        ("salt, to taste", "salt"),
+        ("extra-virgin olive oil", "extra virgin olive oil"),
+    ],
+)
+def test_normalize_ingredient_name(raw, expected):
+    assert normalize_ingredient_name(raw) == expected
+
+def test_cluster_ingredients_groups_by_key_and_embedding():
+    rows = [
+        {"id": "1", "name": "chicken breast", "embedding": [1.0, 0.0, 0.0]},
+        {"id": "2", "name": "boneless chicken breasts", "embedding": None},
+        {"id": "3", "name": "scallion", "embedding": "[0.0, 1.0, 0.0]"},
+        {"id": "4", "name": "green onion", "embedding": [0.0, 0.99, 0.05]},
+        {"id": "5", "name": "rice", "embedding": [0.0, 0.0, 1.0]},
+    ]
+
+    clusters = cluster_ingredients(rows, similarity_threshold=0.95)
+    ids = sorted(sorted(row["id"] for row in members) for members in clusters)
+
+    assert ids == [["1", "2"], ["3", "4"]]
+
+def test_pick_canonical_prefers_normalized_name():
+    members = [
+        {"id": "1", "name": "Chicken Breasts"},
+        {"id": "2", "name": "chicken breast"},
+    ]
+    assert pick_canonical(members)["id"] == "2"
+
+class FakeAliases:
+    """Supabase stand-in answering every alias lookup with the current row."""
+
+    def __init__(self):
+        self.ingredient_id = "old"
+        self.reads = 0
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        self.reads += 1
+        db = self
+
+        class Result:
+            data = [{"ingredient_id": db.ingredient_id, "canonical_name": "milk"}]
+        return Result()
+
+def test_canonicalizer_cache_is_bounded_and_expires():
+    canonicalizer = IngredientCanonicalizer(max_entries=1, ttl=60)
+    canonicalizer.supabase = db = FakeAliases()
+    assert canonicalizer.resolve("Milk")["id"] == "old"
+    assert canonicalizer.resolve("milk")["id"] == "old" and db.reads == 1
+
+    db.ingredient_id = "new"  # duplicates merged
+    canonicalizer.clear_cache()
+    assert canonicalizer.resolve("milk")["id"] == "new"
+    canonicalizer.resolve("eggs")  # evicts milk
+    assert len(canonicalizer._cache) == 1
+
+    canonicalizer.ttl = -1  # everything is stale
+    db.ingredient_id = "newer"
+    assert canonicalizer.resolve("eggs")["id"] == "newer"
@@ -0,0 +1,87 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import grocery
+from app.core.auth import get_current_user
+from app.models.grocery import GroceryItem, GroceryListResponse
+from app.services.grocery_cache import GroceryListCache, MemoryBackend, SQLiteBackend
+
+class FakeSnapshot:
+    """Supabase stand-in serving the price_snapshot row."""
+
+    def __init__(self, version):
+        self.version = version
+        self.reads = 0
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        self.reads += 1
+        snapshot = self
+
+        class Result:
+            data = [{"version": snapshot.version}]
+        return Result()
+
+def _lru_evicts_least_recently_used(backend):
+    backend.set("a", ("1", "A"))
+    backend.set("b", ("2", "B"))
+    assert backend.get("a") == ("1", "A")  # a is now the most recent
+    backend.set("c", ("3", "C"))
+    assert backend.get("b") is None
+    assert backend.get("a") == ("1", "A") and backend.get("c") == ("3", "C")
+
+def test_memory_backend_is_lru():
+    _lru_evicts_least_recently_used(MemoryBackend(max_entries=2))
+
+def test_sqlite_backend_is_lru(tmp_path):
+    _lru_evicts_least_recently_used(SQLiteBackend(tmp_path / "cache.sqlite3", max_entries=2))
+
+def test_entries_are_keyed_by_snapshot_version():
+    db = FakeSnapshot(7)
+    cache = GroceryListCache(MemoryBackend(), supabase=db, version_ttl=60)
+    etag = cache.put("plan", cache.version(), '{"plan_id": "plan"}')
+    assert cache.get("plan", cache.version()) == (etag, '{"plan_id": "plan"}')
+    assert db.reads == 1  # version re-read only after the TTL
+
+    db.version = 8  # a refresh bumped the version
+    cache._version_read_at = None
+    assert cache.get("plan", cache.version()) is None
+    # without a readable version nothing is cached
+    cache.put("other", None, "{}")
+    assert cache.get("other", None) is None
+
+def test_endpoint_serves_cache_and_304(monkeypatch):
+    builds = []
+
+    def build(plan_id, max_stores=None):
+        builds.append(plan_id)
+        item = GroceryItem(name="milk", unit="cup", quantity=2, price_per_unit=0.5, cost=1.0)
+        return GroceryListResponse(plan_id=plan_id, items=[item], total_cost=1.0)
+
+    db = FakeSnapshot(1)
+    cache = GroceryListCache(MemoryBackend(), supabase=db, version_ttl=0)
+    monkeypatch.setattr(grocery, "build_grocery_list", build)
+    monkeypatch.setattr(grocery, "get_grocery_cache", lambda: cache)
+    app = FastAPI()
+    app.include_router(grocery.router)
+    app.dependency_overrides[get_current_user] = lambda: None
+    client = TestClient(app)
+    first = client.get("/grocery/p1")
+    assert first.status_code == 200 and first.json()["total_cost"] == 1.0
+    etag = first.headers["etag"]
+
+    again = client.get("/grocery/p1", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+    assert builds == ["p1"]
+
+    db.version = 2  # recomputed; same prices, so the ETag still matches
+    assert client.get("/grocery/p1", headers={"If-None-Match": etag}).status_code == 304
+    assert builds == ["p1", "p1"]
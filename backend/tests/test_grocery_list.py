@@ -0,0 +1,25 @@
+import re
+from pathlib import Path
+
+from app.services.grocery_list import get_plan_groceries
+from app.services.unit_conversion import UNIT_ALIASES, UNIT_SIZES
+
+MIGRATION = Path(__file__).resolve().parents[1] / "migrations" / "26_grocery_for_plan.sql"
+
+def test_unit_sizes_table_mirrors_unit_conversion():
+    rows = re.findall(r"\('([^']+)', '([^']+)', '(\w+)', ([\d.]+|NULL)\)", MIGRATION.read_text())
+    in_sql = {unit: (canonical, dimension, None if size == "NULL" else float(size))
+              for unit, canonical, dimension, size in rows}
+    expected = {unit: (unit, *UNIT_SIZES[unit]) for unit in UNIT_SIZES}
+    expected.update({alias: (canonical, *UNIT_SIZES[canonical]) for alias, canonical in UNIT_ALIASES.items()})
+    assert in_sql == expected
+
+def test_plan_groceries_come_from_one_rpc(fake_supabase):
+    db = fake_supabase(rpcs={"get_grocery_for_plan": [
+        {"name": "milk", "unit": "cup", "quantity": 2.25},
+        {"name": "garlic", "unit": "clove", "quantity": 6.0},
+        {"name": "salt", "unit": None, "quantity": 1.0},
+    ]})
+    rows = get_plan_groceries("plan-1", db)
+    assert db.rpc_calls == [("get_grocery_for_plan", {"p_plan_id": "plan-1"})]
+    assert [(row["name"], row["unit"]) for row in rows] == [("milk", "cup"), ("garlic", "clove")]
@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from app.services import html_extract
+from app.services.html_extract import first_json_blob, iter_json_blobs, iter_json_ld, match_brackets
+from app.services.walmart import WalmartPriceSource
+
+STATE = {"search": {"searchResult": {"itemStacks": [{"items": [{"name": 'brace } in "name"', "price": {"price": 2.98}}]}]}}}
+PAGE = (
+    "<html><head><script>var x = {};</script></head><body>"
+    + "<div class='pad'>{</div>" * 50
+    + "<script>window.__WML_REDUX_INITIAL_STATE__ = " + json.dumps(STATE) + ";</script>"
+    + '<script type="application/ld+json">{"@type": "Product", "offers": {"price": "3.49"}}</script>'
+    + "</body></html>"
+)
+
+def test_brackets_inside_strings_are_ignored():
+    text = 'x = {"a": "}]", "b": ["\\"{", {"c": 1}]} trailing }'
+    start = text.index("{")
+    end = match_brackets(text, start)
+    assert json.loads(text[start:end]) == {"a": "}]", "b": ['"{', {"c": 1}]}
+
+def test_unclosed_blob_is_bounded():
+    text = "window.__INITIAL_STATE__ = {" + '"k": 1, ' * 1000
+    assert match_brackets(text, text.index("{"), max_chars=100) is None
+    assert list(iter_json_blobs(text, ["window.__INITIAL_STATE__"])) == []
+
+def test_blob_followed_by_more_script():
+    text = '<script>window.__INITIAL_STATE__ = {"a": "};"}; init({"b": 2});</script>'
+    assert first_json_blob(text, ["window.__INITIAL_STATE__"]) == {"a": "};"}
+
+def test_first_json_blob_and_json_ld():
+    assert first_json_blob(PAGE, ["window.__WML_REDUX_INITIAL_STATE__"]) == STATE
+    assert first_json_blob(PAGE, ["window.__MISSING__"]) is None
+    assert list(iter_json_ld(PAGE)) == [{"@type": "Product", "offers": {"price": "3.49"}}]
+
+def test_walmart_parse_in_process_pool():
+    html_extract.configure_process_pool(1)
+    try:
+        result = asyncio.run(html_extract.run_cpu_bound(WalmartPriceSource._parse_search_page, PAGE, "each"))
+    finally:
+        html_extract.configure_process_pool(0)
+    assert result == (2.98, "each")
@@ -0,0 +1,86 @@
+import app.core.supabase
+from app.models.meal_plan import MealPlan
+from app.services import meal_plan_view, pricing
+from app.services.price_bounds import PriceBounds
+
+def _meal(day, name, ingredients):
+    return {
+        "meal_type": "dinner",
+        "day_of_week": day,
+        "servings": 2,
+        "recipes": {
+            "id": f"{name}-{day}",
+            "name": f"{name}_plan-1_{day}_dinner",
+            "instructions": ["Cook"], "prep_time_minutes": 5, "cook_time_minutes": 10, "servings": 2,
+            "calories_per_serving": 500, "protein_per_serving": 20, "carbs_per_serving": 50, "fat_per_serving": 10,
+            "recipe_ingredients": [
+                {"quantity": 1.0, "unit": unit, "ingredients": {"name": ing, "category": "x", "price_per_unit": 9.0}}
+                for ing, unit in ingredients
+            ],
+        },
+    }
+
+def _db(fake_supabase, days):
+    meals = [
+        _meal(day, "Mac_and_cheese", [("milk", "cup"), ("garlic", "clove"), (f"spice {day}", "tsp")])
+        for day in range(days)
+    ]
+    plan = {
+        "id": "plan-1", "start_date": "2026-01-01", "end_date": "2026-01-07", "total_cost": 10.0,
+        "meal_plan_stores": [{"place_id": "store-1"}],
+        "meal_plan_recipes": meals,
+    }
+    return fake_supabase({
+        "meal_plans": [plan],
+        "stores": [{"place_id": "store-1", "name": "Safeway"}],
+        "stores_prices": [{"place_id": "store-1", "price_per_unit": 0.25, "unit": "cup", "ingredient_name": "milk"}],
+    })
+
+def _read(monkeypatch, db):
+    monkeypatch.setattr(pricing, "get_supabase_admin", lambda: db)
+    monkeypatch.setattr(app.core.supabase, "get_supabase_admin", lambda: db)
+    bounds = PriceBounds()
+    bounds.load([])
+    monkeypatch.setattr(pricing, "get_price_bounds", lambda: bounds)
+    return meal_plan_view.get_plan_view("plan-1", db)
+
+def _check(plan):
+    assert [day["day_of_week"] for day in plan["days"]] == list(range(7))
+    recipe = plan["days"][3]["meals"][0]["recipe"]
+    assert recipe["name"] == "Mac_and_cheese"
+    prices = {ing["name"]: ing["price_per_unit"] for ing in recipe["ingredients"]}
+    # milk priced at the store; the rest keep their stored price
+    assert prices == {"milk": 0.25, "garlic": 9.0, "spice 3": 9.0}
+    assert plan["stores"] == [{"place_id": "store-1", "name": "Safeway"}]
+
+def test_plan_rows_read_uses_fixed_number_of_queries(monkeypatch, fake_supabase):
+    small, large = _db(fake_supabase, 1), _db(fake_supabase, 7)
+    _read(monkeypatch, small)
+    plan = _read(monkeypatch, large)
+    assert len(small.queries) == len(large.queries)
+    _check(plan)
+
+def _with_snapshot(db):
+    """Generate-time snapshot of the plan in *db*, as save_snapshot writes it."""
+    tree = db.tables["meal_plans"][0]
+    days = meal_plan_view.build_days(tree["id"], tree["meal_plan_recipes"])
+    plan = MealPlan(start_date=tree["start_date"], end_date=tree["end_date"], total_cost=10.0, days=days)
+    assert meal_plan_view.save_snapshot(db, tree["id"], plan, ["store-1"])
+    assert [table for table, _ in db.updates] == ["meal_plans"]
+    assert tree["snapshot"]["version"] == meal_plan_view.SNAPSHOT_VERSION
+    db.queries.clear()
+    return db
+
+def test_snapshot_read_is_one_plan_lookup(monkeypatch, fake_supabase):
+    small, large = _with_snapshot(_db(fake_supabase, 1)), _with_snapshot(_db(fake_supabase, 7))
+    _read(monkeypatch, small)
+    plan = _read(monkeypatch, large)
+    assert len(small.queries) == len(large.queries)
+    # one plan lookup; the relational rows are never read
+    assert large.queries.count("meal_plans") == 1
+    _check(plan)
+
+def test_missing_plan_is_none(monkeypatch, fake_supabase):
+    db = _db(fake_supabase, 1)
+    db.tables["meal_plans"] = []
+    assert _read(monkeypatch, db) is None
@@ -0,0 +1,57 @@
+import random
+
+from app.services.price_bounds import PriceBounds, compute_bounds
+from app.services.pricing import is_realistic_price, realism_bounds
+from app.services.source_registry import ESTIMATE_SOURCES
+
+def test_bounds_are_robust_to_broken_scrapes():
+    rng = random.Random(3)
+    observations = [("Chicken Breast", "lb", rng.uniform(3.5, 6.5), "kroger_api") for _ in range(40)]
+    observations += [("chicken breasts", "lbs", 0.01, "walmart_web"), ("chicken breast", "lb", 250.0, "walmart_web")]
+    observations += [("saffron", "g", 9.0, "aldi_web")] * 3  # too few samples to learn
+    [row] = compute_bounds(observations)
+
+    assert (row["ingredient_key"], row["unit"], row["samples"]) == ("chicken breast", "lb", 42)
+    assert row["lower"] < 3.5 and row["upper"] > 6.5
+    assert row["lower"] > 0.01 and row["upper"] < 250.0
+
+def test_identical_samples_still_leave_a_range():
+    [row] = compute_bounds([("milk", "gallon", 3.99, "kroger_api")] * 10)
+    assert row["lower"] < 3.0 and row["upper"] > 5.0
+
+def test_estimates_do_not_shape_the_bounds():
+    rng = random.Random(5)
+    observations = [("milk", "gallon", rng.uniform(3.0, 6.0), "kroger_api") for _ in range(6)]
+    # the fallback table's price at every store, written by the source or before sources were recorded
+    observations += [("milk", "gallon", 3.49, "safeway_fallback")] * 200
+    observations += [("milk", "gallon", 3.49, None)] * 200
+    [row] = compute_bounds(observations, exclude_sources=ESTIMATE_SOURCES)
+    assert row["samples"] == 7
+    assert row["lower"] < 3.0 and row["upper"] > 6.0
+    # estimates alone are never learned
+    assert compute_bounds([("eggs", "each", 0.35, "safeway_fallback")] * 50, exclude_sources=ESTIMATE_SOURCES) == []
+
+def test_learned_pairs_allow_uniform_prices_only_when_typical(monkeypatch):
+    bounds = PriceBounds()
+    bounds.load([
+        {"ingredient_key": "olive oil", "unit": "fl-oz", "lower": 0.12, "upper": 1.9},
+        {"ingredient_key": "steak", "unit": "lb", "lower": 4.0, "upper": 20.0},
+    ])
+    monkeypatch.setattr("app.services.pricing.get_price_bounds", lambda: bounds)
+    # $1.00/fl-oz sits inside the learned range but far above its median (~$0.48)
+    assert realism_bounds("olive oil", "fl-oz")[2] is False
+    assert not is_realistic_price(1.0, "olive oil", "fl-oz")
+    assert is_realistic_price(1.05, "olive oil", "fl-oz")
+    # $10/lb is what steak usually costs
+    assert is_realistic_price(10.0, "steak", "lb")
+
+def test_learned_bounds_replace_heuristics(monkeypatch):
+    bounds = PriceBounds()
+    bounds.load([{"ingredient_key": "salmon", "unit": "lb", "lower": 6.0, "upper": 30.0}])
+    monkeypatch.setattr("app.services.pricing.get_price_bounds", lambda: bounds)
+
+    assert is_realistic_price(14.99, "Salmon", "lb")  # heuristics cap lb at $8
+    assert not is_realistic_price(2.0, "salmon", "lb")
+    # unseen pairs keep the heuristics
+    assert not is_realistic_price(14.99, "carrots", "lb")
+    assert not is_realistic_price(5.0, "carrots", "each")
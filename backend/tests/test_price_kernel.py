@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+
+import app.core.supabase
+from app.services import price_kernel, pricing
+from app.services.price_bounds import PriceBounds, get_price_bounds
+from app.services.pricing import is_realistic_price, realism_bounds
+from app.services.unit_conversion import convert_price
+
+UNITS = ["lb", "oz", "g", "kg", "each", "ct", "cup", "ml", "fl oz", "slice", "clove", "bunch", "gallon"]
+NAMES = ["milk", "chicken breast", "garlic", "olive oil", "sourdough bread", "flour", "basil", "cheddar cheese"]
+
+def _scalar_cheapest(rows, items):
+    best = [None] * len(items)
+    for price, unit, group in rows:
+        name, target = items[group]
+        converted = price if unit == target else convert_price(price, unit, target, name)
+        if converted is not None and is_realistic_price(converted, name, target):
+            if best[group] is None or converted < best[group]:
+                best[group] = converted
+    return best
+
+def _kernel_cheapest(rows, items):
+    bounds = [realism_bounds(name, unit) for name, unit in items]
+    best = price_kernel.cheapest_per_group(
+        np.array([price for price, _, _ in rows]),
+        price_kernel.unit_codes(unit for _, unit, _ in rows),
+        np.array([group for _, _, group in rows], dtype=np.int64),
+        price_kernel.unit_codes(unit for _, unit in items),
+        price_kernel.class_codes(name for name, _ in items),
+        np.array([bound[0] for bound in bounds]),
+        np.array([bound[1] for bound in bounds]),
+        np.array([bound[2] for bound in bounds]),
+    )
+    return price_kernel.group_results(best)
+
+def test_kernel_matches_scalar_pricing():
+    get_price_bounds().load([{"ingredient_key": "garlic", "unit": "each", "lower": 0.3, "upper": 1.5}])
+    rng = random.Random(7)
+    items = [(name, unit) for name in NAMES for unit in UNITS]
+    rows = [
+        (rng.choice([round(rng.uniform(0.001, 12), 3), 1.0, 5.0, 0.0]), rng.choice(UNITS), rng.randrange(len(items)))
+        for _ in range(5000)
+    ]
+    expected = _scalar_cheapest(rows, items)
+    for got, want in zip(_kernel_cheapest(rows, items), expected):
+        assert (got is None and want is None) or abs(got - want) < 1e-9
+
+def test_multipliers_apply_after_the_realism_check():
+    best = price_kernel.cheapest_per_group(
+        np.array([7.5, 2.0]), price_kernel.unit_codes(["lb", "lb"]), np.array([0, 1]),
+        price_kernel.unit_codes(["lb", "lb"]), price_kernel.class_codes(["beef", "beef"]),
+        np.zeros(2), np.array([8.0, 8.0]), np.array([True, True]), multipliers=np.array([1.2, 1.2]),
+    )
+    assert np.allclose(best, [9.0, 2.4])
+
+def test_empty_and_unknown_units():
+    best = price_kernel.cheapest_per_group(
+        np.array([2.0, 3.0]), price_kernel.unit_codes(["bunch", "head"]), np.array([0, 1]),
+        price_kernel.unit_codes(["bunch", "bunch"]), price_kernel.class_codes([None, None]),
+        np.zeros(2), np.array([5.0, 5.0]), np.array([True, True]),
+    )
+    assert price_kernel.group_results(best) == [2.0, None]
+
+def _priced_from(monkeypatch, db):
+    monkeypatch.setattr(pricing, "get_supabase_admin", lambda: db)
+    monkeypatch.setattr(app.core.supabase, "get_supabase_admin", lambda: db)
+    bounds = PriceBounds()
+    bounds.load([])
+    monkeypatch.setattr(pricing, "get_price_bounds", lambda: bounds)
+
+def test_single_lookup_converts_like_the_batch(monkeypatch, fake_supabase):
+    db = fake_supabase({"stores_prices": [
+        {"place_id": "A", "ingredient_name": "milk", "unit": "each", "price_per_unit": 3.99},
+    ]})
+    _priced_from(monkeypatch, db)
+    # a half-gallon carton (package_ml 1892.7) is 8 cups, not the 4 of a generic "each"
+    [batched] = pricing.get_prices_per_unit(["A"], [("milk", "cup")])
+    assert pricing.get_price_per_unit(["A"], "milk", "cup") == batched == convert_price(3.99, "each", "cup", "milk")
+
+def test_batch_reads_candidates_past_the_row_cap(monkeypatch, fake_supabase, ingredient_unit_prices):
+    monkeypatch.setattr(pricing, "PAGE_SIZE", 3)
+    names = ["milk", "flour", "rice", "oats", "beans"]
+    rows = [
+        {"place_id": place_id, "ingredient_name": name, "unit": "lb", "price_per_unit": 1.25 + k / 100}
+        for k, name in enumerate(names) for place_id in ["A", "B"]
+    ]
+    # only stocked away from the selected store: priced through the global fallback
+    rows += [
+        {"place_id": place_id, "ingredient_name": "lentils", "unit": "lb", "price_per_unit": price}
+        for place_id, price in [("B", 2.75), ("C", 2.25), ("D", 2.5), ("E", 2.6)]
+    ]
+    db = fake_supabase(
+        {"stores_prices": rows, "stores": [{"place_id": "A", "name": "Corner Market"}]},
+        rpcs={"ingredient_unit_prices": ingredient_unit_prices(rows)},
+    )
+    _priced_from(monkeypatch, db)
+    prices = pricing.get_prices_per_unit(["A"], [(name, "lb") for name in names + ["lentils"]], substring_fallback=False)
+    assert prices == [1.25 + k / 100 for k in range(len(names))] + [2.25]
+    # 5 rows at A, then 4 distinct lentil prices anywhere: two pages of 3 each
+    assert db.queries.count("stores_prices") == 2
+    assert db.queries.count("ingredient_unit_prices") == 2
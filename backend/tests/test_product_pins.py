@@ -0,0 +1,79 @@
+import asyncio
+
+from app.services.price_sources import PriceSource, ProductHit
+from app.services import product_pins
+from app.services.product_pins import PinnedSource, ProductPins
+
+class FakeIdSource(PriceSource):
+    product_id_batch = 50
+
+    def __init__(self, catalog, searches, fail_batches=False):
+        self.catalog = catalog  # product id -> price
+        self.searches = searches  # ingredient -> ProductHit
+        self.fail_batches = fail_batches
+        self.batches = []
+        self.search_calls = []
+
+    @property
+    def source_name(self):
+        return "fake_api"
+
+    def fetch_price(self, store_external_id, ingredient_name, unit):
+        return (None, unit)
+
+    async def async_search_product(self, store_external_id, ingredient_name, unit):
+        self.search_calls.append(ingredient_name)
+        return self.searches.get(ingredient_name)
+
+    async def async_fetch_product_prices(self, store_external_id, product_ids):
+        self.batches.append(list(product_ids))
+        if self.fail_batches:
+            return None
+        return {pid: (self.catalog[pid], "lb") for pid in product_ids if pid in self.catalog}
+
+def _price_all(source, names):
+    async def run():
+        return await asyncio.gather(*(source.async_fetch_price("L1", name, "ea") for name in names))
+    return asyncio.run(run())
+
+def test_pinned_products_are_priced_in_one_batch():
+    pins = ProductPins()
+    pins._pins = {("milk", "kroger"): "P1", ("eggs", "kroger"): "P2", ("rice", "kroger"): "P3"}
+    src = FakeIdSource({"P1": 3.0, "P2": 4.0, "P3": 1.5}, {})
+    results = _price_all(PinnedSource(src, "kroger", pins), ["milk", "eggs", "rice"])
+
+    assert results == [(3.0, "lb"), (4.0, "lb"), (1.5, "lb")]
+    assert len(src.batches) == 1 and sorted(src.batches[0]) == ["P1", "P2", "P3"]
+    assert src.search_calls == [] and pins.by_id == 3
+
+def test_unpinned_and_disappeared_products_are_searched_and_pinned():
+    pins = ProductPins()
+    pins._pins = {("milk", "kroger"): "GONE"}
+    src = FakeIdSource({}, {
+        "milk": ProductHit("P9", 3.2, "gal", "2% Milk"),
+        "eggs": ProductHit("P8", 4.1, "ct", "Large Eggs"),
+    })
+    results = _price_all(PinnedSource(src, "kroger", pins), ["milk", "eggs"])
+
+    assert results == [(3.2, "gal"), (4.1, "ct")]
+    assert pins.get("milk", "kroger") == "P9" and pins.get("eggs", "kroger") == "P8"
+    assert pins.repinned == 1
+    assert {row["product_id"] for row in pins._pending.values()} == {"P8", "P9"}
+
+def test_failed_batch_falls_back_to_search_but_keeps_the_pin():
+    pins = ProductPins()
+    pins._pins = {("milk", "kroger"): "P1"}
+    src = FakeIdSource({}, {"milk": ProductHit("P7", 3.0, "gal")}, fail_batches=True)
+    assert _price_all(PinnedSource(src, "kroger", pins), ["milk"]) == [(3.0, "gal")]
+    assert pins.get("milk", "kroger") == "P1" and not pins._pending
+
+def test_load_pages_past_the_row_cap(monkeypatch, fake_supabase):
+    monkeypatch.setattr(product_pins, "PAGE_SIZE", 2)
+    db = fake_supabase({"product_mappings": [
+        {"ingredient_name": name, "retailer": retailer, "product_id": f"{name}-{retailer}"}
+        for name in ["milk", "eggs", "rice"] for retailer in ["kroger", "safeway"]
+    ]})
+    pins = ProductPins(db)
+    pins.load(["kroger"])
+    assert db.queries == ["product_mappings"] * 2
+    assert pins._pins == {(name, "kroger"): f"{name}-kroger" for name in ["milk", "eggs", "rice"]}
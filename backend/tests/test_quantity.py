@@ -0,0 +1,58 @@
+import pytest
+
+from app.services.kroger import KrogerPriceSource
+from app.services.quantity import parse_quantity, unit_price
+from app.services.walmart import WalmartPriceSource
+
+# (size string, expected (total quantity, canonical unit))
+CASES = [
+    ("12 ct / 2 lb", (2.0, "lb")),
+    ("1 gal", (1.0, "gallon")),
+    ("16.9 fl oz (6 pk)", (101.4, "fl-oz")),
+    ("2 x 500 g", (1000.0, "g")),
+    ("1/2 gal", (0.5, "gallon")),
+    ("1 1/2 lb", (1.5, "lb")),
+    ("750 mL", (750.0, "ml")),
+    ("2 L", (2.0, "l")),
+    ("18 ct", (18.0, "each")),
+    ("1 dozen", (12.0, "each")),
+    ("4 pk / 12 oz", (48.0, "oz")),
+    ("Lucerne Butter Salted - 4-4 Oz", (16.0, "oz")),
+    ("Signature SELECT Extra Virgin Olive Oil - 25.5 Fl. Oz.", (25.5, "fl-oz")),
+    ("Great Value Large White Eggs, 18 Count", (18.0, "each")),
+    ("Coca-Cola Soda Pop, 12 fl oz, 12 Pack Cans", (144.0, "fl-oz")),
+    ("Coke Zero - 6-16.9 Fl. Oz.", (101.4, "fl-oz")),
+    ("3-4 lb", (3.5, "lb")),
+    ("Whole Turkey - avg. 4-5 lb", (4.5, "lb")),
+    ("Pork Shoulder approx 2.5-3.5 Lb", (3.0, "lb")),
+    ("12 oz (Pack of 6)", (72.0, "oz")),
+    ("Half Gallon", (0.5, "gallon")),
+    ("Lucerne 2% Milk - Half-Gallon", (0.5, "gallon")),
+    ("per lb", (1.0, "lb")),
+    ("Each", (1.0, "each")),
+    ("Cilantro 1 bunch", None),
+    ("vitamin b12", None),
+    ("", None),
+    (None, None),
+]
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_parse_quantity(text, expected):
+    parsed = parse_quantity(text)
+    if expected is None:
+        assert parsed is None
+    else:
+        assert parsed[0] == pytest.approx(expected[0]) and parsed[1] == expected[1]
+
+def test_unit_price_uses_first_parseable_size():
+    assert unit_price(6.0, [None, "no size here", "3 lb"], "each") == (2.0, "lb")
+    assert unit_price(6.0, ["no size here"], "each") == (6.0, "each")
+
+def test_sources_price_per_package_unit():
+    kroger = {"items": [{"price": {"regular": 399}, "size": "1/2 gal"}]}
+    assert KrogerPriceSource()._price_product(kroger, "cup") == (7.98, "gallon")
+
+    item = {"name": "Great Value Whole Milk, 1 Gallon", "price": {"price": 3.48}}
+    assert WalmartPriceSource._item_unit_price(item, "cup") == (3.48, "gallon")
+    item = {"name": "Great Value Large White Eggs, 18 Count", "price": {"price": 4.50}}
+    assert WalmartPriceSource._item_unit_price(item, "each") == (0.25, "each")
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.refresh_scheduler import (
+    BASE_INTERVAL,
+    HOT_INTERVAL,
+    MAX_INTERVAL,
+    hot_ingredient_names,
+    is_unchanged,
+    plan_refresh,
+    record_miss,
+    record_observation,
+    refresh_interval,
+)
+
+NOW = datetime(2025, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+def _row(hours_ago, refresh_count=0, change_count=0, unchanged_streak=0, price=1.0):
+    return {
+        "price_per_unit": price,
+        "last_seen_at": (NOW - timedelta(hours=hours_ago)).isoformat(),
+        "refresh_count": refresh_count,
+        "change_count": change_count,
+        "unchanged_streak": unchanged_streak,
+    }
+
+def test_refresh_interval_backs_off_for_stable_prices():
+    assert refresh_interval(_row(0)) == BASE_INTERVAL
+    assert refresh_interval(_row(0), hot=True) == HOT_INTERVAL
+    assert refresh_interval(_row(0, refresh_count=3, unchanged_streak=3)) == BASE_INTERVAL * 8
+    assert refresh_interval(_row(0, refresh_count=50, unchanged_streak=50)) == MAX_INTERVAL
+
+def test_refresh_interval_does_not_back_off_for_volatile_prices():
+    volatile = _row(0, refresh_count=10, change_count=5, unchanged_streak=4)
+    assert refresh_interval(volatile) == BASE_INTERVAL
+
+def test_plan_refresh_orders_by_staleness_and_respects_budget():
+    rows = {
+        "fresh": _row(1),
+        "stale": _row(48),
+        "very_stale": _row(96),
+        "stable": _row(48, refresh_count=4, unchanged_streak=4),  # 16 days, capped at the 14 day MAX_INTERVAL
+    }
+    costs = {"fresh": 1, "stale": 1, "very_stale": 1, "stable": 1, "never_seen": 2}
+
+    assert plan_refresh(costs, rows, set(), budget=None, now=NOW) == ["never_seen", "very_stale", "stale"]
+    assert plan_refresh(costs, rows, set(), budget=3, now=NOW) == ["never_seen", "very_stale"]
+    # A hot ingredient is due after HOT_INTERVAL
+    assert "fresh" not in plan_refresh(costs, rows, {"fresh"}, budget=None, now=NOW)
+    rows["fresh"] = _row(7)
+    assert "fresh" in plan_refresh(costs, rows, {"fresh"}, budget=None, now=NOW)
+
+def test_never_priced_keys_back_off_after_misses():
+    missed = {**record_miss(None, NOW - timedelta(hours=30)), "place_id": "A", "ingredient_name": "saffron"}
+    assert missed["miss_count"] == 1
+    rows = {"stale": _row(48), "missed": missed}
+    costs = {"stale": 1, "missed": 1, "never_tried": 1}
+
+    # One miss waits 2 × BASE_INTERVAL instead of staying first forever
+    assert plan_refresh(costs, rows, set(), budget=2, now=NOW) == ["never_tried", "stale"]
+    rows["missed"] = {**missed, **record_miss(missed, NOW - timedelta(hours=120))}
+    assert rows["missed"]["miss_count"] == 2
+    assert plan_refresh(costs, rows, set(), budget=None, now=NOW) == ["never_tried", "stale", "missed"]
+    rows["missed"]["miss_count"] = 3
+    assert "missed" not in plan_refresh(costs, rows, set(), budget=None, now=NOW)
+
+def test_record_observation_tracks_changes():
+    first = record_observation(None, 2.0, NOW)
+    assert first["refresh_count"] == 1 and first["change_count"] == 0
+
+    unchanged = record_observation({**_row(24, refresh_count=1), **first, "price_per_unit": 2.0}, 2.001, NOW)
+    assert unchanged["unchanged_streak"] == 1 and unchanged["change_count"] == 0
+
+    changed = record_observation({**_row(24, refresh_count=2, unchanged_streak=1), "price_per_unit": 2.0}, 2.5, NOW)
+    assert changed["unchanged_streak"] == 0
+    assert changed["change_count"] == 1
+    assert changed["last_changed_at"] == NOW.isoformat()
+
+def test_hot_ingredient_names():
+    rows = [{"ingredients": {"name": "rice"}}, {"ingredients": None}, {"ingredients": {"name": "rice"}}]
+    assert hot_ingredient_names(rows) == {"rice"}
+
+def test_is_unchanged_requires_same_unit_and_price():
+    previous = {"unit": "lb", "price_per_unit": 2.00}
+    assert is_unchanged(previous, {"unit": "lb", "price_per_unit": 2.005})
+    assert not is_unchanged(previous, {"unit": "lb", "price_per_unit": 2.50})
+    assert not is_unchanged(previous, {"unit": "oz", "price_per_unit": 2.00})
+    assert not is_unchanged(None, {"unit": "lb", "price_per_unit": 2.00})
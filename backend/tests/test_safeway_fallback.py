@@ -0,0 +1,65 @@
+import json
+import random
+
+from app.services.safeway_fallback import EstimateIndex, SafewayFallbackPriceSource, load_estimates
+
+def _legacy_match(estimates, name):
+    """The per-call linear scan the index replaced."""
+    name = name.lower().strip()
+    if name in estimates.items:
+        return estimates.items[name]
+    best, best_score = None, 0
+    for key in estimates.items:
+        words, key_words = set(name.split()), set(key.split())
+        if words & key_words:
+            score = len(words & key_words) / len(words | key_words)
+        elif name in key or key in name:
+            score = 0.5
+        else:
+            score = 0.0
+        if score > best_score and score > 0.3:
+            best, best_score = key, score
+    if best:
+        return estimates.items[best]
+    for _, price, keywords in estimates._categories:
+        if any(keyword in name for keyword in keywords):
+            return price
+    return estimates.default_price
+
+NAMES = [
+    "Milk", "almond milk", "oat milk", "whole milk yogurt", "cherry tomatoes", "canned tomatoes",
+    "red bell pepper", "pepper", "boneless chicken thighs", "pork chops", "fresh dill", "heavy cream",
+    "sesame oil", "jarred salsa", "quinoa", "  Eggs ", "brown rice", "frozen mixed vegetables", "",
+]
+
+def test_index_matches_legacy_scan():
+    source = SafewayFallbackPriceSource()
+    for name in NAMES:
+        assert source.fetch_price("3132", name, "lb") == (_legacy_match(source.estimates, name), "lb"), name
+
+def test_containment_lookups_match_legacy_scan():
+    index = load_estimates()
+    rng = random.Random(3)
+    names = ["tomato", "buttermilk", "egg", "ch", "a", "chickenbreast"]
+    for key in index.items:
+        start = rng.randrange(len(key))
+        names.append(key[start:start + rng.randint(1, 8)])  # inside an item name
+        names.append(f"xq{key}zz")  # around an item name
+    for name in names:
+        assert index.match(name)[0] == _legacy_match(index, name), name
+
+def test_matches_are_memoized_per_normalized_name():
+    index = load_estimates()
+    assert index.match("Cherry Tomatoes") is index.match("cherry tomatoes ")
+
+def test_estimates_load_from_a_data_file(tmp_path):
+    path = tmp_path / "estimates.json"
+    path.write_text(json.dumps({
+        "default_price": 1.0,
+        "items": {"saffron": 12.5},
+        "categories": [{"name": "spice", "price": 4.0, "keywords": ["spice"]}],
+    }))
+    index = EstimateIndex.from_file(path)
+    assert index.match("saffron threads") == (12.5, "similar", "saffron")
+    assert index.match("pumpkin spice") == (4.0, "category", "spice")
+    assert index.match("gravel") == (1.0, "default", None)
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from app.services import source_guard
+from app.services.source_guard import AIMDLimiter, CircuitBreaker, SourceGuard
+
+class FlakySource:
+    source_name = "flaky_test"
+
+    def __init__(self, fail=True):
+        self.fail = fail
+        self.calls = 0
+
+    async def async_fetch_price(self, store_external_id, ingredient_name, unit):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("boom")
+        return (1.25, unit)
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    for _ in range(2):
+        breaker.record(False, breaker.admit())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_count == 1
+
+    # reset_timeout elapsed: one probe is let through, concurrent calls are skipped
+    assert breaker.admit() == CircuitBreaker.HALF_OPEN
+    assert breaker.admit() is None
+    breaker.record(True, CircuitBreaker.HALF_OPEN)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_aimd_limiter_increases_additively_and_halves_once_per_interval():
+    async def run():
+        limiter = AIMDLimiter(initial=4, maximum=8, decrease_interval=60)
+        for _ in range(4):
+            await limiter.acquire()
+            await limiter.release(True)
+        assert 4.9 < limiter.limit < 5.0
+        for _ in range(3):
+            await limiter.acquire()
+            await limiter.release(False)
+        assert limiter.limit < 2.5
+        assert limiter.limit > 2.4
+    asyncio.run(run())
+
+def test_source_guard_skips_source_once_circuit_opens():
+    async def run():
+        source = FlakySource()
+        guard = SourceGuard(source.source_name, failure_threshold=3, reset_timeout=60)
+        results = [await guard.fetch_price(source, "1", f"item {i}", "lb") for i in range(10)]
+        return source, guard, results
+    source, guard, results = asyncio.run(run())
+
+    assert results == [(None, "lb")] * 10
+    assert source.calls == 3
+    stats = guard.stats()
+    assert stats["failures"] == 3
+    assert stats["skipped"] == 7
+    assert stats["circuit_opened"] == 1
+    assert stats["success_rate"] == 0
+
+def test_source_guard_records_successes():
+    async def run():
+        source = FlakySource(fail=False)
+        guard = SourceGuard(source.source_name)
+        price = await guard.fetch_price(source, "1", "rice", "lb")
+        return guard, price
+    guard, price = asyncio.run(run())
+    assert price == (1.25, "lb")
+    assert guard.stats()["success_rate"] == 1.0
+    assert guard.stats()["priced"] == 1
+
+def test_retry_after_is_clamped(monkeypatch, caplog):
+    monkeypatch.setattr(source_guard, "MAX_RETRY_AFTER_S", 60.0)
+    assert source_guard._retry_after_seconds("30", "walmart_web") == 30.0
+    assert not caplog.records
+    with caplog.at_level(logging.WARNING):
+        assert source_guard._retry_after_seconds("86400", "walmart_web") == 60.0
+    assert "walmart_web" in caplog.text
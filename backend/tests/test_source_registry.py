@@ -0,0 +1,72 @@
+import asyncio
+
+from app.services.source_guard import TokenBucket
+from app.services.source_registry import MIN_SAMPLES, PROBE_EVERY, SourceLink, SourceRegistry
+
+class FakeSource:
+    def __init__(self, name, price=None):
+        self.source_name = name
+        self.price = price
+        self.calls = 0
+
+    async def async_fetch_price(self, store_external_id, ingredient_name, unit):
+        self.calls += 1
+        return (self.price, unit)
+
+CHAINS = {
+    "safeway": [
+        SourceLink("scraper_a", "safeway_store_id"),
+        SourceLink("scraper_b", "safeway_store_id"),
+        SourceLink("estimates", "safeway_store_id", default_id="3132", estimate=True),
+    ],
+    "kroger": [SourceLink("kroger", "kroger_location_id")],
+}
+
+def _registry(**prices):
+    sources = {name: FakeSource(name, price) for name, price in prices.items()}
+    registry = SourceRegistry(CHAINS, sources=sources)
+    for guard in registry.guards.values():
+        guard.bucket = TokenBucket(1e6, 1_000_000)  # no rate limiting in tests
+    return registry, sources
+
+def test_routes_pick_id_columns_and_defaults():
+    registry, _ = _registry(scraper_a=None, scraper_b=None, estimates=2.0, kroger=1.0)
+    routes = registry.routes({"place_id": "p", "safeway_store_id": None, "kroger_location_id": "K1"})
+    by_retailer = {retailer: ids for retailer, _, ids in routes}
+    assert by_retailer == {"safeway": {"estimates": "3132"}, "kroger": {"kroger": "K1"}}
+    assert registry.id_columns() == ["kroger_location_id", "safeway_store_id"]
+
+def _lookups(registry, links, ids, n):
+    async def run():
+        for _ in range(n):
+            await registry.fetch_price(links, ids, "milk", "gal")
+    asyncio.run(run())
+
+def test_falls_back_down_the_chain_and_reorders():
+    registry, sources = _registry(scraper_a=None, scraper_b=3.5, estimates=2.0)
+    [(_, links, ids)] = registry.routes({"place_id": "p", "safeway_store_id": "S1"})
+
+    price, _, source = asyncio.run(registry.fetch_price(links, ids, "milk", "gal"))
+    assert (price, source) == (3.5, "scraper_b")
+    assert registry.fallbacks == 1
+
+    _lookups(registry, links, ids, 50)
+    # scraper_b prices every time, so it is tried first and scraper_a is left alone
+    assert registry.order(links)[0].source == "scraper_b"
+    assert sources["scraper_a"].calls < 10
+    assert sources["estimates"].calls == 0
+
+def test_dead_sources_are_only_probed():
+    registry, sources = _registry(scraper_a=None, scraper_b=None, estimates=2.0)
+    [(_, links, ids)] = registry.routes({"place_id": "p", "safeway_store_id": "S1"})
+
+    _lookups(registry, links, ids, 500)
+    assert registry.is_dead("scraper_a") and registry.is_dead("scraper_b")
+    assert sources["scraper_a"].calls <= MIN_SAMPLES + 500 // PROBE_EVERY
+    assert sources["estimates"].calls == 500
+
+def test_estimates_are_last_resort():
+    registry, sources = _registry(scraper_a=None, scraper_b=None, estimates=2.0)
+    [(_, links, ids)] = registry.routes({"place_id": "p", "safeway_store_id": "S1"})
+    assert [link.source for link in registry.order(links)][-1] == "estimates"
+    assert asyncio.run(registry.fetch_price(links, ids, "eggs", "ct"))[2] == "estimates"
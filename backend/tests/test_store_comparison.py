@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from app.api.endpoints import grocery
+from app.services import pricing
+from app.services.store_comparison import compare_stores, item_names
+
+nan = np.nan
+
+def test_totals_coverage_and_estimates():
+    prices = np.array([
+        [2.0, nan, nan],
+        [1.0, 1.5, nan],
+        [nan, nan, nan],
+    ])
+    baseline = np.array([2.0, 1.0, nan])
+    totals = compare_stores(prices, baseline, np.array([1.0, 1.2, 0.8]), np.array([1.0, 2.0, 3.0]))
+    assert totals.totals.tolist() == pytest.approx([4.0, 2.4 + 3.0, 1.6 + 1.6])
+    assert totals.direct_totals.tolist() == pytest.approx([4.0, 3.0, 0.0])
+    assert totals.coverage.tolist() == pytest.approx([2 / 3, 1 / 3, 0.0])
+    names = ["milk", "rice", "saffron"]
+    assert item_names(totals.estimated, names) == [[], ["milk"], ["milk", "rice"]]
+    assert item_names(totals.missing, names) == [["saffron"], ["saffron"], ["saffron"]]
+
+def test_compare_plan_and_nearby_stores(monkeypatch, fake_supabase, ingredient_unit_prices):
+    prices = [
+        {"place_id": "kroger-1", "ingredient_name": "brown rice", "unit": "lb", "price_per_unit": 1.5},
+        {"place_id": "kroger-1", "ingredient_name": "chicken breast", "unit": "lb", "price_per_unit": 4.0},
+        {"place_id": "far-1", "ingredient_name": "chicken breast", "unit": "lb", "price_per_unit": 3.5},
+        {"place_id": "wf-1", "ingredient_name": "brown rice", "unit": "lb", "price_per_unit": 2.0},
+    ]
+    db = fake_supabase({
+        "meal_plan_stores": [{"meal_plan_id": "p1", "place_id": "kroger-1"}],
+        "stores": [
+            {"place_id": "kroger-1", "name": "Kroger", "lat": 37.0, "lon": -122.0},
+            {"place_id": "wf-1", "name": "Whole Foods Market", "lat": 37.01, "lon": -122.0},
+            {"place_id": "far-1", "name": "Safeway", "lat": 38.0, "lon": -122.0},
+        ],
+        "stores_prices": prices,
+    }, rpcs={"ingredient_unit_prices": ingredient_unit_prices(prices)})
+    monkeypatch.setattr(grocery, "get_supabase_admin", lambda: db)
+    monkeypatch.setattr(pricing, "get_supabase_admin", lambda: db)
+    monkeypatch.setattr(grocery, "get_plan_groceries", lambda plan_id, supabase: [
+        {"name": "brown rice", "unit": "lb", "quantity": 2.0},
+        {"name": "chicken breast", "unit": "lb", "quantity": 1.0},
+        {"name": "saffron", "unit": "g", "quantity": 1.0},
+    ])
+
+    result = grocery.build_store_comparison("p1", radius_km=5)
+    # the compared stores' rows, plus one aggregated read for the baseline
+    assert db.queries.count("stores_prices") == 1 and db.queries.count("ingredient_unit_prices") == 1
+    [place_ids] = [values for table, column, values in db.in_filters if (table, column) == ("stores_prices", "place_id")]
+    assert sorted(place_ids) == ["kroger-1", "wf-1"]
+    by_id = {store.place_id: store for store in result.stores}
+    assert set(by_id) == {"kroger-1", "wf-1"}  # far-1 is outside the radius
+
+    kroger, whole_foods = by_id["kroger-1"], by_id["wf-1"]
+    assert kroger.in_plan and not whole_foods.in_plan
+    assert kroger.total_cost == 7.0 and kroger.coverage_pct == pytest.approx(66.7)
+    assert kroger.missing_items == ["saffron"] and kroger.estimated_items == []
+    # Whole Foods has no chicken price: the cheapest anywhere (3.50) at its price level
+    assert whole_foods.estimated_items == ["chicken breast"]
+    assert whole_foods.direct_cost == 4.0 and whole_foods.total_cost > 4.0 + 3.5
@@ -0,0 +1,48 @@
+import asyncio
+
+from app.services.store_id_resolver import KROGER_BANNERS, StoreIdResolver, always, grid_cell, name_matches
+
+def _store(place_id, name, lat, lon):
+    return {"place_id": place_id, "name": name, "lat": lat, "lon": lon,
+            "kroger_location_id": None, "walmart_store_id": None}
+
+def test_grid_cell_groups_nearby_points():
+    assert grid_cell(37.001, -122.201) == grid_cell(37.009, -122.209)
+    assert grid_cell(37.001, -122.201) != grid_cell(37.05, -122.201)
+
+def test_resolver_shares_lookups_per_cell_and_honours_negative_cache(fake_supabase):
+    negative_cell = grid_cell(40.0, -100.0)
+    db = fake_supabase({"store_id_cache": [
+        {"id_column": "walmart_store_id", "grid_cell": negative_cell, "external_id": None, "expires_at": "2999-01-01T00:00:00+00:00"},
+        # expired: resolved again
+        {"id_column": "kroger_location_id", "grid_cell": grid_cell(37.001, -122.201), "external_id": "K0", "expires_at": "2000-01-01T00:00:00+00:00"},
+    ]})
+    calls = []
+
+    def kroger_lookup(lat, lon):
+        calls.append("kroger")
+        return "K1"
+
+    def walmart_lookup(lat, lon):
+        calls.append("walmart")
+        return "W1"
+
+    resolver = StoreIdResolver(db, {
+        "kroger_location_id": (kroger_lookup, name_matches(KROGER_BANNERS)),
+        "walmart_store_id": (walmart_lookup, always),
+    })
+    stores = [
+        _store("a", "Ralphs", 37.001, -122.201),
+        _store("b", "Kroger Marketplace", 37.002, -122.202),
+        _store("c", "Corner Market", 40.0, -100.0),
+    ]
+    asyncio.run(resolver.resolve(stores))
+
+    # one Kroger + one Walmart lookup for the shared cell; none for the cached miss
+    assert sorted(calls) == ["kroger", "walmart"]
+    assert [s["kroger_location_id"] for s in stores] == ["K1", "K1", None]
+    assert [s["walmart_store_id"] for s in stores] == ["W1", "W1", None]
+
+    writes = dict(db.writes)
+    assert {row["place_id"] for row in writes["stores"]} == {"a", "b"}
+    assert len(writes["store_id_cache"]) == 2
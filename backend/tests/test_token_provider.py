@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.token_provider import TokenProvider
+
+class CountingFetcher:
+    def __init__(self, expires_in=3600):
+        self.calls = 0
+        self.expires_in = expires_in
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(0.05)  # slow token endpoint widens the race window
+        return f"token-{n}", self.expires_in
+
+def test_concurrent_threads_share_a_single_fetch():
+    fetch = CountingFetcher()
+    provider = TokenProvider(fetch)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        tokens = list(pool.map(lambda _: provider.get_token(), range(20)))
+    assert fetch.calls == 1
+    assert set(tokens) == {"token-1"}
+
+def test_concurrent_coroutines_share_a_single_fetch():
+    fetch = CountingFetcher()
+    provider = TokenProvider(fetch)
+
+    async def run():
+        return await asyncio.gather(*(provider.async_get_token() for _ in range(20)))
+
+    assert set(asyncio.run(run())) == {"token-1"}
+    assert fetch.calls == 1
+
+def test_expired_and_invalidated_tokens_are_refetched():
+    fetch = CountingFetcher(expires_in=30)  # inside the 60s expiry margin
+    provider = TokenProvider(fetch)
+    assert provider.get_token() == "token-1"
+    assert provider.get_token() == "token-2"
+
+    fetch.expires_in = 3600
+    provider = TokenProvider(fetch)
+    provider.get_token()
+    provider.invalidate()
+    assert provider.get_token() == "token-4"
+
+def test_late_401_does_not_drop_a_refreshed_token():
+    fetch = CountingFetcher()
+    provider = TokenProvider(fetch)
+    old = provider.get_token()
+    provider.invalidate(old)
+    assert provider.get_token() == "token-2"
+    provider.invalidate(old)  # 401 for a request that still used token-1
+    assert provider.get_token() == "token-2"
+    assert fetch.calls == 2
+
+def test_token_is_persisted_and_reused(tmp_path):
+    cache = tmp_path / "token.json"
+    fetch = CountingFetcher()
+    assert TokenProvider(fetch, cache_path=cache).get_token() == "token-1"
+
+    second_run = TokenProvider(fetch, cache_path=cache)
+    assert second_run.get_token() == "token-1"
+    assert fetch.calls == 1
+    assert cache.stat().st_mode & 0o777 == 0o600
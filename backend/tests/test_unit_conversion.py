@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.unit_conversion import canonical_unit, conversion_factor, convert_price, ingredient_class
+
+# (price, from_unit, to_unit, ingredient, expected per-unit price)
+CASES = [
+    (4.00, "lb", "oz", None, 0.25),
+    (10.00, "kg", "g", None, 0.01),
+    (0.25, "oz", "lb", None, 4.00),
+    (3.00, "gallon", "quart", "milk", 0.75),
+    (1.00, "cup", "tbsp", None, 1 / 16),
+    (2.00, "l", "ml", None, 0.002),
+    (4.00, "lbs", "Pounds", None, 4.00),
+    (2.50, "each", "ct", None, 2.50),
+    (3.00, "each", "slice", None, 0.60),
+    (4.00, "each", "slice", "sourdough bread", 0.20),
+    (0.60, "slices", "each", None, 3.00),
+    (1.00, "each", "clove", "garlic", 0.10),
+    (3.00, "each", "cup", "whole milk", 3.00 * 236.588 / 1892.7),
+    (1.50, "ct", "cup", "chickpeas", 1.50 * 236.588 / 355.0),
+    (3.00, "each", "lb", None, 3.00 * 453.592 / 300.0),
+    (0.01, "g", "cup", "all-purpose flour", 0.01 * 236.588 * 0.53),
+    (8.00, "l", "lb", "olive oil", 8.00 * 453.592 / (1000 * 0.92)),
+    (1.00, "fl oz", "ml", None, 1 / 29.5735),
+    (5.00, "bunch", "bunch", None, 5.00),
+    (5.00, "bunch", "lb", None, None),
+]
+
+@pytest.mark.parametrize("price, from_unit, to_unit, ingredient, expected", CASES)
+def test_convert_price(price, from_unit, to_unit, ingredient, expected):
+    result = convert_price(price, from_unit, to_unit, ingredient)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected, rel=1e-4)
+
+def test_round_trips_are_inverse():
+    for ingredient in (None, "milk", "flour", "garlic"):
+        for a, b in [("lb", "cup"), ("each", "g"), ("clove", "tbsp"), ("gallon", "each")]:
+            assert conversion_factor(a, b, ingredient) * conversion_factor(b, a, ingredient) == pytest.approx(1.0)
+
+def test_aliases_and_classes():
+    assert canonical_unit(" Fl Oz ") == "fl-oz"
+    assert canonical_unit("tbsp.") == "tbsp"
+    assert ingredient_class("Peanut Butter") == "default"
+    assert ingredient_class("unsalted butter") == "butter"
+    assert ingredient_class(None) == "default"